@@ -1,15 +1,23 @@
 import logging
-from typing import Optional
+from typing import Optional, Union
 import uuid
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import get_settings
 from app.db.session import get_db_session
 from app.db.models.user import User
 from app.features.auth import get_required_user_from_session
+from app.features.chat.pagination import HistoryCursor
+from app.features.chat.search import SearchCursor, search_chat_messages
+from app.features.chat.sessions import list_chat_sessions
+from app.features.chat.turn_events import get_turn_owner, read_turn_events
 from app.services.chat_service import ChatService, get_chat_service
+from app.shared.clients import get_redis
+from app.shared.utils import format_sse_event
 
 # Import schemas and dependencies from the new feature-specific files
 from app.features.chat.schemas import (
@@ -17,6 +25,11 @@ from app.features.chat.schemas import (
     ChatHistoryResponse,
     ChatMessageRequest,
     ChatMessageAPIResponse,
+    ChatSearchHitResponse,
+    ChatSearchResponse,
+    ChatSessionListResponse,
+    ChatSessionResponse,
+    ChatTurnAcceptedResponse,
     GreetingResponse,
 )
 
@@ -47,13 +60,13 @@ async def get_greeting(
     chat_service: ChatService = Depends(get_chat_service),  # Inject ChatService
 ):
     """
-    Generates a dynamic greeting for the authenticated user based on past interactions.
+    Returns a dynamic greeting for the authenticated user based on past interactions.
+    Served from the greeting cache, revalidated in the background when stale.
     """
-    logger.info(f"Generating dynamic greeting for user {user_id}.")
+    logger.info(f"Fetching dynamic greeting for user {user_id}.")
 
     try:
-        # Call the new service method to generate the greeting
-        greeting_text = await chat_service.generate_greeting(db=db, user_id=user_id)
+        greeting_text = await chat_service.get_greeting(db=db, user_id=user_id)
 
         return GreetingResponse(greeting=greeting_text)
 
@@ -77,29 +90,61 @@ async def get_chat_history(
     db: AsyncSession = Depends(get_db_session),
     chat_service: ChatService = Depends(get_chat_service),  # Inject ChatService
     session_id: Optional[UUID] = None,  # Optional query parameter
-    limit: int = Query(default=5, ge=1, le=10),  # Optional limit query parameter
+    limit: int = Query(default=5, ge=1, le=100),  # Optional limit query parameter
+    before: Optional[str] = Query(
+        default=None, description="Cursor: load the messages older than this"
+    ),
+    after: Optional[str] = Query(
+        default=None, description="Cursor: load the messages newer than this"
+    ),
 ):
     """
     Retrieves chat message history for the authenticated user.
     Can filter by session_id or retrieve recent messages across sessions.
+
+    Returns the newest messages by default. Scroll back by passing the response's
+    `older_cursor` as `before`, and fetch newer messages with `newer_cursor` as `after`.
     """
     logger.info(
         f"Fetching chat history for user {user_id}, session_id: {session_id}, limit: {limit}"
     )
 
+    if before is not None and after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Pass either 'before' or 'after', not both.",
+        )
+    try:
+        before_cursor = HistoryCursor.decode(before) if before else None
+        after_cursor = HistoryCursor.decode(after) if after else None
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from e
+
     try:
         # Call the new service method to get chat history
-        messages = await chat_service.get_history(
-            db=db, user_id=user_id, session_id=session_id, limit=limit
+        page = await chat_service.get_history(
+            db=db,
+            user_id=user_id,
+            session_id=session_id,
+            limit=limit,
+            before=before_cursor,
+            after=after_cursor,
         )
 
         # Convert ORM models to Pydantic models
         chat_messages_response = [
-            ChatMessageResponse.model_validate(msg) for msg in messages
+            ChatMessageResponse.model_validate(msg) for msg in page.messages
         ]
 
-        logger.info(f"Found {len(messages)} chat messages for user {user_id}")
-        return ChatHistoryResponse(messages=chat_messages_response)
+        logger.info(f"Found {len(page.messages)} chat messages for user {user_id}")
+        return ChatHistoryResponse(
+            messages=chat_messages_response,
+            has_more=page.has_more,
+            older_cursor=page.older_cursor,
+            newer_cursor=page.newer_cursor,
+        )
 
     except Exception as e:
         logger.error(
@@ -111,9 +156,111 @@ async def get_chat_history(
         ) from e
 
 
-@router.post("/message", response_model=ChatMessageAPIResponse)
+@router.get("/sessions", response_model=ChatSessionListResponse)
+async def list_sessions(
+    user_id: UUID = Depends(get_required_user_from_session),
+    db: AsyncSession = Depends(get_db_session),
+    limit: int = Query(default=20, ge=1, le=100),
+    before: Optional[str] = Query(
+        default=None, description="Cursor: load the sessions after this one"
+    ),
+):
+    """
+    Lists the authenticated user's chat sessions, most recently active first.
+    """
+    try:
+        before_cursor = HistoryCursor.decode(before) if before else None
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from e
+
+    try:
+        page = await list_chat_sessions(db, user_id, limit=limit, before=before_cursor)
+    except Exception as e:
+        logger.error(
+            f"Failed to list chat sessions for user {user_id}: {e}", exc_info=True
+        )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to list chat sessions.",
+        ) from e
+    return ChatSessionListResponse(
+        sessions=[ChatSessionResponse.model_validate(s) for s in page.sessions],
+        next_cursor=page.next_cursor,
+    )
+
+
+@router.get("/search", response_model=ChatSearchResponse)
+async def search_messages(
+    q: str = Query(
+        ...,
+        min_length=1,
+        max_length=256,
+        description='Search terms; supports "quoted phrases", or, and -excluded words',
+    ),
+    user_id: UUID = Depends(get_required_user_from_session),
+    db: AsyncSession = Depends(get_db_session),
+    session_id: Optional[UUID] = Query(
+        default=None, description="Only search this chat session"
+    ),
+    limit: int = Query(default=20, ge=1, le=50),
+    cursor: Optional[str] = Query(
+        default=None, description="Cursor: load the hits after this one"
+    ),
+):
+    """
+    Searches the authenticated user's chat messages, best matches first.
+    """
+    try:
+        after = SearchCursor.decode(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from e
+
+    try:
+        page = await search_chat_messages(
+            db, user_id, q, session_id=session_id, limit=limit, after=after
+        )
+    except Exception as e:
+        logger.error(
+            f"Failed to search chat messages for user {user_id}: {e}", exc_info=True
+        )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to search chat messages.",
+        ) from e
+    return ChatSearchResponse(
+        hits=[
+            ChatSearchHitResponse(
+                id=hit.message.id,
+                session_id=hit.message.session_id,
+                role=hit.message.role,
+                timestamp=hit.message.timestamp,
+                snippet=hit.snippet,
+                rank=hit.rank,
+            )
+            for hit in page.hits
+        ],
+        next_cursor=page.next_cursor,
+    )
+
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # Disable proxy buffering (nginx) so tokens flush
+}
+
+
+@router.post(
+    "/message",
+    response_model=Union[ChatMessageAPIResponse, ChatTurnAcceptedResponse],
+    responses={202: {"model": ChatTurnAcceptedResponse}},
+)
 async def post_chat_message(
     request: ChatMessageRequest,
+    response: Response,
     user_id: UUID = Depends(get_required_user_from_session),
     db: AsyncSession = Depends(get_db_session),
     chat_service: ChatService = Depends(get_chat_service),
@@ -121,6 +268,10 @@ async def post_chat_message(
     """
     Processes a new user chat message, interacts with the AI agent, and returns the response.
     Manages chat sessions.
+
+    In async mode (`run_async`, defaulting to CHAT_ASYNC_TURNS) the turn is queued in
+    the worker instead and a 202 with the turn ID is returned; follow its progress
+    with GET /turns/{turn_id}/events.
     """
     logger.info(
         f"Received message for user {user_id}, session_id: {request.session_id}"
@@ -131,6 +282,33 @@ async def post_chat_message(
         str(request.session_id) if request.session_id else str(uuid.uuid4())
     )
 
+    run_async = (
+        request.run_async
+        if request.run_async is not None
+        else get_settings().CHAT_ASYNC_TURNS
+    )
+    if run_async:
+        try:
+            turn = await chat_service.enqueue_turn(
+                user_message=request.message,
+                user_id=user_id,
+                session_id=session_id_str,
+            )
+        except Exception as e:
+            logger.error(
+                f"Error queueing chat turn for user {user_id}: {e}", exc_info=True
+            )
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="An error occurred while processing your message.",
+            ) from e
+        response.status_code = status.HTTP_202_ACCEPTED
+        return ChatTurnAcceptedResponse(
+            turn_id=UUID(turn["turn_id"]),
+            session_id=UUID(turn["session_id"]),
+            events_url=f"/api/chat/turns/{turn['turn_id']}/events",
+        )
+
     # Interact with the ChatService
     try:
         # Fetch User object as ChatService.interact expects it
@@ -142,15 +320,17 @@ async def post_chat_message(
                 status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
             )
 
-        response = await chat_service.interact(
+        result = await chat_service.interact(
             db=db,
             user_message=request.message,  # Pass the simple string message
             user=user,  # Pass the fetched User object
-            session_id=session_id_str,  # Pass the generated session ID
+            # The requested session, so duplicate first messages of a new session
+            # are coalesced into one turn; interact() then creates the session
+            session_id=str(request.session_id) if request.session_id else None,
         )
         # ChatService.interact returns {"reply": str, "session_id": str}
         return ChatMessageAPIResponse(
-            reply=response["reply"], session_id=UUID(response["session_id"])
+            reply=result["reply"], session_id=UUID(result["session_id"])
         )
     except HTTPException as e:
         # Re-raise HTTPExceptions from the service layer
@@ -163,3 +343,80 @@ async def post_chat_message(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while processing your message.",
         ) from e
+
+
+@router.post("/message/stream")
+async def post_chat_message_stream(
+    request: ChatMessageRequest,
+    user_id: UUID = Depends(get_required_user_from_session),
+    db: AsyncSession = Depends(get_db_session),
+    chat_service: ChatService = Depends(get_chat_service),
+):
+    """
+    Streaming variant of POST /message using Server-Sent Events.
+
+    Emits a `session` event first, then `token` and `tool_call` events as the agent
+    generates them, `tool_result` events once tools have run, and finally `done`
+    (with the full reply) or `error`. Messages are persisted exactly as in POST /message.
+    """
+    logger.info(
+        f"Received streaming message for user {user_id}, session_id: {request.session_id}"
+    )
+
+    session_id_str = (
+        str(request.session_id) if request.session_id else str(uuid.uuid4())
+    )
+
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+        )
+
+    async def event_stream():
+        async for event in chat_service.interact_stream(
+            user_message=request.message,
+            user=user,
+            session_id=session_id_str,
+        ):
+            yield format_sse_event(event["event"], event["data"])
+
+    return StreamingResponse(
+        event_stream(), media_type="text/event-stream", headers=SSE_HEADERS
+    )
+
+
+@router.get("/turns/{turn_id}/events")
+async def get_chat_turn_events(
+    turn_id: UUID,
+    user_id: UUID = Depends(get_required_user_from_session),
+    last_event_id: Optional[str] = Header(default=None),
+):
+    """
+    Streams the progress of a turn queued by POST /message in async mode as
+    Server-Sent Events.
+
+    Emits the same events as POST /message/stream, each with an SSE `id`. Clients
+    that reconnect with `Last-Event-ID` resume after that event; otherwise the
+    turn's events are replayed from the start. The stream ends after `done` or `error`.
+    """
+    redis = get_redis()
+    owner = await get_turn_owner(redis, str(turn_id))
+    if owner != str(user_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Turn not found"
+        )
+
+    async def event_stream():
+        async for item in read_turn_events(
+            redis, str(turn_id), last_event_id=last_event_id or "0"
+        ):
+            if item is None:
+                yield ": keep-alive\n\n"
+                continue
+            event_id, event, data = item
+            yield format_sse_event(event, data, event_id=event_id)
+
+    return StreamingResponse(
+        event_stream(), media_type="text/event-stream", headers=SSE_HEADERS
+    )
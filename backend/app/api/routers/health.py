@@ -10,6 +10,17 @@ from app.config import (
     Settings,
     get_settings,
 )  # Import Settings and the cached dependency
+from app.shared.clients import (
+    get_hedging_stats,
+    get_llm_client_pool,
+    get_llm_rate_limiter,
+    get_llm_response_cache,
+    get_single_flight,
+)
+from app.features.chat.message_writer import get_chat_message_writer
+from app.features.chat.prompt_cache import get_prompt_cache_stats
+from app.services.embedding_service import get_embedding_service
+from app.shared.tools.cache import get_tool_result_cache
 
 router = APIRouter(tags=["Health"])
 
@@ -23,6 +34,26 @@ async def health_check() -> HealthResponse:
     return HealthResponse(status="ok")
 
 
+@router.get("/health/metrics")
+async def runtime_metrics():
+    """
+    Returns in-process runtime metrics (e.g. LLM connection pool usage, response,
+    prompt and tool cache hit rates and coalesced calls).
+    Values are per API worker process.
+    """
+    return {
+        "llm_pool": get_llm_client_pool().stats(),
+        "llm_cache": get_llm_response_cache().stats(),
+        "llm_rate_limit": get_llm_rate_limiter().stats(),
+        "llm_hedging": get_hedging_stats(),
+        "prompt_cache": get_prompt_cache_stats(),
+        "single_flight": get_single_flight().stats(),
+        "tool_cache": get_tool_result_cache().stats(),
+        "chat_writer": get_chat_message_writer().stats(),
+        "embeddings": get_embedding_service().stats(),
+    }
+
+
 @router.get("/test-settings")
 async def test_settings_dependency(settings: Settings = Depends(get_settings)):
     """
@@ -13,7 +13,7 @@ database_url = settings.DATABASE_URL
 ```
 """
 
-from typing import Optional, List
+from typing import Dict, Optional, List, Tuple
 from pydantic import (
     HttpUrl,
     SecretStr,
@@ -45,9 +45,83 @@ class Settings(BaseSettings):
     SUPERTOKENS_API_KEY: SecretStr
 
     # --- LLM Configuration (Haystack) ---
+    LLM_TIMEOUT: float = 60.0  # Seconds per LLM HTTP request
+    LLM_MAX_RETRIES: int = 2  # Retries performed by the OpenAI client
+    LLM_HTTP2: bool = True  # Use HTTP/2 to the LLM gateway when 'h2' is installed
+    LLM_HTTP_MAX_CONNECTIONS: int = 100  # Connection pool size per process
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20  # Idle connections kept warm
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = 30.0  # Seconds before idle connections close
+    LLM_CACHE_ENABLED: bool = True  # Master switch for the exact-match response cache
+    LLM_CACHE_PIPELINES: str = Field(
+        default=""
+    )  # Comma-separated pipelines opted into response caching (e.g. "greeting,summary")
+    LLM_CACHE_TTL_SECONDS: int = 24 * 3600  # Cached LLM responses expire after a day
+    LLM_CACHE_MAX_ENTRIES: int = 10000  # Oldest entries are evicted beyond this count
+    LLM_CACHE_MAX_ENTRY_BYTES: int = 64 * 1024  # Larger responses are not cached
+    LLM_EMBEDDING_MODEL: str = "openai/text-embedding-3-small"  # 1536 dimensions
+    EMBEDDING_BACKEND: str = "openai"  # "openai" (the LLM gateway) or "local" (CPU)
+    EMBEDDING_BATCH_MAX_TOKENS: int = 8000  # Est. input tokens per embedding request
+    EMBEDDING_BATCH_MAX_TEXTS: int = 256  # Max inputs per embedding request
+    EMBEDDING_MICROBATCH_WAIT_MS: float = 5.0  # Query batching delay; 0 disables
+    LLM_SINGLE_FLIGHT_LOCK_TTL_SECONDS: float = 120.0  # Max time a call may lead
+    LLM_SINGLE_FLIGHT_RESULT_TTL_SECONDS: int = 10  # Result kept for late duplicates
+    # Per-model LLM limits shared by all processes through Redis (0 = unlimited)
+    LLM_RATE_LIMIT_REQUESTS_PER_MINUTE: int = 0
+    LLM_RATE_LIMIT_TOKENS_PER_MINUTE: int = 0
+    LLM_MAX_CONCURRENT_REQUESTS: int = 0  # Requests in flight per model
+    # Model-specific limits, e.g. "openai/gpt-4o=500:200000" (requests:tokens)
+    LLM_RATE_LIMIT_OVERRIDES: str = ""
+    LLM_RATE_LIMIT_RESERVE_RATIO: float = 0.2  # Kept back from each lower priority
+    LLM_RATE_LIMIT_MAX_WAIT_SECONDS: float = 60.0  # Then the call fails
+    LLM_RATE_LIMIT_COMPLETION_TOKENS: int = 512  # Estimate when max_tokens isn't set
+    # Models tried after LLM_MODEL, in order, e.g. "openai/gpt-4o-mini,anthropic/..."
+    LLM_FALLBACK_MODELS: str = ""
+    LLM_HEDGING_ENABLED: bool = False  # Race a second call against slow ones
+    LLM_HEDGE_PERCENTILE: float = 95.0  # Latency percentile after which to hedge
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 1.0
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS: float = 5.0  # Until enough latencies are known
+    LLM_LATENCY_BUDGET_SECONDS: float = 0.0  # Per call incl. hedges; 0 = no budget
 
     # --- Chat Configuration ---
     CHAT_PIPELINE_TAG: str = "chat_v1"  # Default pipeline version tag
+    GREETING_CACHE_TTL_SECONDS: int = 7 * 24 * 3600  # Greetings expire after a week
+    CHAT_HISTORY_TOKEN_BUDGET: int = 4000  # Est. history tokens per turn, with summary
+    CHAT_HISTORY_MAX_MESSAGES: int = 200  # Max history rows loaded per turn
+    CHAT_SUMMARY_TARGET_RATIO: float = 0.5  # Summarize down to this share of budget
+    CHAT_SUMMARY_MAX_TOKENS: int = 500  # Max tokens of a rolling summary
+    SEMANTIC_CACHE_ENABLED: bool = False  # Answer near-duplicate queries from pgvector
+    SEMANTIC_CACHE_SIMILARITY_THRESHOLD: float = 0.95  # Min cosine similarity
+    SEMANTIC_CACHE_TTL_SECONDS: int = 3600  # Answers may cite user data
+    SEMANTIC_CACHE_EF_SEARCH: int = 40  # HNSW candidate list size; higher is slower
+    CHAT_ASYNC_TURNS: bool = False  # Run POST /chat/message turns in the SAQ worker
+    CHAT_TURN_TIMEOUT_SECONDS: int = 300  # Max worker time for one queued chat turn
+    CHAT_TURN_EVENTS_TTL_SECONDS: int = 3600  # How long queued turn events are kept
+    CHAT_DEFERRED_PERSISTENCE: bool = False  # Store turns after the reply is sent
+    CHAT_WRITE_BEHIND_ENABLED: bool = False  # Buffer messages, COPY them in batches
+    CHAT_WRITE_BEHIND_BATCH_SIZE: int = 500  # Max rows per COPY; a full batch flushes
+    CHAT_WRITE_BEHIND_FLUSH_INTERVAL_SECONDS: float = 1.0  # Max buffering delay
+    CHAT_PARTITION_MONTHS_AHEAD: int = 3  # Monthly chat partitions created ahead
+    CHAT_PARTITION_RETENTION_MONTHS: int = 0  # Older partitions detached; 0 keeps all
+    CHAT_ARCHIVE_ENABLED: bool = False  # Archive idle sessions, restore them on access
+    CHAT_ARCHIVE_IDLE_DAYS: int = 90  # Sessions idle this long are archived
+    CHAT_ARCHIVE_BATCH_SIZE: int = 200  # Max sessions archived per job run
+    CHAT_ARCHIVE_DIR: str = "/data/chat-archive"  # Shared by the API and the worker
+    CHAT_MEMORY_ENABLED: bool = False  # Embed turns; give the agent search_memory
+    CHAT_MEMORY_TOP_K: int = 5  # Max past turns returned by one search_memory call
+    CHAT_MEMORY_EF_SEARCH: int = 40  # HNSW candidate list size; higher is slower
+    CHAT_MEMORY_MAX_TURN_CHARS: int = 4000  # Turn text embedded and returned
+    AGENT_TOOL_MAX_CONCURRENCY: int = 4  # Tool calls of one agent step run at once
+    AGENT_TOOL_TIMEOUT_SECONDS: float = 30.0  # Per tool call; errors go to the LLM
+    # Per-tool overrides, e.g. "get_user_tasks=10,search=60"
+    AGENT_TOOL_TIMEOUTS: str = ""
+    TOOL_CACHE_ENABLED: bool = True  # Serve repeated agent tool calls from Redis
+
+    # --- Voice DNA Configuration ---
+    VOICE_DNA_TRANSCRIPT_DIR: str = "/data/transcripts"  # Root of ingestible files
+    VOICE_DNA_TOKENIZER: str = "cl100k_base"  # tiktoken encoding of the embedder
+    VOICE_DNA_CHUNK_MAX_TOKENS: int = 512  # Max tokens of a transcript chunk
+    VOICE_DNA_CHUNK_OVERLAP_TOKENS: int = 64  # Max tokens repeated in the next chunk
+    VOICE_DNA_INSERT_BATCH_SIZE: int = 500  # Chunks per bulk INSERT
 
     # --- Prompt and Tool Versioning Configuration ---
     DEFAULT_CHAT_PIPELINE_TAG: str = Field(
@@ -110,6 +184,49 @@ class Settings(BaseSettings):
             if header.strip()
         ]
 
+    # Parse the LLM_CACHE_PIPELINES string into a list
+    @computed_field
+    def LLM_CACHE_PIPELINE_LIST(self) -> List[str]:
+        """Split the LLM_CACHE_PIPELINES string into a list."""
+        return [
+            pipeline.strip()
+            for pipeline in self.LLM_CACHE_PIPELINES.split(",")
+            if pipeline.strip()
+        ]
+
+    # Parse the LLM_FALLBACK_MODELS string into a list
+    @computed_field
+    def LLM_FALLBACK_MODEL_LIST(self) -> List[str]:
+        """Split the LLM_FALLBACK_MODELS string into a list."""
+        return [
+            model.strip()
+            for model in self.LLM_FALLBACK_MODELS.split(",")
+            if model.strip()
+        ]
+
+    # Parse the LLM_RATE_LIMIT_OVERRIDES string into a dict
+    @computed_field
+    def LLM_RATE_LIMIT_OVERRIDE_MAP(self) -> Dict[str, Tuple[int, int]]:
+        """Split the LLM_RATE_LIMIT_OVERRIDES "model=requests:tokens" pairs."""
+        overrides = {}
+        for pair in self.LLM_RATE_LIMIT_OVERRIDES.split(","):
+            model, _, limits = pair.rpartition("=")
+            if model.strip() and limits.strip():
+                requests, _, tokens = limits.partition(":")
+                overrides[model.strip()] = (int(requests or 0), int(tokens or 0))
+        return overrides
+
+    # Parse the AGENT_TOOL_TIMEOUTS string into a dict
+    @computed_field
+    def AGENT_TOOL_TIMEOUT_MAP(self) -> Dict[str, float]:
+        """Split the AGENT_TOOL_TIMEOUTS "name=seconds" pairs into a dict."""
+        timeouts = {}
+        for pair in self.AGENT_TOOL_TIMEOUTS.split(","):
+            name, _, seconds = pair.partition("=")
+            if name.strip() and seconds.strip():
+                timeouts[name.strip()] = float(seconds)
+        return timeouts
+
     # --- Add other future settings here ---
 
     # Configure BaseSettings to load from .env file and ignore extra variables
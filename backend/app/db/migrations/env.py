@@ -20,6 +20,7 @@ sys.path.insert(
 
 try:
     from app.db.models import Base
+    from app.db.partitions import is_partition_table
     from app.config import get_settings
 except ImportError as e:
     logger.error(
@@ -58,6 +59,16 @@ def process_revision_directives(context, revision, directives):
     # Downgrade doesn't need a corresponding drop extension unless specifically desired.
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    """
+    Alembic hook to filter the objects compared by autogenerate.
+    Skips the partitions of chat_messages, which are managed at runtime.
+    """
+    if type_ == "table" and is_partition_table(name):
+        return False
+    return True
+
+
 # --- Database URL Configuration ---
 def get_url_from_settings():
     """Constructs the database URL from the application settings object."""
@@ -100,7 +111,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
-        # include_object=include_object # Add if using include_object filter
+        include_object=include_object,
         process_revision_directives=process_revision_directives,  # Register the hook for offline mode
     )
     with context.begin_transaction():
@@ -113,7 +124,7 @@ def do_run_migrations(connection):
         target_metadata=target_metadata,
         # compare_type=True, # Optional: Check column types too
         # include_schemas=True, # If using schemas
-        # include_object=include_object, # Add if using include_object filter
+        include_object=include_object,
         process_revision_directives=process_revision_directives,  # Register the hook for online mode
     )
     with context.begin_transaction():
@@ -0,0 +1,147 @@
+"""Partition chat_messages by month
+
+Revision ID: 5d3f9b2e7c18
+Revises: e2a7c5d91f40
+Create Date: 2026-10-17 17:12:45.218904
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "5d3f9b2e7c18"  # pragma: allowlist secret
+down_revision: Union[str, None] = "e2a7c5d91f40"  # pragma: allowlist secret
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Indexes of the unpartitioned table, renamed out of the way while its rows are
+# copied into the partitioned one
+INDEXES = [
+    "chat_messages_pkey",
+    "ix_chat_message_session_timestamp",
+    "ix_chat_message_user_timestamp",
+    "ix_chat_messages_timestamp",
+    "ix_chat_messages_user_id",
+]
+
+# Partitions created ahead of the current month; the worker job keeps this up
+MONTHS_AHEAD = 3
+
+COLUMNS = "id, user_id, session_id, role, content, timestamp, metadata_"
+
+
+def _chat_messages_columns():
+    return [
+        sa.Column(
+            "id", sa.UUID(), server_default=sa.text("gen_random_uuid()"), nullable=False
+        ),
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("session_id", sa.UUID(), nullable=False),
+        sa.Column("role", sa.String(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column(
+            "timestamp",
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("metadata_", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+    ]
+
+
+def _create_chat_messages_indexes() -> None:
+    op.create_index(
+        "ix_chat_message_session_timestamp",
+        "chat_messages",
+        ["session_id", "timestamp"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_chat_message_user_timestamp",
+        "chat_messages",
+        ["user_id", "timestamp"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_chat_messages_timestamp"), "chat_messages", ["timestamp"], unique=False
+    )
+    op.create_index(
+        op.f("ix_chat_messages_user_id"), "chat_messages", ["user_id"], unique=False
+    )
+
+
+def _set_aside_chat_messages() -> None:
+    op.rename_table("chat_messages", "chat_messages_old")
+    for index in INDEXES:
+        op.execute(f"ALTER INDEX {index} RENAME TO {index}_old")
+
+
+def upgrade() -> None:
+    _set_aside_chat_messages()
+
+    op.create_table(
+        "chat_messages",
+        *_chat_messages_columns(),
+        sa.PrimaryKeyConstraint("id", "timestamp"),
+        postgresql_partition_by="RANGE (timestamp)",
+    )
+    _create_chat_messages_indexes()
+
+    # One partition per month from the oldest message to MONTHS_AHEAD months from
+    # now, named like app.db.partitions.partition_name
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            month timestamptz;
+        BEGIN
+            FOR month IN
+                SELECT generate_series(
+                    date_trunc('month', COALESCE(
+                        (SELECT min(timestamp) FROM chat_messages_old), now()
+                    ), 'UTC'),
+                    date_trunc('month', now(), 'UTC')
+                        + interval '{MONTHS_AHEAD} months',
+                    interval '1 month'
+                )
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF chat_messages FOR VALUES FROM (%L) TO (%L)',
+                    'chat_messages_' || to_char(month AT TIME ZONE 'UTC', '"y"YYYY"m"MM'),
+                    month,
+                    month + interval '1 month'
+                );
+            END LOOP;
+        END
+        $$
+        """
+    )
+    op.execute("CREATE TABLE chat_messages_default PARTITION OF chat_messages DEFAULT")
+
+    op.execute(
+        f"INSERT INTO chat_messages ({COLUMNS}) SELECT {COLUMNS} FROM chat_messages_old"
+    )
+    op.drop_table("chat_messages_old")
+
+
+def downgrade() -> None:
+    # Rows of partitions detached since are not brought back
+    _set_aside_chat_messages()
+
+    op.create_table(
+        "chat_messages",
+        *_chat_messages_columns(),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    _create_chat_messages_indexes()
+
+    op.execute(
+        f"INSERT INTO chat_messages ({COLUMNS}) SELECT {COLUMNS} FROM chat_messages_old"
+    )
+    # Drops the partitions with their parent
+    op.drop_table("chat_messages_old")
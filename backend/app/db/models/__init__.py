@@ -1,17 +1,28 @@
 # Import all models to ensure they are registered with SQLAlchemy's metadata
 from .base import Base
 from .user import User
-from .chat import ChatMessage
+from .chat import ChatMessage, ChatSession, ChatSessionSummary
 from .video import Video
 from .user_video import UserVideo
 from .job import BackgroundJob
+from .semantic_cache import SemanticCacheEntry
+from .memory import ChatTurnEmbedding
+from .embedding_cache import EmbeddingCacheEntry
+from .voice_dna import CreatorTranscript, TranscriptChunk
 
 # You can optionally define __all__ for explicit exports
 __all__ = [
     "Base",
     "User",
     "ChatMessage",
+    "ChatSession",
+    "ChatSessionSummary",
     "Video",
     "UserVideo",
     "BackgroundJob",
+    "SemanticCacheEntry",
+    "ChatTurnEmbedding",
+    "EmbeddingCacheEntry",
+    "CreatorTranscript",
+    "TranscriptChunk",
 ]
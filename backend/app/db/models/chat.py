@@ -1,21 +1,32 @@
 from datetime import datetime
+from typing import Optional
 from uuid import UUID as PyUUID
 
 from sqlalchemy import (
+    BigInteger,
+    Computed,
     ForeignKey,
+    Integer,
     String,
     Text,
     TIMESTAMP,
     Index,
 )
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID, JSONB
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 
 from .base import Base
 
 
 class ChatMessage(Base):
+    """
+    A message of a chat session.
+
+    The table is range partitioned by month on `timestamp` (see `app.db.partitions`),
+    which is why the timestamp is part of the primary key.
+    """
+
     __tablename__ = "chat_messages"
 
     id: Mapped[PyUUID] = mapped_column(
@@ -31,11 +42,106 @@ class ChatMessage(Base):
     role: Mapped[str] = mapped_column(String, nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
     timestamp: Mapped[datetime] = mapped_column(
-        TIMESTAMP(timezone=True), server_default=func.now(), nullable=False, index=True
+        TIMESTAMP(timezone=True),
+        server_default=func.now(),
+        primary_key=True,
+        index=True,
     )
     metadata_: Mapped[dict] = mapped_column(JSONB, nullable=False, default={})
+    # Full-text search document, see features/chat/search.py; not loaded by default
+    content_tsv: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed("to_tsvector('english'::regconfig, content)", persisted=True),
+        deferred=True,
+    )
 
     __table_args__ = (
         Index("ix_chat_message_session_timestamp", "session_id", "timestamp"),
         Index("ix_chat_message_user_timestamp", "user_id", "timestamp"),
+        Index(
+            "ix_chat_message_user_content_tsv",
+            "user_id",
+            "content_tsv",
+            postgresql_using="gin",
+        ),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+
+class ChatSessionSummary(Base):
+    """
+    Rolling summary of the older turns of a chat session.
+
+    Messages up to and including `summarized_until` are folded into `summary` and
+    no longer loaded into the agent's context.
+    """
+
+    __tablename__ = "chat_session_summaries"
+
+    session_id: Mapped[PyUUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    user_id: Mapped[PyUUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    summary: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    summarized_until: Mapped[Optional[datetime]] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )  # Timestamp of the newest message folded into the summary
+    summarized_message_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
+
+
+class ChatSession(Base):
+    """
+    A chat session with running totals, updated as its turns are stored.
+
+    Lets a user's sessions be listed without aggregating `chat_messages`. The id is
+    the `session_id` of the session's messages.
+    """
+
+    __tablename__ = "chat_sessions"
+
+    id: Mapped[PyUUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    user_id: Mapped[PyUUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    title: Mapped[str] = mapped_column(
+        String, nullable=False, default=""
+    )  # Start of the first user message
+    last_message_preview: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    message_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    prompt_tokens: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    completion_tokens: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, default=0
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now(), nullable=False
+    )
+    last_activity_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=False
+    )
+    archived_at: Mapped[Optional[datetime]] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )  # Set while the messages are in cold storage, see features/chat/archive.py
+    archive_key: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+
+    __table_args__ = (
+        Index("ix_chat_session_user_activity", "user_id", "last_activity_at"),
+        # Finds idle sessions to archive
+        Index(
+            "ix_chat_session_hot_activity",
+            "last_activity_at",
+            postgresql_where=text("archived_at IS NULL"),
+        ),
     )
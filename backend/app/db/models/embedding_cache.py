@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import String, TIMESTAMP
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from .base import Base
+from .semantic_cache import EMBEDDING_DIMENSIONS
+
+
+class EmbeddingCacheEntry(Base):
+    """
+    The embedding of a text by a model, looked up by the SHA-256 of the text so
+    the same text is only ever embedded once per model.
+    """
+
+    __tablename__ = "embedding_cache"
+
+    model: Mapped[str] = mapped_column(String, primary_key=True)
+    content_hash: Mapped[str] = mapped_column(
+        String(64), primary_key=True
+    )  # Hex SHA-256 of the embedded text
+    embedding: Mapped[list] = mapped_column(
+        Vector(EMBEDDING_DIMENSIONS), nullable=False
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now(), nullable=False
+    )
@@ -0,0 +1,58 @@
+from datetime import datetime
+from uuid import UUID as PyUUID
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import (
+    ForeignKey,
+    Text,
+    TIMESTAMP,
+    Index,
+)
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from .base import Base
+from .semantic_cache import EMBEDDING_DIMENSIONS
+
+
+class ChatTurnEmbedding(Base):
+    """
+    The embedding of one chat turn (a user message and the agent's reply), searched
+    by the agent's `search_memory` tool.
+
+    Kept apart from the partitioned `chat_messages`, so the HNSW index covers turns
+    only and survives the detaching and archival of messages.
+    """
+
+    __tablename__ = "chat_turn_embeddings"
+
+    id: Mapped[PyUUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True
+    )  # The ID of the turn's user message
+    user_id: Mapped[PyUUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    session_id: Mapped[PyUUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    turn_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=False
+    )  # When the user message was sent
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+    embedding: Mapped[list] = mapped_column(
+        Vector(EMBEDDING_DIMENSIONS), nullable=False
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    __table_args__ = (
+        Index(
+            "ix_chat_turn_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+    )
@@ -0,0 +1,63 @@
+from datetime import datetime
+from uuid import UUID as PyUUID
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import (
+    ForeignKey,
+    Integer,
+    String,
+    Text,
+    TIMESTAMP,
+    Index,
+)
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from .base import Base
+
+# Must match the output size of Settings.LLM_EMBEDDING_MODEL
+EMBEDDING_DIMENSIONS = 1536
+
+
+class SemanticCacheEntry(Base):
+    """
+    A cached agent answer, looked up by the similarity of a new query's embedding
+    to `embedding` within the same user and pipeline configuration.
+    """
+
+    __tablename__ = "semantic_cache_entries"
+
+    id: Mapped[PyUUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, server_default=func.gen_random_uuid()
+    )
+    user_id: Mapped[PyUUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    prompt_key: Mapped[str] = mapped_column(
+        String, nullable=False
+    )  # Pipeline type, tag, prompt versions and model the answer was generated with
+    query: Mapped[str] = mapped_column(Text, nullable=False)
+    response: Mapped[str] = mapped_column(Text, nullable=False)
+    embedding: Mapped[list] = mapped_column(
+        Vector(EMBEDDING_DIMENSIONS), nullable=False
+    )
+    hit_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now(), nullable=False
+    )
+    expires_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=False
+    )
+
+    __table_args__ = (
+        Index("ix_semantic_cache_user_prompt_key", "user_id", "prompt_key"),
+        Index(
+            "ix_semantic_cache_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+    )
@@ -0,0 +1,109 @@
+from datetime import datetime
+from typing import Optional
+from uuid import UUID as PyUUID
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import (
+    ForeignKey,
+    Integer,
+    String,
+    Text,
+    TIMESTAMP,
+    Index,
+    UniqueConstraint,
+)
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from .base import Base
+from .semantic_cache import EMBEDDING_DIMENSIONS
+
+
+class CreatorTranscript(Base):
+    """
+    A transcript of a creator's content ingested for Voice DNA, split into
+    `TranscriptChunk` rows.
+    """
+
+    __tablename__ = "creator_transcripts"
+
+    id: Mapped[PyUUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, server_default=func.gen_random_uuid()
+    )
+    user_id: Mapped[PyUUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    source_ref: Mapped[str] = mapped_column(
+        String, nullable=False
+    )  # Where the transcript was read from, e.g. its path
+    title: Mapped[str] = mapped_column(String, nullable=False)
+    content_hash: Mapped[Optional[str]] = mapped_column(
+        String(64), nullable=True
+    )  # Hex SHA-256 of the ingested file
+    status: Mapped[str] = mapped_column(
+        String, nullable=False
+    )  # 'pending', 'chunked', 'embedded' or 'failed'
+    chunk_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    token_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now(), nullable=False
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "source_ref", name="uq_creator_transcript_source"),
+    )
+
+
+class TranscriptChunk(Base):
+    """
+    A sentence-aligned chunk of a transcript, with its embedding once computed.
+    """
+
+    __tablename__ = "transcript_chunks"
+
+    id: Mapped[PyUUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, server_default=func.gen_random_uuid()
+    )
+    transcript_id: Mapped[PyUUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("creator_transcripts.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    user_id: Mapped[PyUUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    chunk_index: Mapped[int] = mapped_column(Integer, nullable=False)
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+    token_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    embedding: Mapped[Optional[list]] = mapped_column(
+        Vector(EMBEDDING_DIMENSIONS), nullable=True
+    )  # Filled in by embed_transcript_chunks_task
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    __table_args__ = (
+        UniqueConstraint(
+            "transcript_id", "chunk_index", name="uq_transcript_chunk_index"
+        ),
+        Index(
+            "ix_transcript_chunk_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+    )
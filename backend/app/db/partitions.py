@@ -0,0 +1,164 @@
+"""
+Monthly range partitions of `chat_messages`.
+
+`chat_messages` is partitioned by `timestamp`, one partition per calendar month
+(UTC) named `chat_messages_yYYYYmMM`, plus `chat_messages_default` catching rows
+outside every partition so inserts never fail when maintenance falls behind.
+Queries with a bound on `timestamp` only scan the partitions it overlaps, and each
+month's indexes stay small and are vacuumed on their own.
+
+`maintain_chat_partitions` (run daily by the worker) creates the partitions of the
+coming months and detaches the ones past the retention period. Detached
+partitions are kept as plain tables, to be archived or dropped.
+"""
+
+import logging
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "chat_messages"
+DEFAULT_PARTITION = "chat_messages_default"
+_PARTITION_NAME = re.compile(r"^chat_messages_y(\d{4})m(\d{2})$")
+
+# Partition DDL locks the parent table; give up rather than queue behind (and
+# block) chat traffic, the next run retries
+LOCK_TIMEOUT = "5s"
+
+
+def month_start(moment: datetime) -> datetime:
+    """Returns the start of the UTC calendar month containing `moment`."""
+    moment = moment.astimezone(timezone.utc)
+    return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    """Returns the start of the month `months` after the month starting at `month`."""
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{PARENT_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def partition_month(name: str) -> Optional[datetime]:
+    """Returns the month a partition holds, or None if `name` isn't a monthly partition."""
+    match = _PARTITION_NAME.match(name)
+    if match is None:
+        return None
+    return datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone.utc)
+
+
+def is_partition_table(name: str) -> bool:
+    """Returns True for the partitions of `chat_messages`, which aren't ORM models."""
+    return name == DEFAULT_PARTITION or partition_month(name) is not None
+
+
+async def list_partitions(conn: AsyncConnection) -> List[str]:
+    """Returns the names of the partitions attached to `chat_messages`."""
+    result = await conn.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = CAST(:parent AS regclass) "
+            "ORDER BY child.relname"
+        ),
+        {"parent": PARENT_TABLE},
+    )
+    return list(result.scalars().all())
+
+
+async def create_partition(conn: AsyncConnection, month: datetime) -> str:
+    """Creates the partition of the month starting at `month`, if missing."""
+    name = partition_name(month)
+    await conn.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} "
+            f"FOR VALUES FROM ('{month.isoformat()}') "
+            f"TO ('{add_months(month, 1).isoformat()}')"
+        )
+    )
+    return name
+
+
+async def detach_partition(conn: AsyncConnection, name: str) -> None:
+    # Not CONCURRENTLY, which a default partition rules out; the lock is brief
+    await conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+
+
+@dataclass
+class PartitionMaintenance:
+    """The partitions a maintenance run created and detached."""
+
+    created: List[str] = field(default_factory=list)
+    detached: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+
+
+async def maintain_chat_partitions(
+    engine: AsyncEngine,
+    *,
+    months_ahead: int,
+    retention_months: int = 0,
+    now: Optional[datetime] = None,
+) -> PartitionMaintenance:
+    """
+    Creates the partitions of the current and next `months_ahead` months, and
+    detaches the partitions entirely older than `retention_months` months.
+
+    Each statement runs in its own transaction, so one failing (a lock timeout, or
+    the default partition already holding rows of a new month) doesn't undo the
+    others; failures are logged and reported, and retried by the next run.
+
+    Args:
+        engine: The async engine to run the DDL with.
+        months_ahead: How many months after the current one to create.
+        retention_months: How many months before the current one to keep attached;
+            0 keeps every partition.
+        now: The current time, defaults to now.
+    """
+    current = month_start(now or datetime.now(timezone.utc))
+    outcome = PartitionMaintenance()
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text(f"SET lock_timeout = '{LOCK_TIMEOUT}'"))
+        existing = set(await list_partitions(conn))
+
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            name = partition_name(month)
+            if name in existing:
+                continue
+            try:
+                await create_partition(conn, month)
+                outcome.created.append(name)
+            except DBAPIError as e:
+                logger.error(f"Could not create chat partition {name}: {e}")
+                outcome.failed.append(name)
+
+        if retention_months > 0:
+            cutoff = add_months(current, -retention_months)
+            for name in sorted(existing):
+                start = partition_month(name)
+                if start is None or add_months(start, 1) > cutoff:
+                    continue
+                try:
+                    await detach_partition(conn, name)
+                    outcome.detached.append(name)
+                except DBAPIError as e:
+                    logger.error(f"Could not detach chat partition {name}: {e}")
+                    outcome.failed.append(name)
+
+    logger.info(
+        f"Chat partition maintenance: created {outcome.created}, "
+        f"detached {outcome.detached}, failed {outcome.failed}"
+    )
+    return outcome
@@ -16,6 +16,7 @@ from app.db.session import (
     async_session_factory,
 )
 from app.db.models.user import User
+from app.services.chat_service import ChatService
 
 from fastapi import FastAPI, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -195,6 +196,7 @@ def override_email_password_apis(original_implementation: APIInterface) -> APIIn
             email = next((f.value for f in form_fields if f.id == "email"), None)
             if email:
                 supertokens_user_id = response.user.id
+                signed_in_user_id: Optional[UUID] = None
                 # Manually create session scope for DB operations
                 async with async_session_factory() as db_session:
                     try:
@@ -204,7 +206,9 @@ def override_email_password_apis(original_implementation: APIInterface) -> APIIn
                         )
                         result = await db_session.execute(stmt)
                         existing_user = result.scalar_one_or_none()
-                        if not existing_user:
+                        if existing_user:
+                            signed_in_user_id = existing_user.id
+                        else:
                             # Attempt to link by email if ST ID match failed
                             # Use ORM select
                             stmt_email = select(User).where(
@@ -216,6 +220,7 @@ def override_email_password_apis(original_implementation: APIInterface) -> APIIn
                             if email_user:
                                 email_user.supertokens_user_id = supertokens_user_id
                                 await db_session.commit()
+                                signed_in_user_id = email_user.id
                                 logger.info(
                                     f"Linked existing user {email} to SuperTokens ID {supertokens_user_id} during sign-in"
                                 )  # Replaced print with logging
@@ -234,6 +239,10 @@ def override_email_password_apis(original_implementation: APIInterface) -> APIIn
                         # Avoid rollback here unless absolutely necessary, as sign-in was successful
                         logger.error(f"Error checking/syncing user after sign-in: {e}")
                         # Do not interfere with the successful sign-in response
+                if signed_in_user_id:
+                    # Precompute the greeting in the worker; the greeting endpoint is
+                    # the first request the frontend makes after login
+                    await ChatService.schedule_greeting_refresh(signed_in_user_id)
         return response
 
     original_implementation.sign_up_post = sign_up_post
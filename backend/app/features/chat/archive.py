@@ -0,0 +1,298 @@
+"""
+Cold archival of idle chat sessions.
+
+With `CHAT_ARCHIVE_ENABLED`, a daily worker job moves the messages of sessions idle
+for `CHAT_ARCHIVE_IDLE_DAYS` out of `chat_messages` into one zstd-compressed JSONL
+segment per session, keeping the hot table and its indexes to recent sessions.
+The session's `chat_sessions` row stays and records the segment in `archive_key`,
+so listing sessions is unaffected.
+
+Reading an archived session's history or sending a message to it rehydrates it
+first: the segment's rows are inserted back and the segment removed, so callers
+never see the difference beyond the latency of the first access.
+
+Segments are written through an `ArchiveStore`; `LocalArchiveStore` keeps them
+under `CHAT_ARCHIVE_DIR`, which the API and the worker must share.
+"""
+
+import abc
+import asyncio
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import zstandard
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import Settings, get_settings
+from app.db.models.chat import ChatMessage, ChatSession
+from app.features.chat.message_writer import COPY_COLUMNS, decode_row, encode_row
+
+logger = logging.getLogger(__name__)
+
+ZSTD_LEVEL = 10
+# Rows per INSERT when rehydrating, within asyncpg's 32767 parameter limit
+REHYDRATE_CHUNK_ROWS = 1000
+
+
+class ArchiveStore(abc.ABC):
+    """Stores archive segments by key."""
+
+    @abc.abstractmethod
+    async def write(self, key: str, data: bytes) -> None:
+        """Stores a segment, replacing any segment with the same key."""
+
+    @abc.abstractmethod
+    async def read(self, key: str) -> bytes:
+        """Returns a segment's bytes."""
+
+    @abc.abstractmethod
+    async def delete(self, key: str) -> None:
+        """Removes a segment; a missing segment is not an error."""
+
+
+class LocalArchiveStore(ArchiveStore):
+    """Keeps archive segments as files under a root directory."""
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key
+
+    def _write(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so a segment is either complete or missing
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    async def write(self, key: str, data: bytes) -> None:
+        await asyncio.to_thread(self._write, key, data)
+
+    async def read(self, key: str) -> bytes:
+        return await asyncio.to_thread(self._path(key).read_bytes)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._path(key).unlink, missing_ok=True)
+
+
+def segment_key(session: ChatSession) -> str:
+    return f"chat/{session.user_id}/{session.id}.jsonl.zst"
+
+
+def encode_segment(messages: List[ChatMessage]) -> bytes:
+    """Encodes messages as zstd-compressed JSONL, one `encode_row` line each."""
+    lines = "".join(
+        encode_row({column: getattr(message, column) for column in COPY_COLUMNS}) + "\n"
+        for message in messages
+    )
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(lines.encode("utf-8"))
+
+
+def decode_segment(data: bytes) -> List[Dict[str, Any]]:
+    """Decodes a segment written by `encode_segment` into `chat_messages` rows."""
+    # Segments are written in one frame with its content size, which decompress needs
+    lines = zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+    return [decode_row(line) for line in lines.splitlines() if line]
+
+
+class ChatArchiver:
+    """
+    Archives idle sessions to an `ArchiveStore` and rehydrates them on access.
+    """
+
+    def __init__(self, settings: Settings, store: ArchiveStore):
+        """
+        Args:
+            settings: Application settings providing the idle period and batch size.
+            store: Where segments are written.
+        """
+        self.settings = settings
+        self.store = store
+
+    async def archive_idle_sessions(
+        self, db: AsyncSession, *, now: Optional[datetime] = None
+    ) -> List[uuid.UUID]:
+        """
+        Archives up to `CHAT_ARCHIVE_BATCH_SIZE` of the longest idle sessions.
+
+        Returns:
+            The IDs of the archived sessions.
+        """
+        cutoff = (now or datetime.now(timezone.utc)) - timedelta(
+            days=self.settings.CHAT_ARCHIVE_IDLE_DAYS
+        )
+        # Uses ix_chat_session_hot_activity
+        result = await db.execute(
+            select(ChatSession.id)
+            .filter(
+                ChatSession.archived_at.is_(None),
+                ChatSession.last_activity_at < cutoff,
+            )
+            .order_by(ChatSession.last_activity_at)
+            .limit(self.settings.CHAT_ARCHIVE_BATCH_SIZE)
+        )
+        archived = []
+        for session_id in result.scalars().all():
+            try:
+                if await self.archive_session(db, session_id, cutoff=cutoff):
+                    archived.append(session_id)
+            except Exception as e:
+                await db.rollback()
+                logger.error(
+                    f"Failed to archive chat session {session_id}: {e}", exc_info=True
+                )
+        return archived
+
+    async def archive_session(
+        self, db: AsyncSession, session_id: uuid.UUID, *, cutoff: datetime
+    ) -> bool:
+        """
+        Moves a session's messages into a segment, if it is still idle since
+        `cutoff` and not archived yet.
+
+        The segment is written before the rows are deleted, and the deletion
+        commits together with the session's `archive_key`, so a failure at any
+        point leaves the messages in `chat_messages`.
+        """
+        # Locking the session row holds off turns storing messages meanwhile
+        session = (
+            await db.execute(
+                select(ChatSession)
+                .filter(ChatSession.id == session_id)
+                .with_for_update()
+            )
+        ).scalar_one_or_none()
+        if (
+            session is None
+            or session.archived_at is not None
+            or session.last_activity_at >= cutoff
+        ):
+            await db.rollback()
+            return False
+
+        in_session = (
+            ChatMessage.session_id == session.id,
+            ChatMessage.timestamp >= session.created_at,
+        )
+        messages = list(
+            (
+                await db.execute(
+                    select(ChatMessage)
+                    .filter(*in_session)
+                    .order_by(ChatMessage.timestamp, ChatMessage.id)
+                )
+            )
+            .scalars()
+            .all()
+        )
+        key = segment_key(session)
+        if messages:
+            await self.store.write(key, encode_segment(messages))
+            await db.execute(
+                delete(ChatMessage).filter(
+                    *in_session, ChatMessage.id.in_([m.id for m in messages])
+                )
+            )
+        session.archived_at = datetime.now(timezone.utc)
+        session.archive_key = key if messages else None
+        await db.commit()
+
+        logger.info(f"Archived {len(messages)} messages of chat session {session_id}")
+        return True
+
+    async def rehydrate(
+        self,
+        db: AsyncSession,
+        session_id: Union[str, uuid.UUID],
+        user_id: uuid.UUID,
+    ) -> bool:
+        """
+        Restores the messages of a user's archived session into `chat_messages`.
+
+        Returns:
+            True if the session was archived and has been restored; False if it
+            isn't archived or belongs to another user.
+        """
+        session_uuid = uuid.UUID(str(session_id))
+        session = (
+            await db.execute(
+                select(ChatSession)
+                .filter(ChatSession.id == session_uuid, ChatSession.user_id == user_id)
+                .with_for_update()
+            )
+        ).scalar_one_or_none()
+        if session is None or session.archived_at is None:
+            # Another request restored it while this one waited for the lock
+            await db.rollback()
+            return False
+
+        key = session.archive_key
+        rows = decode_segment(await self.store.read(key)) if key else []
+        for start in range(0, len(rows), REHYDRATE_CHUNK_ROWS):
+            # Rows of detached months land in the default partition
+            await db.execute(
+                pg_insert(ChatMessage)
+                .values(rows[start : start + REHYDRATE_CHUNK_ROWS])
+                .on_conflict_do_nothing()
+            )
+        session.archived_at = None
+        session.archive_key = None
+        await db.commit()
+
+        if key:
+            try:
+                await self.store.delete(key)
+            except OSError as e:
+                # Harmless: a later archival of the session overwrites it
+                logger.warning(f"Could not delete archive segment {key}: {e}")
+        logger.info(f"Rehydrated {len(rows)} messages of chat session {session_id}")
+        return True
+
+    async def ensure_hot(
+        self,
+        db: AsyncSession,
+        session_id: Union[str, uuid.UUID],
+        user_id: uuid.UUID,
+    ) -> None:
+        """
+        Rehydrates a session about to be read by its user if it is archived.
+
+        Costs one primary key lookup for sessions that aren't. Sessions of other
+        users are left as they are.
+        """
+        archived_at = (
+            await db.execute(
+                select(ChatSession.archived_at).filter(
+                    ChatSession.id == uuid.UUID(str(session_id)),
+                    ChatSession.user_id == user_id,
+                )
+            )
+        ).scalar_one_or_none()
+        if archived_at is not None:
+            await self.rehydrate(db, session_id, user_id)
+
+
+_archiver: Optional[ChatArchiver] = None
+_archiver_lock = threading.Lock()
+
+
+def get_chat_archiver() -> ChatArchiver:
+    """Returns the process-wide archiver, storing segments under `CHAT_ARCHIVE_DIR`."""
+    global _archiver
+    if _archiver is None:
+        with _archiver_lock:
+            if _archiver is None:
+                settings = get_settings()
+                _archiver = ChatArchiver(
+                    settings, LocalArchiveStore(settings.CHAT_ARCHIVE_DIR)
+                )
+    return _archiver
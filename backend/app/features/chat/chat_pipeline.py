@@ -1,15 +1,22 @@
 from haystack.core.pipeline import AsyncPipeline  # Import AsyncPipeline
 from haystack.components.agents import Agent  # Import the Agent component
-from haystack.utils import Secret  # Import Haystack's Secret class
 
 # Import the User model for state schema type hinting
 from app.db.models.user import User  # Import User model
 
 # Import shared tools
 from app.shared.tools.general import general_tools  # Import the list of general tools
+from app.shared.tools.memory import memory_tools
+from app.features.chat.prompt_cache import stable_tools
+from app.features.chat.tool_invoker import AppLoop, ConcurrentToolInvoker
 
-# Import a standard Haystack generator
-from haystack.components.generators.chat import OpenAIChatGenerator
+# Import the shared pooled LLM client and the response cache wrapper
+from app.shared.clients import (
+    INTERACTIVE,
+    cached_generator,
+    get_llm_client_pool,
+    hedged_generator,
+)
 
 # Import settings to get Portkey keys and URL
 from app.config import Settings  # Import get_settings
@@ -17,7 +24,11 @@ from app.config import Settings  # Import get_settings
 
 # Define the chat pipeline
 from app.services.prompt_service import PromptService  # Import PromptService
-from typing import Optional  # Import Optional
+from typing import Optional, Tuple  # Import Optional
+
+# Logical prompt names fetched by build_chat_pipeline. The resolved versions of these
+# prompts are part of the pipeline registry cache key.
+CHAT_PIPELINE_PROMPTS: Tuple[str, ...] = ("system",)
 
 
 # Define the chat pipeline
@@ -38,21 +49,30 @@ async def build_chat_pipeline(  # Make async as it will call async get_prompt_te
     """
     pipeline = AsyncPipeline()  # Instantiate AsyncPipeline
 
-    # Configure OpenAIChatGenerator to use Portkey
-    # Use the Portkey Virtual Key as the API key
-    # Use the Portkey API base URL
-    # Specify the desired model name (Portkey will route this)
-    # Instantiate a standard LLM Generator (replace with the actual desired generator)
-    # Assuming OpenAIChatGenerator for now, using settings for API key and model
-    llm_generator = OpenAIChatGenerator(
-        api_key=Secret.from_token(
-            settings.LLM_API_KEY.get_secret_value()
-        ),  # Create a Haystack Secret from the Pydantic SecretStr value
-        model=settings.LLM_MODEL,  # Use the configurable LLM model from settings
-        # Add other parameters as needed by the chosen generator
-        api_base_url=str(settings.LLM_API_URL)
-        if settings.LLM_API_URL
-        else None,  # Use configurable API URL if applicable
+    # Use a generator backed by the process-wide pooled LLM client so every pipeline
+    # shares warm connections to the LLM gateway. Slow or failing calls to LLM_MODEL
+    # are hedged with or fall back to LLM_FALLBACK_MODELS if configured.
+    llm_pool = get_llm_client_pool()
+    llm_generator = hedged_generator(
+        lambda model: llm_pool.build_chat_generator(
+            model=model,
+            # The Agent calls the LLM from an executor thread, outside the
+            # llm_priority context, and chat turns are always interactive
+            priority=INTERACTIVE,
+        ),
+        settings=settings,
+    )
+    # Answer deterministic requests from the response cache if "chat" opted in via
+    # LLM_CACHE_PIPELINES. Prompt versions are part of the cache key.
+    llm_generator = cached_generator(
+        llm_generator,
+        pipeline=pipeline_type,
+        prompt_versions={
+            prompt_name: prompt_service.get_prompt_template_version(
+                pipeline_type, prompt_name, override_pipeline_tag
+            )
+            for prompt_name in CHAT_PIPELINE_PROMPTS
+        },
     )
 
     # Fetch prompts using the PromptService
@@ -69,6 +89,10 @@ async def build_chat_pipeline(  # Make async as it will call async get_prompt_te
     #     override_pipeline_tag=override_pipeline_tag,
     # )
 
+    tools = list(general_tools)
+    if settings.CHAT_MEMORY_ENABLED:
+        tools.extend(memory_tools)
+
     # Instantiate the Haystack Agent
     # The Agent will use the llm_generator and the system prompt
     # The main_chat prompt template will be used by the Agent's internal PromptBuilder
@@ -87,15 +111,25 @@ async def build_chat_pipeline(  # Make async as it will call async get_prompt_te
         # or in the run_async call depending on the Agent's API.
         # For now, assume the Agent uses the system_prompt and the messages passed in run_async.
         # Tools will be added later when implementing function calling.
-        tools=list(
-            general_tools
-        ),  # Provide the list of general tools to the Agent, explicitly creating a new list
+        # Tools in name order keep the request prefix byte-stable for prompt caching
+        tools=stable_tools(tools),
         state_schema={  # Define the schema for additional inputs
             "user": {"type": User},  # Expect a User object
             "session_id": {"type": str},  # Expect a string session ID
+            "app_loop": {"type": AppLoop},  # For tools using pooled connections
         },
     )
 
+    # Run the tool calls of one LLM response concurrently instead of one by one.
+    # The Agent has no option for this, so its invoker is replaced after construction.
+    agent._tool_invoker = ConcurrentToolInvoker(
+        tools=agent.tools,
+        raise_on_failure=agent.raise_on_tool_invocation_failure,
+        max_concurrency=settings.AGENT_TOOL_MAX_CONCURRENCY,
+        timeout_seconds=settings.AGENT_TOOL_TIMEOUT_SECONDS,
+        tool_timeouts=settings.AGENT_TOOL_TIMEOUT_MAP,
+    )
+
     # Add components
     # Add the Agent to the pipeline
     pipeline.add_component("agent", agent)
@@ -0,0 +1,113 @@
+"""
+Per-user greeting cache with stale-while-revalidate semantics.
+
+A greeting depends on the user's recent chat history, so each cached greeting
+records the id of the user's latest ChatMessage at generation time. A cached
+greeting whose recorded id no longer matches the latest message is stale: it is
+still served immediately while a background job regenerates it.
+"""
+
+import json
+import logging
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db.models.chat import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+GREETING_KEY_PREFIX = "chat:greeting:"
+
+
+@dataclass
+class CachedGreeting:
+    """A generated greeting and the history state it was generated from."""
+
+    greeting: str
+    last_message_id: Optional[str]
+    generated_at: str
+
+    def is_fresh(self, latest_message_id: Optional[uuid.UUID]) -> bool:
+        """Returns True if no message was added since the greeting was generated."""
+        latest = str(latest_message_id) if latest_message_id else None
+        return self.last_message_id == latest
+
+
+async def get_latest_message_id(
+    db: AsyncSession, user_id: uuid.UUID
+) -> Optional[uuid.UUID]:
+    """
+    Returns the id of the user's most recent chat message, if any.
+
+    Uses ix_chat_message_user_timestamp, so this is a single index probe.
+    """
+    result = await db.execute(
+        select(ChatMessage.id)
+        .filter(ChatMessage.user_id == user_id)
+        .order_by(ChatMessage.timestamp.desc())
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+
+class GreetingCache:
+    """
+    Stores generated greetings in Redis, one entry per user.
+    """
+
+    def __init__(self, redis: Redis, ttl_seconds: int):
+        """
+        Args:
+            redis: The asyncio Redis client.
+            ttl_seconds: How long an entry is kept after it was last written.
+        """
+        self.redis = redis
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def _key(user_id: uuid.UUID) -> str:
+        return f"{GREETING_KEY_PREFIX}{user_id}"
+
+    async def get(self, user_id: uuid.UUID) -> Optional[CachedGreeting]:
+        """Returns the cached greeting for the user, or None on a miss or read error."""
+        try:
+            raw = await self.redis.get(self._key(user_id))
+        except Exception as e:
+            # The cache is an optimization; fall back to generating the greeting
+            logger.warning(f"Failed to read cached greeting for user {user_id}: {e}")
+            return None
+        if not raw:
+            return None
+        try:
+            return CachedGreeting(**json.loads(raw))
+        except (TypeError, ValueError) as e:
+            logger.warning(
+                f"Discarding malformed cached greeting for user {user_id}: {e}"
+            )
+            return None
+
+    async def set(
+        self,
+        user_id: uuid.UUID,
+        greeting: str,
+        last_message_id: Optional[uuid.UUID],
+    ) -> CachedGreeting:
+        """Stores a freshly generated greeting for the user."""
+        entry = CachedGreeting(
+            greeting=greeting,
+            last_message_id=str(last_message_id) if last_message_id else None,
+            generated_at=datetime.now(timezone.utc).isoformat(),
+        )
+        try:
+            await self.redis.set(
+                self._key(user_id), json.dumps(asdict(entry)), ex=self.ttl_seconds
+            )
+        except Exception as e:
+            logger.warning(f"Failed to cache greeting for user {user_id}: {e}")
+        return entry
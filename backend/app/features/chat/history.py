@@ -0,0 +1,345 @@
+"""
+Token-budgeted conversation history with rolling summaries.
+
+Each turn the agent receives the newest messages of the session that fit into
+`CHAT_HISTORY_TOKEN_BUDGET`, preceded by a rolling summary of everything older.
+When messages fall out of the window, a background job folds them into the summary
+stored in `chat_session_summaries`, so the prompt size per turn stays bounded
+however long the session grows. The summary comes first, right after the system
+prompt, so it stays part of the request prefix the LLM provider can cache
+(see `prompt_cache`).
+
+Token counts are estimated from character length; the budget is a soft bound that
+only needs to be in the right order of magnitude for the model's context window.
+"""
+
+import logging
+import math
+import uuid
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from haystack.dataclasses import ChatMessage as HaystackChatMessage, ChatRole
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.config import Settings
+from app.db.models.chat import ChatMessage, ChatSessionSummary
+from app.features.chat.archive import get_chat_archiver
+from app.features.chat.message_writer import pending_session_messages
+from app.services.prompt_service import PromptService
+from app.shared.clients import cached_generator, get_llm_client_pool, get_redis
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and framing tokens added per message
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Estimates the tokens a message with this text adds to the prompt."""
+    return MESSAGE_OVERHEAD_TOKENS + math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def is_context_message(message: ChatMessage) -> bool:
+    """
+    Returns True if a stored message is replayed to the agent as history.
+
+    Tool results can't be replayed without the tool calls that produced them, and
+    the assistant's final reply already reflects them, so only user and assistant
+    text is kept.
+    """
+    return message.role in (ChatRole.USER.value, ChatRole.ASSISTANT.value) and bool(
+        message.content
+    )
+
+
+def to_haystack_message(message: ChatMessage) -> HaystackChatMessage:
+    """Converts a stored user or assistant message into a Haystack ChatMessage."""
+    if message.role == ChatRole.USER.value:
+        return HaystackChatMessage.from_user(message.content)
+    return HaystackChatMessage.from_assistant(message.content)
+
+
+@dataclass
+class HistoryWindow:
+    """The history sent to the agent for one turn."""
+
+    messages: List[HaystackChatMessage] = field(default_factory=list)
+    token_count: int = 0
+    # True if older unsummarized messages didn't fit and should be folded into the summary
+    needs_summary: bool = False
+
+
+class ChatHistoryAssembler:
+    """
+    Builds the per-turn history window and maintains the rolling session summary.
+    """
+
+    def __init__(self, settings: Settings, prompt_service: PromptService):
+        """
+        Args:
+            settings: Application settings providing the history budget.
+            prompt_service: The PromptService used to fetch the summary prompt.
+        """
+        self.settings = settings
+        self.prompt_service = prompt_service
+
+    async def assemble(
+        self, db: AsyncSession, session_id: str, user_id: uuid.UUID
+    ) -> HistoryWindow:
+        """
+        Loads the history window for a session, newest messages first, until the
+        token budget is spent.
+
+        Only the user's own messages and summary are loaded, so a session ID of
+        another user yields an empty window.
+
+        Args:
+            db: The SQLAlchemy async database session.
+            session_id: The chat session ID.
+            user_id: The ID of the user sending the turn.
+
+        Returns:
+            The summary (as a system message) followed by the recent messages in
+            chronological order.
+        """
+        session_uuid = uuid.UUID(str(session_id))
+        if self.settings.CHAT_ARCHIVE_ENABLED:
+            await get_chat_archiver().ensure_hot(db, session_uuid, user_id)
+        budget = self.settings.CHAT_HISTORY_TOKEN_BUDGET
+        summary = await self._load_summary(db, session_uuid, user_id)
+
+        window = HistoryWindow()
+        summary_message = None
+        if summary is not None and summary.summary:
+            summary_message = HaystackChatMessage.from_system(
+                SUMMARY_PREFIX + summary.summary
+            )
+            window.token_count = estimate_tokens(summary_message.text)
+
+        limit = self.settings.CHAT_HISTORY_MAX_MESSAGES
+        rows = await self._load_unsummarized(
+            db, session_uuid, user_id, summary, newest_first=True, limit=limit
+        )
+        recent: List[ChatMessage] = []
+        for row in rows:
+            if not is_context_message(row):
+                continue
+            cost = estimate_tokens(row.content)
+            if window.token_count + cost > budget:
+                window.needs_summary = True
+                break
+            recent.append(row)
+            window.token_count += cost
+        else:
+            # Hitting the row limit means older unsummarized messages were not loaded
+            window.needs_summary = len(rows) >= limit
+
+        recent.reverse()
+        if summary_message is not None:
+            window.messages.append(summary_message)
+        window.messages.extend(to_haystack_message(row) for row in recent)
+        return window
+
+    async def summarize(
+        self, db: AsyncSession, session_id: str, user_id: uuid.UUID
+    ) -> Optional[ChatSessionSummary]:
+        """
+        Folds the oldest unsummarized messages into the session's rolling summary.
+
+        Messages are folded until the rest fits into `CHAT_SUMMARY_TARGET_RATIO` of
+        the budget (after reserving room for the summary itself), so a session
+        isn't re-summarized on every turn once it reaches the budget.
+
+        Args:
+            db: The SQLAlchemy async database session.
+            session_id: The chat session ID.
+            user_id: The ID of the user owning the session.
+
+        Returns:
+            The updated summary row, or None if nothing needed folding.
+        """
+        session_uuid = uuid.UUID(str(session_id))
+        summary = await db.get(ChatSessionSummary, session_uuid)
+        if summary is not None and summary.user_id != user_id:
+            logger.warning(
+                f"Not summarizing session {session_id}: it belongs to another user"
+            )
+            return None
+        rows = await self._load_unsummarized(
+            db,
+            session_uuid,
+            user_id,
+            summary,
+            newest_first=False,
+            limit=None,
+        )
+
+        target = (
+            self.settings.CHAT_HISTORY_TOKEN_BUDGET
+            * self.settings.CHAT_SUMMARY_TARGET_RATIO
+            - self.settings.CHAT_SUMMARY_MAX_TOKENS
+        )
+        remaining = sum(
+            estimate_tokens(row.content) for row in rows if is_context_message(row)
+        )
+        fold_count = 0
+        max_fold = self.settings.CHAT_HISTORY_MAX_MESSAGES
+        while fold_count < len(rows) and remaining > target and fold_count < max_fold:
+            if is_context_message(rows[fold_count]):
+                remaining -= estimate_tokens(rows[fold_count].content)
+            fold_count += 1
+        # Messages saved in one commit share a timestamp; never split such a group,
+        # since `summarized_until` marks the boundary by timestamp
+        while (
+            0 < fold_count < len(rows)
+            and rows[fold_count].timestamp == rows[fold_count - 1].timestamp
+        ):
+            fold_count += 1
+
+        folded = rows[:fold_count]
+        if not folded:
+            logger.debug(f"Nothing to summarize for session {session_id}")
+            return None
+
+        transcript = "\n".join(
+            f"{row.role.capitalize()}: {row.content}"
+            for row in folded
+            if is_context_message(row)
+        )
+
+        if transcript:
+            new_summary = await self._generate_summary(
+                summary.summary if summary is not None else "", transcript
+            )
+        else:
+            new_summary = summary.summary if summary is not None else ""
+
+        if summary is None:
+            summary = ChatSessionSummary(
+                session_id=session_uuid,
+                user_id=user_id,
+                summarized_message_count=0,
+            )
+            db.add(summary)
+        summary.summary = new_summary
+        summary.summarized_until = folded[-1].timestamp
+        summary.summarized_message_count += len(folded)
+        await db.commit()
+
+        logger.info(
+            f"Folded {len(folded)} messages into the summary of session {session_id}"
+        )
+        return summary
+
+    async def _load_summary(
+        self, db: AsyncSession, session_id: uuid.UUID, user_id: uuid.UUID
+    ) -> Optional[ChatSessionSummary]:
+        """Loads the session's summary if it belongs to the user."""
+        summary = await db.get(ChatSessionSummary, session_id)
+        if summary is None or summary.user_id != user_id:
+            return None
+        return summary
+
+    async def _load_unsummarized(
+        self,
+        db: AsyncSession,
+        session_id: uuid.UUID,
+        user_id: uuid.UUID,
+        summary: Optional[ChatSessionSummary],
+        *,
+        newest_first: bool,
+        limit: Optional[int],
+    ) -> List[ChatMessage]:
+        """Loads session messages newer than the summary (uses ix_chat_message_session_timestamp)."""
+        query = select(ChatMessage).filter(
+            ChatMessage.session_id == session_id, ChatMessage.user_id == user_id
+        )
+        if summary is not None and summary.summarized_until is not None:
+            query = query.filter(ChatMessage.timestamp > summary.summarized_until)
+        if newest_first:
+            query = query.order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc())
+        else:
+            query = query.order_by(ChatMessage.timestamp, ChatMessage.id)
+        if limit is not None:
+            query = query.limit(limit)
+        result = await db.execute(query)
+        rows = list(result.scalars().all())
+        if self.settings.CHAT_WRITE_BEHIND_ENABLED:
+            rows = await self._merge_pending(
+                rows,
+                session_id,
+                user_id,
+                summary,
+                newest_first=newest_first,
+                limit=limit,
+            )
+        return rows
+
+    async def _merge_pending(
+        self,
+        rows: List[ChatMessage],
+        session_id: uuid.UUID,
+        user_id: uuid.UUID,
+        summary: Optional[ChatSessionSummary],
+        *,
+        newest_first: bool,
+        limit: Optional[int],
+    ) -> List[ChatMessage]:
+        """Adds the session's messages still buffered by the write-behind writer."""
+        pending = await pending_session_messages(get_redis(), session_id)
+        known = {row.id for row in rows}
+        boundary = summary.summarized_until if summary is not None else None
+        unflushed = [
+            message
+            for message in pending
+            if message.id not in known
+            and message.user_id == user_id
+            and (boundary is None or message.timestamp > boundary)
+        ]
+        if not unflushed:
+            return rows
+        merged = sorted(
+            rows + unflushed,
+            key=lambda message: (message.timestamp, message.id),
+            reverse=newest_first,
+        )
+        return merged[:limit] if limit is not None else merged
+
+    async def _generate_summary(self, previous_summary: str, transcript: str) -> str:
+        """Asks the LLM to merge the new messages into the previous summary."""
+        template = await self.prompt_service.get_prompt_template_content(
+            pipeline_type="chat",
+            logical_prompt_name="summary",
+            override_pipeline_tag=None,
+        )
+        prompt = template.format(
+            summary=previous_summary or "(none)",
+            transcript=transcript,
+            # Roughly 3 words per 4 tokens
+            max_words=self.settings.CHAT_SUMMARY_MAX_TOKENS * 3 // 4,
+        )
+        # Summaries are generated deterministically, so a retried job can be
+        # answered from the response cache if "summary" opted in
+        generator = cached_generator(
+            get_llm_client_pool().get_chat_generator(self.settings.LLM_MODEL),
+            pipeline="summary",
+            prompt_versions={
+                "summary": self.prompt_service.get_prompt_template_version(
+                    "chat", "summary", None
+                )
+            },
+        )
+        result = await generator.run_async(
+            messages=[HaystackChatMessage.from_user(prompt)],
+            generation_kwargs={
+                "max_tokens": self.settings.CHAT_SUMMARY_MAX_TOKENS,
+                "temperature": 0,
+            },
+        )
+        for reply in result.get("replies", []):
+            if reply.role == ChatRole.ASSISTANT and reply.text:
+                return reply.text.strip()
+        raise ValueError("LLM returned no summary text.")
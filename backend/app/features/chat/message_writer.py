@@ -0,0 +1,376 @@
+"""
+Write-behind buffer for chat messages.
+
+With `CHAT_WRITE_BEHIND_ENABLED`, chat turns are not inserted in their own
+transaction. Their rows are buffered in-process and copied into `chat_messages` in
+batches with PostgreSQL `COPY`, when `CHAT_WRITE_BEHIND_BATCH_SIZE` rows are waiting
+or at the latest every `CHAT_WRITE_BEHIND_FLUSH_INTERVAL_SECONDS`.
+
+Buffered rows are made durable and readable in Redis before `add` returns:
+
+- `chatwb:journal:{writer_id}` lists the rows of one writer in buffer order. It is
+  trimmed after each flush. A writer whose heartbeat in `chatwb:writers` goes stale
+  (e.g. a crashed process) has its journal replayed by another writer, with
+  `ON CONFLICT DO NOTHING` since some rows may have been copied already.
+- `chatwb:session:{session_id}` holds the unflushed rows of a session, so history
+  reads see a session's latest turns whichever process buffered them
+  (read-your-writes). See `pending_session_messages`.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, Awaitable, Dict, List, Optional, cast
+
+import asyncpg
+from redis.asyncio import Redis
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.config import Settings, get_settings
+from app.db.models.chat import ChatMessage
+from app.db.session import async_session_factory, engine
+from app.features.chat.sessions import upsert_chat_sessions
+from app.shared.clients.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+WRITERS_KEY = "chatwb:writers"
+JOURNAL_KEY_PREFIX = "chatwb:journal:"
+SESSION_KEY_PREFIX = "chatwb:session:"
+# Safety net only: session entries are removed when their rows are flushed
+SESSION_KEY_TTL_SECONDS = 86400
+
+# Column order of the COPY records
+COPY_COLUMNS = (
+    "id",
+    "user_id",
+    "session_id",
+    "role",
+    "content",
+    "timestamp",
+    "metadata_",
+)
+
+# Atomically takes over the journal of a stale writer: returns its rows and removes
+# the journal, unless the writer sent a heartbeat in the meantime
+_CLAIM_SCRIPT = """
+local score = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if score and tonumber(score) > tonumber(ARGV[2]) then
+    return {}
+end
+local rows = redis.call('LRANGE', KEYS[2], 0, -1)
+redis.call('DEL', KEYS[2])
+redis.call('ZREM', KEYS[1], ARGV[1])
+return rows
+"""
+
+
+def _session_key(session_id: Any) -> str:
+    return f"{SESSION_KEY_PREFIX}{session_id}"
+
+
+def encode_row(row: Dict[str, Any]) -> str:
+    """Encodes a `chat_messages` row (as built by `TurnRecord.rows`) for Redis."""
+    return json.dumps(
+        {
+            "id": str(row["id"]),
+            "user_id": str(row["user_id"]),
+            "session_id": str(row["session_id"]),
+            "role": row["role"],
+            "content": row["content"],
+            "timestamp": row["timestamp"].isoformat(),
+            "metadata_": row["metadata_"],
+        },
+        default=str,
+    )
+
+
+def decode_row(raw: str) -> Dict[str, Any]:
+    """Decodes a row encoded with `encode_row`."""
+    data = json.loads(raw)
+    data["id"] = uuid.UUID(data["id"])
+    data["user_id"] = uuid.UUID(data["user_id"])
+    data["session_id"] = uuid.UUID(data["session_id"])
+    data["timestamp"] = datetime.fromisoformat(data["timestamp"])
+    return data
+
+
+async def pending_session_messages(redis: Redis, session_id: Any) -> List[ChatMessage]:
+    """
+    Returns the buffered, not yet flushed messages of a session in timestamp order.
+
+    The messages are transient `ChatMessage` instances. They may already have been
+    copied into the database if a flush is in progress, so callers merging them
+    with queried rows must skip ids they already have.
+    """
+    # redis-py types command results as sync-or-async; the asyncio client awaits
+    entries = await cast(Awaitable[List[str]], redis.hvals(_session_key(session_id)))
+    rows = sorted((decode_row(raw) for raw in entries), key=lambda r: r["timestamp"])
+    return [ChatMessage(**row) for row in rows]
+
+
+class ChatMessageWriter:
+    """
+    Buffers chat message rows and flushes them in batches with COPY.
+    """
+
+    def __init__(self, settings: Settings, redis: Redis):
+        """
+        Args:
+            settings: Application settings providing the batch size and interval.
+            redis: The asyncio Redis client.
+        """
+        self.settings = settings
+        self.redis = redis
+        self.writer_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._journal_key = f"{JOURNAL_KEY_PREFIX}{self.writer_id}"
+        self._buffer: List[Dict[str, Any]] = []
+        # Keeps the journal in buffer order, which trimming after a flush relies on
+        self._add_lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._counts: Counter = Counter()
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.CHAT_WRITE_BEHIND_ENABLED
+
+    @property
+    def _stale_after_seconds(self) -> float:
+        # Several missed heartbeats, so a busy event loop isn't mistaken for a crash
+        return max(30.0, 10 * self.settings.CHAT_WRITE_BEHIND_FLUSH_INTERVAL_SECONDS)
+
+    async def add(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Buffers `chat_messages` rows for the next flush.
+
+        Rows must carry their `id` and `timestamp`. Raises if they can't be journaled
+        in Redis, in which case nothing was buffered and the caller should insert
+        the rows itself.
+        """
+        if not rows:
+            return
+        encoded = [encode_row(row) for row in rows]
+        async with self._add_lock:
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.zadd(WRITERS_KEY, {self.writer_id: time.time()})
+            pipe.rpush(self._journal_key, *encoded)
+            for row, raw in zip(rows, encoded):
+                pipe.hset(_session_key(row["session_id"]), str(row["id"]), raw)
+            for session_id in {str(row["session_id"]) for row in rows}:
+                pipe.expire(_session_key(session_id), SESSION_KEY_TTL_SECONDS)
+            await pipe.execute()
+            self._buffer.extend(rows)
+        self._counts["buffered"] += len(rows)
+        if len(self._buffer) >= self.settings.CHAT_WRITE_BEHIND_BATCH_SIZE:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """
+        Copies the buffered rows into the database, in batches.
+
+        Returns:
+            The number of rows written. Rows that failed to be written stay buffered
+            and journaled for the next flush.
+        """
+        written = 0
+        async with self._flush_lock:
+            while self._buffer:
+                batch = self._buffer[: self.settings.CHAT_WRITE_BEHIND_BATCH_SIZE]
+                try:
+                    try:
+                        await self._copy(batch)
+                    except asyncpg.UniqueViolationError:
+                        # Part of the batch was replayed from a journal already
+                        await self._insert_ignoring_existing(batch)
+                except Exception as e:
+                    self._counts["errors"] += 1
+                    logger.error(
+                        f"Failed to flush {len(batch)} buffered chat messages: {e}",
+                        exc_info=True,
+                    )
+                    break
+                del self._buffer[: len(batch)]
+                await self._forget(batch)
+                written += len(batch)
+                self._counts["flushed"] += len(batch)
+                self._counts["batches"] += 1
+        return written
+
+    async def _copy(self, rows: List[Dict[str, Any]]) -> None:
+        records = [
+            (
+                row["id"],
+                row["user_id"],
+                row["session_id"],
+                row["role"],
+                row["content"],
+                row["timestamp"],
+                json.dumps(row["metadata_"], default=str),
+            )
+            for row in rows
+        ]
+        async with engine.connect() as conn:
+            # The upsert opens the transaction the COPY then joins, so the session
+            # totals commit together with the messages
+            await upsert_chat_sessions(conn, rows)
+            raw_connection = await conn.get_raw_connection()
+            await raw_connection.driver_connection.copy_records_to_table(
+                ChatMessage.__tablename__, records=records, columns=COPY_COLUMNS
+            )
+            await conn.commit()
+
+    async def _forget(self, rows: List[Dict[str, Any]]) -> None:
+        """Drops flushed rows from the journal and the pending session entries."""
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.ltrim(self._journal_key, len(rows), -1)
+            for row in rows:
+                pipe.hdel(_session_key(row["session_id"]), str(row["id"]))
+            await pipe.execute()
+        except Exception as e:
+            # Left-over entries are harmless: reads skip ids already stored and
+            # replays skip existing rows
+            logger.warning(f"Failed to clear flushed chat messages from Redis: {e}")
+
+    async def recover_stale_journals(self) -> int:
+        """
+        Replays the journals of writers that stopped sending heartbeats.
+
+        Returns:
+            The number of rows recovered.
+        """
+        stale_before = time.time() - self._stale_after_seconds
+        writer_ids = await self.redis.zrangebyscore(WRITERS_KEY, "-inf", stale_before)
+        recovered = 0
+        for writer_id in writer_ids:
+            if writer_id == self.writer_id:
+                continue
+            entries = await cast(
+                Awaitable[List[str]],
+                self.redis.eval(
+                    _CLAIM_SCRIPT,
+                    2,
+                    WRITERS_KEY,
+                    f"{JOURNAL_KEY_PREFIX}{writer_id}",
+                    writer_id,
+                    str(stale_before),
+                ),
+            )
+            if not entries:
+                continue
+            rows = [decode_row(raw) for raw in entries]
+            try:
+                await self._insert_ignoring_existing(rows)
+            except Exception:
+                # Take the rows over so they aren't lost; the next flush retries them
+                async with self._add_lock:
+                    await cast(
+                        Awaitable[int], self.redis.rpush(self._journal_key, *entries)
+                    )
+                    self._buffer.extend(rows)
+                raise
+            await self._forget_recovered(rows)
+            recovered += len(rows)
+            logger.warning(
+                f"Recovered {len(rows)} buffered chat messages of stale writer {writer_id}"
+            )
+        self._counts["recovered"] += recovered
+        return recovered
+
+    async def _insert_ignoring_existing(self, rows: List[Dict[str, Any]]) -> None:
+        async with async_session_factory() as db:
+            result = await db.execute(
+                pg_insert(ChatMessage)
+                .values(rows)
+                # The primary key of the partitioned table; ids are only unique
+                # together with the partition key
+                .on_conflict_do_nothing(index_elements=["id", "timestamp"])
+                .returning(ChatMessage.id)
+            )
+            # Only rows not stored before count towards their sessions
+            inserted = set(result.scalars().all())
+            await upsert_chat_sessions(db, [r for r in rows if r["id"] in inserted])
+            await db.commit()
+
+    async def _forget_recovered(self, rows: List[Dict[str, Any]]) -> None:
+        pipe = self.redis.pipeline(transaction=False)
+        for row in rows:
+            pipe.hdel(_session_key(row["session_id"]), str(row["id"]))
+        await pipe.execute()
+
+    async def _run(self) -> None:
+        interval = self.settings.CHAT_WRITE_BEHIND_FLUSH_INTERVAL_SECONDS
+        next_recovery = 0.0
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.redis.zadd(WRITERS_KEY, {self.writer_id: time.time()})
+                await self.flush()
+                if time.monotonic() >= next_recovery:
+                    next_recovery = time.monotonic() + self._stale_after_seconds
+                    await self.recover_stale_journals()
+            except Exception as e:
+                self._counts["errors"] += 1
+                logger.error(f"Chat message writer iteration failed: {e}")
+
+    def start(self) -> None:
+        """Starts the background flush loop if write-behind is enabled."""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Started chat message writer {self.writer_id}")
+
+    async def stop(self) -> None:
+        """Stops the flush loop and writes out what is still buffered."""
+        if self._task is None and not self._buffer:
+            return
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._buffer:
+            await self.flush()
+        if not self._buffer:
+            await self.redis.zrem(WRITERS_KEY, self.writer_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns buffer and flush counters."""
+        return {
+            "enabled": self.enabled,
+            "writer_id": self.writer_id,
+            "pending": len(self._buffer),
+            "buffered": self._counts["buffered"],
+            "flushed": self._counts["flushed"],
+            "batches": self._counts["batches"],
+            "recovered": self._counts["recovered"],
+            "errors": self._counts["errors"],
+        }
+
+
+_writer: Optional[ChatMessageWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_chat_message_writer() -> ChatMessageWriter:
+    """Returns the process-wide ChatMessageWriter, creating it on first use."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = ChatMessageWriter(get_settings(), get_redis())
+    return _writer
@@ -0,0 +1,109 @@
+"""
+Keyset pagination of chat history.
+
+Messages are totally ordered by `(timestamp, id)`. A page is fetched relative to a
+cursor holding that pair for one message, so fetching a page costs the same however
+far back it is (an index range scan from the cursor, instead of skipping an OFFSET),
+and messages inserted while a client pages don't shift or duplicate the pages.
+
+Cursors are opaque to clients: URL-safe base64 of the ISO timestamp and the id.
+"""
+
+import base64
+import binascii
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, List, NamedTuple, Optional
+
+from sqlalchemy import and_, literal, tuple_
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.db.models.chat import ChatMessage
+
+
+class HistoryCursor(NamedTuple):
+    """The position of a message in the `(timestamp, id)` order."""
+
+    timestamp: datetime
+    id: uuid.UUID
+
+    @classmethod
+    def of(cls, message: ChatMessage) -> "HistoryCursor":
+        return cls(message.timestamp, message.id)
+
+    def encode(self) -> str:
+        raw = f"{self.timestamp.isoformat()}|{self.id}".encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    @classmethod
+    def decode(cls, value: str) -> "HistoryCursor":
+        """
+        Parses a cursor produced by `encode`.
+
+        Raises:
+            ValueError: If the value is not a valid cursor.
+        """
+        try:
+            raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+            timestamp, message_id = raw.decode("utf-8").split("|")
+            return cls(datetime.fromisoformat(timestamp), uuid.UUID(message_id))
+        except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+            raise ValueError(f"Invalid history cursor: {value!r}") from e
+
+    def precedes(self, message: ChatMessage) -> bool:
+        """Returns True if the message comes after this cursor."""
+        return (message.timestamp, message.id) > tuple(self)
+
+    def follows(self, message: ChatMessage) -> bool:
+        """Returns True if the message comes before this cursor."""
+        return (message.timestamp, message.id) < tuple(self)
+
+
+def _cursor_row(cursor: HistoryCursor) -> ColumnElement[Any]:
+    return tuple_(
+        literal(cursor.timestamp, ChatMessage.timestamp.type),
+        literal(cursor.id, ChatMessage.id.type),
+    )
+
+
+def before_cursor(cursor: HistoryCursor) -> ColumnElement[bool]:
+    """Filters messages older than the cursor."""
+    # The plain timestamp bound lets the (…, timestamp) indexes limit the range
+    # scan; the row comparison then breaks ties on the id
+    return and_(
+        ChatMessage.timestamp <= cursor.timestamp,
+        tuple_(ChatMessage.timestamp, ChatMessage.id) < _cursor_row(cursor),
+    )
+
+
+def after_cursor(cursor: HistoryCursor) -> ColumnElement[bool]:
+    """Filters messages newer than the cursor."""
+    return and_(
+        ChatMessage.timestamp >= cursor.timestamp,
+        tuple_(ChatMessage.timestamp, ChatMessage.id) > _cursor_row(cursor),
+    )
+
+
+@dataclass
+class HistoryPage:
+    """A page of chat history."""
+
+    messages: List[ChatMessage]  # In chronological order
+    has_more: bool  # Whether more messages exist in the direction paged
+    # Where the page was fetched from, echoed when the page is empty
+    after: Optional[HistoryCursor] = None
+
+    @property
+    def older_cursor(self) -> Optional[str]:
+        """Cursor for the page before this one, if there may be older messages."""
+        if not self.messages or (self.after is None and not self.has_more):
+            return None
+        return HistoryCursor.of(self.messages[0]).encode()
+
+    @property
+    def newer_cursor(self) -> Optional[str]:
+        """Cursor for the messages after this page, including ones not sent yet."""
+        if self.messages:
+            return HistoryCursor.of(self.messages[-1]).encode()
+        return self.after.encode() if self.after is not None else None
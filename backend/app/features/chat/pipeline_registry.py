@@ -0,0 +1,142 @@
+"""
+Process-wide registry of built chat pipelines.
+
+Building a chat pipeline instantiates the LLM generator, fetches prompt templates
+and constructs a Haystack Agent and AsyncPipeline. The registry builds each distinct
+pipeline configuration once and hands out the warm instance for the lifetime of the
+process.
+
+A configuration is identified by the pipeline type, the resolved pipeline tag, the
+resolved versions of every prompt the pipeline uses and the LLM model, so bumping a
+prompt version in `pipeline-tags.yaml` or changing `LLM_MODEL` yields a new pipeline.
+"""
+
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+
+from haystack.core.pipeline import AsyncPipeline
+
+from app.config import Settings
+from app.features.chat.chat_pipeline import CHAT_PIPELINE_PROMPTS, build_chat_pipeline
+from app.services.prompt_service import PromptService
+
+logger = logging.getLogger(__name__)
+
+PipelineKey = Tuple[str, Optional[str], Tuple[Tuple[str, str], ...], str]
+
+
+class ChatPipelineRegistry:
+    """
+    Caches built chat pipelines keyed by their resolved configuration.
+
+    Pipelines are built at most once per key, even under concurrent requests:
+    callers asking for a key that is being built wait on a per-key lock and
+    receive the same instance. The Agent keeps per-run data in its own State,
+    so a single pipeline instance can serve concurrent runs.
+    """
+
+    def __init__(self) -> None:
+        self._pipelines: Dict[PipelineKey, AsyncPipeline] = {}
+        self._locks: Dict[PipelineKey, asyncio.Lock] = {}
+
+    def make_key(
+        self,
+        *,
+        pipeline_type: str,
+        override_pipeline_tag: Optional[str],
+        prompt_service: PromptService,
+        settings: Settings,
+    ) -> PipelineKey:
+        """
+        Resolves the cache key for a pipeline configuration.
+
+        Args:
+            pipeline_type: The type of pipeline (e.g., 'chat').
+            override_pipeline_tag: An optional tag to override the default pipeline tag.
+            prompt_service: The PromptService used to resolve prompt versions.
+            settings: Application settings providing the LLM model.
+
+        Returns:
+            A hashable key identifying the pipeline configuration.
+        """
+        prompt_versions = tuple(
+            (
+                prompt_name,
+                prompt_service.get_prompt_template_version(
+                    pipeline_type, prompt_name, override_pipeline_tag
+                ),
+            )
+            for prompt_name in CHAT_PIPELINE_PROMPTS
+        )
+        return (
+            pipeline_type,
+            prompt_service.resolve_pipeline_tag(pipeline_type, override_pipeline_tag),
+            prompt_versions,
+            settings.LLM_MODEL,
+        )
+
+    async def get_pipeline(
+        self,
+        *,
+        pipeline_type: str,
+        override_pipeline_tag: Optional[str],
+        prompt_service: PromptService,
+        settings: Settings,
+    ) -> AsyncPipeline:
+        """
+        Returns a ready pipeline for the configuration, building it on first use.
+
+        Args:
+            pipeline_type: The type of pipeline (e.g., 'chat').
+            override_pipeline_tag: An optional tag to override the default pipeline tag.
+            prompt_service: The PromptService used to resolve and fetch prompts.
+            settings: Application settings.
+
+        Returns:
+            A warmed-up Haystack AsyncPipeline.
+        """
+        key = self.make_key(
+            pipeline_type=pipeline_type,
+            override_pipeline_tag=override_pipeline_tag,
+            prompt_service=prompt_service,
+            settings=settings,
+        )
+
+        pipeline = self._pipelines.get(key)
+        if pipeline is not None:
+            return pipeline
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Another request may have finished building while we waited
+            pipeline = self._pipelines.get(key)
+            if pipeline is not None:
+                return pipeline
+
+            logger.info(f"Building chat pipeline for key {key}")
+            pipeline = await build_chat_pipeline(
+                pipeline_type=pipeline_type,
+                override_pipeline_tag=override_pipeline_tag,
+                prompt_service=prompt_service,
+                settings=settings,
+            )
+            pipeline.warm_up()
+            self._pipelines[key] = pipeline
+            return pipeline
+
+    def clear(self) -> None:
+        """Drops all cached pipelines so the next request rebuilds them."""
+        self._pipelines.clear()
+        self._locks.clear()
+
+    def __len__(self) -> int:
+        return len(self._pipelines)
+
+
+_registry = ChatPipelineRegistry()
+
+
+def get_chat_pipeline_registry() -> ChatPipelineRegistry:
+    """Returns the process-wide ChatPipelineRegistry."""
+    return _registry
@@ -0,0 +1,182 @@
+"""
+Provider-side prompt caching for chat turns.
+
+LLM providers cache the longest prefix of a request they have recently seen (OpenAI
+does so automatically for prompts of 1024 tokens or more) and serve cached prompt
+tokens faster and at a fraction of their price. A hit needs a byte-identical prefix,
+so chat requests are laid out from the most to the least stable part:
+
+1. the system prompt, static per prompt version (it must not contain per-turn data),
+2. the tools schema, in name order (see `stable_tools`),
+3. the rolling session summary, which only changes when history is folded,
+4. the recent messages, followed by the new user message.
+
+Each assistant reply records its prompt and cached token counts, and a fingerprint
+of the stable prefix it was sent with, under `prompt_cache` in its metadata.
+`PromptCacheMetrics` aggregates the per-process hit rate by model.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from haystack.dataclasses import ChatMessage, ChatRole
+from haystack.tools import Tool
+
+logger = logging.getLogger(__name__)
+
+
+def stable_tools(tools: Iterable[Tool]) -> List[Tool]:
+    """Returns the tools in name order, so their schema is sent identically every turn."""
+    return sorted(tools, key=lambda tool: tool.name)
+
+
+def prefix_fingerprint(
+    system_prompt: Optional[str],
+    tools: Optional[List[Tool]],
+    messages: List[ChatMessage],
+) -> str:
+    """
+    Hashes the stable prefix of a request: the system prompt, the tools schema and
+    the leading system messages of the history (the session summary).
+
+    Requests with the same fingerprint can share cached prompt tokens; a fingerprint
+    changing on every turn of a session means the prefix isn't stable.
+    """
+    leading_system = []
+    for message in messages:
+        if message.role != ChatRole.SYSTEM:
+            break
+        leading_system.append(message.text)
+    payload = {
+        "system_prompt": system_prompt,
+        "tools": [tool.tool_spec for tool in tools or []],
+        "summary": leading_system,
+    }
+    digest = hashlib.sha256(
+        json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+    return digest[:16]
+
+
+def _field(obj: Any, name: str) -> Any:
+    if isinstance(obj, Mapping):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def usage_to_dict(usage: Any) -> Any:
+    """
+    Converts generator usage metadata to plain JSON values: a dict for the usage
+    mapping itself, and lists or scalars for the values nested in it.
+
+    OpenAI usage details (`prompt_tokens_details`, `completion_tokens_details`)
+    arrive as pydantic models, which can't be stored in a JSONB column as-is.
+    """
+    if hasattr(usage, "model_dump"):
+        usage = usage.model_dump()
+    if isinstance(usage, Mapping):
+        return {key: usage_to_dict(value) for key, value in usage.items()}
+    if isinstance(usage, (list, tuple)):
+        return [usage_to_dict(value) for value in usage]
+    return usage
+
+
+def cached_prompt_tokens(usage: Any) -> int:
+    """
+    Returns the prompt tokens served from the provider's prompt cache.
+
+    Reads OpenAI's `prompt_tokens_details.cached_tokens`, or Anthropic's
+    `cache_read_input_tokens` as passed through by some gateways.
+    """
+    if not usage:
+        return 0
+    details = _field(usage, "prompt_tokens_details")
+    cached = _field(details, "cached_tokens") if details else None
+    if cached is None:
+        cached = _field(usage, "cache_read_input_tokens")
+    return int(cached or 0)
+
+
+class PromptCacheMetrics:
+    """Per-model prompt token counters, for the prompt cache hit rate."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"requests": 0, "hits": 0, "prompt_tokens": 0, "cached_tokens": 0}
+        )
+
+    def record(self, model: str, prompt_tokens: int, cached_tokens: int) -> None:
+        with self._lock:
+            counts = self._counts[model]
+            counts["requests"] += 1
+            counts["hits"] += 1 if cached_tokens else 0
+            counts["prompt_tokens"] += prompt_tokens
+            counts["cached_tokens"] += cached_tokens
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Returns the counters by model, with the share of requests and tokens hit."""
+        with self._lock:
+            return {
+                model: {
+                    **counts,
+                    "hit_rate": (
+                        counts["hits"] / counts["requests"]
+                        if counts["requests"]
+                        else 0.0
+                    ),
+                    "cached_token_ratio": (
+                        counts["cached_tokens"] / counts["prompt_tokens"]
+                        if counts["prompt_tokens"]
+                        else 0.0
+                    ),
+                }
+                for model, counts in self._counts.items()
+            }
+
+
+_metrics = PromptCacheMetrics()
+
+
+def record_prompt_cache_usage(replies: List[ChatMessage], *, prefix: str) -> None:
+    """
+    Records the prompt cache usage of the LLM calls that produced `replies`.
+
+    Each assistant reply with usage metadata gets its usage converted to plain JSON
+    and a `prompt_cache` entry in its metadata, so it is stored with the message.
+    Replies answered by the LLM response cache made no provider call and are skipped.
+
+    Args:
+        replies: The messages generated during an Agent run.
+        prefix: The `prefix_fingerprint` of the requests.
+    """
+    for reply in replies:
+        if reply.role != ChatRole.ASSISTANT or reply.meta.get("cache_hit"):
+            continue
+        usage = reply.meta.get("usage")
+        if not usage:
+            continue
+        usage = usage_to_dict(usage)
+        reply.meta["usage"] = usage
+        prompt_tokens = int(usage.get("prompt_tokens") or 0)
+        cached_tokens = cached_prompt_tokens(usage)
+        reply.meta["prompt_cache"] = {
+            "prefix": prefix,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+        }
+        _metrics.record(
+            reply.meta.get("model") or "unknown", prompt_tokens, cached_tokens
+        )
+        logger.debug(
+            f"Prompt cache: {cached_tokens}/{prompt_tokens} prompt tokens cached (prefix {prefix})"
+        )
+
+
+def get_prompt_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Returns this process' prompt cache counters by model."""
+    return _metrics.stats()
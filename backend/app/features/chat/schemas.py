@@ -22,9 +22,66 @@ class ChatMessageResponse(BaseModel):
 
 
 class ChatHistoryResponse(BaseModel):
-    """Represents a list of chat messages for a session or user."""
+    """Represents a page of chat messages for a session or user."""
 
-    messages: List[ChatMessageResponse]
+    messages: List[ChatMessageResponse]  # In chronological order
+    has_more: bool = Field(
+        False, description="Whether more messages exist in the direction paged"
+    )
+    older_cursor: Optional[str] = Field(
+        None,
+        description="Pass as `before` to load older messages; null if there are none",
+    )
+    newer_cursor: Optional[str] = Field(
+        None, description="Pass as `after` to load newer messages"
+    )
+
+
+class ChatSessionResponse(BaseModel):
+    """Represents a chat session in the session list."""
+
+    id: UUID
+    title: str  # Start of the first user message
+    last_message_preview: str
+    message_count: int
+    prompt_tokens: int
+    completion_tokens: int
+    created_at: datetime
+    last_activity_at: datetime
+
+    class Config:
+        from_attributes = True  # Enable ORM mode
+
+
+class ChatSessionListResponse(BaseModel):
+    """Represents a page of the user's chat sessions, most recently active first."""
+
+    sessions: List[ChatSessionResponse]
+    next_cursor: Optional[str] = Field(
+        None, description="Pass as `before` to load the next page; null on the last"
+    )
+
+
+class ChatSearchHitResponse(BaseModel):
+    """Represents a chat message matching a search."""
+
+    id: UUID
+    session_id: UUID
+    role: str
+    timestamp: datetime
+    snippet: str = Field(
+        ..., description="HTML-escaped excerpt with the matches wrapped in <mark>"
+    )
+    rank: float
+
+
+class ChatSearchResponse(BaseModel):
+    """Represents a page of search hits, best matches first."""
+
+    hits: List[ChatSearchHitResponse]
+    next_cursor: Optional[str] = Field(
+        None, description="Pass as `cursor` to load the next page; null on the last"
+    )
 
 
 class ChatMessageRequest(BaseModel):
@@ -34,6 +91,11 @@ class ChatMessageRequest(BaseModel):
     session_id: Optional[UUID] = Field(
         None, description="Optional session ID to continue a conversation"
     )  # Explicitly use Field for default
+    run_async: Optional[bool] = Field(
+        None,
+        description="Queue the turn in the worker and return a turn ID instead of the reply. "
+        "Defaults to the server's CHAT_ASYNC_TURNS setting.",
+    )
 
 
 class ChatMessageAPIResponse(BaseModel):
@@ -43,6 +105,14 @@ class ChatMessageAPIResponse(BaseModel):
     session_id: UUID
 
 
+class ChatTurnAcceptedResponse(BaseModel):
+    """Represents the response after queueing a chat turn in the worker."""
+
+    turn_id: UUID
+    session_id: UUID
+    events_url: str  # SSE endpoint streaming the turn's progress
+
+
 class GreetingResponse(BaseModel):
     """Represents the response for the greeting endpoint."""
 
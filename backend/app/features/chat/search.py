@@ -0,0 +1,168 @@
+"""
+Full-text search over a user's chat history.
+
+`chat_messages.content_tsv` is a stored `tsvector` generated from the content, and
+`ix_chat_message_user_content_tsv` a GIN index over `(user_id, content_tsv)`
+(`btree_gin`), so a search is an index lookup of the user's matching messages
+rather than a scan of the table. Queries use `websearch_to_tsquery` syntax:
+quoted phrases, `or` and `-excluded` words.
+
+Results are ranked with `ts_rank_cd` and paged by keyset on `(rank, timestamp, id)`.
+Snippets are HTML: the message text escaped, with matches wrapped in `<mark>`.
+Messages of archived sessions and messages still buffered by the write-behind
+writer are not searchable until they are back in, or flushed to, the table.
+"""
+
+import base64
+import binascii
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Union
+
+from sqlalchemy import and_, cast, func, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models.chat import ChatMessage
+
+SEARCH_CONFIG = "english"  # Must match the content_tsv generation expression
+SEARCHED_ROLES = ("user", "assistant")
+SNIPPET_OPTIONS = (
+    "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, "
+    'MaxFragments=2, FragmentDelimiter=" … "'
+)
+
+
+class SearchCursor(NamedTuple):
+    """The position of a search hit in the `(rank, timestamp, id)` order."""
+
+    rank: float
+    timestamp: datetime
+    id: uuid.UUID
+
+    def encode(self) -> str:
+        raw = f"{self.rank!r}|{self.timestamp.isoformat()}|{self.id}".encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    @classmethod
+    def decode(cls, value: str) -> "SearchCursor":
+        """
+        Parses a cursor produced by `encode`.
+
+        Raises:
+            ValueError: If the value is not a valid cursor.
+        """
+        try:
+            raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+            rank, timestamp, message_id = raw.decode("utf-8").split("|")
+            return cls(
+                float(rank), datetime.fromisoformat(timestamp), uuid.UUID(message_id)
+            )
+        except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+            raise ValueError(f"Invalid search cursor: {value!r}") from e
+
+
+@dataclass
+class SearchHit:
+    message: ChatMessage
+    rank: float
+    snippet: str  # Escaped HTML with <mark>ed matches
+
+
+@dataclass
+class SearchPage:
+    """A page of search hits, best ranked first."""
+
+    hits: List[SearchHit]
+    has_more: bool
+
+    @property
+    def next_cursor(self) -> Optional[str]:
+        """Cursor for the next page, if any."""
+        if not self.has_more:
+            return None
+        last = self.hits[-1]
+        return SearchCursor(last.rank, last.message.timestamp, last.message.id).encode()
+
+
+def _escaped_content():
+    """The message content with HTML special characters escaped, for snippets."""
+    content = ChatMessage.content
+    for char, entity in (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;")):
+        content = func.replace(content, char, entity)
+    return content
+
+
+async def search_chat_messages(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    text: str,
+    *,
+    session_id: Optional[Union[str, uuid.UUID]] = None,
+    limit: int = 20,
+    after: Optional[SearchCursor] = None,
+) -> SearchPage:
+    """
+    Searches a user's user and assistant messages.
+
+    Args:
+        db: The SQLAlchemy async database session.
+        user_id: The ID of the user whose messages are searched.
+        text: The search query, in `websearch_to_tsquery` syntax.
+        session_id: Optional ID of a chat session to search within.
+        limit: The maximum number of hits to return.
+        after: Return the hits after this cursor.
+
+    Returns:
+        The page of hits.
+    """
+    tsquery = func.websearch_to_tsquery(cast(SEARCH_CONFIG, REGCONFIG), text)
+    rank = func.ts_rank_cd(ChatMessage.content_tsv, tsquery)
+
+    # Rank and page the matches first, so snippets are only built for the page
+    matches = select(ChatMessage.id, ChatMessage.timestamp, rank.label("rank")).filter(
+        ChatMessage.user_id == user_id,
+        ChatMessage.content_tsv.bool_op("@@")(tsquery),
+        ChatMessage.role.in_(SEARCHED_ROLES),
+    )
+    if session_id is not None:
+        matches = matches.filter(ChatMessage.session_id == str(session_id))
+    if after is not None:
+        matches = matches.filter(
+            tuple_(rank, ChatMessage.timestamp, ChatMessage.id)
+            < tuple_(
+                literal(after.rank),
+                literal(after.timestamp, ChatMessage.timestamp.type),
+                literal(after.id, ChatMessage.id.type),
+            )
+        )
+    # One extra row tells whether another page follows
+    page = (
+        matches.order_by(
+            rank.desc(), ChatMessage.timestamp.desc(), ChatMessage.id.desc()
+        )
+        .limit(limit + 1)
+        .subquery()
+    )
+
+    snippet = func.ts_headline(
+        cast(SEARCH_CONFIG, REGCONFIG), _escaped_content(), tsquery, SNIPPET_OPTIONS
+    )
+    query = (
+        select(ChatMessage, page.c.rank, snippet)
+        .join(
+            page,
+            and_(
+                ChatMessage.id == page.c.id,
+                ChatMessage.timestamp == page.c.timestamp,
+            ),
+        )
+        .order_by(page.c.rank.desc(), page.c.timestamp.desc(), page.c.id.desc())
+    )
+    result = await db.execute(query)
+    hits = [
+        SearchHit(message=message, rank=rank_value, snippet=snippet_value)
+        for message, rank_value, snippet_value in result.all()
+    ]
+    return SearchPage(hits=hits[:limit], has_more=len(hits) > limit)
@@ -0,0 +1,196 @@
+"""
+Embedding-based semantic cache of agent answers.
+
+Many queries to the assistant are near-duplicates ("how do I write a good hook",
+"tips for a video hook"). Answers are stored with the embedding of the query that produced them, and
+a new query whose embedding is within `SEMANTIC_CACHE_SIMILARITY_THRESHOLD` (cosine
+similarity) of a stored one is answered without running the agent.
+
+Entries are scoped to the user, since answers may cite their data, and to the
+pipeline configuration (type, tag, prompt versions and model) through `prompt_key`,
+so a prompt version bump stops old answers from matching. Entries expire after
+`SEMANTIC_CACHE_TTL_SECONDS`. Answers the agent built from tool calls aren't stored,
+since the data they cite (e.g. the user's tasks) may change before then.
+
+The HNSW index spans every user's entries and the scope filters apply to the
+candidates it returns, so lookups scan iteratively until a candidate in scope is
+found instead of giving up after the first `SEMANTIC_CACHE_EF_SEARCH` candidates.
+"""
+
+import logging
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.sql import func
+
+from app.config import Settings
+from app.db.models.semantic_cache import SemanticCacheEntry
+from app.features.chat.pipeline_registry import PipelineKey
+from app.services.embedding_service import get_embedding_service
+
+logger = logging.getLogger(__name__)
+
+
+def make_prompt_key(pipeline_key: PipelineKey) -> str:
+    """Formats a pipeline registry key as the semantic cache scope string."""
+    pipeline_type, tag, prompt_versions, model = pipeline_key
+    versions = ",".join(f"{name}={version}" for name, version in prompt_versions)
+    return f"{pipeline_type}:{tag}:{versions}:{model}"
+
+
+@dataclass
+class SemanticLookup:
+    """The result of a semantic cache lookup."""
+
+    query_embedding: List[float]
+    entry: Optional[SemanticCacheEntry] = None
+    similarity: Optional[float] = None
+
+    @property
+    def hit(self) -> bool:
+        return self.entry is not None
+
+
+class SemanticCache:
+    """
+    Looks up and stores agent answers by query embedding in pgvector.
+    """
+
+    def __init__(self, settings: Settings):
+        """
+        Args:
+            settings: Application settings providing the threshold and TTL.
+        """
+        self.settings = settings
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.SEMANTIC_CACHE_ENABLED
+
+    async def lookup(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: uuid.UUID,
+        prompt_key: str,
+        query: str,
+    ) -> Optional[SemanticLookup]:
+        """
+        Finds the closest unexpired answer for the query in the user's scope.
+
+        Args:
+            db: The SQLAlchemy async database session.
+            user_id: The ID of the user asking.
+            prompt_key: The pipeline configuration scope (see `make_prompt_key`).
+            query: The user's message.
+
+        Returns:
+            A lookup carrying the query embedding (for storing the answer on a miss)
+            and, on a hit, the matching entry. None if the query couldn't be embedded.
+        """
+        try:
+            embedding = await get_embedding_service().embed_query(query)
+        except Exception as e:
+            # The cache is an optimization; fall back to running the agent
+            logger.warning(f"Failed to embed query for semantic cache: {e}")
+            return None
+
+        # Scoped to the transaction, like the `search_memory` tool's settings
+        await db.execute(
+            select(
+                func.set_config(
+                    "hnsw.ef_search", str(self.settings.SEMANTIC_CACHE_EF_SEARCH), True
+                ),
+                func.set_config("hnsw.iterative_scan", "relaxed_order", True),
+            )
+        )
+        distance = SemanticCacheEntry.embedding.cosine_distance(embedding)
+        result = await db.execute(
+            select(SemanticCacheEntry, distance.label("distance"))
+            .filter(
+                SemanticCacheEntry.user_id == user_id,
+                SemanticCacheEntry.prompt_key == prompt_key,
+                SemanticCacheEntry.expires_at > func.now(),
+            )
+            .order_by(distance)
+            .limit(1)
+        )
+        row = result.first()
+        lookup = SemanticLookup(query_embedding=embedding)
+        if row is None:
+            return lookup
+
+        entry, entry_distance = row
+        similarity = 1.0 - float(entry_distance)
+        if similarity < self.settings.SEMANTIC_CACHE_SIMILARITY_THRESHOLD:
+            return lookup
+
+        lookup.entry = entry
+        lookup.similarity = similarity
+        # Committed right away: a turn answered from the cache may not commit the
+        # session itself (e.g. with write-behind)
+        try:
+            await db.execute(
+                update(SemanticCacheEntry)
+                .where(SemanticCacheEntry.id == entry.id)
+                .values(hit_count=SemanticCacheEntry.hit_count + 1)
+            )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.warning(f"Failed to count semantic cache hit: {e}")
+        logger.info(
+            f"Semantic cache hit for user {user_id} (similarity {similarity:.3f})"
+        )
+        return lookup
+
+    async def store(
+        self,
+        db: AsyncSession,
+        lookup: SemanticLookup,
+        *,
+        user_id: uuid.UUID,
+        prompt_key: str,
+        query: str,
+        response: str,
+    ) -> None:
+        """
+        Stores an answer for a query that missed the cache, and drops the user's
+        expired entries.
+
+        Args:
+            db: The SQLAlchemy async database session.
+            lookup: The lookup performed for the query.
+            user_id: The ID of the user who asked.
+            prompt_key: The pipeline configuration scope.
+            query: The user's message.
+            response: The agent's final reply.
+        """
+        try:
+            await db.execute(
+                delete(SemanticCacheEntry).where(
+                    SemanticCacheEntry.user_id == user_id,
+                    SemanticCacheEntry.expires_at <= func.now(),
+                )
+            )
+            db.add(
+                SemanticCacheEntry(
+                    user_id=user_id,
+                    prompt_key=prompt_key,
+                    query=query,
+                    response=response,
+                    embedding=lookup.query_embedding,
+                    hit_count=0,
+                    expires_at=datetime.now(timezone.utc)
+                    + timedelta(seconds=self.settings.SEMANTIC_CACHE_TTL_SECONDS),
+                )
+            )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.warning(f"Failed to store semantic cache entry: {e}")
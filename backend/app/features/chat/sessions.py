@@ -0,0 +1,175 @@
+"""
+Chat sessions with incrementally maintained totals.
+
+Whenever the messages of a turn are stored, `upsert_chat_sessions` folds them into
+their `chat_sessions` rows in the same transaction: one upsert adds the message and
+token counts and moves the preview and last activity forward. Listing a user's
+sessions is then a range scan of `ix_chat_session_user_activity`.
+"""
+
+import re
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from sqlalchemy import and_, case, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.db.models.chat import ChatSession
+from app.features.chat.pagination import HistoryCursor
+
+TITLE_MAX_CHARS = 80
+PREVIEW_MAX_CHARS = 200
+
+
+def _shorten(text: str, max_chars: int) -> str:
+    text = re.sub(r"\s+", " ", text or "").strip()
+    if len(text) <= max_chars:
+        return text
+    return text[: max_chars - 1].rstrip() + "…"
+
+
+def session_totals(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Aggregates `chat_messages` rows (as built by `TurnRecord.rows`) into the
+    `chat_sessions` values they add, one per session.
+    """
+    sessions: Dict[str, Dict[str, Any]] = {}
+    for row in sorted(rows, key=lambda r: (r["timestamp"], str(r["id"]))):
+        totals = sessions.get(str(row["session_id"]))
+        if totals is None:
+            totals = sessions[str(row["session_id"])] = {
+                "id": uuid.UUID(str(row["session_id"])),
+                "user_id": row["user_id"],
+                "title": "",
+                "last_message_preview": "",
+                "message_count": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "created_at": row["timestamp"],
+                "last_activity_at": row["timestamp"],
+            }
+        totals["message_count"] += 1
+        totals["last_activity_at"] = row["timestamp"]
+        usage = (row.get("metadata_") or {}).get("usage") or {}
+        totals["prompt_tokens"] += int(usage.get("prompt_tokens") or 0)
+        totals["completion_tokens"] += int(usage.get("completion_tokens") or 0)
+        if row["role"] in ("user", "assistant") and row["content"]:
+            totals["last_message_preview"] = _shorten(row["content"], PREVIEW_MAX_CHARS)
+            if row["role"] == "user" and not totals["title"]:
+                totals["title"] = _shorten(row["content"], TITLE_MAX_CHARS)
+    return list(sessions.values())
+
+
+async def upsert_chat_sessions(
+    db: Union[AsyncSession, AsyncConnection], rows: List[Dict[str, Any]]
+) -> None:
+    """
+    Adds stored message rows to their sessions' totals, creating missing sessions.
+
+    Runs in the caller's transaction, so the totals commit with the messages.
+    Sessions of another user are left untouched.
+    """
+    values = session_totals(rows)
+    if not values:
+        return
+    insert = pg_insert(ChatSession).values(values)
+    excluded = insert.excluded
+    is_newer = excluded.last_activity_at >= ChatSession.last_activity_at
+    await db.execute(
+        insert.on_conflict_do_update(
+            index_elements=[ChatSession.id],
+            set_={
+                # A session started before this table existed gets its first title
+                "title": case(
+                    (ChatSession.title == "", excluded.title), else_=ChatSession.title
+                ),
+                "last_message_preview": case(
+                    (
+                        and_(is_newer, excluded.last_message_preview != ""),
+                        excluded.last_message_preview,
+                    ),
+                    else_=ChatSession.last_message_preview,
+                ),
+                "message_count": ChatSession.message_count + excluded.message_count,
+                "prompt_tokens": ChatSession.prompt_tokens + excluded.prompt_tokens,
+                "completion_tokens": ChatSession.completion_tokens
+                + excluded.completion_tokens,
+                "last_activity_at": func.greatest(
+                    ChatSession.last_activity_at, excluded.last_activity_at
+                ),
+                # Write-behind batches may land out of order; keeps the lower bound
+                # of `session_started_at` sound
+                "created_at": func.least(ChatSession.created_at, excluded.created_at),
+            },
+            where=ChatSession.user_id == excluded.user_id,
+        )
+    )
+
+
+async def session_started_at(
+    db: AsyncSession, user_id: uuid.UUID, session_id: Union[str, uuid.UUID]
+) -> Optional[datetime]:
+    """
+    Returns the timestamp of a session's first stored message, if the session exists.
+
+    Bounding a `chat_messages` query on it lets Postgres skip the monthly partitions
+    from before the session started.
+    """
+    result = await db.execute(
+        select(ChatSession.created_at).filter(
+            ChatSession.id == uuid.UUID(str(session_id)),
+            ChatSession.user_id == user_id,
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+@dataclass
+class SessionPage:
+    """A page of a user's sessions, most recently active first."""
+
+    sessions: List[ChatSession]
+    has_more: bool
+
+    @property
+    def next_cursor(self) -> Optional[str]:
+        """Cursor for the next (less recently active) page, if any."""
+        if not self.has_more:
+            return None
+        last = self.sessions[-1]
+        return HistoryCursor(last.last_activity_at, last.id).encode()
+
+
+async def list_chat_sessions(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    *,
+    limit: int,
+    before: Optional[HistoryCursor] = None,
+) -> SessionPage:
+    """
+    Lists a user's sessions by last activity, newest first.
+
+    Args:
+        db: The SQLAlchemy async database session.
+        user_id: The ID of the user.
+        limit: The maximum number of sessions to return.
+        before: Return the sessions after this cursor in the listing.
+    """
+    # Uses ix_chat_session_user_activity
+    query = select(ChatSession).filter(ChatSession.user_id == user_id)
+    if before is not None:
+        query = query.filter(
+            ChatSession.last_activity_at <= before.timestamp,
+            tuple_(ChatSession.last_activity_at, ChatSession.id)
+            < tuple_(before.timestamp, before.id),
+        )
+    query = query.order_by(
+        ChatSession.last_activity_at.desc(), ChatSession.id.desc()
+    ).limit(limit + 1)
+    result = await db.execute(query)
+    sessions = list(result.scalars().all())
+    return SessionPage(sessions=sessions[:limit], has_more=len(sessions) > limit)
@@ -0,0 +1,342 @@
+"""
+Background Tasks (SAQ) for the Chat Feature.
+
+These functions are executed by the SAQ worker and registered in
+`app/worker/settings.py`. They delegate the actual work to `ChatService`.
+"""
+
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Dict
+
+from saq.types import Context
+
+from app.config import get_settings
+from app.db.models import User
+from app.db.partitions import maintain_chat_partitions
+from app.db.session import engine
+from app.features.chat.archive import get_chat_archiver
+from app.features.chat.history import ChatHistoryAssembler
+from app.features.chat.turn_events import TurnEventPublisher
+from app.services.chat_service import ChatService
+from app.services.prompt_service import PromptService
+from app.services.user_service import UserService
+from app.shared.clients import BACKGROUND, BATCH, get_redis, llm_priority
+from app.shared.tools.memory import store_turn_embedding, turn_text
+from app.worker.context import get_session_factory
+
+logger = logging.getLogger(__name__)
+
+
+async def precompute_greeting_task(ctx: Context, *, user_id: str) -> Dict[str, Any]:
+    """
+    Generates the user's greeting and stores it in the greeting cache.
+
+    Enqueued after sign-in and whenever a stale cached greeting is served, so the
+    greeting endpoint can answer from cache.
+
+    Args:
+        ctx: The SAQ context object containing job information
+        user_id: The ID of the user to generate the greeting for
+
+    Returns:
+        A dictionary containing the job result
+    """
+    job = ctx.get("job")
+    job_id = job.id if job else "unknown"
+    logger.info(
+        f"Starting precompute_greeting_task - job_id: {job_id}, user: {user_id}"
+    )
+
+    settings = get_settings()
+    session_factory = get_session_factory(ctx)
+    try:
+        # Precomputed greetings yield LLM capacity to interactive chat turns
+        async with session_factory() as db:
+            with llm_priority(BACKGROUND):
+                chat_service = ChatService(
+                    settings=settings,
+                    prompt_service=PromptService(settings),
+                    user_service=UserService(db=db),
+                )
+                await chat_service.refresh_greeting(db, uuid.UUID(user_id))
+
+        logger.info(f"Completed precompute_greeting_task - job_id: {job_id}")
+        return {"status": "success", "job_id": job_id, "user_id": user_id}
+
+    except Exception as e:
+        logger.exception(
+            f"Error in precompute_greeting_task - job_id: {job_id}: {str(e)}"
+        )
+        # Re-raise to let SAQ handle the failure
+        raise
+
+
+async def summarize_chat_session_task(
+    ctx: Context, *, session_id: str, user_id: str
+) -> Dict[str, Any]:
+    """
+    Folds a session's oldest messages into its rolling summary.
+
+    Enqueued after a turn whose history no longer fit the token budget.
+
+    Args:
+        ctx: The SAQ context object containing job information
+        session_id: The ID of the chat session to summarize
+        user_id: The ID of the user owning the session
+
+    Returns:
+        A dictionary containing the job result
+    """
+    job = ctx.get("job")
+    job_id = job.id if job else "unknown"
+    logger.info(
+        f"Starting summarize_chat_session_task - job_id: {job_id}, session: {session_id}"
+    )
+
+    settings = get_settings()
+    session_factory = get_session_factory(ctx)
+    try:
+        async with session_factory() as db:
+            with llm_priority(BATCH):
+                assembler = ChatHistoryAssembler(settings, PromptService(settings))
+                summary = await assembler.summarize(db, session_id, uuid.UUID(user_id))
+
+        logger.info(f"Completed summarize_chat_session_task - job_id: {job_id}")
+        return {
+            "status": "success",
+            "job_id": job_id,
+            "session_id": session_id,
+            "summarized_message_count": (
+                summary.summarized_message_count if summary is not None else None
+            ),
+        }
+
+    except Exception as e:
+        logger.exception(
+            f"Error in summarize_chat_session_task - job_id: {job_id}: {str(e)}"
+        )
+        # Re-raise to let SAQ handle the failure
+        raise
+
+
+async def embed_chat_turn_task(
+    ctx: Context,
+    *,
+    turn_id: str,
+    user_id: str,
+    session_id: str,
+    turn_at: str,
+    user_message: str,
+    reply: str,
+) -> Dict[str, Any]:
+    """
+    Embeds a stored chat turn for the agent's `search_memory` tool.
+
+    Enqueued after each stored turn when `CHAT_MEMORY_ENABLED`, see
+    `app.shared.tools.memory`.
+
+    Args:
+        ctx: The SAQ context object containing job information
+        turn_id: The ID of the turn's user message
+        user_id: The ID of the user owning the session
+        session_id: The ID of the chat session
+        turn_at: When the user message was sent, in ISO 8601 format
+        user_message: The user's message
+        reply: The agent's final reply
+
+    Returns:
+        A dictionary containing the job result
+    """
+    job = ctx.get("job")
+    job_id = job.id if job else "unknown"
+    logger.info(f"Starting embed_chat_turn_task - job_id: {job_id}, turn: {turn_id}")
+
+    settings = get_settings()
+    session_factory = get_session_factory(ctx)
+    try:
+        async with session_factory() as db:
+            with llm_priority(BATCH):
+                embedded = await store_turn_embedding(
+                    db,
+                    turn_id=uuid.UUID(turn_id),
+                    user_id=uuid.UUID(user_id),
+                    session_id=uuid.UUID(session_id),
+                    turn_at=datetime.fromisoformat(turn_at),
+                    content=turn_text(
+                        user_message, reply, settings.CHAT_MEMORY_MAX_TURN_CHARS
+                    ),
+                )
+
+        logger.info(f"Completed embed_chat_turn_task - job_id: {job_id}")
+        return {
+            "status": "success" if embedded else "skipped",
+            "job_id": job_id,
+            "turn_id": turn_id,
+        }
+
+    except Exception as e:
+        logger.exception(f"Error in embed_chat_turn_task - job_id: {job_id}: {str(e)}")
+        # Re-raise to let SAQ handle the failure
+        raise
+
+
+async def chat_turn_task(
+    ctx: Context,
+    *,
+    turn_id: str,
+    user_id: str,
+    session_id: str,
+    user_message: str,
+) -> Dict[str, Any]:
+    """
+    Runs a queued chat turn and publishes its progress to the turn's event stream.
+
+    Enqueued by `POST /api/chat/message` in async mode; clients follow the turn via
+    `GET /api/chat/turns/{turn_id}/events`.
+
+    Args:
+        ctx: The SAQ context object containing job information
+        turn_id: The ID of the turn, used as the event stream name
+        user_id: The ID of the user who sent the message
+        session_id: The ID of the chat session
+        user_message: The message sent by the user
+
+    Returns:
+        A dictionary containing the job result
+    """
+    job = ctx.get("job")
+    job_id = job.id if job else "unknown"
+    logger.info(f"Starting chat_turn_task - job_id: {job_id}, turn: {turn_id}")
+
+    settings = get_settings()
+    session_factory = get_session_factory(ctx)
+    publisher = TurnEventPublisher(
+        get_redis(), turn_id, settings.CHAT_TURN_EVENTS_TTL_SECONDS
+    )
+    outcome: Dict[str, Any] = {}
+
+    def emit(event: str, data: Dict[str, Any]) -> None:
+        if event in ("done", "error"):
+            outcome["event"] = event
+        publisher.emit(event, data)
+
+    try:
+        async with session_factory() as db:
+            user = await db.get(User, uuid.UUID(user_id))
+            if not user:
+                publisher.emit("error", {"detail": "User not found."})
+                raise ValueError(f"User {user_id} not found")
+            chat_service = ChatService(
+                settings=settings,
+                prompt_service=PromptService(settings),
+                user_service=UserService(db=db),
+            )
+
+        await chat_service.run_turn_with_events(
+            user_message=user_message,
+            user=user,
+            session_id=session_id,
+            emit=emit,
+        )
+
+        logger.info(
+            f"Completed chat_turn_task - job_id: {job_id}, outcome: {outcome.get('event')}"
+        )
+        return {
+            "status": "success" if outcome.get("event") == "done" else "error",
+            "job_id": job_id,
+            "turn_id": turn_id,
+            "session_id": session_id,
+        }
+
+    except Exception as e:
+        logger.exception(f"Error in chat_turn_task - job_id: {job_id}: {str(e)}")
+        # Re-raise to let SAQ handle the failure
+        raise
+    finally:
+        await publisher.aclose()
+
+
+async def maintain_chat_partitions_task(ctx: Context) -> Dict[str, Any]:
+    """
+    Creates the coming months' `chat_messages` partitions and detaches expired ones.
+
+    Runs daily as a cron job, see `app.db.partitions`.
+
+    Args:
+        ctx: The SAQ context object containing job information
+
+    Returns:
+        A dictionary containing the job result
+    """
+    job = ctx.get("job")
+    job_id = job.id if job else "unknown"
+    logger.info(f"Starting maintain_chat_partitions_task - job_id: {job_id}")
+
+    settings = get_settings()
+    try:
+        outcome = await maintain_chat_partitions(
+            engine,
+            months_ahead=settings.CHAT_PARTITION_MONTHS_AHEAD,
+            retention_months=settings.CHAT_PARTITION_RETENTION_MONTHS,
+        )
+
+        logger.info(f"Completed maintain_chat_partitions_task - job_id: {job_id}")
+        return {
+            "status": "success" if not outcome.failed else "partial",
+            "job_id": job_id,
+            "created": outcome.created,
+            "detached": outcome.detached,
+            "failed": outcome.failed,
+        }
+
+    except Exception as e:
+        logger.exception(
+            f"Error in maintain_chat_partitions_task - job_id: {job_id}: {str(e)}"
+        )
+        # Re-raise to let SAQ handle the failure
+        raise
+
+
+async def archive_chat_sessions_task(ctx: Context) -> Dict[str, Any]:
+    """
+    Moves the messages of idle chat sessions to cold storage.
+
+    Runs daily as a cron job when `CHAT_ARCHIVE_ENABLED`, see
+    `app.features.chat.archive`.
+
+    Args:
+        ctx: The SAQ context object containing job information
+
+    Returns:
+        A dictionary containing the job result
+    """
+    job = ctx.get("job")
+    job_id = job.id if job else "unknown"
+    settings = get_settings()
+    if not settings.CHAT_ARCHIVE_ENABLED:
+        return {"status": "skipped", "job_id": job_id}
+    logger.info(f"Starting archive_chat_sessions_task - job_id: {job_id}")
+
+    session_factory = get_session_factory(ctx)
+    try:
+        async with session_factory() as db:
+            archived = await get_chat_archiver().archive_idle_sessions(db)
+
+        logger.info(
+            f"Completed archive_chat_sessions_task - job_id: {job_id}, archived: {len(archived)}"
+        )
+        return {
+            "status": "success",
+            "job_id": job_id,
+            "archived_session_count": len(archived),
+        }
+
+    except Exception as e:
+        logger.exception(
+            f"Error in archive_chat_sessions_task - job_id: {job_id}: {str(e)}"
+        )
+        # Re-raise to let SAQ handle the failure
+        raise
@@ -0,0 +1,226 @@
+"""
+Concurrent tool invocation for the chat Agent.
+
+Haystack's `ToolInvoker` runs the tool calls of an LLM response one after another,
+so a step calling several tools pays the sum of their latencies. `ConcurrentToolInvoker`
+runs them at once, bounded by `max_concurrency` and with a timeout per call, then
+builds the tool messages and merges outputs into the Agent state in call order, as
+`ToolInvoker` does.
+
+The Agent runs synchronously (in an executor thread under `AsyncPipeline`), so the
+calls are driven by a private event loop: async tool functions are awaited on it and
+sync ones run in the invoker's thread pool. Async tools must therefore not use
+resources bound to the application's event loop, such as a request's `AsyncSession`,
+directly; they can hand such work to the `AppLoop` in the Agent state.
+"""
+
+import asyncio
+import inspect
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Coroutine, Dict, List, Optional, Tuple, TypeVar, Union
+
+from haystack import component
+from haystack.components.tools import ToolInvoker
+from haystack.components.tools.tool_invoker import (
+    ToolNotFoundException,
+    ToolOutputMergeError,
+)
+from haystack.dataclasses import ChatMessage, State, ToolCall
+from haystack.tools import Tool
+from haystack.tools.errors import ToolInvocationError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class AppLoop:
+    """
+    The event loop running a chat turn, passed to tools in the Agent state as
+    `app_loop`. `run` executes a coroutine there, where the pooled database and LLM
+    connections live, and awaits it from the invoker's private loop.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "AppLoop":
+        # State deep-copies values on every read, which event loops don't support
+        return self
+
+    async def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        """Runs a coroutine on the application's loop and returns its result."""
+        if asyncio.get_running_loop() is self.loop:
+            return await coro
+        # Cancelling the wrapper (e.g. on a tool timeout) cancels the coroutine too
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(coro, self.loop)
+        )
+
+
+# What invoking one tool call produced: its result, or the error to report
+ToolOutcome = Tuple[ToolCall, Optional[Tool], Union[Any, Exception]]
+
+
+@component
+class ConcurrentToolInvoker(ToolInvoker):
+    """
+    A `ToolInvoker` running the tool calls of one step concurrently.
+    """
+
+    def __init__(
+        self,
+        tools: List[Tool],
+        raise_on_failure: bool = True,
+        convert_result_to_json_string: bool = False,
+        *,
+        max_concurrency: int = 4,
+        timeout_seconds: Optional[float] = 30.0,
+        tool_timeouts: Optional[Dict[str, float]] = None,
+    ):
+        """
+        Args:
+            tools: The tools that can be invoked.
+            raise_on_failure: Raise tool errors instead of returning them as tool messages.
+            convert_result_to_json_string: Convert results with `json.dumps` instead of `str`.
+            max_concurrency: Max tool calls running at once.
+            timeout_seconds: Default time limit of one tool call, None for no limit.
+            tool_timeouts: Time limits overriding `timeout_seconds` by tool name.
+        """
+        # @component recreates the class, so zero-argument super() can't be used
+        ToolInvoker.__init__(
+            self,
+            tools=tools,
+            raise_on_failure=raise_on_failure,
+            convert_result_to_json_string=convert_result_to_json_string,
+        )
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout_seconds = timeout_seconds
+        self.tool_timeouts = tool_timeouts or {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="agent-tool"
+        )
+
+    @component.output_types(tool_messages=List[ChatMessage], state=State)
+    def run(
+        self, messages: List[ChatMessage], state: Optional[State] = None
+    ) -> Dict[str, Any]:
+        """
+        Invokes the tool calls in `messages` concurrently.
+
+        Args:
+            messages: The LLM replies whose tool calls are invoked.
+            state: The runtime state used by the tools.
+
+        Returns:
+            A dictionary with the `tool_messages` (one per tool call, in call order)
+            and the updated `state`.
+        """
+        if state is None:
+            state = State(schema={})
+
+        tool_calls = [
+            tool_call for message in messages for tool_call in message.tool_calls
+        ]
+        outcomes = self._run_loop(self._invoke_all(tool_calls, state))
+
+        tool_messages = []
+        for tool_call, tool_to_invoke, result in outcomes:
+            if isinstance(result, Exception):
+                error_message = self._handle_error(result)
+                tool_messages.append(
+                    ChatMessage.from_tool(
+                        tool_result=error_message, origin=tool_call, error=True
+                    )
+                )
+                continue
+
+            # State isn't thread-safe, so outputs are merged here in call order
+            try:
+                self._merge_tool_outputs(tool_to_invoke, result, state)
+            except Exception as e:
+                try:
+                    error_message = self._handle_error(
+                        ToolOutputMergeError(
+                            f"Failed to merge tool outputs from tool {tool_call.tool_name} into State: {e}"
+                        )
+                    )
+                    tool_messages.append(
+                        ChatMessage.from_tool(
+                            tool_result=error_message, origin=tool_call, error=True
+                        )
+                    )
+                    continue
+                except ToolOutputMergeError as propagated_e:
+                    raise propagated_e from e
+
+            tool_messages.append(
+                self._prepare_tool_result_message(
+                    result=result, tool_call=tool_call, tool_to_invoke=tool_to_invoke
+                )
+            )
+
+        return {"tool_messages": tool_messages, "state": state}
+
+    def _run_loop(self, coro) -> List[ToolOutcome]:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+        # Called from a thread running an event loop: drive ours in another thread
+        with ThreadPoolExecutor(max_workers=1) as runner:
+            return runner.submit(asyncio.run, coro).result()
+
+    async def _invoke_all(
+        self, tool_calls: List[ToolCall], state: State
+    ) -> List[ToolOutcome]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def invoke(tool_call: ToolCall) -> ToolOutcome:
+            tool_to_invoke = self._tools_with_names.get(tool_call.tool_name)
+            if tool_to_invoke is None:
+                return (
+                    tool_call,
+                    None,
+                    ToolNotFoundException(
+                        tool_call.tool_name, list(self._tools_with_names.keys())
+                    ),
+                )
+            final_args = self._inject_state_args(
+                tool_to_invoke, tool_call.arguments.copy(), state
+            )
+            timeout = self.tool_timeouts.get(tool_call.tool_name, self.timeout_seconds)
+            async with semaphore:
+                try:
+                    result = await asyncio.wait_for(
+                        self._invoke_tool(tool_to_invoke, final_args), timeout
+                    )
+                except asyncio.TimeoutError:
+                    logger.warning(
+                        f"Tool {tool_call.tool_name} timed out after {timeout}s"
+                    )
+                    result = ToolInvocationError(
+                        f"Tool `{tool_call.tool_name}` timed out after {timeout} seconds."
+                    )
+                except ToolInvocationError as e:
+                    result = e
+            return tool_call, tool_to_invoke, result
+
+        return await asyncio.gather(*(invoke(tool_call) for tool_call in tool_calls))
+
+    async def _invoke_tool(self, tool: Tool, args: Dict[str, Any]) -> Any:
+        if not inspect.iscoroutinefunction(tool.function):
+            # A timed-out sync tool keeps its worker thread until it returns
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, partial(tool.invoke, **args)
+            )
+        try:
+            return await tool.function(**args)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            raise ToolInvocationError(
+                f"Failed to invoke Tool `{tool.name}` with parameters {args}. Error: {e}"
+            ) from e
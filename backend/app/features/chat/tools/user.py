@@ -1,16 +1,61 @@
 import logging
 import uuid
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, List
 from haystack.tools import Tool
+from sqlalchemy import inspect
 from app.db.models.user import User  # Import User
+from app.db.models.user_video import UserVideo
+from app.db.models.video import Video
 from app.services.user_service import UserService  # Import UserService
+from app.shared.tools.cache import (
+    cached_tool_result,
+    install_invalidation_hooks,
+    register_invalidation,
+)
 
 logger = logging.getLogger(__name__)
 
+# Tool cache invalidation tags. A user's tasks change with their UserVideo rows and
+# with the titles of videos, which aren't attributable to users without a query.
+VIDEOS_TAG = "videos"
+
+
+def user_videos_tag(user_id: Any) -> str:
+    return f"user_videos:{user_id}"
+
+
+def _user_tasks_tags(state: Dict[str, Any], args: Dict[str, Any]) -> List[str]:
+    user = state.get("user")
+    target_user_id = args.get("user_id") or (user.id if user else None)
+    return [user_videos_tag(target_user_id), VIDEOS_TAG]
+
+
+def _user_video_changed(row: UserVideo, change: str) -> Iterable[str]:
+    return [user_videos_tag(row.user_id)]
+
+
+def _video_changed(row: Video, change: str) -> Iterable[str]:
+    # New videos only appear in tasks once linked through a UserVideo row, and status
+    # updates during processing don't change task titles
+    if change == "delete" or (
+        change == "update" and inspect(row).attrs.title.history.has_changes()
+    ):
+        return [VIDEOS_TAG]
+    return []
+
+
+def register_tool_cache_invalidation() -> None:
+    """Invalidates cached task lists when UserVideo rows or video titles change."""
+    register_invalidation(UserVideo, _user_video_changed)
+    register_invalidation(Video, _video_changed)
+    install_invalidation_hooks()
+
 
 # Tool function for getting user tasks
 # This function will receive the 'state' object from the Agent's run method,
 # which should contain the DB session and user object.
+# Results are cached per caller and arguments until the user's videos change.
+@cached_tool_result(ttl_seconds=300, tags=_user_tasks_tags)
 async def get_user_tasks_tool_func(state: Dict[str, Any], **kwargs) -> Dict[str, Any]:
     """
     Gets the tasks for the specified user.
@@ -64,5 +109,6 @@ get_user_tasks_tool = Tool(
     },
     function=get_user_tasks_tool_func,
 )
-# List of chat-specific tools
+# List of chat-specific tools. Not registered with the chat Agent yet: the tool needs
+# `user_service` in the Agent state and must run its query through `app_loop`.
 chat_tools: List[Tool] = [get_user_tasks_tool]
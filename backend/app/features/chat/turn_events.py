@@ -0,0 +1,148 @@
+"""
+Progress events of chat turns executed in the SAQ worker.
+
+A queued turn is registered under `chat:turn:{turn_id}` (owner and session) and the
+worker appends its events (`token`, `tool_call`, `tool_result`, `done`, `error`) to
+the Redis stream `chat:turn:{turn_id}:events`. A stream rather than pub/sub lets a
+client connect after the turn started, or reconnect with the last event id it saw,
+without missing events. Both keys expire after `CHAT_TURN_EVENTS_TTL_SECONDS`.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Awaitable, Dict, Optional, Tuple, cast
+
+from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+TURN_KEY_PREFIX = "chat:turn:"
+TERMINAL_EVENTS = ("done", "error")
+# Bounds the stream of a single turn; a reply rarely has more token chunks
+TURN_EVENTS_MAXLEN = 10000
+
+TurnEvent = Tuple[str, str, Dict[str, Any]]  # (event id, event type, data)
+
+
+def _turn_key(turn_id: str) -> str:
+    return f"{TURN_KEY_PREFIX}{turn_id}"
+
+
+def _events_key(turn_id: str) -> str:
+    return f"{TURN_KEY_PREFIX}{turn_id}:events"
+
+
+async def register_turn(
+    redis: Redis,
+    turn_id: str,
+    *,
+    user_id: str,
+    session_id: str,
+    ttl_seconds: int,
+) -> None:
+    """Records who owns a queued turn so only they can read its events."""
+    key = _turn_key(turn_id)
+    pipe = redis.pipeline()
+    pipe.hset(key, mapping={"user_id": user_id, "session_id": session_id})
+    pipe.expire(key, ttl_seconds)
+    await pipe.execute()
+
+
+async def get_turn_owner(redis: Redis, turn_id: str) -> Optional[str]:
+    """Returns the user id owning the turn, or None if it is unknown or expired."""
+    return await cast(
+        Awaitable[Optional[str]], redis.hget(_turn_key(turn_id), "user_id")
+    )
+
+
+class TurnEventPublisher:
+    """
+    Appends a turn's events to its Redis stream in emission order.
+
+    `emit` may be called from any thread (the Agent's streaming callback runs in
+    an executor thread); events are handed to a task on the event loop that writes
+    them to Redis one by one.
+    """
+
+    def __init__(self, redis: Redis, turn_id: str, ttl_seconds: int):
+        """
+        Args:
+            redis: The asyncio Redis client.
+            turn_id: The ID of the turn whose events are published.
+            ttl_seconds: How long the events are kept after the last write.
+        """
+        self.redis = redis
+        self.turn_id = turn_id
+        self.ttl_seconds = ttl_seconds
+        self._loop = asyncio.get_running_loop()
+        self._pending: asyncio.Queue = asyncio.Queue()
+        self._writer = asyncio.create_task(self._write_events())
+
+    def emit(self, event: str, data: Dict[str, Any]) -> None:
+        """Queues an event for publishing. Safe to call from any thread."""
+        self._loop.call_soon_threadsafe(self._pending.put_nowait, (event, data))
+
+    async def _write_events(self) -> None:
+        key = _events_key(self.turn_id)
+        while True:
+            item = await self._pending.get()
+            if item is None:
+                return
+            event, data = item
+            try:
+                pipe = self.redis.pipeline()
+                pipe.xadd(
+                    key,
+                    {"event": event, "data": json.dumps(data, default=str)},
+                    maxlen=TURN_EVENTS_MAXLEN,
+                    approximate=True,
+                )
+                pipe.expire(key, self.ttl_seconds)
+                await pipe.execute()
+            except Exception as e:
+                logger.warning(
+                    f"Failed to publish '{event}' event of turn {self.turn_id}: {e}"
+                )
+
+    async def aclose(self) -> None:
+        """Waits until all emitted events are written."""
+        # Queue the sentinel through the loop like emit() so it lands after them
+        self._loop.call_soon_threadsafe(self._pending.put_nowait, None)
+        await self._writer
+
+
+async def read_turn_events(
+    redis: Redis,
+    turn_id: str,
+    *,
+    last_event_id: str = "0",
+    block_ms: int = 15000,
+) -> AsyncIterator[Optional[TurnEvent]]:
+    """
+    Yields a turn's events after `last_event_id` until a terminal event.
+
+    Yields None whenever no event arrived within `block_ms`, so callers can send
+    keep-alives. Stops if the turn's events expired.
+
+    Args:
+        redis: The asyncio Redis client.
+        turn_id: The ID of the turn.
+        last_event_id: Resume after this stream id ("0" replays from the start).
+        block_ms: How long to wait for new events per read.
+    """
+    key = _events_key(turn_id)
+    while True:
+        response = await redis.xread({key: last_event_id}, block=block_ms, count=100)
+        if not response:
+            if not await redis.exists(_turn_key(turn_id)):
+                return
+            yield None
+            continue
+        for _, entries in response:
+            for event_id, fields in entries:
+                last_event_id = event_id
+                event = fields["event"]
+                yield event_id, event, json.loads(fields["data"])
+                if event in TERMINAL_EVENTS:
+                    return
@@ -4,12 +4,226 @@ Haystack AI Pipeline Definitions for the Voice DNA Feature.
 This file defines Haystack pipelines (or similar AI orchestration logic)
 specific to the Creator Voice DNA feature.
 
-Examples:
-- Pipelines for analyzing text to extract stylistic features.
-- Pipelines for generating text in a specific creator's voice.
-- Pipelines combining retrieval, generation, and custom components.
-
-Define the structure and components of your AI pipelines here.
-Keep the core pipeline definitions separate from the service logic that uses them.
-Prompt templates used by these pipelines should typically reside in the `prompts/` directory.
+Transcript ingestion is a chain of generators, so a transcript is read, split and
+chunked a block at a time and never held in memory as a whole:
+
+    text pieces  ->  iter_sentences  ->  chunk_sentences  ->  TextChunk
+
+`chunk_sentences` packs whole sentences into chunks of up to `max_tokens` tokens
+of the embedding model's tokenizer, repeating trailing sentences of up to
+`overlap_tokens` at the start of the next chunk. Sentences longer than a chunk
+(e.g. unpunctuated auto-captions) are split at token boundaries. Caption files are
+reduced to their spoken text by `iter_caption_text` first.
 """
+
+import functools
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Iterable, Iterator, List, Protocol, Tuple
+
+import tiktoken
+
+# Text without sentence punctuation is cut at a space once it grows this long
+MAX_SENTENCE_CHARS = 2000
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?…])[\"')\]]*\s+")
+_CAPTION_TAG = re.compile(r"<[^>]*>")
+# What a token slice ending inside a multi-byte character decodes to
+_REPLACEMENT_CHARACTER = "\ufffd"
+
+
+class Tokenizer(Protocol):
+    def encode(self, text: str) -> List[int]: ...
+
+    def decode(self, tokens: List[int]) -> str: ...
+
+
+class TiktokenTokenizer:
+    """A tiktoken encoding, treating special token text as ordinary text."""
+
+    def __init__(self, encoding: tiktoken.Encoding):
+        self.encoding = encoding
+
+    def encode(self, text: str) -> List[int]:
+        return self.encoding.encode_ordinary(text)
+
+    def decode(self, tokens: List[int]) -> str:
+        return self.encoding.decode(tokens)
+
+
+@functools.lru_cache(maxsize=4)
+def get_tokenizer(encoding_name: str) -> TiktokenTokenizer:
+    """
+    Returns the shared tokenizer of a tiktoken encoding (loaded once).
+
+    tiktoken downloads the encoding on first use unless it is found in
+    `TIKTOKEN_CACHE_DIR`; the backend image bakes it in there.
+    """
+    return TiktokenTokenizer(tiktoken.get_encoding(encoding_name))
+
+
+@dataclass
+class TextChunk:
+    index: int
+    content: str
+    token_count: int  # Exact, by the chunking tokenizer
+
+
+def iter_caption_text(lines: Iterable[str]) -> Iterator[str]:
+    """Yields the spoken text of WebVTT or SRT lines, without cue markup."""
+    previous = None
+    in_note = False
+    for raw_line in lines:
+        line = raw_line.strip()
+        if not line:
+            in_note = False
+            continue
+        if in_note or line.startswith(("WEBVTT", "STYLE", "REGION")):
+            continue
+        if line.startswith("NOTE"):
+            in_note = True
+            continue
+        if "-->" in line or line.isdigit():  # Cue timings and SRT cue numbers
+            continue
+        text = _CAPTION_TAG.sub("", line).strip()
+        # Rolling auto-captions repeat the previous cue's line
+        if text and text != previous:
+            previous = text
+            yield text + "\n"
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def iter_sentences(
+    pieces: Iterable[str], *, max_chars: int = MAX_SENTENCE_CHARS
+) -> Iterator[str]:
+    """
+    Regroups streamed text into sentences with normalized whitespace.
+
+    Only the unfinished sentence is buffered; text without sentence punctuation is
+    cut at a space once it reaches `max_chars`.
+    """
+    buffer = ""
+    for piece in pieces:
+        buffer += piece
+        *sentences, buffer = _SENTENCE_BOUNDARY.split(buffer)
+        for sentence in sentences:
+            if sentence := _normalize(sentence):
+                yield sentence
+        while len(buffer) > max_chars:
+            cut = buffer.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            if sentence := _normalize(buffer[:cut]):
+                yield sentence
+            buffer = buffer[cut:]
+    if sentence := _normalize(buffer):
+        yield sentence
+
+
+def _clean_cut(tokenizer: Tokenizer, tokens: List[int], start: int, end: int) -> int:
+    """
+    Moves a cut between tokens back until the slice before it decodes to whole
+    characters: byte-level BPE tokens may hold part of an emoji, CJK or accented
+    character. Falls back to `end` if no such cut exists.
+    """
+    if end >= len(tokens):
+        return end
+    for cut in range(end, start, -1):
+        if not tokenizer.decode(tokens[start:cut]).endswith(_REPLACEMENT_CHARACTER):
+            return cut
+    return end
+
+
+def chunk_sentences(
+    sentences: Iterable[str],
+    tokenizer: Tokenizer,
+    *,
+    max_tokens: int,
+    overlap_tokens: int = 0,
+) -> Iterator[TextChunk]:
+    """
+    Packs sentences into chunks of at most `max_tokens` tokens.
+
+    Args:
+        sentences: The sentences, in order.
+        tokenizer: The tokenizer of the embedding model.
+        max_tokens: The token budget of a chunk.
+        overlap_tokens: Trailing sentences of a chunk within this many tokens open
+            the next chunk too, so context spanning a boundary stays retrievable.
+
+    Yields:
+        The chunks, numbered from 0.
+    """
+    window: Deque[Tuple[str, int]] = deque()
+    window_tokens = 0
+    has_new = False  # Whether the window holds sentences not emitted yet
+    index = 0
+
+    def cost(text: str) -> int:
+        # Counted as it appears within a chunk, after a joining space
+        return len(tokenizer.encode(" " + text))
+
+    def pieces(sentence: str) -> Iterator[Tuple[str, int]]:
+        count = cost(sentence)
+        if count <= max_tokens:
+            yield sentence, count
+            return
+        tokens = tokenizer.encode(sentence)
+        start = 0
+        while start < len(tokens):
+            end = _clean_cut(tokenizer, tokens, start, start + max_tokens)
+            text = tokenizer.decode(tokens[start:end]).strip()
+            # The joining space may take a token of its own
+            while cost(text) > max_tokens and end - start > 1:
+                end = _clean_cut(tokenizer, tokens, start, end - 1)
+                text = tokenizer.decode(tokens[start:end]).strip()
+            if text:
+                yield text, cost(text)
+            start = end
+
+    def emit() -> TextChunk:
+        content = " ".join(text for text, _ in window)
+        return TextChunk(index, content, len(tokenizer.encode(content)))
+
+    for sentence in sentences:
+        for text, count in pieces(sentence):
+            if window and window_tokens + count > max_tokens:
+                if has_new:
+                    yield emit()
+                    index += 1
+                    has_new = False
+                # Keep the trailing sentences that fit the overlap and leave room
+                kept: Deque[Tuple[str, int]] = deque()
+                kept_tokens = 0
+                while window and (
+                    kept_tokens + window[-1][1] <= overlap_tokens
+                    and kept_tokens + window[-1][1] + count <= max_tokens
+                ):
+                    kept.appendleft(window.pop())
+                    kept_tokens += kept[0][1]
+                window, window_tokens = kept, kept_tokens
+            window.append((text, count))
+            window_tokens += count
+            has_new = True
+    if has_new:
+        yield emit()
+
+
+def chunk_transcript(
+    pieces: Iterable[str],
+    tokenizer: Tokenizer,
+    *,
+    max_tokens: int,
+    overlap_tokens: int = 0,
+) -> Iterator[TextChunk]:
+    """Streams the chunks of a transcript read as consecutive text pieces."""
+    return chunk_sentences(
+        iter_sentences(pieces),
+        tokenizer,
+        max_tokens=max_tokens,
+        overlap_tokens=overlap_tokens,
+    )
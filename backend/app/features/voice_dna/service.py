@@ -5,14 +5,344 @@ This file contains the main business logic for the Creator Voice DNA feature.
 It acts as a facade, orchestrating interactions between API endpoints/tasks,
 data access (repositories/DB), and AI pipelines.
 
-Examples:
-- Functions to initiate Voice DNA analysis.
-- Functions to retrieve or update Voice DNA profiles.
-- Functions to utilize the Voice DNA for content generation tasks.
-- Coordination of database operations and calls to AI pipelines (`pipelines.py`).
-
-Implement the core use cases of the feature here.
-Keep this layer clean of direct web framework (FastAPI) or database session
-management details; inject dependencies (like DB sessions, pipeline runners) instead.
-Avoid putting raw AI pipeline definitions here; use `pipelines.py`.
+Transcript ingestion runs in the worker in two jobs per transcript:
+
+1. `ingest_transcript` streams the transcript from its `TranscriptSource` through
+   the chunking generators of `pipelines.py` and bulk-inserts the chunks, a batch
+   of `VOICE_DNA_INSERT_BATCH_SIZE` at a time. Reading and tokenizing run in a
+   thread, so neither a long transcript nor the tokenizer blocks the event loop,
+   and only one batch of chunks is held in memory.
+2. `embed_transcript_chunks` embeds the chunks still lacking an embedding through
+   the `EmbeddingService`, whose cache shares the vectors of repeated passages
+   (intros, sponsor reads) across transcripts.
+
+Unchanged transcripts are skipped by content hash, so a catalog can be re-ingested
+cheaply after new files are added.
 """
+
+import abc
+import asyncio
+import hashlib
+import itertools
+import logging
+import uuid
+from pathlib import Path, PurePosixPath
+from typing import Iterator, Mapping, Optional, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import Settings
+from app.db.models.voice_dna import CreatorTranscript, TranscriptChunk
+from app.features.voice_dna.pipelines import (
+    TextChunk,
+    Tokenizer,
+    chunk_transcript,
+    get_tokenizer,
+    iter_caption_text,
+)
+from app.services.embedding_service import EmbeddingService, get_embedding_service
+from app.worker.queue import queue
+
+logger = logging.getLogger(__name__)
+
+# Characters read from a plain-text transcript at a time
+READ_BLOCK_CHARS = 64 * 1024
+CAPTION_SUFFIXES = (".vtt", ".srt")
+TRANSCRIPT_SUFFIXES = (".txt", ".md") + CAPTION_SUFFIXES
+
+
+class TranscriptSource(abc.ABC):
+    """Lists and streams the transcripts available for ingestion."""
+
+    @abc.abstractmethod
+    def iter_refs(self, prefix: str = "") -> Iterator[str]:
+        """Yields the references of the transcripts under a prefix."""
+
+    @abc.abstractmethod
+    def read(self, ref: str) -> Iterator[str]:
+        """Streams a transcript's text as consecutive pieces."""
+
+    def content_hash(self, ref: str) -> str:
+        """The hex SHA-256 of a transcript's text."""
+        digest = hashlib.sha256()
+        for piece in self.read(ref):
+            digest.update(piece.encode("utf-8"))
+        return digest.hexdigest()
+
+    def title(self, ref: str) -> str:
+        return PurePosixPath(ref).stem
+
+
+class FileTranscriptSource(TranscriptSource):
+    """
+    Transcript files (plain text, WebVTT or SRT) under a root directory, referenced
+    by their POSIX path relative to it.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root).resolve()
+
+    def path(self, ref: str) -> Path:
+        """
+        Resolves a reference to its file.
+
+        Raises:
+            ValueError: If the reference points outside the root directory.
+        """
+        path = (self.root / ref).resolve()
+        if path != self.root and self.root not in path.parents:
+            raise ValueError(f"Transcript reference outside the source: {ref!r}")
+        return path
+
+    def iter_refs(self, prefix: str = "") -> Iterator[str]:
+        for path in self.path(prefix).rglob("*"):
+            if path.suffix.lower() in TRANSCRIPT_SUFFIXES and path.is_file():
+                yield path.relative_to(self.root).as_posix()
+
+    def read(self, ref: str) -> Iterator[str]:
+        path = self.path(ref)
+        with path.open(encoding="utf-8", errors="replace") as f:
+            if path.suffix.lower() in CAPTION_SUFFIXES:
+                yield from iter_caption_text(f)
+            else:
+                yield from iter(lambda: f.read(READ_BLOCK_CHARS), "")
+
+
+class FixtureTranscriptSource(TranscriptSource):
+    """In-memory transcripts keyed by reference, for local development and tests."""
+
+    def __init__(self, transcripts: Mapping[str, str]):
+        self.transcripts = transcripts
+
+    def iter_refs(self, prefix: str = "") -> Iterator[str]:
+        return (ref for ref in self.transcripts if ref.startswith(prefix))
+
+    def read(self, ref: str) -> Iterator[str]:
+        text = self.transcripts[ref]
+        for start in range(0, len(text), READ_BLOCK_CHARS):
+            yield text[start : start + READ_BLOCK_CHARS]
+
+
+class VoiceDnaService:
+    """Ingests a creator's transcripts as embedded, sentence-aligned chunks."""
+
+    def __init__(
+        self,
+        settings: Settings,
+        source: TranscriptSource,
+        *,
+        tokenizer: Optional[Tokenizer] = None,
+        embedding_service: Optional[EmbeddingService] = None,
+    ):
+        self.settings = settings
+        self.source = source
+        self._tokenizer = tokenizer
+        self._embedding_service = embedding_service
+
+    @property
+    def tokenizer(self) -> Tokenizer:
+        # Loaded on first use; tiktoken reads its encoding from disk or network
+        if self._tokenizer is None:
+            self._tokenizer = get_tokenizer(self.settings.VOICE_DNA_TOKENIZER)
+        return self._tokenizer
+
+    @property
+    def embedding_service(self) -> EmbeddingService:
+        if self._embedding_service is None:
+            self._embedding_service = get_embedding_service()
+        return self._embedding_service
+
+    def iter_chunks(self, ref: str) -> Iterator[TextChunk]:
+        """Streams the chunks of a transcript."""
+        return chunk_transcript(
+            self.source.read(ref),
+            self.tokenizer,
+            max_tokens=self.settings.VOICE_DNA_CHUNK_MAX_TOKENS,
+            overlap_tokens=self.settings.VOICE_DNA_CHUNK_OVERLAP_TOKENS,
+        )
+
+    async def ingest_transcript(
+        self, db: AsyncSession, user_id: uuid.UUID, ref: str
+    ) -> CreatorTranscript:
+        """
+        Chunks a transcript and stores its chunks, replacing those of an earlier
+        version. A transcript already chunked with the same content is left as is.
+
+        The old chunks are replaced in one transaction, so a failed ingestion leaves
+        them in place; the transcript is then marked 'failed'.
+
+        Args:
+            db: The SQLAlchemy async database session.
+            user_id: The ID of the creator the transcript belongs to.
+            ref: The transcript's reference in the source.
+
+        Returns:
+            The transcript row, 'chunked' (or 'embedded' if unchanged).
+        """
+        content_hash = await asyncio.to_thread(self.source.content_hash, ref)
+        transcript = await self._get_or_create_transcript(db, user_id, ref)
+        if transcript.content_hash == content_hash and transcript.status in (
+            "chunked",
+            "embedded",
+        ):
+            logger.info(f"Transcript {ref!r} of user {user_id} is unchanged; skipped.")
+            return transcript
+
+        try:
+            await db.execute(
+                delete(TranscriptChunk).filter(
+                    TranscriptChunk.transcript_id == transcript.id
+                )
+            )
+            chunk_count, token_count = await self._insert_chunks(db, transcript, ref)
+        except Exception as e:
+            await db.rollback()
+            transcript = await self._get_or_create_transcript(db, user_id, ref)
+            transcript.status = "failed"
+            transcript.error = str(e)
+            await db.commit()
+            raise
+
+        transcript.content_hash = content_hash
+        transcript.status = "chunked"
+        transcript.chunk_count = chunk_count
+        transcript.token_count = token_count
+        transcript.error = None
+        await db.commit()
+        logger.info(
+            f"Chunked transcript {ref!r} of user {user_id}: "
+            f"{chunk_count} chunks, {token_count} tokens."
+        )
+        return transcript
+
+    async def _get_or_create_transcript(
+        self, db: AsyncSession, user_id: uuid.UUID, ref: str
+    ) -> CreatorTranscript:
+        result = await db.execute(
+            select(CreatorTranscript).filter(
+                CreatorTranscript.user_id == user_id,
+                CreatorTranscript.source_ref == ref,
+            )
+        )
+        transcript = result.scalars().first()
+        if transcript is None:
+            transcript = CreatorTranscript(
+                user_id=user_id,
+                source_ref=ref,
+                title=self.source.title(ref),
+                status="pending",
+            )
+            db.add(transcript)
+            await db.flush()
+        return transcript
+
+    async def _insert_chunks(
+        self, db: AsyncSession, transcript: CreatorTranscript, ref: str
+    ) -> Tuple[int, int]:
+        """Streams a transcript's chunks into the table in bulk INSERTs."""
+        chunks = self.iter_chunks(ref)
+        batch_size = self.settings.VOICE_DNA_INSERT_BATCH_SIZE
+        chunk_count = token_count = 0
+        while True:
+            # The generator reads and tokenizes as it goes, so it's drained in a thread
+            batch = await asyncio.to_thread(
+                lambda: list(itertools.islice(chunks, batch_size))
+            )
+            if not batch:
+                break
+            await db.execute(
+                insert(TranscriptChunk),
+                [
+                    {
+                        "transcript_id": transcript.id,
+                        "user_id": transcript.user_id,
+                        "chunk_index": chunk.index,
+                        "content": chunk.content,
+                        "token_count": chunk.token_count,
+                    }
+                    for chunk in batch
+                ],
+            )
+            chunk_count += len(batch)
+            token_count += sum(chunk.token_count for chunk in batch)
+        return chunk_count, token_count
+
+    async def embed_transcript_chunks(
+        self, db: AsyncSession, transcript_id: uuid.UUID
+    ) -> int:
+        """
+        Embeds the chunks of a transcript lacking an embedding, a batch at a time,
+        and marks the transcript 'embedded'. A retried job resumes where it stopped.
+
+        Returns:
+            The number of chunks embedded.
+        """
+        batch_size = self.settings.EMBEDDING_BATCH_MAX_TEXTS
+        embedded = 0
+        while True:
+            result = await db.execute(
+                select(TranscriptChunk.id, TranscriptChunk.content)
+                .filter(
+                    TranscriptChunk.transcript_id == transcript_id,
+                    TranscriptChunk.embedding.is_(None),
+                )
+                .order_by(TranscriptChunk.chunk_index)
+                .limit(batch_size)
+            )
+            rows = result.all()
+            if not rows:
+                break
+            # Commits the new vectors to `embedding_cache`
+            embeddings = await self.embedding_service.embed(
+                db, [content for _, content in rows]
+            )
+            await db.execute(
+                update(TranscriptChunk),
+                [
+                    {"id": chunk_id, "embedding": embedding}
+                    for (chunk_id, _), embedding in zip(rows, embeddings)
+                ],
+            )
+            await db.commit()
+            embedded += len(rows)
+
+        await db.execute(
+            update(CreatorTranscript)
+            .filter(CreatorTranscript.id == transcript_id)
+            .values(status="embedded")
+        )
+        await db.commit()
+        return embedded
+
+    @staticmethod
+    async def schedule_ingestion(user_id: uuid.UUID, ref: str) -> None:
+        """
+        Enqueues ingestion of a transcript, keyed so a transcript queued twice is
+        ingested once.
+        """
+        await queue.enqueue(
+            "ingest_transcript_task",
+            key=f"ingest_transcript:{user_id}:{ref}",
+            user_id=str(user_id),
+            ref=ref,
+        )
+
+    @staticmethod
+    async def schedule_chunk_embedding(transcript_id: uuid.UUID) -> None:
+        """Enqueues embedding of a transcript's chunks."""
+        try:
+            await queue.enqueue(
+                "embed_transcript_chunks_task",
+                key=f"embed_transcript_chunks:{transcript_id}",
+                transcript_id=str(transcript_id),
+            )
+        except Exception as e:
+            logger.warning(
+                f"Failed to enqueue embedding of transcript {transcript_id}: {e}"
+            )
+
+
+def get_transcript_source(settings: Settings) -> TranscriptSource:
+    """The source of the files under `VOICE_DNA_TRANSCRIPT_DIR`."""
+    return FileTranscriptSource(settings.VOICE_DNA_TRANSCRIPT_DIR)
@@ -1,17 +1,161 @@
 """
 Background Tasks (SAQ) for the Voice DNA Feature.
 
-This file defines the actual functions that will be executed asynchronously
-by the SAQ worker for tasks related to the Creator Voice DNA feature.
-
-Examples:
-- A task to run a long-running Voice DNA analysis pipeline.
-- A task to periodically update Voice DNA profiles based on new content.
-- Tasks interacting with external services that might be slow.
-
-Implement the logic for background jobs here. These functions will be decorated
-with `@queue.task` (or similar) and imported in `app/worker/settings.py`.
-Tasks should typically call methods from the corresponding feature service (`service.py`)
-to perform the actual work, keeping the task definition itself relatively simple.
-Ensure tasks are idempotent if possible.
+These functions are executed by the SAQ worker and registered in
+`app/worker/settings.py`. They delegate the actual work to `VoiceDnaService`.
+
+A creator's catalog is ingested as one job per transcript, so hundreds of
+transcripts spread over the worker's concurrency and a failed file is retried on
+its own:
+
+    ingest_transcript_catalog_task  ->  ingest_transcript_task (per file)
+                                    ->  embed_transcript_chunks_task
 """
+
+import logging
+import uuid
+from typing import Any, Dict
+
+from saq.types import Context
+
+from app.config import get_settings
+from app.features.voice_dna.service import VoiceDnaService, get_transcript_source
+from app.shared.clients import BATCH, llm_priority
+from app.worker.context import get_session_factory
+
+logger = logging.getLogger(__name__)
+
+
+async def ingest_transcript_catalog_task(
+    ctx: Context, *, user_id: str, prefix: str = ""
+) -> Dict[str, Any]:
+    """
+    Enqueues ingestion of every transcript under a directory of the source.
+
+    Args:
+        ctx: The SAQ context object containing job information
+        user_id: The ID of the creator the transcripts belong to
+        prefix: The directory under `VOICE_DNA_TRANSCRIPT_DIR` to ingest
+
+    Returns:
+        A dictionary containing the job result
+    """
+    job = ctx.get("job")
+    job_id = job.id if job else "unknown"
+    logger.info(
+        f"Starting ingest_transcript_catalog_task - job_id: {job_id}, user: {user_id}, prefix: {prefix!r}"
+    )
+
+    try:
+        source = get_transcript_source(get_settings())
+        enqueued = 0
+        for ref in source.iter_refs(prefix):
+            await VoiceDnaService.schedule_ingestion(uuid.UUID(user_id), ref)
+            enqueued += 1
+
+        logger.info(f"Completed ingest_transcript_catalog_task - job_id: {job_id}")
+        return {
+            "status": "success",
+            "job_id": job_id,
+            "user_id": user_id,
+            "enqueued_count": enqueued,
+        }
+
+    except Exception as e:
+        logger.exception(
+            f"Error in ingest_transcript_catalog_task - job_id: {job_id}: {str(e)}"
+        )
+        # Re-raise to let SAQ handle the failure
+        raise
+
+
+async def ingest_transcript_task(
+    ctx: Context, *, user_id: str, ref: str
+) -> Dict[str, Any]:
+    """
+    Chunks one transcript into `transcript_chunks` and enqueues its embedding.
+
+    Args:
+        ctx: The SAQ context object containing job information
+        user_id: The ID of the creator the transcript belongs to
+        ref: The transcript's path relative to `VOICE_DNA_TRANSCRIPT_DIR`
+
+    Returns:
+        A dictionary containing the job result
+    """
+    job = ctx.get("job")
+    job_id = job.id if job else "unknown"
+    logger.info(
+        f"Starting ingest_transcript_task - job_id: {job_id}, user: {user_id}, ref: {ref!r}"
+    )
+
+    settings = get_settings()
+    session_factory = get_session_factory(ctx)
+    try:
+        service = VoiceDnaService(settings, get_transcript_source(settings))
+        async with session_factory() as db:
+            transcript = await service.ingest_transcript(db, uuid.UUID(user_id), ref)
+            transcript_id, status = transcript.id, transcript.status
+            chunk_count = transcript.chunk_count
+        if status != "embedded":
+            await service.schedule_chunk_embedding(transcript_id)
+
+        logger.info(f"Completed ingest_transcript_task - job_id: {job_id}")
+        return {
+            "status": "success",
+            "job_id": job_id,
+            "transcript_id": str(transcript_id),
+            "chunk_count": chunk_count,
+        }
+
+    except Exception as e:
+        logger.exception(
+            f"Error in ingest_transcript_task - job_id: {job_id}: {str(e)}"
+        )
+        # Re-raise to let SAQ handle the failure
+        raise
+
+
+async def embed_transcript_chunks_task(
+    ctx: Context, *, transcript_id: str
+) -> Dict[str, Any]:
+    """
+    Embeds the chunks of a transcript that lack an embedding.
+
+    Args:
+        ctx: The SAQ context object containing job information
+        transcript_id: The ID of the transcript
+
+    Returns:
+        A dictionary containing the job result
+    """
+    job = ctx.get("job")
+    job_id = job.id if job else "unknown"
+    logger.info(
+        f"Starting embed_transcript_chunks_task - job_id: {job_id}, transcript: {transcript_id}"
+    )
+
+    settings = get_settings()
+    session_factory = get_session_factory(ctx)
+    try:
+        service = VoiceDnaService(settings, get_transcript_source(settings))
+        async with session_factory() as db:
+            with llm_priority(BATCH):
+                embedded = await service.embed_transcript_chunks(
+                    db, uuid.UUID(transcript_id)
+                )
+
+        logger.info(f"Completed embed_transcript_chunks_task - job_id: {job_id}")
+        return {
+            "status": "success",
+            "job_id": job_id,
+            "transcript_id": transcript_id,
+            "embedded_count": embedded,
+        }
+
+    except Exception as e:
+        logger.exception(
+            f"Error in embed_transcript_chunks_task - job_id: {job_id}: {str(e)}"
+        )
+        # Re-raise to let SAQ handle the failure
+        raise
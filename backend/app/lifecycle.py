@@ -6,6 +6,10 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI  # Import FastAPI for type hinting
 from app.config import get_settings  # Import get_settings
 from app.services.prompt_service import PromptService  # Import PromptService
+from app.features.chat.message_writer import get_chat_message_writer
+from app.features.chat.pipeline_registry import get_chat_pipeline_registry
+from app.features.chat.tools.user import register_tool_cache_invalidation
+from app.shared.clients import close_llm_client_pool, close_redis
 
 logger = logging.getLogger(__name__)
 
@@ -70,7 +74,7 @@ async def lifespan(app: FastAPI):
         # "creatordna": settings.DEFAULT_CREATORDNA_PIPELINE_TAG,
     }
     expected_prompts = {
-        "chat": ["system", "greeting", "main_chat"],
+        "chat": ["system", "greeting", "main_chat", "summary"],
         # Define expected prompts for other pipeline types here
         # "creatordna": ["system", "analysis_prompt", "report_prompt"],
     }
@@ -155,6 +159,29 @@ async def lifespan(app: FastAPI):
         for p_name, version in prompts.items():
             logger.info(f"      {p_name}: {version}")
 
+    # 5. Pre-build the default chat pipeline so the first message doesn't pay for it
+    try:
+        await get_chat_pipeline_registry().get_pipeline(
+            pipeline_type="chat",
+            override_pipeline_tag=None,
+            prompt_service=prompt_service_instance,
+            settings=settings_obj,
+        )
+        logger.info("Default chat pipeline built and cached.")
+    except Exception as e:
+        # Not fatal: the pipeline will be built on the first chat message instead
+        logger.warning(f"Failed to pre-build default chat pipeline: {e}")
+
+    # Keep cached agent tool results consistent with writes made by this process
+    register_tool_cache_invalidation()
+
+    # Flush buffered chat messages in batches if write-behind is enabled
+    get_chat_message_writer().start()
+
     logger.info("Application startup complete.")
     yield  # Application runs
     logger.info("Application shutdown initiated.")
+    await get_chat_message_writer().stop()
+    get_chat_pipeline_registry().clear()
+    await close_llm_client_pool()
+    await close_redis()
@@ -1,14 +1,15 @@
+import asyncio
+import hashlib
 import logging
 import uuid
-from typing import List, Dict, Any, Optional, cast
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Callable, List, Dict, Any, Optional, Set
 from haystack.dataclasses import (
     ChatMessage as HaystackChatMessage,
     ChatRole,
+    StreamingChunk,
 )  # Import Haystack ChatMessage and ChatRole
-from haystack.components.generators.chat import (
-    OpenAIChatGenerator,
-)  # Import the generator
-from haystack.utils import Secret  # Import Secret for LLM API key
 
 from app.services.user_service import (
     UserService,
@@ -16,23 +17,120 @@ from app.services.user_service import (
 )  # Import UserService and its dependency function
 
 from fastapi import HTTPException, status, Depends  # Import Depends
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from app.config import Settings, get_settings
 from app.db.models.chat import ChatMessage  # Import ChatMessage
+from app.db.session import async_session_factory
 from app.db import models  # Import the models module to avoid circular dependency
-from app.features.chat.chat_pipeline import (
-    build_chat_pipeline,
-)  # Import the new pipeline builder
+from app.features.chat.pipeline_registry import (
+    ChatPipelineRegistry,
+    get_chat_pipeline_registry,
+)
 from app.services.prompt_service import (
     PromptService,
     get_prompt_service,
 )  # Import PromptService and its dependency function
 from app.shared.exceptions import PromptTemplateNotFoundError  # Import custom exception
+from app.shared.clients import (
+    SingleFlight,
+    cached_generator,
+    get_llm_client_pool,
+    get_redis,
+    get_single_flight,
+    hedged_generator,
+)
+from app.features.chat.greeting_cache import GreetingCache, get_latest_message_id
+from app.features.chat.history import ChatHistoryAssembler, HistoryWindow
+from app.features.chat.message_writer import (
+    get_chat_message_writer,
+    pending_session_messages,
+)
+from app.features.chat.pagination import (
+    HistoryCursor,
+    HistoryPage,
+    after_cursor,
+    before_cursor,
+)
+from app.features.chat.prompt_cache import (
+    prefix_fingerprint,
+    record_prompt_cache_usage,
+)
+from app.features.chat.archive import get_chat_archiver
+from app.features.chat.sessions import session_started_at, upsert_chat_sessions
+from app.features.chat.semantic_cache import SemanticCache, make_prompt_key
+from app.features.chat.tool_invoker import AppLoop
+from app.features.chat.turn_events import register_turn
+from app.worker.queue import queue
 
 logger = logging.getLogger(__name__)
 
+# Strong references to fire-and-forget tasks (e.g. streaming turns) so they aren't
+# garbage collected before completion
+_background_tasks: Set[asyncio.Task] = set()
+
+
+@dataclass
+class TurnRecord:
+    """The messages of one chat turn, to be stored together."""
+
+    user: models.User
+    session_id: str
+    user_message: str
+    sent_at: datetime  # When the user message was received
+    replies: List[HaystackChatMessage]
+
+    @property
+    def final_reply_text(self) -> str:
+        """The text of the last assistant reply."""
+        for reply in reversed(self.replies):
+            if reply.role == ChatRole.ASSISTANT and reply.text is not None:
+                return reply.text
+        return ""
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """
+        Returns the `chat_messages` rows of the turn: the user message followed by
+        the assistant and tool messages.
+
+        Replies are stamped after the agent finished, a microsecond apart, so
+        history ordered by timestamp keeps the order in which they were generated.
+        """
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "user_id": self.user.id,
+                "session_id": self.session_id,
+                "role": ChatRole.USER.value,
+                "content": self.user_message,
+                "timestamp": self.sent_at,
+                "metadata_": {},
+            }
+        ]
+        replied_at = max(datetime.now(timezone.utc), self.sent_at)
+        for reply in self.replies:
+            if reply.role not in (ChatRole.ASSISTANT, ChatRole.TOOL):
+                continue
+            replied_at += timedelta(microseconds=1)
+            if reply.tool_call_result is not None:
+                content = str(reply.tool_call_result.result)
+            else:
+                content = reply.text or ""  # Tool-call-only replies have no text
+            rows.append(
+                {
+                    "id": uuid.uuid4(),
+                    "user_id": self.user.id,
+                    "session_id": self.session_id,
+                    "role": reply.role.value,
+                    "content": content,
+                    "timestamp": replied_at,
+                    "metadata_": reply.meta,  # E.g. usage and prompt cache details
+                }
+            )
+        return rows
+
 
 class ChatService:
     """
@@ -45,6 +143,11 @@ class ChatService:
         settings: Settings,
         prompt_service: PromptService,
         user_service: UserService,
+        pipeline_registry: Optional[ChatPipelineRegistry] = None,
+        greeting_cache: Optional[GreetingCache] = None,
+        history_assembler: Optional[ChatHistoryAssembler] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+        single_flight: Optional[SingleFlight] = None,
     ):
         """
         Initializes the ChatService.
@@ -53,11 +156,125 @@ class ChatService:
             settings: Application settings.
             prompt_service: The PromptService instance.
             user_service: The UserService instance.
+            pipeline_registry: Registry of built pipelines. Defaults to the process-wide registry.
+            greeting_cache: Cache of generated greetings. Defaults to a Redis-backed cache.
+            history_assembler: Builds the per-turn history window. Defaults to one using these settings.
+            semantic_cache: Cache of answers by query similarity. Defaults to one using these settings.
+            single_flight: Coalesces identical concurrent calls. Defaults to the process-wide instance.
         """
         self.settings = settings
         self.prompt_service = prompt_service
         self.user_service = user_service  # Store UserService instance
-        pass  # Pipeline will be built in interact method via dependency
+        self.pipeline_registry = pipeline_registry or get_chat_pipeline_registry()
+        self.greeting_cache = greeting_cache or GreetingCache(
+            get_redis(), settings.GREETING_CACHE_TTL_SECONDS
+        )
+        self.history_assembler = history_assembler or ChatHistoryAssembler(
+            settings, prompt_service
+        )
+        self.semantic_cache = semantic_cache or SemanticCache(settings)
+        self.single_flight = single_flight or get_single_flight()
+
+    async def get_greeting(self, db: AsyncSession, user_id: uuid.UUID) -> str:
+        """
+        Returns the user's greeting, served from cache whenever possible.
+
+        A fresh cached greeting is returned as is. A stale one (the user has new
+        messages since it was generated) is still returned immediately, and a
+        background job is enqueued to regenerate it. Only on a cache miss is the
+        greeting generated inline.
+        """
+        cached = await self.greeting_cache.get(user_id)
+        if cached is None:
+            logger.info(f"No cached greeting for user {user_id}; generating inline.")
+            return await self.refresh_greeting(db, user_id)
+
+        latest_message_id = await get_latest_message_id(db, user_id)
+        if not cached.is_fresh(latest_message_id):
+            logger.info(f"Serving stale greeting for user {user_id}; revalidating.")
+            await self.schedule_greeting_refresh(user_id)
+        return cached.greeting
+
+    async def refresh_greeting(self, db: AsyncSession, user_id: uuid.UUID) -> str:
+        """
+        Generates a new greeting for the user and stores it in the greeting cache.
+
+        Concurrent refreshes for the same user (duplicate requests, or a request
+        racing the background job) share one generation.
+        """
+
+        async def refresh() -> str:
+            # Read the latest message id before generating so a message arriving
+            # mid-generation leaves the entry stale rather than wrongly fresh
+            latest_message_id = await get_latest_message_id(db, user_id)
+            greeting_text = await self.generate_greeting(db, user_id)
+            await self.greeting_cache.set(user_id, greeting_text, latest_message_id)
+            return greeting_text
+
+        return await self.single_flight.do(f"greeting:{user_id}", refresh)
+
+    @staticmethod
+    async def schedule_greeting_refresh(user_id: uuid.UUID) -> None:
+        """
+        Enqueues background regeneration of the user's greeting.
+
+        The job key is derived from the user so repeated stale hits while a refresh
+        is already queued don't enqueue duplicates.
+        """
+        try:
+            await queue.enqueue(
+                "precompute_greeting_task",
+                key=f"precompute_greeting:{user_id}",
+                user_id=str(user_id),
+            )
+        except Exception as e:
+            logger.warning(
+                f"Failed to enqueue greeting refresh for user {user_id}: {e}"
+            )
+
+    @staticmethod
+    async def schedule_history_summary(session_id: str, user_id: uuid.UUID) -> None:
+        """
+        Enqueues folding of a session's overflowing history into its rolling summary.
+
+        The job key is derived from the session so turns arriving while a summary is
+        queued don't enqueue duplicates.
+        """
+        try:
+            await queue.enqueue(
+                "summarize_chat_session_task",
+                key=f"summarize_chat_session:{session_id}",
+                session_id=str(session_id),
+                user_id=str(user_id),
+            )
+        except Exception as e:
+            logger.warning(
+                f"Failed to enqueue history summary for session {session_id}: {e}"
+            )
+
+    @staticmethod
+    async def schedule_turn_embedding(turn: TurnRecord, *, turn_id: uuid.UUID) -> None:
+        """
+        Enqueues embedding of a stored turn for the `search_memory` tool.
+
+        The job carries the turn's text, so it doesn't wait for buffered messages to
+        be written, and is keyed by the turn's user message to run once.
+        """
+        try:
+            await queue.enqueue(
+                "embed_chat_turn_task",
+                key=f"embed_chat_turn:{turn_id}",
+                turn_id=str(turn_id),
+                user_id=str(turn.user.id),
+                session_id=str(turn.session_id),
+                turn_at=turn.sent_at.isoformat(),
+                user_message=turn.user_message,
+                reply=turn.final_reply_text,
+            )
+        except Exception as e:
+            logger.warning(
+                f"Failed to enqueue embedding of chat turn {turn_id} of session {turn.session_id}: {e}"
+            )
 
     async def generate_greeting(self, db: AsyncSession, user_id: uuid.UUID) -> str:
         """
@@ -110,13 +327,19 @@ class ChatService:
             )
             logger.debug("DEBUG: Greeting prompt template fetched successfully")
 
-            # Instantiate LLM Generator - Initialize here as it's specific to this task
-            llm_generator = OpenAIChatGenerator(
-                api_key=Secret.from_token(self.settings.LLM_API_KEY.get_secret_value()),
-                model=self.settings.LLM_MODEL,
-                api_base_url=str(self.settings.LLM_API_URL)
-                if self.settings.LLM_API_URL
-                else None,
+            # Reuse the shared generator backed by the pooled LLM client, hedged with
+            # the fallback models if configured, answering deterministic requests from
+            # the response cache if "greeting" opted in
+            llm_generator = cached_generator(
+                hedged_generator(
+                    get_llm_client_pool().get_chat_generator, settings=self.settings
+                ),
+                pipeline="greeting",
+                prompt_versions={
+                    "greeting": self.prompt_service.get_prompt_template_version(
+                        "chat", "greeting", None
+                    )
+                },
             )
 
             # Format the prompt with user details and history
@@ -137,7 +360,11 @@ class ChatService:
             ]  # Use Haystack ChatMessage
 
             logger.debug("DEBUG: Calling LLM generator for greeting")
-            result = await llm_generator.run(messages=messages_for_llm)
+            # Greetings are precomputed and cached anyway, so they are generated
+            # deterministically, which also makes them eligible for the response cache
+            result = await llm_generator.run_async(
+                messages=messages_for_llm, generation_kwargs={"temperature": 0}
+            )
             logger.debug(f"DEBUG: LLM generator result: {result}")
 
             # Extract the greeting text from the LLM response
@@ -147,8 +374,8 @@ class ChatService:
                 # Find the first assistant message
                 for reply in result["replies"]:
                     # Need to import ChatRole if not already imported
-                    if reply.role == ChatRole.ASSISTANT and reply.content:
-                        greeting_text = reply.content
+                    if reply.role == ChatRole.ASSISTANT and reply.text:
+                        greeting_text = reply.text
                         break  # Take the first assistant reply
 
             if not greeting_text:
@@ -191,126 +418,15 @@ class ChatService:
                 f"Processing chat interaction for user {user.id} in session {session_id}"
             )
 
-            # Determine the current session ID
-            current_session_id = session_id if session_id else str(uuid.uuid4())
-
-            # Store the user's message in the database
-            user_chat_message = ChatMessage(
-                user_id=user.id,
-                session_id=current_session_id,
-                role="user",
-                content=user_message,
-            )
-            db.add(user_chat_message)
-            await db.commit()
-            await db.refresh(
-                user_chat_message
-            )  # Refresh to get the generated ID and timestamp
-
-            # Fetch recent chat history for this session from the database
-            # Use the index on (session_id, timestamp) for efficient retrieval
-            # history_result = await db.execute(
-            #     select(ChatMessage)
-            #     .filter(ChatMessage.session_id == current_session_id)
-            #     .order_by(ChatMessage.timestamp)
-            # )
-            # chat_history_models = history_result.scalars().all()
-
-            # Convert database models to Haystack ChatMessage objects
-            # Include the current user message in the history for the pipeline
-            # messages: List[ChatMessage] = []
-            # for msg in chat_history_models:
-            #     # Map DB role to Haystack ChatRole enum
-            #     haystack_role = (
-            #         ChatRole.USER
-            #         if msg.role == "user"
-            #         else (
-            #             ChatRole.ASSISTANT if msg.role == "assistant" else ChatRole.TOOL
-            #         )
-            #     )
-            #     meta_data = {
-            #         "db_id": str(msg.id),
-            #         "timestamp": msg.timestamp.isoformat(),
-            #         **(msg.metadata_ or {}),
-            #     }
-            #     if haystack_role == ChatRole.USER:
-            #         messages.append(
-            #             HaystackChatMessage.from_user(msg.content, meta=meta_data)
-            #         )
-            #     elif haystack_role == ChatRole.ASSISTANT:
-            #         messages.append(
-            #             HaystackChatMessage.from_assistant(msg.content, meta=meta_data)
-            #         )
-            #     elif haystack_role == ChatRole.TOOL:
-            #         messages.append(
-            #             HaystackChatMessage.from_tool(msg.content, meta=meta_data)
-            #         )
-            #     # Add other roles if necessary, though the DB schema currently only supports user/assistant/tool
-            #     else:
-            #         logger.warning(
-            #             f"Unknown chat message role from DB: {msg.role}. Skipping message."
-            #         )
-
-            pipeline = await build_chat_pipeline(
-                pipeline_type="chat",  # Specify the pipeline type
-                override_pipeline_tag=None,  # Use default tag for ChatService interactions
-                prompt_service=self.prompt_service,
-                settings=self.settings,  # Pass settings as it's needed by the generator (using settings_obj as per pipeline signature)
-                # db=db # Pass db if needed by any pipeline components
-            )
-
-            pipeline_result = await pipeline.run_async(
-                data={
-                    "agent": {  # Target the 'agent' component in the pipeline
-                        "messages": [
-                            HaystackChatMessage.from_user(user_message)
-                        ],  # Pass only the current user message
-                        "user": user,  # Pass the user object for tool checks
-                        "session_id": current_session_id,  # Pass the session ID
-                        # Add other context data needed by tools or prompts here
-                    }
-                }
-            )
-
-            # Process the pipeline result
-            # The Agent returns the full conversation history including its responses
-            replies: List[ChatMessage] = pipeline_result["agent"]["messages"]
-
-            # Store agent and tool messages in the database
-            messages_to_save = []
-            final_reply_text = ""
-            for reply_msg in replies:
-                logger.debug(
-                    f"Processing reply message with role: {reply_msg.role}, meta: {reply_msg.meta}"
-                )  # Log meta content
-                # Only save messages generated by the assistant or tools
-                if reply_msg.role in [ChatRole.ASSISTANT, ChatRole.TOOL]:
-                    messages_to_save.append(
-                        ChatMessage(
-                            user_id=user.id,
-                            session_id=current_session_id,
-                            role=reply_msg.role.value,  # Save the enum value (string)
-                            content=reply_msg.text,  # Save the content from the Haystack message
-                            metadata_=reply_msg.meta,  # Save metadata (e.g., tool call details, usage)
-                        )
-                    )
-                if reply_msg.role == ChatRole.ASSISTANT and reply_msg.text is not None:
-                    final_reply_text = (
-                        reply_msg.text
-                    )  # Capture the last assistant text reply
-
-            if messages_to_save:
-                db.add_all(messages_to_save)
-                await db.commit()
-                # No need to refresh here unless we need the IDs immediately
-
-            logger.info(
-                f"Finished processing chat interaction for user {user.id} in session {current_session_id}"
+            # Duplicate submissions of the same message while it is in flight (e.g.
+            # React strict mode) share one turn: one stored exchange, one LLM call,
+            # the same reply. The same message sent again later is a new turn.
+            message_hash = hashlib.sha256(user_message.encode("utf-8")).hexdigest()
+            return await self.single_flight.do(
+                f"chat:interact:{user.id}:{session_id or 'new'}:{message_hash}",
+                lambda: self._interact(db, user_message, user, session_id),
             )
 
-            # Return the agent's final text reply and the session ID
-            return {"reply": final_reply_text, "session_id": current_session_id}
-
         except PromptTemplateNotFoundError as e:
             logger.error(f"Prompt template not found: {e}", exc_info=True)
             raise HTTPException(
@@ -328,25 +444,431 @@ class ChatService:
                 detail="An internal error occurred during chat processing.",
             ) from e
 
+    async def _interact(
+        self,
+        db: AsyncSession,
+        user_message: str,
+        user: models.User,
+        session_id: Optional[str],
+    ) -> Dict[str, Any]:
+        """Runs and persists one chat turn; see `interact`."""
+        # Determine the current session ID
+        current_session_id = session_id if session_id else str(uuid.uuid4())
+
+        # Load history before saving so the current message isn't part of it
+        history = await self.history_assembler.assemble(db, current_session_id, user.id)
+
+        sent_at = datetime.now(timezone.utc)
+
+        replies = await self._run_agent(
+            db=db,
+            user_message=user_message,
+            user=user,
+            session_id=current_session_id,
+            history=history,
+        )
+
+        turn = TurnRecord(
+            user=user,
+            session_id=current_session_id,
+            user_message=user_message,
+            sent_at=sent_at,
+            replies=replies,
+        )
+        if self.settings.CHAT_DEFERRED_PERSISTENCE:
+            self._persist_turn_in_background(turn)
+        else:
+            await self._persist_turn(db, turn)
+        final_reply_text = turn.final_reply_text
+        if history.needs_summary:
+            await self.schedule_history_summary(current_session_id, user.id)
+
+        logger.info(
+            f"Finished processing chat interaction for user {user.id} in session {current_session_id}"
+        )
+
+        # Return the agent's final text reply and the session ID
+        return {"reply": final_reply_text, "session_id": current_session_id}
+
+    async def interact_stream(
+        self,
+        user_message: str,
+        user: models.User,
+        session_id: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of `interact` that yields events while the agent runs.
+
+        Tokens and tool-call starts are forwarded from the generator's streaming
+        callback as they arrive. Once the agent finishes, tool results and a final
+        `done` event are emitted. The turn is run and persisted in a background task
+        with its own database session, so it completes and is saved exactly like
+        `interact` even if the client disconnects mid-stream.
+
+        Args:
+            user_message: The current message from the user.
+            user: The authenticated user object.
+            session_id: Optional ID of the current chat session. If None, a new session is created.
+
+        Yields:
+            Event dictionaries with `event` and `data` keys. Event types are
+            `session`, `token`, `tool_call`, `tool_result`, `done` and `error`.
+        """
+        current_session_id = session_id if session_id else str(uuid.uuid4())
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+
+        def emit(event: str, data: Dict[str, Any]) -> None:
+            # The Agent runs in an executor thread, so hand events to the loop safely
+            loop.call_soon_threadsafe(events.put_nowait, {"event": event, "data": data})
+
+        logger.info(
+            f"Processing streaming chat interaction for user {user.id} in session {current_session_id}"
+        )
+        yield {"event": "session", "data": {"session_id": current_session_id}}
+
+        # Keep a reference to the task so it isn't garbage collected if the client leaves
+        task = asyncio.create_task(
+            self.run_turn_with_events(
+                user_message=user_message,
+                user=user,
+                session_id=current_session_id,
+                emit=emit,
+            )
+        )
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+        while True:
+            event = await events.get()
+            yield event
+            if event["event"] in ("done", "error"):
+                break
+
+    async def run_turn_with_events(
+        self,
+        *,
+        user_message: str,
+        user: models.User,
+        session_id: str,
+        emit: Callable[[str, Dict[str, Any]], None],
+    ) -> None:
+        """
+        Runs and persists one chat turn in its own database session, reporting
+        progress through `emit`.
+
+        Used for streaming turns in the API and for queued turns in the worker.
+        Never raises: failures are reported as an `error` event.
+
+        Args:
+            user_message: The current message from the user.
+            user: The authenticated user object.
+            session_id: The chat session ID.
+            emit: Receives `(event, data)` for `token`, `tool_call`, `tool_result`,
+                `done` and `error` events. Called from the Agent's executor thread
+                for tokens and tool calls, so it must be thread-safe.
+        """
+
+        def streaming_callback(chunk: StreamingChunk) -> None:
+            if chunk.content:
+                emit("token", {"content": chunk.content})
+            for tool_call in chunk.meta.get("tool_calls") or []:
+                function = getattr(tool_call, "function", None)
+                if function is not None and function.name:
+                    emit("tool_call", {"id": tool_call.id, "name": function.name})
+
+        try:
+            async with async_session_factory() as db:
+                history = await self.history_assembler.assemble(db, session_id, user.id)
+                sent_at = datetime.now(timezone.utc)
+                replies = await self._run_agent(
+                    db=db,
+                    user_message=user_message,
+                    user=user,
+                    session_id=session_id,
+                    history=history,
+                    streaming_callback=streaming_callback,
+                )
+                for reply_msg in replies:
+                    if reply_msg.role == ChatRole.TOOL and reply_msg.tool_call_result:
+                        emit(
+                            "tool_result",
+                            {
+                                "name": reply_msg.tool_call_result.origin.tool_name,
+                                "result": reply_msg.tool_call_result.result,
+                                "error": reply_msg.tool_call_result.error,
+                            },
+                        )
+                turn = TurnRecord(
+                    user=user,
+                    session_id=session_id,
+                    user_message=user_message,
+                    sent_at=sent_at,
+                    replies=replies,
+                )
+                if self.settings.CHAT_DEFERRED_PERSISTENCE:
+                    emit(
+                        "done",
+                        {"reply": turn.final_reply_text, "session_id": session_id},
+                    )
+                    await self._persist_turn(db, turn)
+                else:
+                    await self._persist_turn(db, turn)
+                    emit(
+                        "done",
+                        {"reply": turn.final_reply_text, "session_id": session_id},
+                    )
+            if history.needs_summary:
+                await self.schedule_history_summary(session_id, user.id)
+        except PromptTemplateNotFoundError as e:
+            logger.error(f"Prompt template not found: {e}", exc_info=True)
+            emit("error", {"detail": "Required prompt template not found."})
+        except Exception as e:
+            logger.error(
+                f"An unexpected error occurred in streaming chat turn: {e}",
+                exc_info=True,
+            )
+            emit(
+                "error",
+                {"detail": "An internal error occurred during chat processing."},
+            )
+
+    async def enqueue_turn(
+        self,
+        *,
+        user_message: str,
+        user_id: uuid.UUID,
+        session_id: Optional[str] = None,
+    ) -> Dict[str, str]:
+        """
+        Queues a chat turn for execution in the SAQ worker.
+
+        The turn's progress is published to Redis and can be followed with
+        `app.features.chat.turn_events.read_turn_events`.
+
+        Args:
+            user_message: The current message from the user.
+            user_id: The ID of the authenticated user.
+            session_id: Optional ID of the current chat session. If None, a new session is created.
+
+        Returns:
+            A dictionary with the `turn_id` and `session_id`.
+        """
+        current_session_id = session_id if session_id else str(uuid.uuid4())
+        turn_id = str(uuid.uuid4())
+        await register_turn(
+            get_redis(),
+            turn_id,
+            user_id=str(user_id),
+            session_id=current_session_id,
+            ttl_seconds=self.settings.CHAT_TURN_EVENTS_TTL_SECONDS,
+        )
+        await queue.enqueue(
+            "chat_turn_task",
+            key=f"chat_turn:{turn_id}",
+            timeout=self.settings.CHAT_TURN_TIMEOUT_SECONDS,
+            turn_id=turn_id,
+            user_id=str(user_id),
+            session_id=current_session_id,
+            user_message=user_message,
+        )
+        logger.info(
+            f"Queued chat turn {turn_id} for user {user_id} in session {current_session_id}"
+        )
+        return {"turn_id": turn_id, "session_id": current_session_id}
+
+    async def _persist_turn(self, db: AsyncSession, turn: TurnRecord) -> None:
+        """
+        Stores the user message and the agent and tool messages of a turn with one
+        multi-row INSERT, and adds them to the session's totals, in a single
+        transaction.
+
+        Ids and timestamps are assigned here rather than by the database, so no
+        RETURNING or refresh is needed, and a turn whose agent run failed leaves no
+        orphaned user message behind. With `CHAT_WRITE_BEHIND_ENABLED` the rows are
+        handed to the write-behind writer instead. With `CHAT_MEMORY_ENABLED` the
+        turn's embedding is then enqueued.
+        """
+        rows = turn.rows()
+        buffered = False
+        if self.settings.CHAT_WRITE_BEHIND_ENABLED:
+            try:
+                await get_chat_message_writer().add(rows)
+                buffered = True
+            except Exception as e:
+                logger.warning(
+                    f"Failed to buffer chat turn of session {turn.session_id}, inserting it directly: {e}"
+                )
+        if not buffered:
+            await db.execute(insert(ChatMessage), rows)
+            await upsert_chat_sessions(db, rows)
+            await db.commit()
+        if self.settings.CHAT_MEMORY_ENABLED:
+            await self.schedule_turn_embedding(turn, turn_id=rows[0]["id"])
+
+    def _persist_turn_in_background(self, turn: TurnRecord) -> None:
+        """Stores a turn in its own database session after the reply was returned."""
+
+        async def persist() -> None:
+            try:
+                async with async_session_factory() as db:
+                    await self._persist_turn(db, turn)
+            except Exception as e:
+                logger.error(
+                    f"Failed to store deferred chat turn of session {turn.session_id}: {e}",
+                    exc_info=True,
+                )
+
+        task = asyncio.create_task(persist())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    async def _run_agent(
+        self,
+        *,
+        db: AsyncSession,
+        user_message: str,
+        user: models.User,
+        session_id: str,
+        history: Optional[HistoryWindow] = None,
+        streaming_callback: Optional[Callable[[StreamingChunk], None]] = None,
+    ) -> List[HaystackChatMessage]:
+        """
+        Runs the chat pipeline for one user message.
+
+        Standalone messages (no session history) are first looked up in the semantic
+        cache; on a hit the cached answer is returned without running the agent.
+
+        Args:
+            db: The SQLAlchemy async database session, used by the semantic cache.
+            user_message: The current message from the user.
+            user: The authenticated user object, passed to the Agent state for tools.
+            session_id: The chat session ID, passed to the Agent state.
+            history: The session's history window, sent before the user message.
+            streaming_callback: Optional callback receiving generator chunks as they arrive.
+
+        Returns:
+            The messages the Agent generated during this run (assistant and tool messages).
+        """
+        # Answers to follow-ups may depend on earlier turns, so only standalone
+        # messages go through the semantic cache
+        semantic_lookup = None
+        if self.semantic_cache.enabled and not (history and history.messages):
+            prompt_key = make_prompt_key(
+                self.pipeline_registry.make_key(
+                    pipeline_type="chat",
+                    override_pipeline_tag=None,
+                    prompt_service=self.prompt_service,
+                    settings=self.settings,
+                )
+            )
+            semantic_lookup = await self.semantic_cache.lookup(
+                db, user_id=user.id, prompt_key=prompt_key, query=user_message
+            )
+            if semantic_lookup is not None and semantic_lookup.hit:
+                reply_text = semantic_lookup.entry.response
+                if streaming_callback is not None:
+                    streaming_callback(StreamingChunk(content=reply_text))
+                return [
+                    HaystackChatMessage.from_assistant(
+                        reply_text,
+                        meta={
+                            "semantic_cache": {
+                                "entry_id": str(semantic_lookup.entry.id),
+                                "similarity": semantic_lookup.similarity,
+                            }
+                        },
+                    )
+                ]
+
+        # Reuse the warm pipeline for this configuration instead of rebuilding it per message
+        pipeline = await self.pipeline_registry.get_pipeline(
+            pipeline_type="chat",  # Specify the pipeline type
+            override_pipeline_tag=None,  # Use default tag for ChatService interactions
+            prompt_service=self.prompt_service,
+            settings=self.settings,
+        )
+
+        input_messages = list(history.messages) if history else []
+        input_messages.append(HaystackChatMessage.from_user(user_message))
+
+        agent_inputs: Dict[str, Any] = {
+            "messages": input_messages,  # History window followed by the current message
+            "user": user,  # Pass the user object for tool checks
+            "session_id": session_id,  # Pass the session ID
+            # Lets tools running on the tool invoker's loop use pooled connections
+            "app_loop": AppLoop(asyncio.get_running_loop()),
+            # Add other context data needed by tools or prompts here
+        }
+        if streaming_callback is not None:
+            agent_inputs["streaming_callback"] = streaming_callback
+
+        pipeline_result = await pipeline.run_async(
+            data={"agent": agent_inputs}  # Target the 'agent' component in the pipeline
+        )
+
+        # The Agent returns its system prompt and our inputs ahead of the messages it
+        # generated; strip them so history isn't saved again
+        agent = pipeline.get_component("agent")
+        messages = pipeline_result["agent"]["messages"]
+        echoed = len(input_messages)
+        if agent.system_prompt:
+            echoed += 1
+        new_messages = messages[echoed:]
+        record_prompt_cache_usage(
+            new_messages,
+            prefix=prefix_fingerprint(agent.system_prompt, agent.tools, input_messages),
+        )
+
+        # Answers drawn from tool results (e.g. the user's tasks) go stale as the
+        # underlying data changes, which the cache's TTL wouldn't notice
+        used_tools = any(m.tool_calls for m in new_messages)
+        if semantic_lookup is not None and not used_tools:
+            final_reply = next(
+                (
+                    m.text
+                    for m in reversed(new_messages)
+                    if m.role == ChatRole.ASSISTANT and m.text
+                ),
+                None,
+            )
+            if final_reply:
+                await self.semantic_cache.store(
+                    db,
+                    semantic_lookup,
+                    user_id=user.id,
+                    prompt_key=prompt_key,
+                    query=user_message,
+                    response=final_reply,
+                )
+        return new_messages
+
     async def get_history(
         self,
         db: AsyncSession,
         user_id: uuid.UUID,
         session_id: Optional[str] = None,
         limit: int = 5,
-    ) -> List[ChatMessage]:
+        before: Optional[HistoryCursor] = None,
+        after: Optional[HistoryCursor] = None,
+    ) -> HistoryPage:
         """
-        Retrieves chat message history for the given user.
+        Retrieves a page of chat message history for the given user.
         Can filter by session_id or retrieve recent messages across sessions.
 
+        Pages are fetched by keyset on `(timestamp, id)`: the newest messages by
+        default, the ones older than `before`, or the ones newer than `after`.
+
         Args:
             db: The SQLAlchemy async database session.
             user_id: The ID of the user.
             session_id: Optional ID of the chat session to filter by.
             limit: The maximum number of messages to retrieve.
+            before: Fetch the messages preceding this cursor.
+            after: Fetch the messages following this cursor.
 
         Returns:
-            A list of ChatMessage ORM models.
+            The page, with its messages in chronological order.
         """
         logger.info(
             f"Fetching chat history for user {user_id}, session_id: {session_id}, limit: {limit}"
@@ -358,25 +880,62 @@ class ChatService:
             )  # Use user_id directly
 
             if session_id:
-                # Filter by session_id and order by timestamp (uses ix_chat_message_session_timestamp)
-                query = query.filter(
-                    ChatMessage.session_id == str(session_id)
-                ).order_by(ChatMessage.timestamp)
+                # Uses ix_chat_message_session_timestamp
+                query = query.filter(ChatMessage.session_id == str(session_id))
+                if self.settings.CHAT_ARCHIVE_ENABLED:
+                    await get_chat_archiver().ensure_hot(db, session_id, user_id)
+                # Only scan the monthly partitions since the session started
+                started_at = await session_started_at(db, user_id, session_id)
+                if started_at is not None:
+                    query = query.filter(ChatMessage.timestamp >= started_at)
+            # Otherwise recent messages across sessions, using ix_chat_message_user_timestamp
+
+            newest_first = after is None
+            if after is not None:
+                query = query.filter(after_cursor(after)).order_by(
+                    ChatMessage.timestamp, ChatMessage.id
+                )
             else:
-                # Order by timestamp descending to get recent messages across sessions (uses ix_chat_message_user_timestamp)
-                query = query.order_by(ChatMessage.timestamp.desc())
+                if before is not None:
+                    query = query.filter(before_cursor(before))
+                query = query.order_by(
+                    ChatMessage.timestamp.desc(), ChatMessage.id.desc()
+                )
 
-            query = query.limit(limit)
+            # One extra row tells whether another page follows
+            query = query.limit(limit + 1)
 
             result = await db.execute(query)
             messages = list(result.scalars().all())
 
-            # If fetching recent across sessions, reverse to show in chronological order
-            if not session_id:
-                messages.reverse()
+            if session_id and self.settings.CHAT_WRITE_BEHIND_ENABLED:
+                # Include the session's latest turns not yet flushed to the database
+                known = {message.id for message in messages}
+                pending = await pending_session_messages(get_redis(), session_id)
+                unflushed = [
+                    message
+                    for message in pending
+                    if message.id not in known
+                    and message.user_id == user_id
+                    and (before is None or before.follows(message))
+                    and (after is None or after.precedes(message))
+                ]
+                if unflushed:
+                    messages = sorted(
+                        messages + unflushed,
+                        key=lambda message: (message.timestamp, message.id),
+                        reverse=newest_first,
+                    )
+
+            page = HistoryPage(
+                messages=messages[:limit], has_more=len(messages) > limit, after=after
+            )
+            # Pages are returned in chronological order whichever way they were fetched
+            if newest_first:
+                page.messages.reverse()
 
-            logger.info(f"Found {len(messages)} chat messages for user {user_id}")
-            return cast(List[ChatMessage], messages)
+            logger.info(f"Found {len(page.messages)} chat messages for user {user_id}")
+            return page
 
         except Exception as e:
             logger.error(
@@ -0,0 +1,394 @@
+"""
+Embedding generation for memory, the semantic cache and Voice DNA.
+
+`EmbeddingService` turns texts into vectors through a pluggable `EmbeddingBackend`
+(`EMBEDDING_BACKEND`): "openai" calls `LLM_EMBEDDING_MODEL` through the pooled LLM
+gateway client, "local" is a deterministic CPU stand-in for development and tests
+that needs no gateway.
+
+Texts are deduplicated by SHA-256 and sent in batches of up to
+`EMBEDDING_BATCH_MAX_TEXTS` inputs and `EMBEDDING_BATCH_MAX_TOKENS` estimated tokens,
+so embedding many texts costs few requests. `embed` additionally looks texts up in
+the `embedding_cache` table first and stores what it computed, so a text is only
+embedded once per model; bulk work goes through `embed_texts_task` in the worker.
+
+Single query embeddings on the request path (`embed_query`) are micro-batched
+across concurrent callers by an `EmbeddingBatcher`.
+"""
+
+import abc
+import asyncio
+import hashlib
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import Settings, get_settings
+from app.db.models.embedding_cache import EmbeddingCacheEntry
+from app.db.models.semantic_cache import EMBEDDING_DIMENSIONS
+from app.shared.clients import get_llm_client_pool
+from app.shared.exceptions import EmbeddingDimensionError
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+# Hashes per lookup query and rows per INSERT into embedding_cache
+CACHE_CHUNK_SIZE = 1000
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def content_hash(text: str) -> str:
+    """The hex SHA-256 of a text, its key in `embedding_cache`."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the input tokens of a text."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) or 1
+
+
+def batch_texts(
+    texts: Sequence[str], *, max_tokens: int, max_texts: int
+) -> Iterator[List[str]]:
+    """
+    Splits texts, in order, into batches within the token and input limits.
+
+    A text over `max_tokens` on its own forms a batch; chunking long documents is
+    up to the caller.
+    """
+    batch: List[str] = []
+    batch_tokens = 0
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if batch and (batch_tokens + tokens > max_tokens or len(batch) >= max_texts):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(text)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+class EmbeddingBackend(abc.ABC):
+    """Embeds a batch of texts with one model."""
+
+    # Identifies the vectors in `embedding_cache`; set by each backend
+    model: str
+
+    @abc.abstractmethod
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Returns one vector per text, in order."""
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """Embeds through the pooled client of the OpenAI-compatible LLM gateway."""
+
+    def __init__(self, model: str):
+        self.model = model
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        return await get_llm_client_pool().embed(texts, model=self.model)
+
+
+class LocalEmbeddingBackend(EmbeddingBackend):
+    """
+    A deterministic stand-in computed on the CPU: words and word pairs are hashed
+    into signed buckets and the vector normalized. Texts sharing words are close,
+    which is enough to exercise retrieval without a gateway; it has no notion of
+    meaning.
+    """
+
+    def __init__(self, dimensions: int = EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+        self.model = f"local/hashing-{dimensions}"
+
+    def _embed_one(self, text: str) -> List[float]:
+        words = _WORD_RE.findall(text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        vector = [0.0] * self.dimensions
+        for feature in features:
+            value = int.from_bytes(
+                hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(),
+                "little",
+            )
+            vector[value % self.dimensions] += 1.0 if value >> 63 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        # CPU-bound, so kept off the event loop
+        return await asyncio.to_thread(lambda: [self._embed_one(t) for t in texts])
+
+
+def make_embedding_backend(settings: Settings) -> EmbeddingBackend:
+    """
+    Creates the backend selected by `EMBEDDING_BACKEND`.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    if settings.EMBEDDING_BACKEND == "openai":
+        return OpenAIEmbeddingBackend(settings.LLM_EMBEDDING_MODEL)
+    if settings.EMBEDDING_BACKEND == "local":
+        return LocalEmbeddingBackend()
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {settings.EMBEDDING_BACKEND!r}")
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces single-text embedding requests of concurrent callers.
+
+    The first request of a batch starts a `max_wait_seconds` timer; requests
+    arriving meanwhile join the batch, which is embedded with one `embed_fn` call
+    when the timer fires or `max_batch_size` requests are waiting, and each caller
+    gets its own vector back. A failed call fails every caller of the batch.
+
+    Batches belong to the event loop of the first caller. Callers on another loop
+    (e.g. a worker thread's `asyncio.run`) are embedded directly.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], Awaitable[List[List[float]]]],
+        *,
+        max_wait_seconds: float,
+        max_batch_size: int,
+    ):
+        """
+        Args:
+            embed_fn: Embeds a list of texts, returning vectors in input order.
+            max_wait_seconds: How long the first request of a batch waits for others.
+            max_batch_size: Requests that make a batch be embedded at once.
+        """
+        self.embed_fn = embed_fn
+        self.max_wait_seconds = max_wait_seconds
+        self.max_batch_size = max(1, max_batch_size)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._counts: Counter = Counter()
+
+    async def embed(self, text: str) -> List[float]:
+        """Embeds one text as part of the next batch."""
+        loop = asyncio.get_running_loop()
+        if self._loop is None or self._loop.is_closed():
+            self._loop = loop
+            self._pending, self._timer = [], None
+        elif loop is not self._loop:
+            self._counts["direct"] += 1
+            return (await self.embed_fn([text]))[0]
+
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush(loop)
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_seconds, self._flush, loop)
+        # A cancelled caller cancels its future and is left out of the call
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        # The loop the batch belongs to, as captured by `embed`
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = loop.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        waiting = [(text, future) for text, future in batch if not future.done()]
+        if not waiting:
+            return
+        self._counts["batches"] += 1
+        self._counts["texts"] += len(waiting)
+        try:
+            vectors = await self.embed_fn([text for text, _ in waiting])
+        except Exception as e:
+            for _, future in waiting:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), vector in zip(waiting, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns counters of batches, batched texts and direct (other loop) calls."""
+        return dict(self._counts)
+
+
+class EmbeddingService:
+    """
+    Embeds texts in deduplicated batches, optionally through the persistent cache.
+    """
+
+    def __init__(self, settings: Settings, backend: EmbeddingBackend):
+        """
+        Args:
+            settings: Application settings providing the batch limits.
+            backend: The backend computing embeddings.
+        """
+        self.settings = settings
+        self.backend = backend
+        self._counts: Counter = Counter()
+        self._batcher = EmbeddingBatcher(
+            self.embed_texts,
+            max_wait_seconds=settings.EMBEDDING_MICROBATCH_WAIT_MS / 1000,
+            max_batch_size=settings.EMBEDDING_BATCH_MAX_TEXTS,
+        )
+
+    @property
+    def model(self) -> str:
+        return self.backend.model
+
+    async def embed_query(self, text: str) -> List[float]:
+        """
+        Embeds one text on the request path, e.g. a search query.
+
+        Concurrent calls are micro-batched into one backend request, adding at most
+        `EMBEDDING_MICROBATCH_WAIT_MS` of latency; 0 disables batching.
+
+        Raises:
+            EmbeddingDimensionError: If the backend's vectors don't fit the vector columns.
+        """
+        if self.settings.EMBEDDING_MICROBATCH_WAIT_MS <= 0:
+            return (await self.embed_texts([text]))[0]
+        return await self._batcher.embed(text)
+
+    async def embed_texts(self, texts: Sequence[str]) -> List[List[float]]:
+        """
+        Embeds texts with the backend, each distinct text once.
+
+        Returns:
+            One embedding per input text, in input order.
+
+        Raises:
+            EmbeddingDimensionError: If the backend's vectors don't fit the vector columns.
+        """
+        distinct = list(dict.fromkeys(texts))
+        self._counts["deduplicated"] += len(texts) - len(distinct)
+        embeddings = await self._compute(distinct)
+        return [embeddings[text] for text in texts]
+
+    async def embed(self, db: AsyncSession, texts: Sequence[str]) -> List[List[float]]:
+        """
+        Embeds texts, serving those embedded before from `embedding_cache` and
+        storing the others there. Commits the stored entries.
+
+        Args:
+            db: The SQLAlchemy async database session.
+            texts: The texts to embed.
+
+        Returns:
+            One embedding per input text, in input order.
+
+        Raises:
+            EmbeddingDimensionError: If the backend's vectors don't fit the vector columns.
+        """
+        by_hash = {content_hash(text): text for text in texts}
+        self._counts["deduplicated"] += len(texts) - len(by_hash)
+
+        cached: Dict[str, List[float]] = {}
+        hashes = list(by_hash)
+        for start in range(0, len(hashes), CACHE_CHUNK_SIZE):
+            result = await db.execute(
+                select(
+                    EmbeddingCacheEntry.content_hash, EmbeddingCacheEntry.embedding
+                ).filter(
+                    EmbeddingCacheEntry.model == self.model,
+                    EmbeddingCacheEntry.content_hash.in_(
+                        hashes[start : start + CACHE_CHUNK_SIZE]
+                    ),
+                )
+            )
+            # pgvector returns numpy arrays
+            cached.update((h, embedding.tolist()) for h, embedding in result.all())
+        self._counts["cached"] += len(cached)
+
+        missing = [h for h in hashes if h not in cached]
+        if missing:
+            computed = await self._compute([by_hash[h] for h in missing])
+            rows = [
+                {
+                    "model": self.model,
+                    "content_hash": h,
+                    "embedding": computed[by_hash[h]],
+                }
+                for h in missing
+            ]
+            for start in range(0, len(rows), CACHE_CHUNK_SIZE):
+                # Concurrent jobs may have stored the same text meanwhile
+                await db.execute(
+                    pg_insert(EmbeddingCacheEntry)
+                    .values(rows[start : start + CACHE_CHUNK_SIZE])
+                    .on_conflict_do_nothing()
+                )
+            await db.commit()
+            cached.update((h, computed[by_hash[h]]) for h in missing)
+        logger.debug(
+            f"Embedded {len(by_hash)} distinct texts with {self.model}: "
+            f"{len(by_hash) - len(missing)} cached, {len(missing)} computed"
+        )
+
+        return [cached[content_hash(text)] for text in texts]
+
+    async def _compute(self, texts: List[str]) -> Dict[str, List[float]]:
+        """Embeds distinct texts in batches; returns the embeddings by text."""
+        embeddings: Dict[str, List[float]] = {}
+        for batch in batch_texts(
+            texts,
+            max_tokens=self.settings.EMBEDDING_BATCH_MAX_TOKENS,
+            max_texts=self.settings.EMBEDDING_BATCH_MAX_TEXTS,
+        ):
+            vectors = await self.backend.embed(batch)
+            for vector in vectors:
+                if len(vector) != EMBEDDING_DIMENSIONS:
+                    raise EmbeddingDimensionError(
+                        self.model, len(vector), EMBEDDING_DIMENSIONS
+                    )
+            embeddings.update(zip(batch, vectors))
+            self._counts["requests"] += 1
+            self._counts["computed"] += len(batch)
+        return embeddings
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns request, text and micro-batch counters."""
+        return {**self._counts, "micro_batching": self._batcher.stats()}
+
+
+_service: Optional[EmbeddingService] = None
+_service_lock = threading.Lock()
+
+
+def get_embedding_service() -> EmbeddingService:
+    """Returns the process-wide EmbeddingService, using `EMBEDDING_BACKEND`."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                settings = get_settings()
+                _service = EmbeddingService(settings, make_embedding_backend(settings))
+    return _service
@@ -75,6 +75,31 @@ class PromptService:
 
         logger.debug("DEBUG: PromptService initialized.")
 
+    def resolve_pipeline_tag(
+        self, pipeline_type: str, override_pipeline_tag: Optional[str]
+    ) -> Optional[str]:
+        """
+        Determines the pipeline tag to use for a pipeline type.
+
+        Args:
+            pipeline_type: The type of pipeline (e.g., 'chat', 'creatordna').
+            override_pipeline_tag: An optional tag to override the default pipeline tag.
+
+        Returns:
+            The override tag if given, otherwise the default tag configured for the
+            pipeline type, or None if the pipeline type has no default tag.
+        """
+        if override_pipeline_tag is not None:
+            return override_pipeline_tag
+
+        # This logic maps pipeline_type to the correct default tag setting from config.py
+        # Add more pipeline types here as needed
+        if pipeline_type == "chat":
+            return self.settings.DEFAULT_CHAT_PIPELINE_TAG
+        # elif pipeline_type == "creatordna":
+        #     return self.settings.DEFAULT_CREATORDNA_PIPELINE_TAG
+        return None
+
     def get_prompt_template_version(
         self,
         pipeline_type: str,
@@ -93,22 +118,14 @@ class PromptService:
         Returns:
             The resolved prompt version string.
         """
-        tag_to_use = override_pipeline_tag
+        tag_to_use = self.resolve_pipeline_tag(pipeline_type, override_pipeline_tag)
 
-        # If no override tag, determine the default tag based on pipeline_type
         if tag_to_use is None:
-            # This logic maps pipeline_type to the correct default tag setting from config.py
-            # Add more pipeline types here as needed
-            if pipeline_type == "chat":
-                tag_to_use = self.settings.DEFAULT_CHAT_PIPELINE_TAG
-            # elif pipeline_type == "creatordna":
-            #     tag_to_use = self.settings.DEFAULT_CREATORDNA_PIPELINE_TAG
-            else:
-                # Fallback to default prompt version if pipeline_type doesn't have a defined default tag
-                logger.warning(
-                    f"No default pipeline tag defined for pipeline type '{pipeline_type}'. Using default prompt version '{self.default_prompt_version}'."
-                )
-                return self.default_prompt_version
+            # Fallback to default prompt version if pipeline_type doesn't have a defined default tag
+            logger.warning(
+                f"No default pipeline tag defined for pipeline type '{pipeline_type}'. Using default prompt version '{self.default_prompt_version}'."
+            )
+            return self.default_prompt_version
 
         # Look up the version in the loaded configuration
         tag_config = self.pipeline_tags_config_.get(tag_to_use, {})
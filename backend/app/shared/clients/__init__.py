@@ -1 +1,45 @@
 # Re-export client instances or classes here
+from .llm_limiter import (
+    BACKGROUND,
+    BATCH,
+    INTERACTIVE,
+    LLMRateLimiter,
+    RateLimitedChatGenerator,
+    get_llm_rate_limiter,
+    llm_priority,
+)
+from .llm import LLMClientPool, get_llm_client_pool, close_llm_client_pool
+from .redis import get_redis, get_sync_redis, close_redis
+from .llm_cache import (
+    CachedChatGenerator,
+    LLMResponseCache,
+    cached_generator,
+    get_llm_response_cache,
+)
+from .llm_hedge import HedgedChatGenerator, get_hedging_stats, hedged_generator
+from .single_flight import SingleFlight, get_single_flight
+
+__all__ = [
+    "LLMClientPool",
+    "get_llm_client_pool",
+    "close_llm_client_pool",
+    "get_redis",
+    "get_sync_redis",
+    "close_redis",
+    "CachedChatGenerator",
+    "LLMResponseCache",
+    "cached_generator",
+    "get_llm_response_cache",
+    "BACKGROUND",
+    "BATCH",
+    "INTERACTIVE",
+    "LLMRateLimiter",
+    "RateLimitedChatGenerator",
+    "get_llm_rate_limiter",
+    "llm_priority",
+    "HedgedChatGenerator",
+    "get_hedging_stats",
+    "hedged_generator",
+    "SingleFlight",
+    "get_single_flight",
+]
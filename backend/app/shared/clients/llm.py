@@ -0,0 +1,351 @@
+"""
+Shared, connection-pooled LLM client.
+
+Every OpenAIChatGenerator creates its own OpenAI clients, each with a private HTTP
+connection pool, so a generator built per call pays for a new TCP/TLS handshake to
+the LLM gateway. This module keeps one long-lived pair of OpenAI clients per process
+(sync for the Haystack Agent, which runs in an executor thread, and async for direct
+calls) backed by pooled httpx clients with keep-alive and HTTP/2 when the `h2`
+package is installed. Generators built through the pool share those clients and
+are rate limited by the shared `LLMRateLimiter` when limits are configured.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+import httpx
+from haystack import component
+from haystack.components.generators.chat import OpenAIChatGenerator
+from haystack.utils import Secret
+from openai import AsyncOpenAI, OpenAI
+
+from app.config import Settings, get_settings
+from app.shared.clients.llm_limiter import (
+    RateLimitedChatGenerator,
+    get_llm_rate_limiter,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _http2_available() -> bool:
+    """Returns True if the optional `h2` package needed for HTTP/2 is installed."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@component
+class PooledChatGenerator(OpenAIChatGenerator):
+    """
+    An OpenAIChatGenerator that also requests token usage for streamed responses.
+
+    OpenAI only reports usage of a stream in a final chunk when asked to; without it
+    streamed replies carry no usage metadata, including cached prompt tokens.
+    """
+
+    def _prepare_api_call(self, **kwargs: Any) -> Dict[str, Any]:
+        # @component recreates the class, so zero-argument super() can't be used
+        api_args = OpenAIChatGenerator._prepare_api_call(self, **kwargs)
+        if api_args["stream"]:
+            api_args.setdefault("stream_options", {"include_usage": True})
+        return api_args
+
+
+@dataclass
+class LLMPoolMetrics:
+    """
+    Request counters of the pooled HTTP clients.
+
+    Requests in flight are tracked by the clients' transports, which see every
+    request end, including timeouts and connection errors that never produce a
+    response; responses are counted by the clients' event hooks.
+    """
+
+    requests_total: int = 0
+    responses_total: int = 0
+    errors_total: int = 0
+    awaiting_response: int = 0
+    max_awaiting_response: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def request_started(self) -> None:
+        with self._lock:
+            self.requests_total += 1
+            self.awaiting_response += 1
+            self.max_awaiting_response = max(
+                self.max_awaiting_response, self.awaiting_response
+            )
+
+    def request_finished(self) -> None:
+        with self._lock:
+            self.awaiting_response -= 1
+
+    def on_response(self, response: httpx.Response) -> None:
+        with self._lock:
+            self.responses_total += 1
+            if response.status_code >= 400:
+                self.errors_total += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "requests_total": self.requests_total,
+                "responses_total": self.responses_total,
+                "errors_total": self.errors_total,
+                "awaiting_response": self.awaiting_response,
+                "max_awaiting_response": self.max_awaiting_response,
+            }
+
+
+class _MeteredTransport(httpx.BaseTransport):
+    """Counts the requests in flight through a sync transport."""
+
+    def __init__(self, transport: httpx.BaseTransport, metrics: LLMPoolMetrics):
+        self.transport = transport
+        self.metrics = metrics
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.metrics.request_started()
+        try:
+            return self.transport.handle_request(request)
+        finally:
+            self.metrics.request_finished()
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class _MeteredAsyncTransport(httpx.AsyncBaseTransport):
+    """Counts the requests in flight through an async transport."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, metrics: LLMPoolMetrics):
+        self.transport = transport
+        self.metrics = metrics
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.metrics.request_started()
+        try:
+            return await self.transport.handle_async_request(request)
+        finally:
+            self.metrics.request_finished()
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def _connection_stats(client: httpx.Client | httpx.AsyncClient) -> Dict[str, Any]:
+    """
+    Reads connection usage from the httpcore pool behind an httpx client.
+
+    httpx does not expose pool state publicly, so this degrades to an empty dict if
+    the transport is not the default httpcore-backed one.
+    """
+    transport = getattr(client, "_transport", None)
+    # Unwrap the metering transport
+    transport = getattr(transport, "transport", transport)
+    pool = getattr(transport, "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is None:
+        return {}
+    return {
+        "open": len(connections),
+        "idle": sum(1 for c in connections if c.is_idle()),
+        "http2": sum(1 for c in connections if "HTTP/2" in repr(c)),
+        "queued_requests": len(getattr(pool, "_requests", [])),
+    }
+
+
+class LLMClientPool:
+    """
+    Owns the pooled HTTP and OpenAI clients used for all LLM calls in the process.
+    """
+
+    def __init__(self, settings: Settings):
+        """
+        Initializes the pooled clients from settings.
+
+        Args:
+            settings: Application settings providing the LLM endpoint, key and pool limits.
+        """
+        self.settings = settings
+        self.metrics = LLMPoolMetrics()
+        self.http2 = settings.LLM_HTTP2 and _http2_available()
+        if settings.LLM_HTTP2 and not self.http2:
+            logger.warning(
+                "LLM_HTTP2 is enabled but 'h2' is not installed; using HTTP/1.1."
+            )
+
+        limits = httpx.Limits(
+            max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(settings.LLM_TIMEOUT, connect=10.0)
+
+        async def _on_async_response(response: httpx.Response) -> None:
+            self.metrics.on_response(response)
+
+        # A client given a transport ignores its own limits and http2 arguments
+        self._http_client = httpx.Client(
+            timeout=timeout,
+            transport=_MeteredTransport(
+                httpx.HTTPTransport(limits=limits, http2=self.http2), self.metrics
+            ),
+            event_hooks={"response": [self.metrics.on_response]},
+        )
+        self._async_http_client = httpx.AsyncClient(
+            timeout=timeout,
+            transport=_MeteredAsyncTransport(
+                httpx.AsyncHTTPTransport(limits=limits, http2=self.http2),
+                self.metrics,
+            ),
+            event_hooks={"response": [_on_async_response]},
+        )
+
+        client_args: Dict[str, Any] = {
+            "api_key": self.api_key.resolve_value(),
+            "base_url": self.api_base_url,
+            "timeout": settings.LLM_TIMEOUT,
+            "max_retries": settings.LLM_MAX_RETRIES,
+        }
+        self.client = OpenAI(**client_args, http_client=self._http_client)
+        self.async_client = AsyncOpenAI(
+            **client_args, http_client=self._async_http_client
+        )
+        self._generators: Dict[str, OpenAIChatGenerator] = {}
+
+        logger.info(
+            f"LLM client pool initialized (max_connections={settings.LLM_HTTP_MAX_CONNECTIONS}, "
+            f"keepalive={settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS}, http2={self.http2})"
+        )
+
+    @property
+    def api_key(self) -> Secret:
+        """The LLM API key as a Haystack Secret."""
+        if self.settings.LLM_API_KEY is None:
+            raise ValueError("LLM_API_KEY is not configured.")
+        return Secret.from_token(self.settings.LLM_API_KEY.get_secret_value())
+
+    @property
+    def api_base_url(self) -> Optional[str]:
+        """The configured LLM API base URL, if any."""
+        return str(self.settings.LLM_API_URL) if self.settings.LLM_API_URL else None
+
+    def build_chat_generator(
+        self,
+        *,
+        model: Optional[str] = None,
+        generation_kwargs: Optional[Dict[str, Any]] = None,
+        priority: Optional[str] = None,
+    ) -> Union[OpenAIChatGenerator, RateLimitedChatGenerator]:
+        """
+        Builds an OpenAIChatGenerator that sends requests through the pooled clients.
+
+        Args:
+            model: The model to use. Defaults to `Settings.LLM_MODEL`.
+            generation_kwargs: Optional generation parameters for the generator.
+            priority: Fixed rate limiter priority class; defaults to the `llm_priority`
+                context of each call.
+
+        Returns:
+            A configured OpenAIChatGenerator, wrapped in a RateLimitedChatGenerator if
+            rate limits apply to the model.
+        """
+        generator = PooledChatGenerator(
+            api_key=self.api_key,
+            model=model or self.settings.LLM_MODEL,
+            api_base_url=self.api_base_url,
+            generation_kwargs=generation_kwargs,
+            timeout=self.settings.LLM_TIMEOUT,
+            max_retries=self.settings.LLM_MAX_RETRIES,
+        )
+        # OpenAIChatGenerator always creates its own clients; swap in the shared ones
+        generator.client = self.client
+        generator.async_client = self.async_client
+        limiter = get_llm_rate_limiter()
+        if limiter.is_limited(generator.model):
+            return RateLimitedChatGenerator(generator, limiter, priority=priority)
+        return generator
+
+    def get_chat_generator(
+        self, model: Optional[str] = None
+    ) -> Union[OpenAIChatGenerator, RateLimitedChatGenerator]:
+        """
+        Returns a shared generator for one-off calls (e.g. greetings) with default parameters.
+
+        Args:
+            model: The model to use. Defaults to `Settings.LLM_MODEL`.
+        """
+        model = model or self.settings.LLM_MODEL
+        generator = self._generators.get(model)
+        if generator is None:
+            generator = self.build_chat_generator(model=model)
+            self._generators[model] = generator
+        return generator
+
+    async def embed(
+        self, texts: List[str], model: Optional[str] = None
+    ) -> List[List[float]]:
+        """
+        Embeds texts through the pooled async client.
+
+        Args:
+            texts: The texts to embed.
+            model: The embedding model. Defaults to `Settings.LLM_EMBEDDING_MODEL`.
+
+        Returns:
+            One embedding per input text, in input order.
+        """
+        model = model or self.settings.LLM_EMBEDDING_MODEL
+        # Embeddings have no completion, so only the input counts against the limit
+        tokens = sum(len(text) for text in texts) // 4 + 1
+        async with get_llm_rate_limiter().limit(model, tokens) as lease:
+            response = await self.async_client.embeddings.create(
+                model=model, input=texts
+            )
+            if lease is not None and response.usage is not None:
+                lease.actual_tokens = response.usage.total_tokens
+        return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns request counters and current connection usage for both clients."""
+        return {
+            "http2_enabled": self.http2,
+            "max_connections": self.settings.LLM_HTTP_MAX_CONNECTIONS,
+            "requests": self.metrics.snapshot(),
+            "sync_connections": _connection_stats(self._http_client),
+            "async_connections": _connection_stats(self._async_http_client),
+        }
+
+    async def aclose(self) -> None:
+        """Closes the pooled HTTP connections."""
+        self._http_client.close()
+        await self._async_http_client.aclose()
+        self._generators.clear()
+
+
+_pool: Optional[LLMClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_llm_client_pool() -> LLMClientPool:
+    """Returns the process-wide LLMClientPool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = LLMClientPool(get_settings())
+    return _pool
+
+
+async def close_llm_client_pool() -> None:
+    """Closes the process-wide LLMClientPool if it was created."""
+    global _pool
+    if _pool is not None:
+        await _pool.aclose()
+        _pool = None
@@ -0,0 +1,415 @@
+"""
+Exact-match LLM response cache in Redis.
+
+Deterministic LLM calls (temperature 0, no streaming) with an identical model,
+prompt versions, message list, tools and generation parameters are answered from
+Redis instead of the LLM. Caching is opt-in per pipeline through
+`Settings.LLM_CACHE_PIPELINES`; `cached_generator` returns the generator unchanged
+for pipelines that haven't opted in.
+
+Entries are keyed by a hash over the pipeline name and its resolved prompt versions
+as well as the request itself, so bumping a prompt version in `pipeline-tags.yaml`
+stops old entries from matching; they then age out through their TTL.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Tuple, cast
+
+from haystack import component
+from haystack.components.generators.chat import OpenAIChatGenerator
+from haystack.dataclasses import ChatMessage
+from haystack.tools import Tool
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+
+from app.config import Settings, get_settings
+from app.shared.clients.redis import get_redis, get_sync_redis
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_KEY_PREFIX = "llm:cache:v1:"
+# Sorted set of cached keys scored by write time, used to cap the number of entries
+LLM_CACHE_INDEX_KEY = "llm:cache:v1:index"
+
+
+def _message_to_dict(message: ChatMessage) -> Dict[str, Any]:
+    """
+    Serializes a ChatMessage in the format read by `ChatMessage.from_dict`.
+
+    `ChatMessage.to_dict` inspects the call stack to decide whether to log a
+    deprecation warning, which is too costly on every LLM call.
+    """
+    content: List[Dict[str, Any]] = [{"text": text} for text in message.texts]
+    content.extend({"tool_call": asdict(call)} for call in message.tool_calls)
+    content.extend(
+        {"tool_call_result": asdict(result)} for result in message.tool_call_results
+    )
+    return {
+        "role": message.role.value,
+        "meta": message.meta,
+        "name": message.name,
+        "content": content,
+    }
+
+
+def _tool_to_dict(tool: Tool) -> Dict[str, Any]:
+    """Describes a tool by what the LLM sees of it."""
+    return {
+        "name": tool.name,
+        "description": tool.description,
+        "parameters": tool.parameters,
+    }
+
+
+@dataclass
+class LLMCacheMetrics:
+    """Hit/miss counters per pipeline."""
+
+    counts: Dict[str, Dict[str, int]] = field(
+        default_factory=lambda: defaultdict(
+            lambda: {"hits": 0, "misses": 0, "bypassed": 0, "errors": 0}
+        )
+    )
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, pipeline: str, outcome: str) -> None:
+        with self._lock:
+            self.counts[pipeline][outcome] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {pipeline: dict(counts) for pipeline, counts in self.counts.items()}
+
+
+class LLMResponseCache:
+    """
+    Stores LLM replies in Redis with a TTL, a per-entry size limit and a cap on the
+    number of entries.
+    """
+
+    def __init__(self, settings: Settings, redis: AsyncRedis, sync_redis: Redis):
+        """
+        Args:
+            settings: Application settings providing TTL and size limits.
+            redis: The asyncio Redis client, used from async code paths.
+            sync_redis: The synchronous Redis client, used from the Agent's executor thread.
+        """
+        self.settings = settings
+        self.redis = redis
+        self.sync_redis = sync_redis
+        self.metrics = LLMCacheMetrics()
+
+    def is_enabled_for(self, pipeline: str) -> bool:
+        """Returns True if the pipeline opted into response caching."""
+        return (
+            self.settings.LLM_CACHE_ENABLED
+            and pipeline in self.settings.LLM_CACHE_PIPELINE_LIST
+        )
+
+    @staticmethod
+    def make_key(
+        *,
+        pipeline: str,
+        prompt_versions: Mapping[str, str],
+        model: str,
+        messages: List[ChatMessage],
+        tools: Optional[List[Tool]],
+        generation_kwargs: Mapping[str, Any],
+    ) -> str:
+        """
+        Builds the cache key for a request.
+
+        Message metadata is left out, so replies replayed as history (which carry
+        usage and finish-reason metadata) match the same request as fresh ones.
+        """
+        payload = {
+            "pipeline": pipeline,
+            "prompt_versions": dict(sorted(prompt_versions.items())),
+            "model": model,
+            "messages": [
+                {k: v for k, v in _message_to_dict(m).items() if k != "meta"}
+                for m in messages
+            ],
+            "tools": [_tool_to_dict(t) for t in tools or []],
+            "generation_kwargs": dict(sorted(generation_kwargs.items())),
+        }
+        digest = hashlib.sha256(
+            json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+        return f"{LLM_CACHE_KEY_PREFIX}{digest}"
+
+    @staticmethod
+    def _decode(raw: Optional[str]) -> Optional[List[ChatMessage]]:
+        if not raw:
+            return None
+        replies = [ChatMessage.from_dict(d) for d in json.loads(raw)]
+        for reply in replies:
+            reply.meta["cache_hit"] = True
+        return replies
+
+    def _encode(self, replies: List[ChatMessage]) -> Optional[str]:
+        encoded = json.dumps([_message_to_dict(r) for r in replies], default=str)
+        if len(encoded.encode("utf-8")) > self.settings.LLM_CACHE_MAX_ENTRY_BYTES:
+            return None
+        return encoded
+
+    def get(self, key: str, pipeline: str) -> Optional[List[ChatMessage]]:
+        """Returns the cached replies for a key (sync), or None on a miss or error."""
+        try:
+            replies = self._decode(cast(Optional[str], self.sync_redis.get(key)))
+        except Exception as e:
+            logger.warning(f"Failed to read LLM cache entry {key}: {e}")
+            self.metrics.record(pipeline, "errors")
+            return None
+        self.metrics.record(pipeline, "hits" if replies is not None else "misses")
+        return replies
+
+    async def aget(self, key: str, pipeline: str) -> Optional[List[ChatMessage]]:
+        """Returns the cached replies for a key, or None on a miss or error."""
+        try:
+            replies = self._decode(await self.redis.get(key))
+        except Exception as e:
+            logger.warning(f"Failed to read LLM cache entry {key}: {e}")
+            self.metrics.record(pipeline, "errors")
+            return None
+        self.metrics.record(pipeline, "hits" if replies is not None else "misses")
+        return replies
+
+    def set(self, key: str, pipeline: str, replies: List[ChatMessage]) -> None:
+        """Stores replies under a key (sync) and trims the oldest entries over the cap."""
+        encoded = self._encode(replies)
+        if encoded is None:
+            return
+        try:
+            pipe = self.sync_redis.pipeline()
+            self._queue_write(pipe, key, encoded)
+            _, _, _, size = pipe.execute()
+            self._trim(size)
+        except Exception as e:
+            logger.warning(f"Failed to write LLM cache entry {key}: {e}")
+            self.metrics.record(pipeline, "errors")
+
+    async def aset(self, key: str, pipeline: str, replies: List[ChatMessage]) -> None:
+        """Stores replies under a key and trims the oldest entries over the cap."""
+        encoded = self._encode(replies)
+        if encoded is None:
+            return
+        try:
+            pipe = self.redis.pipeline()
+            self._queue_write(pipe, key, encoded)
+            _, _, _, size = await pipe.execute()
+            await self._atrim(size)
+        except Exception as e:
+            logger.warning(f"Failed to write LLM cache entry {key}: {e}")
+            self.metrics.record(pipeline, "errors")
+
+    def _queue_write(self, pipe: Any, key: str, encoded: str) -> None:
+        now = time.time()
+        ttl = self.settings.LLM_CACHE_TTL_SECONDS
+        pipe.set(key, encoded, ex=ttl)
+        pipe.zadd(LLM_CACHE_INDEX_KEY, {key: now})
+        # Index entries of keys that already expired
+        pipe.zremrangebyscore(LLM_CACHE_INDEX_KEY, "-inf", now - ttl)
+        pipe.zcard(LLM_CACHE_INDEX_KEY)
+
+    def _trim(self, size: int) -> None:
+        overflow = size - self.settings.LLM_CACHE_MAX_ENTRIES
+        if overflow > 0:
+            popped = cast(
+                List[Tuple[str, float]],
+                self.sync_redis.zpopmin(LLM_CACHE_INDEX_KEY, overflow),
+            )
+            evicted = [k for k, _ in popped]
+            if evicted:
+                self.sync_redis.delete(*evicted)
+
+    async def _atrim(self, size: int) -> None:
+        overflow = size - self.settings.LLM_CACHE_MAX_ENTRIES
+        if overflow > 0:
+            popped = await self.redis.zpopmin(LLM_CACHE_INDEX_KEY, overflow)
+            evicted = [k for k, _ in popped]
+            if evicted:
+                await self.redis.delete(*evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns cache configuration and per-pipeline hit/miss counters."""
+        return {
+            "enabled": self.settings.LLM_CACHE_ENABLED,
+            "pipelines": self.settings.LLM_CACHE_PIPELINE_LIST,
+            "ttl_seconds": self.settings.LLM_CACHE_TTL_SECONDS,
+            "max_entries": self.settings.LLM_CACHE_MAX_ENTRIES,
+            "counts": self.metrics.snapshot(),
+        }
+
+
+@component
+class CachedChatGenerator:
+    """
+    Wraps an OpenAIChatGenerator and answers deterministic requests from the
+    LLM response cache.
+
+    Only requests with temperature 0 and no streaming callback are cached; all other
+    requests are passed through.
+    """
+
+    def __init__(
+        self,
+        generator: OpenAIChatGenerator,
+        cache: "LLMResponseCache",
+        *,
+        pipeline: str,
+        prompt_versions: Optional[Mapping[str, str]] = None,
+    ):
+        """
+        Args:
+            generator: The generator that serves cache misses.
+            cache: The LLM response cache.
+            pipeline: The opted-in pipeline name, recorded in metrics and part of the key.
+            prompt_versions: Resolved versions of the prompts the pipeline uses.
+        """
+        self.generator = generator
+        self.cache = cache
+        self.pipeline = pipeline
+        self.prompt_versions = dict(prompt_versions or {})
+
+    def warm_up(self) -> None:
+        if hasattr(self.generator, "warm_up"):
+            self.generator.warm_up()
+
+    def _cache_key(
+        self,
+        messages: List[ChatMessage],
+        streaming_callback: Any,
+        generation_kwargs: Optional[Dict[str, Any]],
+        tools: Optional[List[Tool]],
+    ) -> Optional[str]:
+        """Returns the cache key, or None if the request must not be cached."""
+        effective_kwargs = {
+            **(self.generator.generation_kwargs or {}),
+            **(generation_kwargs or {}),
+        }
+        if (
+            streaming_callback is not None
+            or self.generator.streaming_callback is not None
+            or effective_kwargs.get("temperature") != 0
+        ):
+            self.cache.metrics.record(self.pipeline, "bypassed")
+            return None
+        return self.cache.make_key(
+            pipeline=self.pipeline,
+            prompt_versions=self.prompt_versions,
+            model=self.generator.model,
+            messages=messages,
+            tools=tools if tools is not None else self.generator.tools,
+            generation_kwargs=effective_kwargs,
+        )
+
+    @component.output_types(replies=List[ChatMessage])
+    def run(
+        self,
+        messages: List[ChatMessage],
+        streaming_callback: Optional[Any] = None,
+        generation_kwargs: Optional[Dict[str, Any]] = None,
+        *,
+        tools: Optional[List[Tool]] = None,
+        tools_strict: Optional[bool] = None,
+    ):
+        """
+        Returns cached replies for a deterministic request, or calls the generator.
+
+        Takes the same arguments as `OpenAIChatGenerator.run`.
+        """
+        key = self._cache_key(messages, streaming_callback, generation_kwargs, tools)
+        if key is not None:
+            replies = self.cache.get(key, self.pipeline)
+            if replies is not None:
+                return {"replies": replies}
+
+        result = self.generator.run(
+            messages=messages,
+            streaming_callback=streaming_callback,
+            generation_kwargs=generation_kwargs,
+            tools=tools,
+            tools_strict=tools_strict,
+        )
+        if key is not None:
+            self.cache.set(key, self.pipeline, result["replies"])
+        return result
+
+    @component.output_types(replies=List[ChatMessage])
+    async def run_async(
+        self,
+        messages: List[ChatMessage],
+        streaming_callback: Optional[Any] = None,
+        generation_kwargs: Optional[Dict[str, Any]] = None,
+        *,
+        tools: Optional[List[Tool]] = None,
+        tools_strict: Optional[bool] = None,
+    ):
+        """
+        Asynchronously returns cached replies for a deterministic request, or calls
+        the generator.
+
+        Takes the same arguments as `OpenAIChatGenerator.run_async`.
+        """
+        key = self._cache_key(messages, streaming_callback, generation_kwargs, tools)
+        if key is not None:
+            replies = await self.cache.aget(key, self.pipeline)
+            if replies is not None:
+                return {"replies": replies}
+
+        result = await self.generator.run_async(
+            messages=messages,
+            streaming_callback=streaming_callback,
+            generation_kwargs=generation_kwargs,
+            tools=tools,
+            tools_strict=tools_strict,
+        )
+        if key is not None:
+            await self.cache.aset(key, self.pipeline, result["replies"])
+        return result
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_response_cache() -> LLMResponseCache:
+    """Returns the process-wide LLMResponseCache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMResponseCache(get_settings(), get_redis(), get_sync_redis())
+    return _cache
+
+
+def cached_generator(
+    generator: OpenAIChatGenerator,
+    *,
+    pipeline: str,
+    prompt_versions: Optional[Mapping[str, str]] = None,
+) -> Any:
+    """
+    Wraps a generator in a CachedChatGenerator if the pipeline opted into caching.
+
+    Args:
+        generator: The generator to wrap.
+        pipeline: The pipeline name to look up in `Settings.LLM_CACHE_PIPELINES`.
+        prompt_versions: Resolved versions of the prompts the pipeline uses.
+
+    Returns:
+        The wrapped generator, or `generator` itself if caching is off for the pipeline.
+    """
+    cache = get_llm_response_cache()
+    if not cache.is_enabled_for(pipeline):
+        return generator
+    return CachedChatGenerator(
+        generator, cache, pipeline=pipeline, prompt_versions=prompt_versions
+    )
@@ -0,0 +1,455 @@
+"""
+Latency-budgeted LLM calls with hedged requests and fallback models.
+
+A stalled upstream request otherwise holds a chat turn until the HTTP timeout.
+`HedgedChatGenerator` races the primary model against the models in
+`LLM_FALLBACK_MODELS`:
+
+- If the primary hasn't answered within a hedge delay, the next candidate is called
+  as well and the first successful answer wins; the other calls are cancelled. The
+  delay is the `LLM_HEDGE_PERCENTILE` of the model's recent latencies, so only
+  stragglers are hedged.
+- If a call fails, the next candidate is called immediately.
+- If no call succeeded within the latency budget, the call fails.
+
+Without fallback models, hedges go to the primary model again, which usually lands
+on another upstream replica. For streaming calls the delay applies to the first
+chunk: the first call to stream claims the output and the others are discarded.
+
+Calls made from executor threads (the Agent) race in threads; a losing sync request
+can't be aborted and runs to completion in the background.
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from haystack import component
+from haystack.dataclasses import ChatMessage, StreamingChunk
+from haystack.tools import Tool
+
+from app.config import Settings, get_settings
+from app.shared.exceptions import LLMLatencyBudgetExceededError
+
+logger = logging.getLogger(__name__)
+
+# Latencies kept per model and call kind for the hedge delay percentile
+LATENCY_WINDOW = 200
+# Below this many samples the configured default delay is used
+MIN_LATENCY_SAMPLES = 20
+
+
+class LatencyTracker:
+    """
+    Keeps recent LLM latencies per model, separately for the time to the full reply
+    and (for streaming calls) to the first chunk.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples: Dict[Tuple[str, str], Deque[float]] = defaultdict(
+            lambda: deque(maxlen=window)
+        )
+        self._lock = threading.Lock()
+
+    def record(self, model: str, kind: str, seconds: float) -> None:
+        with self._lock:
+            self._samples[(model, kind)].append(seconds)
+
+    def percentile(self, model: str, kind: str, percentile: float) -> Optional[float]:
+        """Returns the latency percentile, or None with too few samples."""
+        with self._lock:
+            samples = sorted(self._samples.get((model, kind), ()))
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        index = min(len(samples) - 1, math.ceil(percentile / 100 * len(samples)) - 1)
+        return samples[max(index, 0)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = {key: sorted(values) for key, values in self._samples.items()}
+        return {
+            f"{model}:{kind}": {
+                "samples": len(values),
+                "p50": values[len(values) // 2],
+                "p99": values[min(len(values) - 1, math.ceil(0.99 * len(values)) - 1)],
+            }
+            for (model, kind), values in samples.items()
+            if values
+        }
+
+
+class HedgeMetrics:
+    """Counts how calls were won."""
+
+    def __init__(self):
+        self._counts: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            self._counts[outcome] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+_latencies = LatencyTracker()
+_metrics = HedgeMetrics()
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Returns the thread pool racing sync calls, sized like the LLM connection pool."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=get_settings().LLM_HTTP_MAX_CONNECTIONS,
+                    thread_name_prefix="llm-hedge",
+                )
+    return _executor
+
+
+class _StreamGate:
+    """Forwards the chunks of the first call to stream and drops the others'."""
+
+    def __init__(self, callback: Callable[[StreamingChunk], None]):
+        self.callback = callback
+        self.owner: Optional[int] = None
+        self.first_chunk_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self.claimed = threading.Event()
+
+    def for_attempt(self, attempt: int) -> Callable[[StreamingChunk], None]:
+        def forward(chunk: StreamingChunk) -> None:
+            with self._lock:
+                if self.owner is None:
+                    self.owner = attempt
+                    self.first_chunk_at = time.monotonic()
+                    self.claimed.set()
+                if self.owner != attempt:
+                    return
+            self.callback(chunk)
+
+        return forward
+
+
+@component
+class HedgedChatGenerator:
+    """
+    Calls a primary generator and hedges or falls back to alternate generators.
+
+    Exposes the primary generator's `model`, `generation_kwargs`, `streaming_callback`
+    and `tools`, so it can be used wherever the generator is.
+    """
+
+    def __init__(
+        self,
+        generators: List[Any],
+        settings: Settings,
+        *,
+        latency_budget_seconds: Optional[float] = None,
+    ):
+        """
+        Args:
+            generators: The primary generator followed by the fallbacks, in order.
+            settings: Application settings providing the hedging configuration.
+            latency_budget_seconds: Max time for the call including hedges and
+                fallbacks. Defaults to `LLM_LATENCY_BUDGET_SECONDS`; 0 for no budget.
+        """
+        self.generators = generators
+        self.settings = settings
+        self.latency_budget_seconds = (
+            settings.LLM_LATENCY_BUDGET_SECONDS
+            if latency_budget_seconds is None
+            else latency_budget_seconds
+        )
+        # Hedges go to the primary again if there are no fallbacks
+        self._candidates = generators if len(generators) > 1 else generators * 2
+
+    @property
+    def primary(self) -> Any:
+        return self.generators[0]
+
+    @property
+    def model(self) -> str:
+        return self.primary.model
+
+    @property
+    def generation_kwargs(self) -> Dict[str, Any]:
+        return self.primary.generation_kwargs
+
+    @property
+    def streaming_callback(self) -> Optional[Any]:
+        return self.primary.streaming_callback
+
+    @property
+    def tools(self) -> Optional[List[Tool]]:
+        return self.primary.tools
+
+    def warm_up(self) -> None:
+        for generator in self.generators:
+            if hasattr(generator, "warm_up"):
+                generator.warm_up()
+
+    def _hedge_delay(self, streaming: bool) -> Optional[float]:
+        """Seconds after which the next candidate is called, or None to not hedge."""
+        if not self.settings.LLM_HEDGING_ENABLED:
+            return None
+        delay = _latencies.percentile(
+            self.primary.model,
+            "first_chunk" if streaming else "reply",
+            self.settings.LLM_HEDGE_PERCENTILE,
+        )
+        if delay is None:
+            delay = self.settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS
+        return max(delay, self.settings.LLM_HEDGE_MIN_DELAY_SECONDS)
+
+    @staticmethod
+    def _timeout(
+        now: float, next_hedge_at: Optional[float], deadline: Optional[float]
+    ) -> Optional[float]:
+        """Seconds until the next hedge or the deadline, None if neither applies."""
+        times = [t for t in (next_hedge_at, deadline) if t is not None]
+        return max(0.0, min(times) - now) if times else None
+
+    def _record_win(
+        self, attempt: int, started_at: float, gate: Optional[_StreamGate]
+    ) -> None:
+        model = self._candidates[attempt].model
+        _latencies.record(model, "reply", time.monotonic() - started_at)
+        if gate is not None and gate.first_chunk_at is not None:
+            _latencies.record(model, "first_chunk", gate.first_chunk_at - started_at)
+        _metrics.record("primary" if attempt == 0 else "alternate")
+        if attempt > 0:
+            logger.info(f"LLM call answered by alternate attempt {attempt} ({model})")
+
+    @component.output_types(replies=List[ChatMessage])
+    def run(
+        self,
+        messages: List[ChatMessage],
+        streaming_callback: Optional[Any] = None,
+        generation_kwargs: Optional[Dict[str, Any]] = None,
+        *,
+        tools: Optional[List[Tool]] = None,
+        tools_strict: Optional[bool] = None,
+    ):
+        """
+        Races the candidates from the calling thread.
+
+        Takes the same arguments as `OpenAIChatGenerator.run`.
+        """
+        callback = streaming_callback or self.primary.streaming_callback
+        gate = _StreamGate(callback) if callback is not None else None
+        delay = self._hedge_delay(gate is not None)
+        start = time.monotonic()
+        deadline = (
+            start + self.latency_budget_seconds if self.latency_budget_seconds else None
+        )
+        running: Dict[Future, Tuple[int, float]] = {}
+        next_attempt = 0
+        last_error: Optional[BaseException] = None
+
+        def launch() -> None:
+            nonlocal next_attempt
+            attempt = next_attempt
+            next_attempt += 1
+            future = _get_executor().submit(
+                self._candidates[attempt].run,
+                messages=messages,
+                streaming_callback=gate.for_attempt(attempt) if gate else None,
+                generation_kwargs=generation_kwargs,
+                tools=tools,
+                tools_strict=tools_strict,
+            )
+            running[future] = (attempt, time.monotonic())
+
+        launch()
+        # Only read while hedging, i.e. when delay is not None
+        hedge_delay: float = delay if delay is not None else 0.0
+        next_hedge_at: float = start + hedge_delay
+        while True:
+            can_hedge = (
+                delay is not None
+                and next_attempt < len(self._candidates)
+                and not (gate and gate.claimed.is_set())
+            )
+            done, _ = wait(
+                running,
+                timeout=self._timeout(
+                    time.monotonic(), next_hedge_at if can_hedge else None, deadline
+                ),
+                return_when=FIRST_COMPLETED,
+            )
+            now = time.monotonic()
+            for future in done:
+                attempt, started_at = running.pop(future)
+                error = future.exception()
+                if error is None and (gate is None or gate.owner in (None, attempt)):
+                    self._record_win(attempt, started_at, gate)
+                    for other in running:
+                        other.cancel()
+                    return future.result()
+                if error is not None:
+                    logger.warning(f"LLM attempt {attempt} failed: {error}")
+                    last_error = error
+                    if gate is not None and gate.owner == attempt:
+                        # Its partial output was already streamed
+                        raise error
+            if deadline is not None and now >= deadline:
+                for other in running:
+                    other.cancel()
+                _metrics.record("budget_exceeded")
+                raise LLMLatencyBudgetExceededError(self.latency_budget_seconds)
+            if not running:
+                if next_attempt >= len(self.generators):
+                    # Every attempt failed
+                    assert last_error is not None
+                    raise last_error
+                _metrics.record("fallback")
+                launch()
+                continue
+            if can_hedge and now >= next_hedge_at:
+                _metrics.record("hedged")
+                launch()
+                next_hedge_at = now + hedge_delay
+
+    @component.output_types(replies=List[ChatMessage])
+    async def run_async(
+        self,
+        messages: List[ChatMessage],
+        streaming_callback: Optional[Any] = None,
+        generation_kwargs: Optional[Dict[str, Any]] = None,
+        *,
+        tools: Optional[List[Tool]] = None,
+        tools_strict: Optional[bool] = None,
+    ):
+        """
+        Races the candidates as tasks, cancelling the losers.
+
+        Takes the same arguments as `OpenAIChatGenerator.run_async`.
+        """
+        callback = streaming_callback or self.primary.streaming_callback
+        gate = _StreamGate(callback) if callback is not None else None
+        delay = self._hedge_delay(gate is not None)
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        deadline = (
+            start + self.latency_budget_seconds if self.latency_budget_seconds else None
+        )
+        running: Dict[asyncio.Task, Tuple[int, float]] = {}
+        next_attempt = 0
+        last_error: Optional[BaseException] = None
+
+        def launch() -> None:
+            nonlocal next_attempt
+            attempt = next_attempt
+            next_attempt += 1
+            task = loop.create_task(
+                self._candidates[attempt].run_async(
+                    messages=messages,
+                    streaming_callback=gate.for_attempt(attempt) if gate else None,
+                    generation_kwargs=generation_kwargs,
+                    tools=tools,
+                    tools_strict=tools_strict,
+                )
+            )
+            running[task] = (attempt, time.monotonic())
+
+        launch()
+        # Only read while hedging, i.e. when delay is not None
+        hedge_delay: float = delay if delay is not None else 0.0
+        next_hedge_at: float = start + hedge_delay
+        try:
+            while True:
+                can_hedge = (
+                    delay is not None
+                    and next_attempt < len(self._candidates)
+                    and not (gate and gate.claimed.is_set())
+                )
+                done, _ = await asyncio.wait(
+                    running,
+                    timeout=self._timeout(
+                        time.monotonic(), next_hedge_at if can_hedge else None, deadline
+                    ),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                now = time.monotonic()
+                for task in done:
+                    attempt, started_at = running.pop(task)
+                    error = task.exception()
+                    if error is None and (
+                        gate is None or gate.owner in (None, attempt)
+                    ):
+                        self._record_win(attempt, started_at, gate)
+                        return task.result()
+                    if error is not None:
+                        logger.warning(f"LLM attempt {attempt} failed: {error}")
+                        last_error = error
+                        if gate is not None and gate.owner == attempt:
+                            raise error
+                if deadline is not None and now >= deadline:
+                    _metrics.record("budget_exceeded")
+                    raise LLMLatencyBudgetExceededError(self.latency_budget_seconds)
+                if not running:
+                    if next_attempt >= len(self.generators):
+                        assert last_error is not None
+                        raise last_error
+                    _metrics.record("fallback")
+                    launch()
+                    continue
+                if can_hedge and now >= next_hedge_at:
+                    _metrics.record("hedged")
+                    launch()
+                    next_hedge_at = now + hedge_delay
+        finally:
+            for task in running:
+                task.cancel()
+
+
+def hedged_generator(
+    build: Callable[[str], Any],
+    *,
+    latency_budget_seconds: Optional[float] = None,
+    settings: Optional[Settings] = None,
+) -> Any:
+    """
+    Builds the primary generator, wrapped in a HedgedChatGenerator if hedging,
+    fallback models or a latency budget are configured.
+
+    Args:
+        build: Builds the generator for a model name.
+        latency_budget_seconds: Overrides `LLM_LATENCY_BUDGET_SECONDS` for this call site.
+        settings: Application settings; defaults to `get_settings()`.
+    """
+    settings = settings or get_settings()
+    budget = (
+        settings.LLM_LATENCY_BUDGET_SECONDS
+        if latency_budget_seconds is None
+        else latency_budget_seconds
+    )
+    models = [settings.LLM_MODEL] + [
+        model
+        for model in settings.LLM_FALLBACK_MODEL_LIST
+        if model != settings.LLM_MODEL
+    ]
+    if len(models) == 1 and not settings.LLM_HEDGING_ENABLED and not budget:
+        return build(settings.LLM_MODEL)
+    return HedgedChatGenerator(
+        [build(model) for model in models],
+        settings,
+        latency_budget_seconds=budget,
+    )
+
+
+def get_hedging_stats() -> Dict[str, Any]:
+    """Returns hedging outcome counters and recent latency percentiles."""
+    return {"outcomes": _metrics.snapshot(), "latencies": _latencies.stats()}
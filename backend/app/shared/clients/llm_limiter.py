@@ -0,0 +1,548 @@
+"""
+Redis-coordinated, priority-aware rate limiting of LLM calls.
+
+Interactive chat, greetings and background SAQ jobs share the LLM gateway's quota.
+`LLMRateLimiter` enforces, per model and across all processes:
+
+- requests per minute and tokens per minute, as token buckets refilled continuously,
+- the number of requests in flight, as expiring leases.
+
+All three are checked and consumed atomically by one Lua script. Priority classes
+keep capacity back from lower priorities: `interactive` calls may use everything,
+`background` calls leave `LLM_RATE_LIMIT_RESERVE_RATIO` of each limit untouched and
+`batch` calls twice that, so a burst of batch work can't starve chat turns.
+
+Token usage is estimated before a call (prompt characters / 4 plus the completion
+limit) and corrected with the usage reported by the LLM afterwards.
+
+The priority of a call comes from the `llm_priority` context (e.g. set by a worker
+task) and defaults to `interactive`. Redis errors let calls through unlimited.
+"""
+
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from haystack import component
+from haystack.components.generators.chat import OpenAIChatGenerator
+from haystack.dataclasses import ChatMessage
+from haystack.tools import Tool
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+
+from app.config import Settings, get_settings
+from app.shared.clients.redis import get_redis, get_sync_redis
+from app.shared.exceptions import LLMRateLimitTimeoutError
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+BATCH = "batch"
+# How many reserve ratios of each limit a priority class must leave untouched
+PRIORITY_RESERVES = {INTERACTIVE: 0, BACKGROUND: 1, BATCH: 2}
+
+LLM_LIMIT_KEY_PREFIX = "llm:limit:"
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "llm_priority", default=INTERACTIVE
+)
+
+# Refills both buckets, then either consumes one request, the estimated tokens and
+# an in-flight lease, or returns how many milliseconds to wait before retrying.
+# KEYS: requests bucket, tokens bucket, in-flight leases
+# ARGV: requests/min, tokens/min, max in flight, reserve ratio, tokens, lease id,
+#       lease ttl in ms (limits of 0 are not enforced)
+_ACQUIRE_SCRIPT = """
+local t = redis.call("TIME")
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local max_inflight = tonumber(ARGV[3])
+local reserve = tonumber(ARGV[4])
+local tokens = tonumber(ARGV[5])
+local wait = 0
+
+local function refill(key, capacity)
+    local state = redis.call("HMGET", key, "level", "ts")
+    local level = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    return math.min(capacity, level + (now - ts) * capacity / 60000)
+end
+
+local requests_level, tokens_level
+if rpm > 0 then
+    requests_level = refill(KEYS[1], rpm)
+    local need = 1 + rpm * reserve
+    if requests_level < need then
+        wait = math.max(wait, (need - requests_level) * 60000 / rpm)
+    end
+end
+if tpm > 0 then
+    tokens_level = refill(KEYS[2], tpm)
+    local need = tokens + tpm * reserve
+    if tokens_level < need then
+        wait = math.max(wait, (need - tokens_level) * 60000 / tpm)
+    end
+end
+if max_inflight > 0 then
+    redis.call("ZREMRANGEBYSCORE", KEYS[3], "-inf", now)
+    local allowed = math.max(1, math.floor(max_inflight * (1 - reserve)))
+    if redis.call("ZCARD", KEYS[3]) >= allowed then
+        wait = math.max(wait, 50)
+    end
+end
+if wait > 0 then
+    return math.ceil(wait)
+end
+
+if rpm > 0 then
+    redis.call("HSET", KEYS[1], "level", requests_level - 1, "ts", now)
+    redis.call("PEXPIRE", KEYS[1], 120000)
+end
+if tpm > 0 then
+    redis.call("HSET", KEYS[2], "level", tokens_level - tokens, "ts", now)
+    redis.call("PEXPIRE", KEYS[2], 120000)
+end
+if max_inflight > 0 then
+    local lease_ttl = tonumber(ARGV[7])
+    redis.call("ZADD", KEYS[3], now + lease_ttl, ARGV[6])
+    redis.call("PEXPIRE", KEYS[3], lease_ttl)
+end
+return 0
+"""
+
+# Returns unused estimated tokens to the bucket (or charges extra ones) and ends the lease
+# KEYS: tokens bucket, in-flight leases; ARGV: token delta, lease id
+_RELEASE_SCRIPT = """
+if tonumber(ARGV[1]) ~= 0 and redis.call("EXISTS", KEYS[1]) == 1 then
+    redis.call("HINCRBYFLOAT", KEYS[1], "level", ARGV[1])
+end
+redis.call("ZREM", KEYS[2], ARGV[2])
+return 0
+"""
+
+
+def current_llm_priority() -> str:
+    """Returns the priority class of LLM calls made in the current context."""
+    return _priority.get()
+
+
+@contextmanager
+def llm_priority(priority: str) -> Iterator[None]:
+    """
+    Sets the priority class of LLM calls made within the block.
+
+    Args:
+        priority: One of `interactive`, `background` or `batch`.
+    """
+    if priority not in PRIORITY_RESERVES:
+        raise ValueError(f"Unknown LLM priority: {priority}")
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def estimate_request_tokens(
+    messages: List[ChatMessage],
+    generation_kwargs: Optional[Dict[str, Any]],
+    default_completion_tokens: int,
+) -> int:
+    """
+    Estimates the tokens a chat request consumes, including its completion.
+
+    Args:
+        messages: The request messages.
+        generation_kwargs: The effective generation parameters.
+        default_completion_tokens: The completion estimate if no limit is set.
+    """
+    characters = sum(len(text) for message in messages for text in message.texts)
+    characters += sum(
+        len(str(call.arguments)) for message in messages for call in message.tool_calls
+    )
+    characters += sum(
+        len(result.result)
+        for message in messages
+        for result in message.tool_call_results
+    )
+    kwargs = generation_kwargs or {}
+    completion = kwargs.get("max_tokens") or kwargs.get("max_completion_tokens")
+    return characters // 4 + (completion or default_completion_tokens)
+
+
+@dataclass
+class LLMLease:
+    """Capacity acquired for one LLM call."""
+
+    model: str
+    lease_id: str
+    estimated_tokens: int
+    # Set by the caller once the LLM reported the actual usage
+    actual_tokens: Optional[int] = None
+    # Taken from the tokens bucket; set by the limiter
+    charged_tokens: int = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.charged_tokens = self.estimated_tokens
+
+
+class LLMRateLimiter:
+    """
+    Acquires per-model request, token and concurrency capacity from Redis.
+    """
+
+    def __init__(self, settings: Settings, redis: AsyncRedis, sync_redis: Redis):
+        """
+        Args:
+            settings: Application settings providing the limits.
+            redis: The asyncio Redis client.
+            sync_redis: The sync Redis client, for calls from executor threads.
+        """
+        self.settings = settings
+        self._acquire = redis.register_script(_ACQUIRE_SCRIPT)
+        self._release = redis.register_script(_RELEASE_SCRIPT)
+        self._sync_acquire = sync_redis.register_script(_ACQUIRE_SCRIPT)
+        self._sync_release = sync_redis.register_script(_RELEASE_SCRIPT)
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {"acquired": 0, "delayed": 0, "wait_seconds": 0.0, "timeouts": 0}
+        )
+        self._errors = 0
+
+    def limits_for(self, model: str) -> Tuple[int, int]:
+        """Returns the (requests/min, tokens/min) limits of a model."""
+        return self.settings.LLM_RATE_LIMIT_OVERRIDE_MAP.get(
+            model,
+            (
+                self.settings.LLM_RATE_LIMIT_REQUESTS_PER_MINUTE,
+                self.settings.LLM_RATE_LIMIT_TOKENS_PER_MINUTE,
+            ),
+        )
+
+    def is_limited(self, model: str) -> bool:
+        rpm, tpm = self.limits_for(model)
+        return bool(rpm or tpm or self.settings.LLM_MAX_CONCURRENT_REQUESTS)
+
+    def _script_args(
+        self, priority: str, lease: LLMLease
+    ) -> Tuple[List[str], List[Any]]:
+        rpm, tpm = self.limits_for(lease.model)
+        prefix = f"{LLM_LIMIT_KEY_PREFIX}{lease.model}:"
+        keys = [f"{prefix}requests", f"{prefix}tokens", f"{prefix}inflight"]
+        reserve = self.settings.LLM_RATE_LIMIT_RESERVE_RATIO * PRIORITY_RESERVES.get(
+            priority, PRIORITY_RESERVES[BATCH]
+        )
+        reserve = min(reserve, 0.9)
+        if tpm > 0:
+            # Requests larger than the usable bucket wait for it to be full and are
+            # charged that much; the release settles the rest with the actual usage
+            lease.charged_tokens = min(lease.estimated_tokens, int(tpm * (1 - reserve)))
+        # Leases outlive a call with all its retries, so crashed callers free theirs
+        lease_ttl_ms = int(
+            self.settings.LLM_TIMEOUT * (self.settings.LLM_MAX_RETRIES + 1) * 1000
+        )
+        args = [
+            rpm,
+            tpm,
+            self.settings.LLM_MAX_CONCURRENT_REQUESTS,
+            reserve,
+            lease.charged_tokens,
+            lease.lease_id,
+            lease_ttl_ms,
+        ]
+        return keys, args
+
+    def _release_args(self, lease: LLMLease) -> Tuple[List[str], List[Any]]:
+        prefix = f"{LLM_LIMIT_KEY_PREFIX}{lease.model}:"
+        delta = 0
+        if lease.actual_tokens is not None:
+            delta = lease.charged_tokens - lease.actual_tokens
+        return [f"{prefix}tokens", f"{prefix}inflight"], [delta, lease.lease_id]
+
+    def _record(self, priority: str, waited: float, timed_out: bool = False) -> None:
+        with self._lock:
+            counts = self._counts[priority]
+            if timed_out:
+                counts["timeouts"] += 1
+                return
+            counts["acquired"] += 1
+            if waited > 0:
+                counts["delayed"] += 1
+                counts["wait_seconds"] += waited
+
+    def _record_error(self, e: Exception) -> None:
+        with self._lock:
+            self._errors += 1
+        logger.warning(f"LLM rate limiter unavailable, not limiting call: {e}")
+
+    @asynccontextmanager
+    async def limit(
+        self, model: str, tokens: int, priority: Optional[str] = None
+    ) -> AsyncIterator[Optional[LLMLease]]:
+        """
+        Waits for capacity for one call, holding it for the duration of the block.
+
+        Args:
+            model: The model called.
+            tokens: The estimated tokens of the call.
+            priority: The priority class; defaults to the `llm_priority` context.
+
+        Yields:
+            The lease, on which the actual usage can be set, or None if unlimited.
+
+        Raises:
+            LLMRateLimitTimeoutError: If no capacity freed up within
+                `LLM_RATE_LIMIT_MAX_WAIT_SECONDS`.
+        """
+        if not self.is_limited(model):
+            yield None
+            return
+        priority = priority or current_llm_priority()
+        lease = LLMLease(model, uuid.uuid4().hex, tokens)
+        keys, args = self._script_args(priority, lease)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + self.settings.LLM_RATE_LIMIT_MAX_WAIT_SECONDS
+        acquired = False
+        while True:
+            try:
+                wait_ms = await self._acquire(keys=keys, args=args)
+            except Exception as e:
+                self._record_error(e)
+                break
+            if not wait_ms:
+                acquired = True
+                break
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                self._record(priority, 0, timed_out=True)
+                raise LLMRateLimitTimeoutError(model, priority)
+            await asyncio.sleep(min(wait_ms / 1000, remaining))
+        self._record(priority, loop.time() - start)
+        try:
+            yield lease
+        finally:
+            if acquired:
+                release_keys, release_args = self._release_args(lease)
+                try:
+                    await self._release(keys=release_keys, args=release_args)
+                except Exception as e:
+                    self._record_error(e)
+
+    @contextmanager
+    def limit_sync(
+        self, model: str, tokens: int, priority: Optional[str] = None
+    ) -> Iterator[Optional[LLMLease]]:
+        """Blocking variant of `limit` for calls made from executor threads."""
+        if not self.is_limited(model):
+            yield None
+            return
+        priority = priority or current_llm_priority()
+        lease = LLMLease(model, uuid.uuid4().hex, tokens)
+        keys, args = self._script_args(priority, lease)
+        start = time.monotonic()
+        deadline = start + self.settings.LLM_RATE_LIMIT_MAX_WAIT_SECONDS
+        acquired = False
+        while True:
+            try:
+                wait_ms = self._sync_acquire(keys=keys, args=args)
+            except Exception as e:
+                self._record_error(e)
+                break
+            if not wait_ms:
+                acquired = True
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._record(priority, 0, timed_out=True)
+                raise LLMRateLimitTimeoutError(model, priority)
+            time.sleep(min(wait_ms / 1000, remaining))
+        self._record(priority, time.monotonic() - start)
+        try:
+            yield lease
+        finally:
+            if acquired:
+                release_keys, release_args = self._release_args(lease)
+                try:
+                    self._sync_release(keys=release_keys, args=release_args)
+                except Exception as e:
+                    self._record_error(e)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the configured limits and per-priority wait counters."""
+        with self._lock:
+            counts = {
+                priority: dict(values) for priority, values in self._counts.items()
+            }
+            errors = self._errors
+        return {
+            "requests_per_minute": self.settings.LLM_RATE_LIMIT_REQUESTS_PER_MINUTE,
+            "tokens_per_minute": self.settings.LLM_RATE_LIMIT_TOKENS_PER_MINUTE,
+            "max_concurrent_requests": self.settings.LLM_MAX_CONCURRENT_REQUESTS,
+            "overrides": self.settings.LLM_RATE_LIMIT_OVERRIDE_MAP,
+            "counts": counts,
+            "errors": errors,
+        }
+
+
+def _usage_tokens(replies: List[ChatMessage]) -> Optional[int]:
+    """Sums the total tokens the LLM reported for the replies, if it did."""
+    usages = [reply.meta.get("usage") or {} for reply in replies if reply.meta]
+    totals: List[int] = [
+        usage["total_tokens"]
+        for usage in usages
+        if usage.get("total_tokens") is not None
+    ]
+    # All replies of one request carry the same usage
+    return max(totals) if totals else None
+
+
+@component
+class RateLimitedChatGenerator:
+    """
+    Wraps an OpenAIChatGenerator so each call first acquires rate limiter capacity.
+
+    Exposes the wrapped generator's `model`, `generation_kwargs`, `streaming_callback`
+    and `tools`, so it can be used wherever the generator is (e.g. inside a
+    `CachedChatGenerator` or an `Agent`).
+    """
+
+    def __init__(
+        self,
+        generator: OpenAIChatGenerator,
+        limiter: LLMRateLimiter,
+        *,
+        priority: Optional[str] = None,
+    ):
+        """
+        Args:
+            generator: The generator making the LLM calls.
+            limiter: The rate limiter.
+            priority: A fixed priority class. Needed for calls made from executor
+                threads (like the Agent's), which don't see the `llm_priority` context.
+        """
+        self.generator = generator
+        self.limiter = limiter
+        self.priority = priority
+
+    @property
+    def model(self) -> str:
+        return self.generator.model
+
+    @property
+    def generation_kwargs(self) -> Dict[str, Any]:
+        return self.generator.generation_kwargs
+
+    @property
+    def streaming_callback(self) -> Optional[Any]:
+        return self.generator.streaming_callback
+
+    @property
+    def tools(self) -> Optional[List[Tool]]:
+        return self.generator.tools
+
+    def warm_up(self) -> None:
+        if hasattr(self.generator, "warm_up"):
+            self.generator.warm_up()
+
+    def _estimate(
+        self, messages: List[ChatMessage], generation_kwargs: Optional[Dict[str, Any]]
+    ) -> int:
+        return estimate_request_tokens(
+            messages,
+            {**(self.generator.generation_kwargs or {}), **(generation_kwargs or {})},
+            self.limiter.settings.LLM_RATE_LIMIT_COMPLETION_TOKENS,
+        )
+
+    @component.output_types(replies=List[ChatMessage])
+    def run(
+        self,
+        messages: List[ChatMessage],
+        streaming_callback: Optional[Any] = None,
+        generation_kwargs: Optional[Dict[str, Any]] = None,
+        *,
+        tools: Optional[List[Tool]] = None,
+        tools_strict: Optional[bool] = None,
+    ):
+        """
+        Calls the generator once capacity is available.
+
+        Takes the same arguments as `OpenAIChatGenerator.run`.
+        """
+        with self.limiter.limit_sync(
+            self.generator.model,
+            self._estimate(messages, generation_kwargs),
+            self.priority,
+        ) as lease:
+            result = self.generator.run(
+                messages=messages,
+                streaming_callback=streaming_callback,
+                generation_kwargs=generation_kwargs,
+                tools=tools,
+                tools_strict=tools_strict,
+            )
+            if lease is not None:
+                lease.actual_tokens = _usage_tokens(result["replies"])
+        return result
+
+    @component.output_types(replies=List[ChatMessage])
+    async def run_async(
+        self,
+        messages: List[ChatMessage],
+        streaming_callback: Optional[Any] = None,
+        generation_kwargs: Optional[Dict[str, Any]] = None,
+        *,
+        tools: Optional[List[Tool]] = None,
+        tools_strict: Optional[bool] = None,
+    ):
+        """
+        Asynchronously calls the generator once capacity is available.
+
+        Takes the same arguments as `OpenAIChatGenerator.run_async`.
+        """
+        async with self.limiter.limit(
+            self.generator.model,
+            self._estimate(messages, generation_kwargs),
+            self.priority,
+        ) as lease:
+            result = await self.generator.run_async(
+                messages=messages,
+                streaming_callback=streaming_callback,
+                generation_kwargs=generation_kwargs,
+                tools=tools,
+                tools_strict=tools_strict,
+            )
+            if lease is not None:
+                lease.actual_tokens = _usage_tokens(result["replies"])
+        return result
+
+
+_limiter: Optional[LLMRateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_llm_rate_limiter() -> LLMRateLimiter:
+    """Returns the process-wide LLMRateLimiter, creating it on first use."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = LLMRateLimiter(get_settings(), get_redis(), get_sync_redis())
+    return _limiter
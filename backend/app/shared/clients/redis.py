@@ -0,0 +1,50 @@
+"""
+Shared Redis clients.
+
+One connection-pooled asyncio client per process for application-level caching and
+coordination (separate from SAQ's own connection), created lazily from
+`Settings.REDIS_URL`, plus a synchronous client for code running in executor threads
+(e.g. inside the Haystack Agent).
+"""
+
+import logging
+from typing import Optional
+
+from redis import Redis as SyncRedis
+from redis.asyncio import Redis
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_redis: Optional[Redis] = None
+_sync_redis: Optional[SyncRedis] = None
+
+
+def get_redis() -> Redis:
+    """Returns the process-wide asyncio Redis client, creating it on first use."""
+    global _redis
+    if _redis is None:
+        _redis = Redis.from_url(get_settings().REDIS_URL, decode_responses=True)
+    return _redis
+
+
+def get_sync_redis() -> SyncRedis:
+    """Returns the process-wide synchronous Redis client, creating it on first use."""
+    global _sync_redis
+    if _sync_redis is None:
+        _sync_redis = SyncRedis.from_url(
+            get_settings().REDIS_URL, decode_responses=True
+        )
+    return _sync_redis
+
+
+async def close_redis() -> None:
+    """Closes the process-wide Redis clients if they were created."""
+    global _redis, _sync_redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+    if _sync_redis is not None:
+        _sync_redis.close()
+        _sync_redis = None
@@ -0,0 +1,219 @@
+"""
+Single-flight coalescing of identical concurrent calls.
+
+Duplicate requests from the frontend (React strict mode, restored tabs) often run
+the same expensive LLM call twice at once. `SingleFlight.do` makes concurrent calls
+with the same key share one execution:
+
+- Within a process, later callers await the in-flight call's future.
+- Across processes, the first caller takes a Redis lock (`SET NX`) holding a token
+  of its execution and publishes its result under a short-lived key derived from
+  that token; callers in other processes that found the lock taken poll for that
+  result. If the leader fails or its lock expires, a waiter takes over.
+
+Only calls in flight are coalesced: a call made after the previous one finished
+runs again, so e.g. the same chat message sent twice in a row gets two turns.
+
+Redis errors degrade to in-process coalescing only.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import uuid
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar, cast
+
+from redis.asyncio import Redis
+
+from app.config import get_settings
+from app.shared.clients.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+SINGLE_FLIGHT_KEY_PREFIX = "singleflight:"
+
+# Deletes the lock only if it is still held by the releasing leader
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution.
+    """
+
+    def __init__(
+        self,
+        redis: Optional[Redis],
+        *,
+        lock_ttl_seconds: float,
+        result_ttl_seconds: int,
+        poll_interval_seconds: float = 0.05,
+    ):
+        """
+        Args:
+            redis: The asyncio Redis client, or None to coalesce within the process only.
+            lock_ttl_seconds: How long a leader may run before waiters take over.
+            result_ttl_seconds: How long a finished result is kept for the waiters of
+                its execution to pick up.
+            poll_interval_seconds: How often cross-process waiters check for the result.
+        """
+        self.redis = redis
+        self.lock_ttl_seconds = lock_ttl_seconds
+        self.result_ttl_seconds = result_ttl_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._counts: Counter = Counter()
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        *,
+        encode: Callable[[T], str] = json.dumps,
+        decode: Callable[[str], T] = json.loads,
+    ) -> T:
+        """
+        Runs `fn` unless an identical call is in flight, then returns its result.
+
+        Args:
+            key: Identifies identical calls. Include everything the result depends on.
+            fn: The call to coalesce.
+            encode: Serializes the result for waiters in other processes.
+            decode: Deserializes a result published by another process.
+
+        Returns:
+            The result of `fn`, possibly from another caller's execution.
+        """
+        while True:
+            future = self._inflight.get(key)
+            if future is None:
+                break
+            self._counts["joined_local"] += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # The leader was cancelled (e.g. its client disconnected). Unless we
+                # are being cancelled ourselves, retry and possibly lead.
+                task = asyncio.current_task()
+                if not future.cancelled() or (task is not None and task.cancelling()):
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        # Avoid "exception was never retrieved" warnings when nobody joined
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            result = await self._do_distributed(key, fn, encode, decode)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _do_distributed(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        encode: Callable[[T], str],
+        decode: Callable[[str], T],
+    ) -> T:
+        if self.redis is None:
+            self._counts["led"] += 1
+            return await fn()
+
+        lock_key = f"{SINGLE_FLIGHT_KEY_PREFIX}lock:{key}"
+        result_key_prefix = f"{SINGLE_FLIGHT_KEY_PREFIX}result:{key}:"
+        token = uuid.uuid4().hex
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lock_ttl_seconds
+        locked = False
+        holder: Optional[str] = None  # Token of the execution in flight elsewhere
+        try:
+            while True:
+                if holder is not None:
+                    published = await self.redis.get(result_key_prefix + holder)
+                    if published is not None:
+                        self._counts["joined_remote"] += 1
+                        return decode(published)
+                locked = bool(
+                    await self.redis.set(
+                        lock_key,
+                        token,
+                        nx=True,
+                        px=int(self.lock_ttl_seconds * 1000),
+                    )
+                )
+                if locked or loop.time() >= deadline:
+                    break
+                # Keeps the last holder seen if the lock was released meanwhile,
+                # so its published result is still picked up
+                holder = await self.redis.get(lock_key) or holder
+                await asyncio.sleep(self.poll_interval_seconds)
+        except Exception as e:
+            logger.warning(f"Single-flight coordination failed for {key}: {e}")
+
+        self._counts["led"] += 1
+        try:
+            result = await fn()
+            if locked:
+                try:
+                    await self.redis.set(
+                        result_key_prefix + token,
+                        encode(result),
+                        ex=self.result_ttl_seconds,
+                    )
+                except Exception as e:
+                    logger.warning(f"Failed to publish single-flight result {key}: {e}")
+            return result
+        finally:
+            if locked:
+                try:
+                    await cast(
+                        Awaitable[int],
+                        self.redis.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, token),
+                    )
+                except Exception as e:
+                    logger.warning(f"Failed to release single-flight lock {key}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns how many calls led an execution or joined one."""
+        return {
+            "inflight": len(self._inflight),
+            "led": self._counts["led"],
+            "joined_local": self._counts["joined_local"],
+            "joined_remote": self._counts["joined_remote"],
+        }
+
+
+_single_flight: Optional[SingleFlight] = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """Returns the process-wide SingleFlight, creating it on first use."""
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                settings = get_settings()
+                _single_flight = SingleFlight(
+                    get_redis(),
+                    lock_ttl_seconds=settings.LLM_SINGLE_FLIGHT_LOCK_TTL_SECONDS,
+                    result_ttl_seconds=settings.LLM_SINGLE_FLIGHT_RESULT_TTL_SECONDS,
+                )
+    return _single_flight
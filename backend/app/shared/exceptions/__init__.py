@@ -1,5 +1,13 @@
-from .exceptions import PromptTemplateNotFoundError
+from .exceptions import (
+    EmbeddingDimensionError,
+    LLMLatencyBudgetExceededError,
+    LLMRateLimitTimeoutError,
+    PromptTemplateNotFoundError,
+)
 
 __all__ = [
+    "EmbeddingDimensionError",
+    "LLMLatencyBudgetExceededError",
+    "LLMRateLimitTimeoutError",
     "PromptTemplateNotFoundError",
 ]
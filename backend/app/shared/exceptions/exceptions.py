@@ -2,3 +2,34 @@ class PromptTemplateNotFoundError(Exception):
     """Custom exception raised when a prompt template is not found."""
 
     pass
+
+
+class LLMRateLimitTimeoutError(Exception):
+    """Raised when an LLM call waited too long for rate limiter capacity."""
+
+    def __init__(self, model: str, priority: str):
+        super().__init__(
+            f"Timed out waiting for LLM rate limit capacity for {model} ({priority})"
+        )
+        self.model = model
+        self.priority = priority
+
+
+class LLMLatencyBudgetExceededError(Exception):
+    """Raised when no LLM call attempt answered within the latency budget."""
+
+    def __init__(self, budget_seconds: float):
+        super().__init__(f"No LLM answer within the {budget_seconds}s latency budget")
+        self.budget_seconds = budget_seconds
+
+
+class EmbeddingDimensionError(Exception):
+    """Raised when an embedding backend's vectors don't fit the vector columns."""
+
+    def __init__(self, model: str, dimensions: int, expected: int):
+        super().__init__(
+            f"Embedding model {model} returned {dimensions} dimensions, expected {expected}"
+        )
+        self.model = model
+        self.dimensions = dimensions
+        self.expected = expected
@@ -0,0 +1,347 @@
+"""
+Result cache for agent tools.
+
+Tools that query the database, like `get_user_tasks`, are often called several times
+per session with the same arguments, and every call sits on the critical path of an
+agent step. `cached_tool_result` declares that a tool function's results may be
+served from Redis:
+
+    @cached_tool_result(ttl_seconds=300, tags=lambda state, args: ["videos"])
+    async def my_tool_func(state, **kwargs): ...
+
+Entries are keyed by the tool, the caller (the user in the Agent state, since tools
+apply per-user permissions) and the LLM-provided arguments. Each entry also carries
+invalidation tags. Every tag has a generation counter in Redis; an entry is only
+served while the generations of its tags are unchanged since it was computed.
+
+Generations are bumped when a committed ORM session changed rows matching an
+invalidation rule registered with `register_invalidation`. Bulk `update()`/`delete()`
+statements bypass ORM events, so code using them must call `invalidate_tags`.
+
+Lookups and stores go through the sync client (in a thread for async tools): tools
+run on the `ConcurrentToolInvoker`'s private event loop. Invalidation must not block
+the event loop a session commits on, so the tags collected during a transaction are
+invalidated by a task on that loop using the asyncio client, right after the commit.
+Sessions committed outside an event loop invalidate through the sync client.
+"""
+
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import threading
+from collections import Counter
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+)
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import Settings, get_settings
+from app.shared.clients.redis import get_redis, get_sync_redis
+
+logger = logging.getLogger(__name__)
+
+TOOL_CACHE_KEY_PREFIX = "toolcache:v1:"
+TOOL_CACHE_GENERATION_PREFIX = "toolcache:gen:"
+
+# Returns the invalidation tags of a tool call from the Agent state and its arguments
+ToolTagsFn = Callable[[Dict[str, Any], Dict[str, Any]], Iterable[str]]
+# Returns the tags to invalidate for a changed ORM row, given the row and its change
+RowTagsFn = Callable[[Any, str], Iterable[str]]
+
+_SESSION_TAGS_KEY = "tool_cache_invalidated_tags"
+
+
+class ToolResultCache:
+    """
+    Stores tool results in Redis, validated by per-tag generation counters.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        redis: Redis,
+        async_redis: Optional[AsyncRedis] = None,
+    ):
+        """
+        Args:
+            settings: Application settings.
+            redis: The sync Redis client.
+            async_redis: The asyncio Redis client, used by `ainvalidate`.
+        """
+        self.settings = settings
+        self.redis = redis
+        self.async_redis = async_redis
+        self._counts: Counter = Counter()
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.TOOL_CACHE_ENABLED
+
+    @staticmethod
+    def make_key(tool_name: str, scope: str, args: Dict[str, Any]) -> str:
+        """Builds the entry key from the tool, caller scope and arguments."""
+        payload = json.dumps(args, sort_keys=True, default=str)
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return f"{TOOL_CACHE_KEY_PREFIX}{tool_name}:{scope}:{digest}"
+
+    def get(self, key: str, tags: List[str]) -> Tuple[bool, Any, List[int]]:
+        """
+        Looks up an entry and the current generations of its tags in one round trip.
+
+        Returns:
+            `(hit, result, generations)`; the generations must be passed to `set`
+            when storing the result computed after a miss.
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.get(key)
+        if tags:
+            pipe.mget([f"{TOOL_CACHE_GENERATION_PREFIX}{tag}" for tag in tags])
+        responses = pipe.execute()
+        generations = [int(g or 0) for g in responses[1]] if tags else []
+        if responses[0] is not None:
+            entry = json.loads(responses[0])
+            if entry["generations"] == generations:
+                self._counts["hits"] += 1
+                return True, entry["result"], generations
+            self._counts["invalidated"] += 1
+        self._counts["misses"] += 1
+        return False, None, generations
+
+    def set(
+        self, key: str, result: Any, generations: List[int], ttl_seconds: int
+    ) -> None:
+        """Stores a result computed with the given tag generations."""
+        entry = json.dumps({"generations": generations, "result": result})
+        self.redis.set(key, entry, ex=ttl_seconds)
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        """Bumps the generations of the tags, invalidating their entries."""
+        tags = sorted(set(tags))
+        if not tags:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        for tag in tags:
+            pipe.incr(f"{TOOL_CACHE_GENERATION_PREFIX}{tag}")
+        pipe.execute()
+        self._counts["invalidations"] += len(tags)
+        logger.debug(f"Invalidated tool cache tags: {tags}")
+
+    async def ainvalidate(self, tags: Iterable[str]) -> None:
+        """Like `invalidate`, through the asyncio client."""
+        tags = sorted(set(tags))
+        if not tags:
+            return
+        if self.async_redis is None:
+            # Caches built without an asyncio client invalidate synchronously
+            self.invalidate(tags)
+            return
+        pipe = self.async_redis.pipeline(transaction=False)
+        for tag in tags:
+            pipe.incr(f"{TOOL_CACHE_GENERATION_PREFIX}{tag}")
+        await pipe.execute()
+        self._counts["invalidations"] += len(tags)
+        logger.debug(f"Invalidated tool cache tags: {tags}")
+
+    def record_error(self) -> None:
+        self._counts["errors"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss and invalidation counters."""
+        return {
+            "enabled": self.enabled,
+            "hits": self._counts["hits"],
+            "misses": self._counts["misses"],
+            "invalidated": self._counts["invalidated"],
+            "invalidations": self._counts["invalidations"],
+            "errors": self._counts["errors"],
+        }
+
+
+_cache: Optional[ToolResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_tool_result_cache() -> ToolResultCache:
+    """Returns the process-wide ToolResultCache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ToolResultCache(get_settings(), get_sync_redis(), get_redis())
+    return _cache
+
+
+def _default_scope(state: Optional[Dict[str, Any]]) -> Optional[str]:
+    user = (state or {}).get("user")
+    return str(user.id) if user is not None else None
+
+
+def cached_tool_result(
+    *,
+    ttl_seconds: int,
+    tags: ToolTagsFn,
+    scope: Callable[[Optional[Dict[str, Any]]], Optional[str]] = _default_scope,
+) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    """
+    Caches the results of an async tool function taking the Agent `state`.
+
+    Results are cached only if they are JSON-serializable and, for dicts, carry no
+    `error` key. Calls without a caller scope are not cached.
+
+    Args:
+        ttl_seconds: How long a result may be served.
+        tags: Returns the invalidation tags of a call from its state and arguments.
+        scope: Returns the caller scope from the state; defaults to the user's ID.
+    """
+
+    def decorator(func: Callable[..., Awaitable[Any]]):
+        tool_name = func.__name__
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*call_args: Any, **call_kwargs: Any) -> Any:
+            cache = get_tool_result_cache()
+            arguments = signature.bind(*call_args, **call_kwargs).arguments
+            state = arguments.pop("state", None)
+            caller = scope(state)
+            if not cache.enabled or caller is None:
+                return await func(*call_args, **call_kwargs)
+
+            # Flatten **kwargs so the key doesn't depend on how arguments were passed
+            args: Dict[str, Any] = {}
+            for name, value in arguments.items():
+                if signature.parameters[name].kind is inspect.Parameter.VAR_KEYWORD:
+                    args.update(value)
+                else:
+                    args[name] = value
+            key = cache.make_key(tool_name, caller, args)
+            call_tags = sorted(set(tags(state or {}, args)))
+            try:
+                hit, result, generations = await asyncio.to_thread(
+                    cache.get, key, call_tags
+                )
+            except Exception as e:
+                cache.record_error()
+                logger.warning(f"Tool cache lookup failed for {tool_name}: {e}")
+                return await func(*call_args, **call_kwargs)
+            if hit:
+                logger.info(f"Tool cache hit for {tool_name}")
+                return result
+
+            result = await func(*call_args, **call_kwargs)
+            if isinstance(result, dict) and "error" in result:
+                return result
+            try:
+                # Generations read before the call: a concurrent invalidation makes
+                # this entry stale immediately instead of being lost
+                await asyncio.to_thread(
+                    cache.set, key, result, generations, ttl_seconds
+                )
+            except Exception as e:
+                cache.record_error()
+                logger.warning(f"Failed to cache result of tool {tool_name}: {e}")
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+# --- Invalidation on ORM changes ---
+
+_invalidation_rules: Dict[Type[Any], List[RowTagsFn]] = {}
+# Invalidations scheduled after commits; the loop only keeps weak references to tasks
+_pending_invalidations: Set["asyncio.Task[None]"] = set()
+_hooks_installed = False
+_hooks_lock = threading.Lock()
+
+
+def register_invalidation(model: Type[Any], tags_fn: RowTagsFn) -> None:
+    """
+    Invalidates tool cache tags when rows of `model` change.
+
+    Args:
+        model: The ORM model class.
+        tags_fn: Called with each inserted, updated or deleted row and the change
+            ("insert", "update" or "delete"); returns the tags to invalidate.
+    """
+    rules = _invalidation_rules.setdefault(model, [])
+    if tags_fn not in rules:
+        rules.append(tags_fn)
+
+
+def invalidate_tags(tags: Iterable[str]) -> None:
+    """Invalidates tool cache tags directly, e.g. after bulk statements."""
+    try:
+        get_tool_result_cache().invalidate(tags)
+    except Exception as e:
+        logger.warning(f"Failed to invalidate tool cache tags: {e}")
+
+
+async def ainvalidate_tags(tags: Iterable[str]) -> None:
+    """Like `invalidate_tags`, without blocking the event loop."""
+    try:
+        await get_tool_result_cache().ainvalidate(tags)
+    except Exception as e:
+        logger.warning(f"Failed to invalidate tool cache tags: {e}")
+
+
+def _collect_tags(session: Session, flush_context: Any) -> None:
+    tags: Set[str] = session.info.setdefault(_SESSION_TAGS_KEY, set())
+    for change, rows in (
+        ("insert", session.new),
+        ("update", session.dirty),
+        ("delete", session.deleted),
+    ):
+        for row in rows:
+            for tags_fn in _invalidation_rules.get(type(row), ()):
+                tags.update(tags_fn(row, change))
+
+
+def _invalidate_committed(session: Session) -> None:
+    tags = session.info.pop(_SESSION_TAGS_KEY, None)
+    if not tags:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # A sync session outside any event loop can afford the round trip
+        invalidate_tags(tags)
+        return
+    # An AsyncSession commits on the loop; the round trip runs there once it's done
+    task = loop.create_task(ainvalidate_tags(tags))
+    _pending_invalidations.add(task)
+    task.add_done_callback(_pending_invalidations.discard)
+
+
+def _discard_rolled_back(session: Session) -> None:
+    session.info.pop(_SESSION_TAGS_KEY, None)
+
+
+def install_invalidation_hooks() -> None:
+    """Listens to ORM session events to apply the registered invalidation rules."""
+    global _hooks_installed
+    with _hooks_lock:
+        if _hooks_installed:
+            return
+        # AsyncSession delegates to a sync Session, so this covers both
+        event.listen(Session, "after_flush", _collect_tags)
+        event.listen(Session, "after_commit", _invalidate_committed)
+        event.listen(Session, "after_rollback", _discard_rolled_back)
+        _hooks_installed = True
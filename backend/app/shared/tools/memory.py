@@ -0,0 +1,227 @@
+"""
+Episodic memory: semantic search over a user's past chat turns.
+
+With `CHAT_MEMORY_ENABLED`, every stored turn enqueues `embed_chat_turn_task`, which
+embeds the user message and the agent's reply off the request path and stores them
+in `chat_turn_embeddings`. The agent's `search_memory` tool embeds its query and
+returns the user's closest turns from other sessions.
+
+The lookup is an HNSW index scan (`ix_chat_turn_embedding_hnsw`, cosine distance),
+which visits a few hundred vectors however large the table grows. The index spans
+all users, so the user filter is applied while scanning: pgvector's iterative scan
+keeps walking the graph until `top_k` of the user's turns are found, instead of
+filtering a fixed candidate list down to few or none.
+
+The tool runs on the `ConcurrentToolInvoker`'s private loop; the embedding call and
+the query are handed to the turn's `AppLoop` to use the pooled connections there.
+"""
+
+import logging
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from haystack.tools import Tool
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.db.models.memory import ChatTurnEmbedding
+from app.db.models.user import User
+from app.db.session import async_session_factory
+from app.services.embedding_service import get_embedding_service
+from app.shared.exceptions import EmbeddingDimensionError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MemoryHit:
+    """A past turn matching a memory search."""
+
+    turn: ChatTurnEmbedding
+    similarity: float
+
+
+def turn_text(user_message: str, reply: str, max_chars: int) -> str:
+    """The text of a turn as embedded and returned by `search_memory`."""
+    return f"User: {user_message}\nAssistant: {reply}"[:max_chars]
+
+
+async def embed_text(text: str) -> Optional[List[float]]:
+    """Embeds one text, or returns None if the model's output doesn't fit the index."""
+    try:
+        return await get_embedding_service().embed_query(text)
+    except EmbeddingDimensionError as e:
+        logger.warning(f"{e}; chat memory unavailable.")
+        return None
+
+
+async def store_turn_embedding(
+    db: AsyncSession,
+    *,
+    turn_id: uuid.UUID,
+    user_id: uuid.UUID,
+    session_id: uuid.UUID,
+    turn_at: datetime,
+    content: str,
+) -> bool:
+    """
+    Embeds a turn and stores it. Retries of the job store it only once.
+
+    Turns are nearly always unique, so `embedding_cache` is bypassed: this table
+    is the turn's persistent embedding.
+
+    Returns:
+        True if the turn was embedded.
+    """
+    embedding = await embed_text(content)
+    if embedding is None:
+        return False
+    await db.execute(
+        pg_insert(ChatTurnEmbedding)
+        .values(
+            id=turn_id,
+            user_id=user_id,
+            session_id=session_id,
+            turn_at=turn_at,
+            content=content,
+            embedding=embedding,
+        )
+        .on_conflict_do_nothing(index_elements=[ChatTurnEmbedding.id])
+    )
+    await db.commit()
+    return True
+
+
+async def search_turns(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    query_embedding: List[float],
+    *,
+    top_k: int,
+    ef_search: int,
+    exclude_session_id: Optional[uuid.UUID] = None,
+) -> List[MemoryHit]:
+    """
+    Finds the user's turns closest to the query embedding, most similar first.
+
+    Args:
+        db: The SQLAlchemy async database session.
+        user_id: The ID of the user whose turns are searched.
+        query_embedding: The embedding of the search query.
+        top_k: The maximum number of turns to return.
+        ef_search: The HNSW candidate list size; trades latency for recall.
+        exclude_session_id: A session whose turns are left out, e.g. the current one.
+    """
+    # Scoped to the transaction; relaxed_order may return hits slightly out of
+    # order, so they are re-sorted below
+    await db.execute(
+        select(
+            func.set_config("hnsw.ef_search", str(ef_search), True),
+            func.set_config("hnsw.iterative_scan", "relaxed_order", True),
+        )
+    )
+    distance = ChatTurnEmbedding.embedding.cosine_distance(query_embedding)
+    nearest = select(ChatTurnEmbedding.id, distance.label("distance")).filter(
+        ChatTurnEmbedding.user_id == user_id
+    )
+    if exclude_session_id is not None:
+        nearest = nearest.filter(ChatTurnEmbedding.session_id != exclude_session_id)
+    top = nearest.order_by(distance).limit(top_k).subquery()
+
+    result = await db.execute(
+        select(ChatTurnEmbedding, top.c.distance)
+        .join(top, ChatTurnEmbedding.id == top.c.id)
+        .order_by(top.c.distance)
+    )
+    hits = [
+        MemoryHit(turn=turn, similarity=1.0 - float(turn_distance))
+        for turn, turn_distance in result.all()
+    ]
+    await db.commit()
+    return hits
+
+
+async def _search_memory(
+    user_id: uuid.UUID, query: str, top_k: int, session_id: Optional[str]
+) -> List[MemoryHit]:
+    settings = get_settings()
+    embedding = await embed_text(query)
+    if embedding is None:
+        return []
+    async with async_session_factory() as db:
+        return await search_turns(
+            db,
+            user_id,
+            embedding,
+            top_k=top_k,
+            ef_search=settings.CHAT_MEMORY_EF_SEARCH,
+            exclude_session_id=uuid.UUID(session_id) if session_id else None,
+        )
+
+
+# Tool function for searching past turns
+# `user`, `session_id` and `app_loop` are injected from the Agent state.
+async def search_memory_tool_func(
+    query: str,
+    limit: Optional[int] = None,
+    user: Optional[User] = None,
+    session_id: Optional[str] = None,
+    app_loop: Optional[Any] = None,
+) -> Dict[str, Any]:
+    """
+    Searches the current user's earlier chat sessions for turns relevant to a query.
+    """
+    logger.info("Executing search_memory tool")
+    if user is None or app_loop is None:
+        logger.error("search_memory tool requires 'user' and 'app_loop' in state.")
+        return {"error": "Internal tool error: User or event loop not available."}
+    max_results = get_settings().CHAT_MEMORY_TOP_K
+    top_k = min(limit, max_results) if limit else max_results
+    hits = await app_loop.run(_search_memory(user.id, query, top_k, session_id))
+    return {
+        "memories": [
+            {
+                "session_id": str(hit.turn.session_id),
+                "turn_at": hit.turn.turn_at.isoformat(),
+                "content": hit.turn.content,
+                "similarity": round(hit.similarity, 3),
+            }
+            for hit in hits
+        ]
+    }
+
+
+# Tool definition for searching past turns
+search_memory_tool = Tool(
+    name="search_memory",
+    description=(
+        "Searches the user's earlier chat sessions for exchanges relevant to a query, "
+        "e.g. to recall what was discussed or decided before. Returns the most "
+        "relevant past turns, best match first."
+    ),
+    parameters={
+        "type": "object",
+        "properties": {
+            "query": {
+                "type": "string",
+                "description": "What to look for, in natural language.",
+            },
+            "limit": {
+                "type": "integer",
+                "description": "Maximum number of past turns to return.",
+                "minimum": 1,
+            },
+        },
+        "required": ["query"],
+        "additionalProperties": False,
+    },
+    function=search_memory_tool_func,
+)
+
+
+# List of the memory tools, registered with CHAT_MEMORY_ENABLED
+memory_tools: List[Tool] = [search_memory_tool]
@@ -0,0 +1,5 @@
+from .utils import format_sse_event
+
+__all__ = [
+    "format_sse_event",
+]
@@ -13,3 +13,24 @@ Keep functions small, pure (if possible), and well-documented.
 Avoid putting business logic or feature-specific code here. If a utility grows
 complex or becomes tightly coupled to a feature, consider moving it.
 """
+
+import json
+from typing import Any, Dict, Optional
+
+
+def format_sse_event(
+    event: str, data: Dict[str, Any], event_id: Optional[str] = None
+) -> str:
+    """
+    Formats a Server-Sent Events message.
+
+    Args:
+        event: The event type, sent as the SSE `event` field.
+        data: JSON-serializable payload, sent as the SSE `data` field.
+        event_id: Optional event ID, sent back by browsers as `Last-Event-ID` on reconnect.
+
+    Returns:
+        The encoded SSE message, terminated by a blank line.
+    """
+    id_line = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{id_line}event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -0,0 +1,17 @@
+"""
+Typed access to the SAQ worker context.
+
+SAQ's `Context` TypedDict only declares SAQ's own keys; the state the `startup`
+hook in `app.worker.settings` adds to it is read through these accessors.
+"""
+
+from typing import Any, Dict, cast
+
+from saq.types import Context
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+
+def get_session_factory(ctx: Context) -> async_sessionmaker[AsyncSession]:
+    """Returns the async session factory stored in the context at startup."""
+    state = cast(Dict[str, Any], ctx)
+    return cast(async_sessionmaker[AsyncSession], state["db_session_factory"])
@@ -0,0 +1,14 @@
+"""
+SAQ Queue Instance.
+
+The queue lives in its own module so API-side code (routers, services, auth hooks)
+can enqueue jobs without importing `app.worker.settings`, which imports every task
+module and would otherwise create circular imports.
+"""
+
+from saq import Queue
+
+from app.config import get_settings
+
+# Create queue using SAQ's proper connection management
+queue = Queue.from_url(get_settings().REDIS_URL, name="default")
@@ -15,22 +15,35 @@ import logging
 from datetime import datetime, timezone
 from typing import Any, Dict
 
+from saq import CronJob
 from sqlalchemy import select
-from saq import Queue
 
-from app.config import get_settings  # Import get_settings
 from app.db.models import BackgroundJob
 from app.db.session import async_session_factory
+from app.shared.clients import close_llm_client_pool, close_redis
 from app.shared.constants.constants import (
     Status as JobStatus,
 )  # Use SAQ's Status enum directly
-from app.worker.tasks import poc_test_task
+from app.worker.queue import queue  # Re-exported for existing imports
+from app.worker.tasks import embed_texts_task, poc_test_task
+from app.features.chat.tasks import (
+    archive_chat_sessions_task,
+    chat_turn_task,
+    embed_chat_turn_task,
+    maintain_chat_partitions_task,
+    precompute_greeting_task,
+    summarize_chat_session_task,
+)
+from app.features.chat.message_writer import get_chat_message_writer
+from app.features.voice_dna.tasks import (
+    embed_transcript_chunks_task,
+    ingest_transcript_catalog_task,
+    ingest_transcript_task,
+)
+from app.features.chat.tools.user import register_tool_cache_invalidation
 
 logger = logging.getLogger(__name__)
 
-# Create queue using SAQ's proper connection management
-queue = Queue.from_url(get_settings().REDIS_URL, name="default")
-
 
 async def startup(ctx: Dict[str, Any]) -> None:
     """
@@ -41,6 +54,10 @@ async def startup(ctx: Dict[str, Any]) -> None:
     logger.info("SAQ Worker starting up")
     # Store the async session factory in the context
     ctx["db_session_factory"] = async_session_factory
+    # Invalidate cached agent tool results when jobs change videos
+    register_tool_cache_invalidation()
+    # Queued chat turns buffer their messages like API ones
+    get_chat_message_writer().start()
 
 
 async def shutdown(ctx: Dict[str, Any]) -> None:
@@ -50,6 +67,9 @@ async def shutdown(ctx: Dict[str, Any]) -> None:
     Runs once when the worker is gracefully shutting down.
     """
     logger.info("SAQ Worker shutting down")
+    await get_chat_message_writer().stop()
+    await close_llm_client_pool()
+    await close_redis()
 
 
 async def before_process(ctx: Dict[str, Any]) -> None:
@@ -188,7 +208,23 @@ async def after_process(ctx: Dict[str, Any]) -> None:
 settings = {
     "queue": queue,
     "concurrency": 5,
-    "functions": [poc_test_task],
+    "functions": [
+        poc_test_task,
+        precompute_greeting_task,
+        summarize_chat_session_task,
+        chat_turn_task,
+        embed_chat_turn_task,
+        embed_texts_task,
+        ingest_transcript_catalog_task,
+        ingest_transcript_task,
+        embed_transcript_chunks_task,
+    ],
+    "cron_jobs": [
+        # Daily, well before a new month's partition is needed
+        CronJob(maintain_chat_partitions_task, cron="17 3 * * *"),
+        # Archiving a batch of sessions may take a while
+        CronJob(archive_chat_sessions_task, cron="43 3 * * *", timeout=1800),
+    ],
     "startup": startup,
     "shutdown": shutdown,
     "before_process": before_process,
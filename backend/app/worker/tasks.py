@@ -15,10 +15,14 @@ Tasks should:
 import asyncio
 import logging
 import uuid
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any
 
 from saq.types import Context
 
+from app.services.embedding_service import get_embedding_service
+from app.shared.clients import BATCH, llm_priority
+from app.worker.context import get_session_factory
+
 # Configure module-level logger
 logger = logging.getLogger(__name__)
 
@@ -80,3 +84,43 @@ async def poc_test_task(
         logger.exception(f"Error in poc_test_task - job_id: {job_id}: {str(e)}")
         # Re-raise to let SAQ handle the failure
         raise
+
+
+async def embed_texts_task(ctx: Context, *, texts: List[str]) -> Dict[str, Any]:
+    """
+    Embeds texts into the `embedding_cache` table.
+
+    Bulk embedding (e.g. backfills) is enqueued as these jobs, so it runs in the
+    worker in deduplicated batches rather than on the API tier; later `embed`
+    calls for the same texts are served from the cache.
+
+    Args:
+        ctx: The SAQ context object containing job information
+        texts: The texts to embed
+
+    Returns:
+        A dictionary containing the job result
+    """
+    job = ctx.get("job")
+    job_id = job.id if job else "unknown"
+    logger.info(f"Starting embed_texts_task - job_id: {job_id}, texts: {len(texts)}")
+
+    session_factory = get_session_factory(ctx)
+    try:
+        service = get_embedding_service()
+        async with session_factory() as db:
+            with llm_priority(BATCH):
+                await service.embed(db, texts)
+
+        logger.info(f"Completed embed_texts_task - job_id: {job_id}")
+        return {
+            "status": "success",
+            "job_id": job_id,
+            "model": service.model,
+            "text_count": len(texts),
+        }
+
+    except Exception as e:
+        logger.exception(f"Error in embed_texts_task - job_id: {job_id}: {str(e)}")
+        # Re-raise to let SAQ handle the failure
+        raise
@@ -0,0 +1,180 @@
+import uuid
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from haystack.dataclasses import ChatRole
+
+from app.config import Settings
+from app.db.models.chat import ChatMessage, ChatSessionSummary
+from app.features.chat.history import (
+    ChatHistoryAssembler,
+    SUMMARY_PREFIX,
+    estimate_tokens,
+)
+from app.services.prompt_service import PromptService
+from tests import chat_helpers
+from tests.chat_helpers import SESSION_ID, USER_ID, make_db, make_result
+
+
+@pytest.fixture
+def mock_settings():
+    settings = MagicMock(spec=Settings)
+    settings.CHAT_HISTORY_TOKEN_BUDGET = 100
+    settings.CHAT_HISTORY_MAX_MESSAGES = 50
+    settings.CHAT_SUMMARY_TARGET_RATIO = 0.5
+    settings.CHAT_SUMMARY_MAX_TOKENS = 20
+    settings.CHAT_WRITE_BEHIND_ENABLED = False
+    settings.CHAT_MEMORY_ENABLED = False
+    settings.CHAT_ARCHIVE_ENABLED = False
+    return settings
+
+
+def make_message(
+    index: int, role: str = "user", content: str = "x" * 40
+) -> ChatMessage:
+    """A stored message costing estimate_tokens(40 chars) == 14 tokens."""
+    return chat_helpers.make_message(index, role, content)
+
+
+@pytest.mark.asyncio
+async def test_assemble_keeps_newest_messages_within_budget(mock_settings):
+    """The window holds the newest messages that fit and flags the overflow."""
+    rows = [make_message(i) for i in range(10)]
+    db = make_db(make_result(list(reversed(rows))))  # Newest first, as queried
+
+    window = await ChatHistoryAssembler(
+        mock_settings, MagicMock(spec=PromptService)
+    ).assemble(db, str(SESSION_ID), USER_ID)
+
+    assert len(window.messages) == 100 // estimate_tokens("x" * 40)
+    assert window.token_count <= mock_settings.CHAT_HISTORY_TOKEN_BUDGET
+    assert window.needs_summary is True
+    assert all(m.role == ChatRole.USER for m in window.messages)
+
+
+@pytest.mark.asyncio
+async def test_assemble_prepends_summary_and_skips_tool_messages(mock_settings):
+    """The summary leads the window; tool results are not replayed."""
+    summary = ChatSessionSummary(
+        session_id=SESSION_ID,
+        user_id=USER_ID,
+        summary="Talked about intros.",
+    )
+    rows = [
+        make_message(0, "user", "Hi"),
+        make_message(1, "tool", "{}"),
+        make_message(2, "assistant", "Hello"),
+    ]
+    db = make_db(make_result(list(reversed(rows))), get=summary)
+
+    window = await ChatHistoryAssembler(
+        mock_settings, MagicMock(spec=PromptService)
+    ).assemble(db, str(SESSION_ID), USER_ID)
+
+    assert [m.role for m in window.messages] == [
+        ChatRole.SYSTEM,
+        ChatRole.USER,
+        ChatRole.ASSISTANT,
+    ]
+    assert window.messages[0].text == SUMMARY_PREFIX + "Talked about intros."
+    assert window.needs_summary is False
+
+
+@pytest.mark.asyncio
+async def test_summarize_folds_oldest_messages(mock_settings):
+    """Oldest messages are folded until the rest fits the target share of the budget."""
+    rows = [make_message(i) for i in range(10)]
+    db = make_db(make_result(rows))
+    assembler = ChatHistoryAssembler(mock_settings, MagicMock(spec=PromptService))
+    assembler._generate_summary = AsyncMock(return_value="New summary")
+
+    summary = await assembler.summarize(db, str(SESSION_ID), USER_ID)
+
+    # Target is 100 * 0.5 - 20 = 30 tokens, so two 14-token messages remain
+    assert summary.summary == "New summary"
+    assert summary.summarized_message_count == 8
+    assert summary.summarized_until == rows[7].timestamp
+    db.add.assert_called_once_with(summary)
+    db.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_summarize_does_not_split_messages_with_equal_timestamps(mock_settings):
+    """Messages saved in one commit are folded together."""
+    rows = [make_message(i) for i in range(10)]
+    for row in rows[7:]:
+        row.timestamp = rows[7].timestamp
+    db = make_db(make_result(rows))
+    assembler = ChatHistoryAssembler(mock_settings, MagicMock(spec=PromptService))
+    assembler._generate_summary = AsyncMock(return_value="New summary")
+
+    summary = await assembler.summarize(db, str(SESSION_ID), USER_ID)
+
+    assert summary.summarized_message_count == 10
+
+
+@pytest.mark.asyncio
+async def test_assemble_includes_unflushed_messages(mock_settings, mocker):
+    """Turns still buffered by the write-behind writer are part of the window."""
+    mock_settings.CHAT_WRITE_BEHIND_ENABLED = True
+    stored = [make_message(0), make_message(1, role="assistant")]
+    pending = [stored[1], make_message(2), make_message(3, role="assistant")]
+    mocker.patch("app.features.chat.history.get_redis")
+    mocker.patch(
+        "app.features.chat.history.pending_session_messages",
+        AsyncMock(return_value=pending),
+    )
+    db = make_db(make_result(list(reversed(stored))))
+
+    window = await ChatHistoryAssembler(
+        mock_settings, MagicMock(spec=PromptService)
+    ).assemble(db, str(SESSION_ID), USER_ID)
+
+    # The message already flushed is not duplicated
+    assert [m.role for m in window.messages] == [
+        ChatRole.USER,
+        ChatRole.ASSISTANT,
+        ChatRole.USER,
+        ChatRole.ASSISTANT,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_assemble_skips_other_users_summary_and_messages(mock_settings, mocker):
+    """A session ID of another user yields none of that user's history."""
+    mock_settings.CHAT_WRITE_BEHIND_ENABLED = True
+    summary = ChatSessionSummary(
+        session_id=SESSION_ID,
+        user_id=uuid.uuid4(),
+        summary="Someone else's secrets.",
+    )
+    mocker.patch("app.features.chat.history.get_redis")
+    mocker.patch(
+        "app.features.chat.history.pending_session_messages",
+        AsyncMock(return_value=[make_message(0)]),
+    )
+    db = make_db(make_result([]), get=summary)
+
+    window = await ChatHistoryAssembler(
+        mock_settings, MagicMock(spec=PromptService)
+    ).assemble(db, str(SESSION_ID), uuid.uuid4())
+
+    assert window.messages == []
+    query = str(db.execute.await_args.args[0])
+    assert "chat_messages.user_id = " in query
+
+
+@pytest.mark.asyncio
+async def test_summarize_leaves_other_users_session_alone(mock_settings):
+    summary = ChatSessionSummary(
+        session_id=SESSION_ID, user_id=uuid.uuid4(), summary="Theirs."
+    )
+    db = make_db(make_result([make_message(i) for i in range(10)]), get=summary)
+    assembler = ChatHistoryAssembler(mock_settings, MagicMock(spec=PromptService))
+    assembler._generate_summary = AsyncMock()
+
+    assert await assembler.summarize(db, str(SESSION_ID), USER_ID) is None
+    assembler._generate_summary.assert_not_awaited()
+    db.commit.assert_not_awaited()
+    assert summary.summary == "Theirs."
@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.config import Settings
+from app.services.prompt_service import PromptService
+from app.features.chat.pipeline_registry import ChatPipelineRegistry
+
+
+@pytest.fixture
+def mock_settings():
+    settings = MagicMock(spec=Settings)
+    settings.LLM_MODEL = "fake-llm-model"
+    settings.DEFAULT_CHAT_PIPELINE_TAG = "dev"
+    return settings
+
+
+@pytest.fixture
+def mock_prompt_service():
+    prompt_service = MagicMock(spec=PromptService)
+    prompt_service.resolve_pipeline_tag.side_effect = (
+        lambda pipeline_type, override_pipeline_tag: override_pipeline_tag or "dev"
+    )
+    prompt_service.get_prompt_template_version.return_value = "v1"
+    return prompt_service
+
+
+@pytest.fixture
+def mock_build(mocker):
+    """Patches the pipeline builder to return a fresh mock pipeline per call."""
+
+    async def _build(**kwargs):
+        await asyncio.sleep(0)  # Yield so concurrent callers can pile up
+        return MagicMock()
+
+    return mocker.patch(
+        "app.features.chat.pipeline_registry.build_chat_pipeline",
+        new=AsyncMock(side_effect=_build),
+    )
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_build_once(
+    mock_settings, mock_prompt_service, mock_build
+):
+    """Concurrent requests for the same configuration share one build."""
+    registry = ChatPipelineRegistry()
+
+    pipelines = await asyncio.gather(
+        *[
+            registry.get_pipeline(
+                pipeline_type="chat",
+                override_pipeline_tag=None,
+                prompt_service=mock_prompt_service,
+                settings=mock_settings,
+            )
+            for _ in range(5)
+        ]
+    )
+
+    assert mock_build.await_count == 1
+    assert all(p is pipelines[0] for p in pipelines)
+    pipelines[0].warm_up.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_prompt_version_bump_builds_new_pipeline(
+    mock_settings, mock_prompt_service, mock_build
+):
+    """A different resolved prompt version yields a separate pipeline."""
+    registry = ChatPipelineRegistry()
+    kwargs = dict(
+        pipeline_type="chat",
+        override_pipeline_tag=None,
+        prompt_service=mock_prompt_service,
+        settings=mock_settings,
+    )
+
+    first = await registry.get_pipeline(**kwargs)
+    mock_prompt_service.get_prompt_template_version.return_value = "v2"
+    second = await registry.get_pipeline(**kwargs)
+
+    assert first is not second
+    assert mock_build.await_count == 2
+    assert len(registry) == 2
+
+
+@pytest.mark.asyncio
+async def test_clear_forces_rebuild(mock_settings, mock_prompt_service, mock_build):
+    """Clearing the registry drops cached pipelines."""
+    registry = ChatPipelineRegistry()
+    kwargs = dict(
+        pipeline_type="chat",
+        override_pipeline_tag="exp-v1",
+        prompt_service=mock_prompt_service,
+        settings=mock_settings,
+    )
+
+    await registry.get_pipeline(**kwargs)
+    registry.clear()
+    await registry.get_pipeline(**kwargs)
+
+    assert mock_build.await_count == 2
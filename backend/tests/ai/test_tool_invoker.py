@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+from haystack.dataclasses import ChatMessage, ToolCall
+from haystack.tools import Tool
+
+from app.features.chat.tool_invoker import ConcurrentToolInvoker
+
+NO_PARAMETERS = {"type": "object", "properties": {}}
+
+
+def slow_sync_tool(value: int):
+    time.sleep(0.2)
+    return {"value": value}
+
+
+async def slow_async_tool(value: int):
+    await asyncio.sleep(0.2)
+    return {"value": value}
+
+
+def hanging_tool():
+    time.sleep(1)
+    return {}
+
+
+def make_invoker(**kwargs) -> ConcurrentToolInvoker:
+    tools = [
+        Tool(
+            name=name,
+            description=name,
+            parameters=NO_PARAMETERS,
+            function=function,
+        )
+        for name, function in (
+            ("sync", slow_sync_tool),
+            ("async", slow_async_tool),
+            ("hang", hanging_tool),
+        )
+    ]
+    return ConcurrentToolInvoker(tools, raise_on_failure=False, **kwargs)
+
+
+def test_tool_calls_run_concurrently_in_call_order():
+    """Calls of one step overlap, and results keep the order of the calls."""
+    invoker = make_invoker()
+    message = ChatMessage.from_assistant(
+        tool_calls=[
+            ToolCall("sync", {"value": 1}),
+            ToolCall("async", {"value": 2}),
+            ToolCall("sync", {"value": 3}),
+        ]
+    )
+
+    start = time.monotonic()
+    result = invoker.run([message])
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 0.5  # Sequential execution would take 0.6s
+    assert [m.tool_call_result.result for m in result["tool_messages"]] == [
+        str({"value": 1}),
+        str({"value": 2}),
+        str({"value": 3}),
+    ]
+    assert not any(m.tool_call_result.error for m in result["tool_messages"])
+
+
+def test_concurrency_cap():
+    invoker = make_invoker(max_concurrency=1)
+    message = ChatMessage.from_assistant(
+        tool_calls=[ToolCall("async", {"value": 1}), ToolCall("async", {"value": 2})]
+    )
+
+    start = time.monotonic()
+    invoker.run([message])
+
+    assert time.monotonic() - start >= 0.4
+
+
+def test_timed_out_and_unknown_tools_report_errors():
+    """A timeout or unknown tool becomes an error message without failing the others."""
+    invoker = make_invoker(tool_timeouts={"hang": 0.1})
+    message = ChatMessage.from_assistant(
+        tool_calls=[
+            ToolCall("hang", {}),
+            ToolCall("missing", {}),
+            ToolCall("sync", {"value": 1}),
+        ]
+    )
+
+    messages = invoker.run([message])["tool_messages"]
+
+    assert [m.tool_call_result.error for m in messages] == [True, True, False]
+    assert "timed out" in messages[0].tool_call_result.result
+    assert "not found" in messages[1].tool_call_result.result
@@ -152,9 +152,8 @@ async def test_post_chat_message_endpoint_new_session(
     assert call_kwargs["db"] == mock_async_session_obj
     assert call_kwargs["user_message"] == user_message
     assert call_kwargs["user"] == mock_user_obj
-    assert isinstance(
-        uuid.UUID(call_kwargs["session_id"]), uuid.UUID
-    )  # Check if session_id is a valid UUID string
+    # interact() creates the session, so duplicate first messages can be coalesced
+    assert call_kwargs["session_id"] is None
 
     # Verify patched dependency mocks were called
     # Handled by conftest override: mocker.patch("app.features.auth.get_required_user_from_session").assert_called_once()
@@ -319,3 +318,29 @@ async def test_get_chat_history_endpoint_recent_messages(
     # Handled by conftest override: mocker.patch("app.features.auth.get_required_user_from_session").assert_called_once()
     mocker.patch("app.db.session.get_db_session").assert_called_once()
     # Note: ChatService is not directly involved in this endpoint's logic
+
+
+@pytest.mark.asyncio
+async def test_get_chat_history_endpoint_rejects_invalid_cursor(
+    test_client: TestClient,
+):
+    """Test that GET /api/chat/history rejects malformed or conflicting cursors."""
+    response = test_client.get("/api/chat/history?before=not-a-cursor")
+    assert response.status_code == 400
+
+    response = test_client.get("/api/chat/history?before=a&after=b")
+    assert response.status_code == 400
+    app.dependency_overrides.clear()  # Clean up override
+
+
+@pytest.mark.asyncio
+async def test_search_chat_messages_endpoint_rejects_invalid_cursor(
+    test_client: TestClient,
+):
+    """Test that GET /api/chat/search rejects malformed cursors and empty queries."""
+    response = test_client.get("/api/chat/search?q=hook&cursor=not-a-cursor")
+    assert response.status_code == 400
+
+    response = test_client.get("/api/chat/search?q=")
+    assert response.status_code == 422
+    app.dependency_overrides.clear()  # Clean up override
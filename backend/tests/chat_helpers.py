@@ -0,0 +1,56 @@
+"""
+Chat messages and mocked database sessions shared by the chat tests.
+"""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+from unittest.mock import AsyncMock, MagicMock
+
+from app.db.models.chat import ChatMessage
+
+USER_ID = uuid.uuid4()
+SESSION_ID = uuid.uuid4()
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def make_message(
+    index: int, role: str = "user", content: Optional[str] = None, **kwargs: Any
+) -> ChatMessage:
+    """A message of the shared session, sent `index` seconds after START."""
+    return ChatMessage(
+        id=uuid.uuid4(),
+        user_id=USER_ID,
+        session_id=SESSION_ID,
+        role=role,
+        content=content if content is not None else f"message {index}",
+        timestamp=START + timedelta(seconds=index),
+        **kwargs,
+    )
+
+
+def make_result(rows: Any = (), one: Any = None) -> MagicMock:
+    """An execute result answering `scalars().all()` and `scalar_one_or_none()`."""
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = list(rows)
+    result.scalar_one_or_none.return_value = one
+    return result
+
+
+def make_db(*results: MagicMock, get: Any = None) -> AsyncMock:
+    """
+    A session whose successive execute calls return `results`.
+
+    Calls past the last result return it again; `get` is what `db.get` returns.
+    """
+    db = AsyncMock()
+    db.add = MagicMock()
+    db.get.return_value = get
+    pending = list(results)
+
+    def execute(*args: Any, **kwargs: Any) -> MagicMock:
+        return pending.pop(0) if len(pending) > 1 else pending[0]
+
+    if pending:
+        db.execute.side_effect = execute
+    return db
@@ -0,0 +1,157 @@
+import uuid
+from datetime import timedelta
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.config import Settings
+from app.db.models.chat import ChatMessage, ChatSession
+from app.features.chat.archive import (
+    ArchiveStore,
+    ChatArchiver,
+    LocalArchiveStore,
+    decode_segment,
+    encode_segment,
+    segment_key,
+)
+from tests import chat_helpers
+from tests.chat_helpers import SESSION_ID, START, USER_ID, make_db, make_result
+
+
+class MemoryStore(ArchiveStore):
+    def __init__(self):
+        self.segments = {}
+
+    async def write(self, key, data):
+        self.segments[key] = data
+
+    async def read(self, key):
+        return self.segments[key]
+
+    async def delete(self, key):
+        self.segments.pop(key, None)
+
+
+def make_message(index: int) -> ChatMessage:
+    return chat_helpers.make_message(
+        index,
+        role="user" if index % 2 == 0 else "assistant",
+        metadata_={"usage": {"prompt_tokens": index}},
+    )
+
+
+def make_session(**kwargs) -> ChatSession:
+    return ChatSession(
+        id=SESSION_ID,
+        user_id=USER_ID,
+        created_at=START,
+        last_activity_at=START + timedelta(seconds=3),
+        **kwargs,
+    )
+
+
+def make_archiver(store) -> ChatArchiver:
+    settings = MagicMock(spec=Settings)
+    settings.CHAT_ARCHIVE_IDLE_DAYS = 90
+    settings.CHAT_ARCHIVE_BATCH_SIZE = 10
+    return ChatArchiver(settings, store)
+
+
+def test_segment_round_trip():
+    messages = [make_message(i) for i in range(4)]
+
+    rows = decode_segment(encode_segment(messages))
+
+    assert [row["id"] for row in rows] == [m.id for m in messages]
+    assert rows[1]["timestamp"] == messages[1].timestamp
+    assert rows[3]["metadata_"] == {"usage": {"prompt_tokens": 3}}
+
+
+@pytest.mark.asyncio
+async def test_local_store_round_trip(tmp_path):
+    store = LocalArchiveStore(tmp_path)
+    key = segment_key(make_session())
+
+    await store.write(key, b"segment")
+    assert await store.read(key) == b"segment"
+    assert [p.name for p in tmp_path.rglob("*")][-1] == f"{SESSION_ID}.jsonl.zst"
+
+    await store.delete(key)
+    await store.delete(key)  # Already gone
+    assert not (tmp_path / key).exists()
+
+
+@pytest.mark.asyncio
+async def test_archive_session_moves_messages_to_a_segment():
+    store = MemoryStore()
+    session = make_session()
+    messages = [make_message(i) for i in range(4)]
+    db = make_db(make_result(one=session), make_result(messages))
+
+    archived = await make_archiver(store).archive_session(
+        db, SESSION_ID, cutoff=START + timedelta(days=1)
+    )
+
+    assert archived is True
+    assert session.archive_key == segment_key(session)
+    assert session.archived_at is not None
+    assert len(decode_segment(store.segments[session.archive_key])) == 4
+    delete = db.execute.await_args_list[2].args[0]
+    assert delete.is_delete
+    db.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_archive_skips_sessions_active_again():
+    db = make_db(make_result(one=make_session()))
+
+    archived = await make_archiver(MemoryStore()).archive_session(
+        db, SESSION_ID, cutoff=START
+    )
+
+    assert archived is False
+    db.rollback.assert_awaited_once()
+    db.commit.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_rehydrate_restores_messages_and_removes_the_segment():
+    store = MemoryStore()
+    session = make_session(archived_at=START, archive_key="chat/segment.jsonl.zst")
+    store.segments[session.archive_key] = encode_segment(
+        [make_message(i) for i in range(3)]
+    )
+    db = make_db(make_result(one=session))
+
+    restored = await make_archiver(store).rehydrate(db, str(SESSION_ID), USER_ID)
+
+    assert restored is True
+    assert "chat_sessions.user_id" in str(db.execute.await_args_list[0].args[0])
+    insert = db.execute.await_args_list[1].args[0]
+    assert insert.is_insert
+    assert session.archived_at is None and session.archive_key is None
+    db.commit.assert_awaited_once()
+    assert store.segments == {}
+
+
+@pytest.mark.asyncio
+async def test_sessions_of_other_users_are_not_rehydrated():
+    archiver = make_archiver(MemoryStore())
+    archiver.rehydrate = AsyncMock()
+    # The lookup is scoped to the caller, so another user's session isn't found
+    db = make_db(make_result())
+
+    await archiver.ensure_hot(db, SESSION_ID, uuid.uuid4())
+
+    lookup = str(db.execute.await_args_list[0].args[0])
+    assert "chat_sessions.user_id" in lookup
+    archiver.rehydrate.assert_not_awaited()
+
+
+def test_archive_store_requires_every_operation():
+    class WriteOnlyStore(ArchiveStore):
+        async def write(self, key, data):
+            pass
+
+    with pytest.raises(TypeError):
+        WriteOnlyStore()
@@ -0,0 +1,84 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.dialects import postgresql
+
+from app.config import Settings
+from app.features.chat.pagination import HistoryCursor
+from app.services.chat_service import ChatService
+from tests.chat_helpers import (
+    SESSION_ID,
+    START,
+    USER_ID,
+    make_db,
+    make_message,
+    make_result,
+)
+
+
+def make_service() -> ChatService:
+    settings = MagicMock(spec=Settings)
+    settings.CHAT_WRITE_BEHIND_ENABLED = False
+    settings.CHAT_MEMORY_ENABLED = False
+    settings.CHAT_ARCHIVE_ENABLED = False
+    return ChatService(
+        settings=settings,
+        prompt_service=MagicMock(),
+        user_service=MagicMock(),
+        pipeline_registry=MagicMock(),
+        greeting_cache=AsyncMock(),
+        single_flight=MagicMock(),
+        history_assembler=MagicMock(),
+    )
+
+
+def compiled_query(db) -> str:
+    query = db.execute.call_args.args[0]
+    return str(query.compile(dialect=postgresql.dialect()))
+
+
+def test_cursor_round_trip():
+    cursor = HistoryCursor.of(make_message(3))
+    assert HistoryCursor.decode(cursor.encode()) == cursor
+    with pytest.raises(ValueError):
+        HistoryCursor.decode("not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_newest_page_is_chronological_with_older_cursor():
+    """The default page holds the newest messages; the extra row flags more."""
+    rows = [make_message(i) for i in range(5, -1, -1)]  # Newest first, limit + 1
+    db = make_db(make_result(rows, one=START))
+
+    page = await make_service().get_history(
+        db, USER_ID, session_id=str(SESSION_ID), limit=5
+    )
+
+    assert [m.content for m in page.messages] == [f"message {i}" for i in range(1, 6)]
+    assert page.has_more is True
+    assert HistoryCursor.decode(page.older_cursor) == HistoryCursor.of(rows[4])
+    assert HistoryCursor.decode(page.newer_cursor) == HistoryCursor.of(rows[0])
+    sql = compiled_query(db)
+    assert "ORDER BY chat_messages.timestamp DESC, chat_messages.id DESC" in sql
+    assert "LIMIT" in sql
+    # Bounded to the partitions since the session started
+    assert "chat_messages.timestamp >= %(timestamp_1)s" in sql
+
+
+@pytest.mark.asyncio
+async def test_pages_before_and_after_cursor():
+    cursor = HistoryCursor.of(make_message(10))
+
+    db = make_db(make_result([make_message(9), make_message(8)]))
+    older = await make_service().get_history(db, USER_ID, limit=5, before=cursor)
+    assert [m.content for m in older.messages] == ["message 8", "message 9"]
+    assert older.has_more is False and older.older_cursor is None
+    assert "(chat_messages.timestamp, chat_messages.id) <" in compiled_query(db)
+
+    db = make_db(make_result())
+    newer = await make_service().get_history(db, USER_ID, limit=5, after=cursor)
+    assert newer.messages == []
+    # Polling for new messages continues from the same position
+    assert newer.newer_cursor == cursor.encode()
+    sql = compiled_query(db)
+    assert "(chat_messages.timestamp, chat_messages.id) >" in sql
+    assert "ORDER BY chat_messages.timestamp, chat_messages.id" in sql
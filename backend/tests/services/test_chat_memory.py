@@ -0,0 +1,164 @@
+import asyncio
+import copy
+import threading
+import uuid
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from haystack.dataclasses import ChatMessage as HaystackChatMessage
+
+from app.config import Settings
+from app.db.models import User
+from app.db.models.memory import ChatTurnEmbedding
+from app.features.chat.tool_invoker import AppLoop
+from app.services.chat_service import ChatService, TurnRecord
+from app.services.prompt_service import PromptService
+from app.services.user_service import UserService
+from app.shared.tools import memory
+from app.shared.tools.memory import (
+    MemoryHit,
+    search_memory_tool_func,
+    store_turn_embedding,
+    turn_text,
+)
+
+
+@pytest.fixture
+def mock_user():
+    user = MagicMock(spec=User)
+    user.id = uuid.uuid4()
+    return user
+
+
+@pytest.fixture
+def memory_settings(mocker):
+    settings = MagicMock(spec=Settings)
+    settings.CHAT_MEMORY_TOP_K = 3
+    mocker.patch.object(memory, "get_settings", return_value=settings)
+    return settings
+
+
+def test_turn_text_is_truncated():
+    assert turn_text("hi", "hello", 100) == "User: hi\nAssistant: hello"
+    assert turn_text("hi", "hello", 8) == "User: hi"
+
+
+def test_app_loop_survives_state_copies_and_runs_on_its_loop():
+    """Coroutines handed over from another loop run on the application's loop."""
+    app_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=app_loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        handle = AppLoop(app_loop)
+        assert copy.deepcopy(handle) is handle
+
+        async def running_loop():
+            return asyncio.get_running_loop()
+
+        # As the tool invoker does, from a private loop in another thread
+        assert asyncio.run(handle.run(running_loop())) is app_loop
+    finally:
+        app_loop.call_soon_threadsafe(app_loop.stop)
+        thread.join()
+        app_loop.close()
+
+
+@pytest.mark.asyncio
+async def test_search_memory_tool_caps_results_and_formats_hits(
+    mocker, mock_user, memory_settings
+):
+    session_id = uuid.uuid4()
+    turn = ChatTurnEmbedding(
+        id=uuid.uuid4(),
+        session_id=session_id,
+        turn_at=datetime(2026, 9, 1, 12, tzinfo=timezone.utc),
+        content="User: my cat is called Miso\nAssistant: Noted!",
+    )
+    search = mocker.patch.object(
+        memory,
+        "_search_memory",
+        AsyncMock(return_value=[MemoryHit(turn=turn, similarity=0.87654)]),
+    )
+    current_session = str(uuid.uuid4())
+
+    result = await search_memory_tool_func(
+        query="cat name",
+        limit=10,
+        user=mock_user,
+        session_id=current_session,
+        app_loop=AppLoop(asyncio.get_running_loop()),
+    )
+
+    search.assert_awaited_once_with(mock_user.id, "cat name", 3, current_session)
+    assert result == {
+        "memories": [
+            {
+                "session_id": str(session_id),
+                "turn_at": "2026-09-01T12:00:00+00:00",
+                "content": turn.content,
+                "similarity": 0.877,
+            }
+        ]
+    }
+
+
+@pytest.mark.asyncio
+async def test_search_memory_tool_requires_state(mock_user, memory_settings):
+    result = await search_memory_tool_func(query="cat name", user=mock_user)
+    assert "error" in result
+
+
+@pytest.mark.asyncio
+async def test_store_turn_embedding_skips_unexpected_dimensions(mocker):
+    mocker.patch.object(memory, "embed_text", AsyncMock(return_value=None))
+    db = AsyncMock()
+
+    stored = await store_turn_embedding(
+        db,
+        turn_id=uuid.uuid4(),
+        user_id=uuid.uuid4(),
+        session_id=uuid.uuid4(),
+        turn_at=datetime.now(timezone.utc),
+        content="User: hi",
+    )
+
+    assert stored is False
+    db.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_persisted_turn_enqueues_its_embedding(mocker, mock_user):
+    queue = mocker.patch("app.services.chat_service.queue")
+    queue.enqueue = AsyncMock()
+    settings = MagicMock(spec=Settings)
+    settings.CHAT_WRITE_BEHIND_ENABLED = False
+    settings.CHAT_MEMORY_ENABLED = True
+    service = ChatService(
+        settings=settings,
+        prompt_service=MagicMock(spec=PromptService),
+        user_service=MagicMock(spec=UserService),
+        pipeline_registry=MagicMock(),
+        greeting_cache=AsyncMock(),
+        history_assembler=AsyncMock(),
+        semantic_cache=AsyncMock(),
+        single_flight=MagicMock(),
+    )
+    sent_at = datetime(2026, 10, 1, 9, tzinfo=timezone.utc)
+    turn = TurnRecord(
+        user=mock_user,
+        session_id=str(uuid.uuid4()),
+        user_message="remember my cat",
+        sent_at=sent_at,
+        replies=[HaystackChatMessage.from_assistant("Noted!")],
+    )
+
+    await service._persist_turn(AsyncMock(), turn)
+
+    queue.enqueue.assert_awaited_once()
+    args, kwargs = queue.enqueue.await_args
+    assert args == ("embed_chat_turn_task",)
+    assert kwargs["key"] == f"embed_chat_turn:{kwargs['turn_id']}"
+    assert kwargs["turn_at"] == sent_at.isoformat()
+    assert kwargs["user_message"] == "remember my cat"
+    assert kwargs["reply"] == "Noted!"
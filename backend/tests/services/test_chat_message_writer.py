@@ -0,0 +1,188 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import asyncpg
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.dialects import postgresql
+
+from app.config import Settings
+from app.db.models.chat import ChatMessage
+from app.features.chat import message_writer
+from app.features.chat.message_writer import (
+    ChatMessageWriter,
+    decode_row,
+    encode_row,
+    pending_session_messages,
+)
+
+SESSION_ID = uuid.uuid4()
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def make_row(index: int, role: str = "user"):
+    return {
+        "id": uuid.uuid4(),
+        "user_id": uuid.uuid4(),
+        "session_id": SESSION_ID,
+        "role": role,
+        "content": f"message {index}",
+        "timestamp": START + timedelta(microseconds=index),
+        "metadata_": {"usage": {"prompt_tokens": index}},
+    }
+
+
+@pytest.fixture
+def mock_redis():
+    redis = MagicMock()
+    redis.pipeline.return_value.execute = AsyncMock()
+    redis.zadd = AsyncMock()
+    return redis
+
+
+def make_writer(redis, batch_size=2) -> ChatMessageWriter:
+    settings = MagicMock(spec=Settings)
+    settings.CHAT_WRITE_BEHIND_ENABLED = True
+    settings.CHAT_WRITE_BEHIND_BATCH_SIZE = batch_size
+    settings.CHAT_WRITE_BEHIND_FLUSH_INTERVAL_SECONDS = 1.0
+    return ChatMessageWriter(settings, redis)
+
+
+def test_row_encoding_round_trips():
+    row = make_row(1)
+    assert decode_row(encode_row(row)) == row
+
+
+@pytest.mark.asyncio
+async def test_add_journals_before_buffering(mock_redis):
+    """Rows are journaled and indexed by session in one pipeline."""
+    writer = make_writer(mock_redis, batch_size=10)
+    rows = [make_row(0), make_row(1, role="assistant")]
+
+    await writer.add(rows)
+
+    pipe = mock_redis.pipeline.return_value
+    pipe.rpush.assert_called_once_with(
+        writer._journal_key, *[encode_row(r) for r in rows]
+    )
+    assert pipe.hset.call_count == 2
+    assert writer.stats()["pending"] == 2
+    assert not writer._wakeup.is_set()
+
+
+@pytest.mark.asyncio
+async def test_flush_copies_in_batches_and_trims_journal(mock_redis, mocker):
+    writer = make_writer(mock_redis, batch_size=2)
+    copy = mocker.patch.object(writer, "_copy", AsyncMock())
+    rows = [make_row(i) for i in range(3)]
+    await writer.add(rows)
+    assert writer._wakeup.is_set()  # A full batch wakes the flush loop
+
+    written = await writer.flush()
+
+    assert written == 3
+    assert [call.args[0] for call in copy.await_args_list] == [rows[:2], rows[2:]]
+    ltrims = mock_redis.pipeline.return_value.ltrim.call_args_list
+    assert [call.args[1] for call in ltrims] == [2, 1]
+    assert writer.stats()["batches"] == 2
+    assert writer.stats()["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_rows_buffered(mock_redis, mocker):
+    writer = make_writer(mock_redis)
+    mocker.patch.object(writer, "_copy", AsyncMock(side_effect=OSError("down")))
+    await writer.add([make_row(0)])
+
+    assert await writer.flush() == 0
+    assert writer.stats()["pending"] == 1
+    assert writer.stats()["errors"] == 1
+    mock_redis.pipeline.return_value.ltrim.assert_not_called()
+
+
+@pytest.fixture
+def mock_db(mocker):
+    """The session of `_insert_ignoring_existing`."""
+    db = AsyncMock()
+    session_factory = MagicMock()
+    session_factory.return_value.__aenter__.return_value = db
+    mocker.patch.object(message_writer, "async_session_factory", session_factory)
+    return db
+
+
+@pytest.mark.asyncio
+async def test_insert_ignoring_existing_targets_the_primary_key(mock_db, mocker):
+    upsert = mocker.patch.object(message_writer, "upsert_chat_sessions", AsyncMock())
+    rows = [make_row(0), make_row(1)]
+    # Only the second row wasn't stored before
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = [rows[1]["id"]]
+    mock_db.execute.return_value = result
+
+    await make_writer(MagicMock())._insert_ignoring_existing(rows)
+
+    statement = mock_db.execute.await_args.args[0]
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    primary_key = ", ".join(c.name for c in ChatMessage.__table__.primary_key)
+    assert f"ON CONFLICT ({primary_key}) DO NOTHING" in sql
+    upsert.assert_awaited_once_with(mock_db, [rows[1]])
+    mock_db.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_flush_falls_back_to_insert_for_replayed_rows(mock_redis, mocker):
+    writer = make_writer(mock_redis, batch_size=2)
+    mocker.patch.object(
+        writer, "_copy", AsyncMock(side_effect=asyncpg.UniqueViolationError())
+    )
+    insert = mocker.patch.object(writer, "_insert_ignoring_existing", AsyncMock())
+    rows = [make_row(i) for i in range(3)]
+    await writer.add(rows)
+
+    assert await writer.flush() == 3
+    assert [call.args[0] for call in insert.await_args_list] == [rows[:2], rows[2:]]
+    assert writer.stats()["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_stale_journals_are_replayed(mock_redis, mocker):
+    writer = make_writer(mock_redis)
+    rows = [make_row(0), make_row(1, role="assistant")]
+    mock_redis.zrangebyscore = AsyncMock(return_value=[writer.writer_id, "gone"])
+    mock_redis.eval = AsyncMock(return_value=[encode_row(r) for r in rows])
+    insert = mocker.patch.object(writer, "_insert_ignoring_existing", AsyncMock())
+
+    assert await writer.recover_stale_journals() == 2
+    insert.assert_awaited_once_with(rows)
+    assert mock_redis.pipeline.return_value.hdel.call_count == 2
+    assert writer.stats()["recovered"] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_replay_takes_the_rows_over(mock_redis, mocker):
+    writer = make_writer(mock_redis)
+    rows = [make_row(0)]
+    entries = [encode_row(r) for r in rows]
+    mock_redis.zrangebyscore = AsyncMock(return_value=["gone"])
+    mock_redis.eval = AsyncMock(return_value=entries)
+    mock_redis.rpush = AsyncMock()
+    mocker.patch.object(
+        writer, "_insert_ignoring_existing", AsyncMock(side_effect=OSError("down"))
+    )
+
+    with pytest.raises(OSError):
+        await writer.recover_stale_journals()
+    mock_redis.rpush.assert_awaited_once_with(writer._journal_key, *entries)
+    assert writer.stats()["pending"] == 1
+
+
+@pytest.mark.asyncio
+async def test_pending_session_messages_are_ordered():
+    rows = [make_row(2, role="assistant"), make_row(1)]
+    redis = MagicMock()
+    redis.hvals = AsyncMock(return_value=[encode_row(r) for r in rows])
+
+    messages = await pending_session_messages(redis, SESSION_ID)
+
+    assert [m.content for m in messages] == ["message 1", "message 2"]
+    assert messages[0].id == rows[1]["id"]
@@ -0,0 +1,104 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+import pytest
+from unittest.mock import MagicMock
+from sqlalchemy.exc import DBAPIError
+
+from app.db.partitions import (
+    add_months,
+    is_partition_table,
+    maintain_chat_partitions,
+    month_start,
+    partition_month,
+    partition_name,
+)
+
+NOW = datetime(2026, 11, 20, 8, 30, tzinfo=timezone.utc)
+
+
+class FakeConnection:
+    """Records DDL and answers the partition listing."""
+
+    def __init__(self, partitions, failing=()):
+        self.partitions = partitions
+        self.failing = failing
+        self.statements = []
+
+    async def execution_options(self, **options):
+        assert options == {"isolation_level": "AUTOCOMMIT"}
+        return self
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql)
+        if any(name in sql for name in self.failing):
+            raise DBAPIError(sql, params, Exception("lock timeout"))
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = self.partitions
+        return result
+
+
+def make_engine(conn):
+    engine = MagicMock()
+
+    @asynccontextmanager
+    async def connect():
+        yield conn
+
+    engine.connect = connect
+    return engine
+
+
+def test_month_arithmetic_and_names():
+    month = month_start(NOW)
+    assert month == datetime(2026, 11, 1, tzinfo=timezone.utc)
+    assert add_months(month, 2) == datetime(2027, 1, 1, tzinfo=timezone.utc)
+    assert add_months(month, -11) == datetime(2025, 12, 1, tzinfo=timezone.utc)
+    assert partition_name(month) == "chat_messages_y2026m11"
+    assert partition_month("chat_messages_y2026m11") == month
+    assert partition_month("chat_messages") is None
+    assert is_partition_table("chat_messages_default")
+    assert not is_partition_table("chat_sessions")
+
+
+@pytest.mark.asyncio
+async def test_maintenance_creates_missing_months_and_detaches_expired():
+    conn = FakeConnection(
+        [
+            "chat_messages_default",
+            "chat_messages_y2025m10",
+            "chat_messages_y2025m11",
+            "chat_messages_y2026m11",
+        ]
+    )
+
+    outcome = await maintain_chat_partitions(
+        make_engine(conn), months_ahead=2, retention_months=12, now=NOW
+    )
+
+    assert outcome.created == ["chat_messages_y2026m12", "chat_messages_y2027m01"]
+    # November 2025 still holds messages from less than 12 months ago
+    assert outcome.detached == ["chat_messages_y2025m10"]
+    assert outcome.failed == []
+    assert (
+        "CREATE TABLE IF NOT EXISTS chat_messages_y2026m12 PARTITION OF chat_messages "
+        "FOR VALUES FROM ('2026-12-01T00:00:00+00:00') TO ('2027-01-01T00:00:00+00:00')"
+        in conn.statements
+    )
+    assert (
+        "ALTER TABLE chat_messages DETACH PARTITION chat_messages_y2025m10"
+        in conn.statements
+    )
+
+
+@pytest.mark.asyncio
+async def test_maintenance_keeps_going_after_a_failure():
+    conn = FakeConnection(["chat_messages_y2025m01"], failing=["y2026m11"])
+
+    outcome = await maintain_chat_partitions(make_engine(conn), months_ahead=1, now=NOW)
+
+    assert outcome.failed == ["chat_messages_y2026m11"]
+    assert outcome.created == ["chat_messages_y2026m12"]
+    # Retention 0 keeps every partition attached
+    assert outcome.detached == []
@@ -0,0 +1,79 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.dialects import postgresql
+
+from app.db.models.chat import ChatMessage
+from app.features.chat.search import SearchCursor, search_chat_messages
+
+USER_ID = uuid.uuid4()
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def make_db(hits):
+    db = AsyncMock()
+    result = MagicMock()
+    result.all.return_value = hits
+    db.execute.return_value = result
+    return db
+
+
+def make_hit(rank: float):
+    message = ChatMessage(
+        id=uuid.uuid4(),
+        user_id=USER_ID,
+        session_id=uuid.uuid4(),
+        role="assistant",
+        content="Open with a hook.",
+        timestamp=START,
+    )
+    return message, rank, "Open with a <mark>hook</mark>."
+
+
+def compiled_query(db) -> str:
+    query = db.execute.await_args.args[0]
+    return str(query.compile(dialect=postgresql.dialect()))
+
+
+def test_cursor_round_trip_keeps_rank_exact():
+    cursor = SearchCursor(0.1 + 0.2, START, uuid.uuid4())
+    assert SearchCursor.decode(cursor.encode()) == cursor
+    with pytest.raises(ValueError):
+        SearchCursor.decode("not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_search_uses_the_index_and_pages_by_rank():
+    hits = [make_hit(0.5), make_hit(0.4), make_hit(0.3)]
+    db = make_db(hits)
+
+    page = await search_chat_messages(db, USER_ID, '"hook" intro', limit=2)
+
+    assert [hit.rank for hit in page.hits] == [0.5, 0.4]
+    assert page.has_more is True
+    assert SearchCursor.decode(page.next_cursor) == (
+        0.4,
+        hits[1][0].timestamp,
+        hits[1][0].id,
+    )
+    sql = compiled_query(db)
+    assert "chat_messages.user_id = %(user_id_1)s" in sql
+    assert "chat_messages.content_tsv @@ websearch_to_tsquery(" in sql
+    assert "ts_headline(" in sql
+
+
+@pytest.mark.asyncio
+async def test_search_after_cursor_within_a_session():
+    db = make_db([])
+    cursor = SearchCursor(0.4, START, uuid.uuid4())
+
+    page = await search_chat_messages(
+        db, USER_ID, "hook", session_id=uuid.uuid4(), after=cursor
+    )
+
+    assert page.hits == [] and page.next_cursor is None
+    sql = compiled_query(db)
+    assert "chat_messages.session_id = %(session_id_1)s" in sql
+    assert "chat_messages.timestamp, chat_messages.id) < (" in sql
@@ -0,0 +1,184 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from haystack.dataclasses import (
+    ChatMessage as HaystackChatMessage,
+    StreamingChunk,
+    ToolCall,
+)
+
+from app.config import Settings
+from app.db.models import User
+from app.features.chat.history import ChatHistoryAssembler, HistoryWindow
+from app.services.chat_service import ChatService, TurnRecord
+from app.services.prompt_service import PromptService
+from app.services.user_service import UserService
+from app.shared.clients.single_flight import SingleFlight
+
+
+@pytest.fixture
+def mock_user():
+    user = MagicMock(spec=User)
+    user.id = uuid.uuid4()
+    user.role = "user"
+    return user
+
+
+@pytest.fixture
+def mock_db(mocker):
+    """Patches the session factory used by streaming turns with a mock session."""
+    session = AsyncMock()
+    session.add = MagicMock()
+    session.add_all = MagicMock()
+    factory = MagicMock()
+    factory.return_value.__aenter__ = AsyncMock(return_value=session)
+    factory.return_value.__aexit__ = AsyncMock(return_value=False)
+    mocker.patch("app.services.chat_service.async_session_factory", new=factory)
+    return session
+
+
+def make_service(pipeline) -> ChatService:
+    registry = MagicMock()
+    registry.get_pipeline = AsyncMock(return_value=pipeline)
+    pipeline.get_component.return_value.system_prompt = "You are Anna."
+    history_assembler = AsyncMock(spec=ChatHistoryAssembler)
+    history_assembler.assemble.return_value = HistoryWindow()
+    settings = MagicMock(spec=Settings)
+    settings.SEMANTIC_CACHE_ENABLED = False
+    settings.CHAT_DEFERRED_PERSISTENCE = False
+    settings.CHAT_WRITE_BEHIND_ENABLED = False
+    settings.CHAT_MEMORY_ENABLED = False
+    return ChatService(
+        settings=settings,
+        prompt_service=MagicMock(spec=PromptService),
+        user_service=MagicMock(spec=UserService),
+        pipeline_registry=registry,
+        greeting_cache=AsyncMock(),
+        single_flight=SingleFlight(None, lock_ttl_seconds=1, result_ttl_seconds=1),
+        history_assembler=history_assembler,
+    )
+
+
+@pytest.mark.asyncio
+async def test_interact_stream_forwards_tokens_and_persists(mock_user, mock_db):
+    """Tokens from the streaming callback are yielded before the final done event."""
+
+    async def run_async(data):
+        callback = data["agent"]["streaming_callback"]
+        callback(StreamingChunk(content="Hel"))
+        callback(StreamingChunk(content="lo"))
+        return {
+            "agent": {
+                "messages": [
+                    HaystackChatMessage.from_system("You are Anna."),
+                    HaystackChatMessage.from_user("Hi"),
+                    HaystackChatMessage.from_assistant("Hello"),
+                ]
+            }
+        }
+
+    pipeline = MagicMock()
+    pipeline.run_async = AsyncMock(side_effect=run_async)
+    service = make_service(pipeline)
+
+    events = [
+        e async for e in service.interact_stream(user_message="Hi", user=mock_user)
+    ]
+
+    assert [e["event"] for e in events] == ["session", "token", "token", "done"]
+    assert "".join(e["data"]["content"] for e in events if e["event"] == "token") == (
+        "Hello"
+    )
+    assert events[-1]["data"]["reply"] == "Hello"
+    assert events[-1]["data"]["session_id"] == events[0]["data"]["session_id"]
+    # User message and reply stored with one INSERT, then the session upserted,
+    # in one commit
+    assert mock_db.execute.await_count == 2
+    rows = mock_db.execute.await_args_list[0].args[1]
+    assert [row["role"] for row in rows] == ["user", "assistant"]
+    assert rows[0]["timestamp"] < rows[1]["timestamp"]
+    mock_db.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_interact_stream_reports_errors(mock_user, mock_db):
+    """A failing agent run ends the stream with an error event."""
+    pipeline = MagicMock()
+    pipeline.run_async = AsyncMock(side_effect=RuntimeError("boom"))
+    service = make_service(pipeline)
+
+    events = [
+        e async for e in service.interact_stream(user_message="Hi", user=mock_user)
+    ]
+
+    assert [e["event"] for e in events] == ["session", "error"]
+    # Nothing is stored for a failed turn, not even the user message
+    mock_db.execute.assert_not_called()
+    mock_db.commit.assert_not_called()
+
+
+def test_turn_rows_keep_generation_order(mock_user):
+    """Tool calls, tool results and replies are stored in order, one row each."""
+    tool_call = ToolCall(tool_name="get_current_time", arguments={}, id="call_1")
+    turn = TurnRecord(
+        user=mock_user,
+        session_id=str(uuid.uuid4()),
+        user_message="What time is it?",
+        sent_at=datetime.now(timezone.utc),
+        replies=[
+            HaystackChatMessage.from_assistant(tool_calls=[tool_call]),
+            HaystackChatMessage.from_tool(tool_result="12:00", origin=tool_call),
+            HaystackChatMessage.from_assistant("It's noon."),
+        ],
+    )
+
+    rows = turn.rows()
+
+    assert [(row["role"], row["content"]) for row in rows] == [
+        ("user", "What time is it?"),
+        ("assistant", ""),
+        ("tool", "12:00"),
+        ("assistant", "It's noon."),
+    ]
+    timestamps = [row["timestamp"] for row in rows]
+    assert timestamps == sorted(timestamps) and len(set(timestamps)) == len(rows)
+    assert turn.final_reply_text == "It's noon."
+
+
+@pytest.mark.asyncio
+async def test_deferred_persistence_stores_after_done(mock_user, mock_db):
+    """In deferred mode the done event is emitted before the turn is stored."""
+    stored_before_done = []
+
+    async def run_async(data):
+        return {
+            "agent": {
+                "messages": [
+                    HaystackChatMessage.from_system("You are Anna."),
+                    HaystackChatMessage.from_user("Hi"),
+                    HaystackChatMessage.from_assistant("Hello"),
+                ]
+            }
+        }
+
+    pipeline = MagicMock()
+    pipeline.run_async = AsyncMock(side_effect=run_async)
+    service = make_service(pipeline)
+    pipeline.get_component.return_value.system_prompt = None
+    service.settings.CHAT_DEFERRED_PERSISTENCE = True
+
+    def emit(event, data):
+        if event == "done":
+            assert data["reply"] == "Hello"
+            stored_before_done.append(mock_db.execute.await_count)
+
+    await service.run_turn_with_events(
+        user_message="Hi", user=mock_user, session_id=str(uuid.uuid4()), emit=emit
+    )
+
+    assert stored_before_done == [0]
+    assert mock_db.execute.await_count == 2
+    mock_db.commit.assert_awaited_once()
@@ -0,0 +1,107 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.dialects import postgresql
+
+from app.db.models.chat import ChatSession
+from app.features.chat.pagination import HistoryCursor
+from app.features.chat.sessions import (
+    list_chat_sessions,
+    session_totals,
+    upsert_chat_sessions,
+)
+
+USER_ID = uuid.uuid4()
+SESSION_ID = uuid.uuid4()
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def make_row(index: int, role: str, content: str, usage=None) -> dict:
+    return {
+        "id": uuid.uuid4(),
+        "user_id": USER_ID,
+        "session_id": str(SESSION_ID),
+        "role": role,
+        "content": content,
+        "timestamp": START + timedelta(microseconds=index),
+        "metadata_": {"usage": usage} if usage else {},
+    }
+
+
+def turn_rows() -> list:
+    return [
+        make_row(0, "user", "What  time\nis it?"),
+        make_row(1, "assistant", "", {"prompt_tokens": 100, "completion_tokens": 5}),
+        make_row(2, "tool", "12:00"),
+        make_row(
+            3, "assistant", "It's noon.", {"prompt_tokens": 120, "completion_tokens": 4}
+        ),
+    ]
+
+
+def test_session_totals_aggregate_a_turn():
+    """A turn adds its rows and tokens; tool rows count but aren't previewed."""
+    [totals] = session_totals(reversed(turn_rows()))
+
+    assert totals["id"] == SESSION_ID
+    assert totals["user_id"] == USER_ID
+    assert totals["title"] == "What time is it?"
+    assert totals["last_message_preview"] == "It's noon."
+    assert totals["message_count"] == 4
+    assert (totals["prompt_tokens"], totals["completion_tokens"]) == (220, 9)
+    assert totals["created_at"] == START
+    assert totals["last_activity_at"] == START + timedelta(microseconds=3)
+
+
+@pytest.mark.asyncio
+async def test_upsert_adds_to_existing_sessions_of_the_same_user():
+    db = AsyncMock()
+
+    await upsert_chat_sessions(db, turn_rows())
+
+    sql = str(db.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (id) DO UPDATE" in sql
+    assert (
+        "message_count = (chat_sessions.message_count + excluded.message_count)" in sql
+    )
+    assert "WHERE chat_sessions.user_id = excluded.user_id" in sql
+
+
+@pytest.mark.asyncio
+async def test_upsert_skips_empty_batches():
+    db = AsyncMock()
+
+    await upsert_chat_sessions(db, [])
+
+    db.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_list_sessions_pages_by_last_activity():
+    sessions = [
+        ChatSession(
+            id=uuid.uuid4(),
+            user_id=USER_ID,
+            last_activity_at=START - timedelta(minutes=i),
+        )
+        for i in range(3)
+    ]
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = sessions
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=result)
+    before = HistoryCursor(START + timedelta(hours=1), uuid.uuid4())
+
+    page = await list_chat_sessions(db, USER_ID, limit=2, before=before)
+
+    assert page.sessions == sessions[:2]
+    assert page.has_more
+    assert HistoryCursor.decode(page.next_cursor) == (
+        sessions[1].last_activity_at,
+        sessions[1].id,
+    )
+    sql = str(db.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "ORDER BY chat_sessions.last_activity_at DESC, chat_sessions.id DESC" in sql
+    assert "(chat_sessions.last_activity_at, chat_sessions.id) <" in sql
@@ -0,0 +1,91 @@
+import uuid
+from unittest.mock import MagicMock
+
+import pytest
+from saq import Worker
+from saq.types import Context
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.config import Settings
+from app.features.chat import tasks
+from app.shared.clients import BACKGROUND, BATCH, INTERACTIVE
+from app.shared.clients.llm_limiter import current_llm_priority
+
+
+@pytest.fixture
+def ctx():
+    # Sessions connect lazily; the services doing the queries are replaced below
+    engine = create_async_engine("postgresql+asyncpg://u:p@localhost:5432/db")
+    return Context(
+        worker=MagicMock(spec=Worker),
+        db_session_factory=async_sessionmaker(engine, expire_on_commit=False),
+    )
+
+
+@pytest.fixture(autouse=True)
+def settings(mocker):
+    settings = MagicMock(spec=Settings)
+    mocker.patch.object(tasks, "get_settings", return_value=settings)
+    return settings
+
+
+@pytest.mark.asyncio
+async def test_greeting_task_runs_at_background_priority(ctx, mocker):
+    priorities = []
+
+    async def refresh_greeting(db, user_id):
+        priorities.append(current_llm_priority())
+
+    chat_service = mocker.patch.object(tasks, "ChatService")
+    chat_service.return_value.refresh_greeting.side_effect = refresh_greeting
+    mocker.patch.object(tasks, "PromptService")
+
+    result = await tasks.precompute_greeting_task(ctx, user_id=str(uuid.uuid4()))
+
+    assert result["status"] == "success"
+    assert priorities == [BACKGROUND]
+    assert current_llm_priority() == INTERACTIVE
+
+
+@pytest.mark.asyncio
+async def test_summary_task_runs_at_batch_priority(ctx, mocker):
+    priorities = []
+
+    async def summarize(db, session_id, user_id):
+        priorities.append(current_llm_priority())
+
+    assembler = mocker.patch.object(tasks, "ChatHistoryAssembler")
+    assembler.return_value.summarize.side_effect = summarize
+    mocker.patch.object(tasks, "PromptService")
+
+    result = await tasks.summarize_chat_session_task(
+        ctx, session_id=str(uuid.uuid4()), user_id=str(uuid.uuid4())
+    )
+
+    assert result["summarized_message_count"] is None
+    assert priorities == [BATCH]
+
+
+@pytest.mark.asyncio
+async def test_turn_embedding_task_runs_at_batch_priority(ctx, settings, mocker):
+    settings.CHAT_MEMORY_MAX_TURN_CHARS = 4000
+    priorities = []
+
+    async def store_turn_embedding(db, **kwargs):
+        priorities.append(current_llm_priority())
+        return True
+
+    mocker.patch.object(tasks, "store_turn_embedding", side_effect=store_turn_embedding)
+
+    result = await tasks.embed_chat_turn_task(
+        ctx,
+        turn_id=str(uuid.uuid4()),
+        user_id=str(uuid.uuid4()),
+        session_id=str(uuid.uuid4()),
+        turn_at="2026-10-01T12:00:00+00:00",
+        user_message="Hi",
+        reply="Hello!",
+    )
+
+    assert result["status"] == "success"
+    assert priorities == [BATCH]
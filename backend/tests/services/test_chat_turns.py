@@ -0,0 +1,142 @@
+import json
+import threading
+import uuid
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.config import Settings
+from app.features.chat.turn_events import TurnEventPublisher, read_turn_events
+from app.services.chat_service import ChatService
+from app.services.prompt_service import PromptService
+from app.services.user_service import UserService
+
+
+@pytest.fixture
+def mock_redis():
+    redis = MagicMock()
+    redis.written = []
+
+    def pipeline():
+        pipe = MagicMock()
+        pipe.xadd.side_effect = lambda key, fields, **kwargs: redis.written.append(
+            (key, fields)
+        )
+        pipe.execute = AsyncMock()
+        return pipe
+
+    redis.pipeline.side_effect = pipeline
+    return redis
+
+
+@pytest.mark.asyncio
+async def test_publisher_writes_events_in_order(mock_redis):
+    """Events emitted from other threads are written in emission order before aclose returns."""
+    publisher = TurnEventPublisher(mock_redis, "t1", ttl_seconds=60)
+
+    publisher.emit("tool_call", {"name": "search"})
+    worker = threading.Thread(
+        target=lambda: [publisher.emit("token", {"content": c}) for c in "abc"]
+    )
+    worker.start()
+    worker.join()
+    publisher.emit("done", {"reply": "abc"})
+    await publisher.aclose()
+
+    assert [key for key, _ in mock_redis.written] == ["chat:turn:t1:events"] * 5
+    assert [fields["event"] for _, fields in mock_redis.written] == [
+        "tool_call",
+        "token",
+        "token",
+        "token",
+        "done",
+    ]
+    assert json.loads(mock_redis.written[-1][1]["data"]) == {"reply": "abc"}
+
+
+@pytest.mark.asyncio
+async def test_read_turn_events_resumes_and_stops_at_terminal_event():
+    """Reading resumes after the given id, yields None on timeouts and ends at `done`."""
+    redis = MagicMock()
+    redis.exists = AsyncMock(return_value=1)
+    redis.xread = AsyncMock(
+        side_effect=[
+            [],
+            [
+                (
+                    "chat:turn:t1:events",
+                    [
+                        ("2-0", {"event": "token", "data": '{"content": "hi"}'}),
+                        ("3-0", {"event": "done", "data": '{"reply": "hi"}'}),
+                        ("4-0", {"event": "token", "data": '{"content": "late"}'}),
+                    ],
+                )
+            ],
+        ]
+    )
+
+    events = [item async for item in read_turn_events(redis, "t1", last_event_id="1-0")]
+
+    assert events == [
+        None,
+        ("2-0", "token", {"content": "hi"}),
+        ("3-0", "done", {"reply": "hi"}),
+    ]
+    assert redis.xread.await_args_list[0].args[0] == {"chat:turn:t1:events": "1-0"}
+
+
+@pytest.mark.asyncio
+async def test_read_turn_events_stops_when_turn_expired():
+    redis = MagicMock()
+    redis.exists = AsyncMock(return_value=0)
+    redis.xread = AsyncMock(return_value=[])
+
+    events = [item async for item in read_turn_events(redis, "t1")]
+
+    assert events == []
+
+
+@pytest.mark.asyncio
+async def test_enqueue_turn_registers_owner_and_queues_job():
+    """The turn is registered for its owner and queued with the turn timeout."""
+    settings = MagicMock(spec=Settings)
+    settings.CHAT_TURN_EVENTS_TTL_SECONDS = 3600
+    settings.CHAT_TURN_TIMEOUT_SECONDS = 300
+    chat_service = ChatService(
+        settings=settings,
+        prompt_service=MagicMock(spec=PromptService),
+        user_service=MagicMock(spec=UserService),
+        pipeline_registry=MagicMock(),
+        greeting_cache=AsyncMock(),
+        history_assembler=AsyncMock(),
+        semantic_cache=AsyncMock(),
+        single_flight=MagicMock(),
+    )
+    user_id = uuid.uuid4()
+
+    with (
+        patch(
+            "app.services.chat_service.register_turn", new_callable=AsyncMock
+        ) as mock_register,
+        patch(
+            "app.services.chat_service.queue.enqueue", new_callable=AsyncMock
+        ) as mock_enqueue,
+        patch("app.services.chat_service.get_redis"),
+    ):
+        turn = await chat_service.enqueue_turn(
+            user_message="hello", user_id=user_id, session_id="s1"
+        )
+
+    assert turn["session_id"] == "s1"
+    mock_register.assert_awaited_once()
+    assert mock_register.await_args.args[1] == turn["turn_id"]
+    assert mock_register.await_args.kwargs["user_id"] == str(user_id)
+    mock_enqueue.assert_awaited_once()
+    assert mock_enqueue.await_args.args == ("chat_turn_task",)
+    assert mock_enqueue.await_args.kwargs == {
+        "key": f"chat_turn:{turn['turn_id']}",
+        "timeout": 300,
+        "turn_id": turn["turn_id"],
+        "user_id": str(user_id),
+        "session_id": "s1",
+        "user_message": "hello",
+    }
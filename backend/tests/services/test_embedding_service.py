@@ -0,0 +1,185 @@
+import asyncio
+import math
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pytest
+from saq import Worker
+from saq.types import Context
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.config import Settings
+from app.services.embedding_service import (
+    EmbeddingBackend,
+    EmbeddingBatcher,
+    EmbeddingService,
+    LocalEmbeddingBackend,
+    batch_texts,
+    content_hash,
+    make_embedding_backend,
+)
+from app.shared.clients import BATCH
+from app.shared.clients.llm_limiter import current_llm_priority
+from app.shared.exceptions import EmbeddingDimensionError
+from app.worker import tasks
+
+
+class RecordingBackend(EmbeddingBackend):
+    """Returns a recognizable vector per text and records each batch."""
+
+    model = "test-model"
+
+    def __init__(self, dimensions=1536):
+        self.dimensions = dimensions
+        self.batches = []
+
+    async def embed(self, texts):
+        self.batches.append(list(texts))
+        return [[float(len(text))] * self.dimensions for text in texts]
+
+
+@pytest.fixture
+def settings():
+    settings = MagicMock(spec=Settings)
+    settings.EMBEDDING_BATCH_MAX_TOKENS = 10
+    settings.EMBEDDING_BATCH_MAX_TEXTS = 3
+    settings.EMBEDDING_MICROBATCH_WAIT_MS = 5.0
+    return settings
+
+
+def test_batches_respect_token_and_input_limits():
+    # 4, 4, 2, 1, 1 and 25 tokens
+    texts = ["a" * 16, "b" * 16, "c" * 8, "d", "e", "f" * 100]
+    batches = list(batch_texts(texts, max_tokens=10, max_texts=3))
+    assert batches == [texts[0:3], texts[3:5], texts[5:6]]
+
+
+def test_local_backend_is_deterministic_and_normalized():
+    backend = LocalEmbeddingBackend()
+    cats, cats_again, dogs = (
+        backend._embed_one(text)
+        for text in ("I like cats", "i like CATS", "Dogs bark loudly")
+    )
+    assert cats == cats_again
+    assert len(cats) == 1536
+    assert math.isclose(sum(v * v for v in cats), 1.0)
+    assert sum(a * b for a, b in zip(cats, dogs)) < 0.5
+
+
+def test_backend_must_implement_embed():
+    class ModelOnlyBackend(EmbeddingBackend):
+        model = "test-model"
+
+    with pytest.raises(TypeError):
+        ModelOnlyBackend()
+
+
+def test_backend_selection(settings):
+    settings.EMBEDDING_BACKEND = "local"
+    assert isinstance(make_embedding_backend(settings), LocalEmbeddingBackend)
+    settings.EMBEDDING_BACKEND = "nope"
+    with pytest.raises(ValueError):
+        make_embedding_backend(settings)
+
+
+@pytest.mark.asyncio
+async def test_embed_texts_deduplicates_and_batches(settings):
+    backend = RecordingBackend()
+    service = EmbeddingService(settings, backend)
+
+    embeddings = await service.embed_texts(["aaaa", "bb", "aaaa", "c", "d"])
+
+    assert [e[0] for e in embeddings] == [4.0, 2.0, 4.0, 1.0, 1.0]
+    assert backend.batches == [["aaaa", "bb", "c"], ["d"]]
+    stats = service.stats()
+    assert (stats["deduplicated"], stats["requests"], stats["computed"]) == (1, 2, 4)
+
+
+@pytest.mark.asyncio
+async def test_embed_serves_cached_texts_and_stores_the_others(settings):
+    backend = RecordingBackend()
+    service = EmbeddingService(settings, backend)
+    db = AsyncMock()
+    lookup = MagicMock()
+    lookup.all.return_value = [(content_hash("cached"), np.full(1536, 9.0))]
+    db.execute.side_effect = [lookup, MagicMock()]
+
+    embeddings = await service.embed(db, ["cached", "new", "new"])
+
+    assert [e[0] for e in embeddings] == [9.0, 3.0, 3.0]
+    assert backend.batches == [["new"]]
+    insert = db.execute.await_args_list[1].args[0]
+    assert "ON CONFLICT DO NOTHING" in str(insert)
+    db.commit.assert_awaited_once()
+    assert service.stats()["cached"] == 1
+
+
+@pytest.mark.asyncio
+async def test_embed_rejects_vectors_not_fitting_the_columns(settings):
+    service = EmbeddingService(settings, RecordingBackend(dimensions=3))
+    with pytest.raises(EmbeddingDimensionError):
+        await service.embed_texts(["text"])
+
+
+@pytest.mark.asyncio
+async def test_concurrent_queries_share_one_backend_call(settings):
+    backend = RecordingBackend()
+    service = EmbeddingService(settings, backend)
+
+    embeddings = await asyncio.gather(
+        service.embed_query("a"), service.embed_query("bb")
+    )
+
+    assert [e[0] for e in embeddings] == [1.0, 2.0]
+    assert backend.batches == [["a", "bb"]]
+    assert service.stats()["micro_batching"] == {"batches": 1, "texts": 2}
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_sent_without_waiting():
+    embed_fn = AsyncMock(side_effect=lambda texts: [[1.0] for _ in texts])
+    batcher = EmbeddingBatcher(embed_fn, max_wait_seconds=60, max_batch_size=2)
+
+    await asyncio.wait_for(
+        asyncio.gather(batcher.embed("a"), batcher.embed("b")), timeout=1
+    )
+
+    embed_fn.assert_awaited_once_with(["a", "b"])
+
+
+@pytest.mark.asyncio
+async def test_batch_failure_reaches_every_caller_and_skips_cancelled_ones():
+    embed_fn = AsyncMock(side_effect=RuntimeError("gateway down"))
+    batcher = EmbeddingBatcher(embed_fn, max_wait_seconds=0.01, max_batch_size=10)
+
+    cancelled = asyncio.create_task(batcher.embed("gone"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    results = await asyncio.gather(
+        batcher.embed("a"), batcher.embed("b"), return_exceptions=True
+    )
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    embed_fn.assert_awaited_once_with(["a", "b"])
+
+
+@pytest.mark.asyncio
+async def test_embed_texts_task_runs_at_batch_priority(mocker):
+    priorities = []
+
+    async def embed(db, texts):
+        priorities.append(current_llm_priority())
+
+    service = MagicMock(model="test-model")
+    service.embed.side_effect = embed
+    mocker.patch.object(tasks, "get_embedding_service", return_value=service)
+    # Sessions connect lazily, and the service doing the queries is replaced
+    engine = create_async_engine("postgresql+asyncpg://u:p@localhost:5432/db")
+    ctx = Context(
+        worker=MagicMock(spec=Worker), db_session_factory=async_sessionmaker(engine)
+    )
+
+    result = await tasks.embed_texts_task(ctx, texts=["a", "b"])
+
+    assert result["text_count"] == 2
+    assert priorities == [BATCH]
@@ -0,0 +1,145 @@
+import uuid
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from haystack.dataclasses import ChatMessage as HaystackChatMessage
+
+from app.config import Settings
+from app.db.models import User
+from app.features.chat.greeting_cache import CachedGreeting, GreetingCache
+from app.services.chat_service import ChatService
+from app.services.prompt_service import PromptService
+from app.services.user_service import UserService
+from app.shared.clients.single_flight import SingleFlight
+
+
+@pytest.fixture
+def mock_greeting_cache():
+    cache = AsyncMock(spec=GreetingCache)
+    cache.get.return_value = None
+    return cache
+
+
+@pytest.fixture
+def chat_service(mock_greeting_cache):
+    service = ChatService(
+        settings=MagicMock(spec=Settings),
+        prompt_service=MagicMock(spec=PromptService),
+        user_service=MagicMock(spec=UserService),
+        pipeline_registry=MagicMock(),
+        greeting_cache=mock_greeting_cache,
+        single_flight=SingleFlight(None, lock_ttl_seconds=1, result_ttl_seconds=1),
+    )
+    service.generate_greeting = AsyncMock(return_value="Welcome back!")
+    return service
+
+
+@pytest.fixture
+def mock_queue(mocker):
+    queue = mocker.patch("app.services.chat_service.queue")
+    queue.enqueue = AsyncMock()
+    return queue
+
+
+def patch_latest_message_id(mocker, value):
+    return mocker.patch(
+        "app.services.chat_service.get_latest_message_id",
+        new=AsyncMock(return_value=value),
+    )
+
+
+@pytest.mark.asyncio
+async def test_cache_miss_generates_and_stores(
+    mocker, chat_service, mock_greeting_cache, mock_queue
+):
+    """On a miss the greeting is generated inline and cached."""
+    user_id = uuid.uuid4()
+    latest_id = uuid.uuid4()
+    patch_latest_message_id(mocker, latest_id)
+
+    greeting = await chat_service.get_greeting(db=AsyncMock(), user_id=user_id)
+
+    assert greeting == "Welcome back!"
+    mock_greeting_cache.set.assert_awaited_once_with(
+        user_id, "Welcome back!", latest_id
+    )
+    mock_queue.enqueue.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_fresh_entry_is_served_without_llm_call(
+    mocker, chat_service, mock_greeting_cache, mock_queue
+):
+    """A cached greeting matching the latest message is returned as is."""
+    latest_id = uuid.uuid4()
+    patch_latest_message_id(mocker, latest_id)
+    mock_greeting_cache.get.return_value = CachedGreeting(
+        greeting="Cached hello", last_message_id=str(latest_id), generated_at="x"
+    )
+
+    greeting = await chat_service.get_greeting(db=AsyncMock(), user_id=uuid.uuid4())
+
+    assert greeting == "Cached hello"
+    chat_service.generate_greeting.assert_not_called()
+    mock_queue.enqueue.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_is_served_and_revalidated(
+    mocker, chat_service, mock_greeting_cache, mock_queue
+):
+    """A stale greeting is served immediately and a refresh job is enqueued."""
+    user_id = uuid.uuid4()
+    patch_latest_message_id(mocker, uuid.uuid4())
+    mock_greeting_cache.get.return_value = CachedGreeting(
+        greeting="Old hello", last_message_id=str(uuid.uuid4()), generated_at="x"
+    )
+
+    greeting = await chat_service.get_greeting(db=AsyncMock(), user_id=user_id)
+
+    assert greeting == "Old hello"
+    chat_service.generate_greeting.assert_not_called()
+    mock_queue.enqueue.assert_awaited_once()
+    assert mock_queue.enqueue.call_args.kwargs["user_id"] == str(user_id)
+
+
+def test_cached_greeting_freshness_without_history():
+    """A greeting generated before any messages is fresh until one arrives."""
+    entry = CachedGreeting(greeting="Hi", last_message_id=None, generated_at="x")
+
+    assert entry.is_fresh(None)
+    assert not entry.is_fresh(uuid.uuid4())
+
+
+@pytest.mark.asyncio
+async def test_greeting_is_generated_deterministically(mocker):
+    """Temperature 0 makes greetings eligible for the LLM response cache."""
+    prompt_service = MagicMock(spec=PromptService)
+    prompt_service.get_prompt_template_content = AsyncMock(
+        return_value="Greet {username}. History: {history}"
+    )
+    service = ChatService(
+        settings=MagicMock(spec=Settings),
+        prompt_service=prompt_service,
+        user_service=MagicMock(spec=UserService),
+        pipeline_registry=MagicMock(),
+        greeting_cache=AsyncMock(),
+        single_flight=SingleFlight(None, lock_ttl_seconds=1, result_ttl_seconds=1),
+    )
+    generator = MagicMock()
+    generator.run_async = AsyncMock(
+        return_value={"replies": [HaystackChatMessage.from_assistant("Hi Ana!")]}
+    )
+    mocker.patch("app.services.chat_service.get_llm_client_pool")
+    mocker.patch("app.services.chat_service.hedged_generator")
+    mocker.patch("app.services.chat_service.cached_generator", return_value=generator)
+    db = AsyncMock()
+    db.get.return_value = MagicMock(spec=User, username="Ana")
+    db.execute.return_value = MagicMock()
+
+    greeting = await service.generate_greeting(db, uuid.uuid4())
+
+    assert greeting == "Hi Ana!"
+    assert generator.run_async.await_args.kwargs["generation_kwargs"] == {
+        "temperature": 0
+    }
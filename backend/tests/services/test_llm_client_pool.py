@@ -0,0 +1,76 @@
+import httpx
+import pytest
+from pydantic import SecretStr
+
+from app.config import Settings
+from app.shared.clients import LLMClientPool
+
+
+@pytest.fixture
+def settings():
+    return Settings(
+        DATABASE_URL="sqlite+aiosqlite:///./test.db",
+        REDIS_URL="redis://localhost:6379/0",
+        SUPERTOKENS_CONNECTION_URI="http://localhost:3567",
+        SUPERTOKENS_API_KEY=SecretStr("testapikey"),
+        LLM_API_KEY=SecretStr("fake-llm-api-key"),
+        LLM_MODEL="fake-llm-model",
+        LLM_HTTP_MAX_CONNECTIONS=7,
+    )
+
+
+@pytest.mark.asyncio
+async def test_generators_share_pooled_clients(settings: Settings):
+    """Generators built by the pool reuse the pool's OpenAI clients."""
+    pool = LLMClientPool(settings)
+    try:
+        first = pool.build_chat_generator()
+        second = pool.build_chat_generator(model="other-model")
+
+        assert first.client is pool.client is second.client
+        assert first.async_client is pool.async_client
+        assert second.model == "other-model"
+        assert pool.get_chat_generator() is pool.get_chat_generator()
+    finally:
+        await pool.aclose()
+
+
+@pytest.mark.asyncio
+async def test_stats_report_pool_limits(settings: Settings):
+    """Pool statistics expose the configured limits and zeroed counters."""
+    pool = LLMClientPool(settings)
+    try:
+        stats = pool.stats()
+        assert stats["max_connections"] == 7
+        assert stats["requests"]["requests_total"] == 0
+    finally:
+        await pool.aclose()
+
+
+@pytest.mark.asyncio
+async def test_failed_requests_are_no_longer_awaiting_a_response(settings: Settings):
+    """Requests ending without a response, e.g. on timeouts, leave the gauge."""
+
+    def fail(request):
+        raise httpx.ConnectTimeout("timed out", request=request)
+
+    def respond(request):
+        return httpx.Response(503)
+
+    pool = LLMClientPool(settings)
+    try:
+        pool._http_client._transport.transport = httpx.MockTransport(respond)
+        pool._async_http_client._transport.transport = httpx.MockTransport(fail)
+
+        pool._http_client.get("http://llm.test/v1/models")
+        with pytest.raises(httpx.ConnectTimeout):
+            await pool._async_http_client.get("http://llm.test/v1/models")
+
+        requests = pool.stats()["requests"]
+        assert requests["requests_total"] == 2
+        assert requests["responses_total"] == 1
+        assert requests["errors_total"] == 1
+        assert requests["awaiting_response"] == 0
+        assert requests["max_awaiting_response"] == 1
+    finally:
+        await pool.aclose()
@@ -0,0 +1,136 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import MagicMock
+
+from haystack.dataclasses import ChatMessage, StreamingChunk
+
+from app.config import Settings
+from app.shared.clients.llm_hedge import HedgedChatGenerator
+from app.shared.exceptions import LLMLatencyBudgetExceededError
+
+
+class FakeGenerator:
+    """Answers after a delay, optionally streaming one chunk first, or fails."""
+
+    def __init__(self, model, delay, error=None, stream_after=None):
+        self.model = model
+        self.delay = delay
+        self.error = error
+        self.stream_after = stream_after
+        self.generation_kwargs = {}
+        self.streaming_callback = None
+        self.tools = None
+        self.cancelled = False
+
+    def _reply(self):
+        if self.error:
+            raise self.error
+        return {"replies": [ChatMessage.from_assistant(self.model)]}
+
+    def run(self, messages, streaming_callback=None, **kwargs):
+        time.sleep(self.delay)
+        return self._reply()
+
+    async def run_async(self, messages, streaming_callback=None, **kwargs):
+        try:
+            if self.stream_after is not None:
+                await asyncio.sleep(self.stream_after)
+                streaming_callback(StreamingChunk(content=self.model))
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return self._reply()
+
+
+def make_settings(**overrides) -> Settings:
+    settings = MagicMock(spec=Settings)
+    settings.LLM_HEDGING_ENABLED = True
+    settings.LLM_HEDGE_PERCENTILE = 95.0
+    settings.LLM_HEDGE_MIN_DELAY_SECONDS = 0.05
+    settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS = 0.05
+    settings.LLM_LATENCY_BUDGET_SECONDS = 0.0
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    return settings
+
+
+@pytest.mark.asyncio
+async def test_straggler_is_hedged_and_cancelled():
+    primary = FakeGenerator("primary", delay=1.0)
+    fallback = FakeGenerator("fallback", delay=0.01)
+    generator = HedgedChatGenerator([primary, fallback], make_settings())
+
+    result = await generator.run_async(messages=[ChatMessage.from_user("hi")])
+
+    assert result["replies"][0].text == "fallback"
+    await asyncio.sleep(0)
+    assert primary.cancelled
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_is_not_hedged():
+    primary = FakeGenerator("primary", delay=0.01)
+    fallback = FakeGenerator("fallback", delay=0.01, error=AssertionError("called"))
+    generator = HedgedChatGenerator([primary, fallback], make_settings())
+
+    result = await generator.run_async(messages=[ChatMessage.from_user("hi")])
+
+    assert result["replies"][0].text == "primary"
+
+
+@pytest.mark.asyncio
+async def test_failure_falls_back_in_order():
+    primary = FakeGenerator("primary", delay=0, error=RuntimeError("502"))
+    fallback = FakeGenerator("fallback", delay=0.01)
+    generator = HedgedChatGenerator(
+        [primary, fallback], make_settings(LLM_HEDGING_ENABLED=False)
+    )
+
+    result = await generator.run_async(messages=[ChatMessage.from_user("hi")])
+
+    assert result["replies"][0].text == "fallback"
+
+
+@pytest.mark.asyncio
+async def test_latency_budget():
+    generator = HedgedChatGenerator(
+        [FakeGenerator("primary", delay=1.0), FakeGenerator("fallback", delay=1.0)],
+        make_settings(),
+        latency_budget_seconds=0.2,
+    )
+
+    with pytest.raises(LLMLatencyBudgetExceededError):
+        await generator.run_async(messages=[ChatMessage.from_user("hi")])
+
+
+@pytest.mark.asyncio
+async def test_first_call_to_stream_owns_the_output():
+    """Once a call streamed, no hedge is sent and only its chunks are forwarded."""
+    primary = FakeGenerator("primary", delay=0.2, stream_after=0.01)
+    fallback = FakeGenerator("fallback", delay=0, error=AssertionError("called"))
+    chunks = []
+    generator = HedgedChatGenerator([primary, fallback], make_settings())
+
+    result = await generator.run_async(
+        messages=[ChatMessage.from_user("hi")],
+        streaming_callback=lambda chunk: chunks.append(chunk.content),
+    )
+
+    assert result["replies"][0].text == "primary"
+    assert chunks == ["primary"]
+
+
+def test_sync_straggler_is_hedged():
+    """The Agent's sync calls are raced in threads."""
+    generator = HedgedChatGenerator(
+        [FakeGenerator("primary", delay=0.5), FakeGenerator("fallback", delay=0.01)],
+        make_settings(),
+    )
+
+    start = time.monotonic()
+    result = generator.run(messages=[ChatMessage.from_user("hi")])
+
+    assert result["replies"][0].text == "fallback"
+    assert time.monotonic() - start < 0.4
@@ -0,0 +1,130 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from haystack.dataclasses import ChatMessage
+
+from app.config import Settings
+from app.shared.clients.llm_limiter import (
+    BATCH,
+    INTERACTIVE,
+    LLMRateLimiter,
+    RateLimitedChatGenerator,
+    llm_priority,
+)
+from app.shared.exceptions import LLMRateLimitTimeoutError
+
+
+def make_settings(**overrides) -> Settings:
+    settings = MagicMock(spec=Settings)
+    settings.LLM_RATE_LIMIT_REQUESTS_PER_MINUTE = 60
+    settings.LLM_RATE_LIMIT_TOKENS_PER_MINUTE = 10000
+    settings.LLM_MAX_CONCURRENT_REQUESTS = 4
+    settings.LLM_RATE_LIMIT_OVERRIDE_MAP = {}
+    settings.LLM_RATE_LIMIT_RESERVE_RATIO = 0.2
+    settings.LLM_RATE_LIMIT_MAX_WAIT_SECONDS = 1.0
+    settings.LLM_RATE_LIMIT_COMPLETION_TOKENS = 100
+    settings.LLM_TIMEOUT = 60.0
+    settings.LLM_MAX_RETRIES = 2
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    return settings
+
+
+def make_limiter(settings: Settings, acquire_results) -> LLMRateLimiter:
+    redis = MagicMock()
+    acquire, release = AsyncMock(side_effect=acquire_results), AsyncMock()
+    redis.register_script.side_effect = [acquire, release]
+    return LLMRateLimiter(settings, redis, MagicMock())
+
+
+@pytest.mark.asyncio
+async def test_waits_for_capacity_and_releases_with_actual_usage():
+    """A call waits out the retry hint, then returns unused tokens on release."""
+    limiter = make_limiter(make_settings(), [20, 0])
+
+    async with limiter.limit("m", 500) as lease:
+        lease.actual_tokens = 120
+
+    assert limiter._acquire.await_count == 2
+    keys = limiter._acquire.await_args.kwargs["keys"]
+    assert keys == [
+        "llm:limit:m:requests",
+        "llm:limit:m:tokens",
+        "llm:limit:m:inflight",
+    ]
+    release = limiter._release.await_args.kwargs
+    assert release["args"] == [380, lease.lease_id]
+    assert limiter.stats()["counts"][INTERACTIVE]["delayed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_priority_context_reserves_capacity():
+    """Lower priorities are checked against a reserve kept for interactive calls."""
+    limiter = make_limiter(make_settings(), [0])
+
+    with llm_priority(BATCH):
+        async with limiter.limit("m", 10):
+            pass
+
+    # Batch calls leave twice the reserve ratio untouched
+    assert limiter._acquire.await_args.kwargs["args"][3] == pytest.approx(0.4)
+
+
+@pytest.mark.asyncio
+async def test_oversized_requests_settle_against_the_charged_tokens():
+    """Calls larger than the usable bucket are charged, and refunded, at its size."""
+    limiter = make_limiter(make_settings(), [0])
+
+    with llm_priority(BATCH):
+        async with limiter.limit("m", 10000) as lease:
+            lease.actual_tokens = 7000
+
+    assert limiter._acquire.await_args.kwargs["args"][4] == 6000
+    assert limiter._release.await_args.kwargs["args"] == [-1000, lease.lease_id]
+
+
+@pytest.mark.asyncio
+async def test_times_out_without_capacity():
+    limiter = make_limiter(
+        make_settings(LLM_RATE_LIMIT_MAX_WAIT_SECONDS=0.05), [1000] * 10
+    )
+
+    with pytest.raises(LLMRateLimitTimeoutError):
+        async with limiter.limit("m", 10):
+            pass
+
+    limiter._release.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_unlimited_models_skip_redis():
+    settings = make_settings(
+        LLM_RATE_LIMIT_REQUESTS_PER_MINUTE=0,
+        LLM_RATE_LIMIT_TOKENS_PER_MINUTE=0,
+        LLM_MAX_CONCURRENT_REQUESTS=0,
+    )
+    limiter = make_limiter(settings, [0])
+
+    async with limiter.limit("m", 10) as lease:
+        assert lease is None
+
+    limiter._acquire.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_generator_estimates_tokens_and_records_usage():
+    limiter = make_limiter(make_settings(), [0])
+    generator = MagicMock()
+    generator.model = "m"
+    generator.generation_kwargs = {"max_tokens": 50}
+    reply = ChatMessage.from_assistant("hi", meta={"usage": {"total_tokens": 30}})
+    generator.run_async = AsyncMock(return_value={"replies": [reply]})
+
+    result = await RateLimitedChatGenerator(generator, limiter).run_async(
+        messages=[ChatMessage.from_user("x" * 400)]
+    )
+
+    assert result["replies"] == [reply]
+    # 400 characters / 4 + max_tokens
+    assert limiter._acquire.await_args.kwargs["args"][4] == 150
+    assert limiter._release.await_args.kwargs["args"][0] == 120
@@ -0,0 +1,107 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from haystack.components.generators.chat import OpenAIChatGenerator
+from haystack.dataclasses import ChatMessage
+
+from app.config import Settings
+from app.shared.clients.llm_cache import CachedChatGenerator, LLMResponseCache
+
+
+class InMemoryRedis:
+    """Just enough of the sync Redis client for the cache's read and write paths."""
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def pipeline(self):
+        pipe = MagicMock()
+        pipe.set.side_effect = lambda key, value, ex: self.values.__setitem__(
+            key, value
+        )
+        pipe.execute.return_value = [True, 1, 0, 1]
+        return pipe
+
+
+@pytest.fixture
+def mock_settings():
+    settings = MagicMock(spec=Settings)
+    settings.LLM_CACHE_ENABLED = True
+    settings.LLM_CACHE_PIPELINE_LIST = ["greeting"]
+    settings.LLM_CACHE_TTL_SECONDS = 60
+    settings.LLM_CACHE_MAX_ENTRIES = 100
+    settings.LLM_CACHE_MAX_ENTRY_BYTES = 64 * 1024
+    return settings
+
+
+@pytest.fixture
+def cache(mock_settings):
+    return LLMResponseCache(mock_settings, AsyncMock(), InMemoryRedis())
+
+
+@pytest.fixture
+def mock_generator():
+    generator = MagicMock(spec=OpenAIChatGenerator)
+    generator.model = "fake-llm-model"
+    generator.generation_kwargs = {}
+    generator.streaming_callback = None
+    generator.tools = None
+    generator.run.return_value = {
+        "replies": [ChatMessage.from_assistant("Hello!", meta={"usage": {"n": 1}})]
+    }
+    return generator
+
+
+def test_key_ignores_meta_and_tracks_prompt_version():
+    """Message metadata doesn't affect the key; a prompt version bump does."""
+    kwargs = dict(
+        pipeline="greeting",
+        model="m",
+        tools=None,
+        generation_kwargs={"temperature": 0},
+    )
+    plain = [ChatMessage.from_assistant("Hi")]
+    with_meta = [ChatMessage.from_assistant("Hi", meta={"usage": {"n": 3}})]
+
+    v1 = LLMResponseCache.make_key(
+        prompt_versions={"greeting": "v1"}, messages=plain, **kwargs
+    )
+
+    assert v1 == LLMResponseCache.make_key(
+        prompt_versions={"greeting": "v1"}, messages=with_meta, **kwargs
+    )
+    assert v1 != LLMResponseCache.make_key(
+        prompt_versions={"greeting": "v2"}, messages=plain, **kwargs
+    )
+
+
+def test_deterministic_request_is_served_from_cache(cache, mock_generator):
+    """The second identical temperature-0 request doesn't reach the LLM."""
+    cached = CachedChatGenerator(
+        mock_generator, cache, pipeline="greeting", prompt_versions={"greeting": "v1"}
+    )
+    messages = [ChatMessage.from_user("Greet me")]
+
+    first = cached.run(messages=messages, generation_kwargs={"temperature": 0})
+    second = cached.run(messages=messages, generation_kwargs={"temperature": 0})
+
+    mock_generator.run.assert_called_once()
+    assert second["replies"][0].text == first["replies"][0].text == "Hello!"
+    assert second["replies"][0].meta["cache_hit"] is True
+    assert cache.metrics.snapshot()["greeting"]["hits"] == 1
+    assert cache.metrics.snapshot()["greeting"]["misses"] == 1
+
+
+def test_sampled_request_bypasses_cache(cache, mock_generator):
+    """Requests without temperature 0 always reach the LLM."""
+    cached = CachedChatGenerator(mock_generator, cache, pipeline="greeting")
+    messages = [ChatMessage.from_user("Greet me")]
+
+    cached.run(messages=messages)
+    cached.run(messages=messages)
+
+    assert mock_generator.run.call_count == 2
+    assert cache.metrics.snapshot()["greeting"]["bypassed"] == 2
@@ -0,0 +1,110 @@
+from haystack.dataclasses import ChatMessage
+from haystack.tools import Tool
+from haystack.utils import Secret
+from openai.types.completion_usage import CompletionUsage, PromptTokensDetails
+
+from app.features.chat import prompt_cache
+from app.features.chat.prompt_cache import (
+    PromptCacheMetrics,
+    cached_prompt_tokens,
+    prefix_fingerprint,
+    record_prompt_cache_usage,
+    stable_tools,
+)
+from app.shared.clients.llm import PooledChatGenerator
+
+
+def make_tool(name: str) -> Tool:
+    return Tool(
+        name=name,
+        description=f"The {name} tool.",
+        parameters={"type": "object", "properties": {}},
+        function=lambda: None,
+    )
+
+
+def test_prefix_is_stable_across_turns():
+    """Tool order and recent messages don't change the prefix; the summary does."""
+    system_prompt = "You are Anna."
+    summary = ChatMessage.from_system("Summary of the earlier conversation:\nHi.")
+    tools = [make_tool("b"), make_tool("a")]
+
+    first = prefix_fingerprint(
+        system_prompt, stable_tools(tools), [summary, ChatMessage.from_user("one")]
+    )
+    second = prefix_fingerprint(
+        system_prompt,
+        stable_tools(reversed(tools)),
+        [summary, ChatMessage.from_user("one"), ChatMessage.from_user("two")],
+    )
+    refolded = prefix_fingerprint(
+        system_prompt,
+        stable_tools(tools),
+        [ChatMessage.from_system("Another summary"), ChatMessage.from_user("one")],
+    )
+
+    assert [tool.name for tool in stable_tools(tools)] == ["a", "b"]
+    assert first == second
+    assert refolded != first
+
+
+def test_cached_prompt_tokens_formats():
+    usage = CompletionUsage(
+        prompt_tokens=2000,
+        completion_tokens=10,
+        total_tokens=2010,
+        prompt_tokens_details=PromptTokensDetails(cached_tokens=1536),
+    )
+
+    assert cached_prompt_tokens(dict(usage)) == 1536
+    assert cached_prompt_tokens({"cache_read_input_tokens": 1024}) == 1024
+    assert cached_prompt_tokens({"prompt_tokens": 20}) == 0
+    assert cached_prompt_tokens({}) == 0
+
+
+def test_record_usage_annotates_replies(monkeypatch):
+    metrics = PromptCacheMetrics()
+    monkeypatch.setattr(prompt_cache, "_metrics", metrics)
+    usage = CompletionUsage(
+        prompt_tokens=2000,
+        completion_tokens=10,
+        total_tokens=2010,
+        prompt_tokens_details=PromptTokensDetails(cached_tokens=1536),
+    )
+    fresh = ChatMessage.from_assistant("Hi", meta={"model": "m", "usage": dict(usage)})
+    cold = ChatMessage.from_assistant(
+        "Hi", meta={"model": "m", "usage": {"prompt_tokens": 1000}}
+    )
+    replayed = ChatMessage.from_assistant(
+        "Hi", meta={"model": "m", "usage": {"prompt_tokens": 5}, "cache_hit": True}
+    )
+
+    record_prompt_cache_usage(
+        [ChatMessage.from_user("Hello"), fresh, cold, replayed], prefix="abc"
+    )
+
+    # The pydantic usage details are converted so the metadata can be stored as JSON
+    assert fresh.meta["usage"]["prompt_tokens_details"]["cached_tokens"] == 1536
+    assert fresh.meta["prompt_cache"] == {
+        "prefix": "abc",
+        "prompt_tokens": 2000,
+        "cached_tokens": 1536,
+    }
+    assert "prompt_cache" not in replayed.meta
+    stats = metrics.stats()["m"]
+    assert stats["requests"] == 2
+    assert stats["hit_rate"] == 0.5
+    assert stats["cached_token_ratio"] == 1536 / 3000
+
+
+def test_streamed_calls_request_usage():
+    generator = PooledChatGenerator(api_key=Secret.from_token("test"), model="m")
+    messages = [ChatMessage.from_user("Hello")]
+
+    streamed = generator._prepare_api_call(
+        messages=messages, streaming_callback=lambda chunk: None
+    )
+    blocking = generator._prepare_api_call(messages=messages)
+
+    assert streamed["stream_options"] == {"include_usage": True}
+    assert "stream_options" not in blocking
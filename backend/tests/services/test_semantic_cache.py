@@ -0,0 +1,230 @@
+import uuid
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from haystack.dataclasses import ChatMessage as HaystackChatMessage, ToolCall
+
+from app.config import Settings
+from app.db.models import User
+from app.db.models.semantic_cache import SemanticCacheEntry
+from app.features.chat.history import HistoryWindow
+from app.features.chat.semantic_cache import (
+    SemanticCache,
+    SemanticLookup,
+    make_prompt_key,
+)
+from app.services.chat_service import ChatService
+from app.services.prompt_service import PromptService
+from app.services.user_service import UserService
+from app.shared.clients.single_flight import SingleFlight
+
+
+@pytest.fixture
+def mock_user():
+    user = MagicMock(spec=User)
+    user.id = uuid.uuid4()
+    return user
+
+
+@pytest.fixture
+def mock_pipeline():
+    pipeline = MagicMock()
+    pipeline.get_component.return_value.system_prompt = None
+    pipeline.run_async = AsyncMock(
+        return_value={
+            "agent": {
+                "messages": [
+                    HaystackChatMessage.from_user("what are my tasks"),
+                    HaystackChatMessage.from_assistant("You have 2 tasks."),
+                ]
+            }
+        }
+    )
+    return pipeline
+
+
+@pytest.fixture
+def mock_semantic_cache():
+    cache = AsyncMock(spec=SemanticCache)
+    cache.enabled = True
+    return cache
+
+
+@pytest.fixture
+def chat_service(mock_pipeline, mock_semantic_cache):
+    registry = MagicMock()
+    registry.get_pipeline = AsyncMock(return_value=mock_pipeline)
+    registry.make_key.return_value = ("chat", "dev", (("system", "v1"),), "m")
+    return ChatService(
+        settings=MagicMock(spec=Settings),
+        prompt_service=MagicMock(spec=PromptService),
+        user_service=MagicMock(spec=UserService),
+        pipeline_registry=registry,
+        greeting_cache=AsyncMock(),
+        history_assembler=AsyncMock(),
+        semantic_cache=mock_semantic_cache,
+        single_flight=SingleFlight(None, lock_ttl_seconds=1, result_ttl_seconds=1),
+    )
+
+
+def test_make_prompt_key():
+    key = ("chat", "dev", (("system", "v1"), ("greeting", "v2")), "model-x")
+    assert make_prompt_key(key) == "chat:dev:system=v1,greeting=v2:model-x"
+
+
+@pytest.mark.asyncio
+async def test_hit_skips_the_agent(
+    chat_service, mock_pipeline, mock_semantic_cache, mock_user
+):
+    """A similar enough cached answer is returned without running the pipeline."""
+    entry = SemanticCacheEntry(id=uuid.uuid4(), response="You have 2 tasks.")
+    mock_semantic_cache.lookup.return_value = SemanticLookup(
+        query_embedding=[0.1], entry=entry, similarity=0.98
+    )
+    streamed = []
+
+    replies = await chat_service._run_agent(
+        db=AsyncMock(),
+        user_message="show my tasks",
+        user=mock_user,
+        session_id=str(uuid.uuid4()),
+        history=HistoryWindow(),
+        streaming_callback=lambda chunk: streamed.append(chunk.content),
+    )
+
+    assert [r.text for r in replies] == ["You have 2 tasks."]
+    assert replies[0].meta["semantic_cache"]["similarity"] == 0.98
+    assert streamed == ["You have 2 tasks."]
+    mock_pipeline.run_async.assert_not_awaited()
+    mock_semantic_cache.lookup.assert_awaited_once()
+    assert (
+        mock_semantic_cache.lookup.await_args.kwargs["prompt_key"]
+        == "chat:dev:system=v1:m"
+    )
+
+
+@pytest.mark.asyncio
+async def test_miss_runs_agent_and_stores_answer(
+    chat_service, mock_pipeline, mock_semantic_cache, mock_user
+):
+    """On a miss the agent's final reply is stored for future queries."""
+    lookup = SemanticLookup(query_embedding=[0.1])
+    mock_semantic_cache.lookup.return_value = lookup
+
+    replies = await chat_service._run_agent(
+        db=AsyncMock(),
+        user_message="what are my tasks",
+        user=mock_user,
+        session_id=str(uuid.uuid4()),
+    )
+
+    assert [r.text for r in replies] == ["You have 2 tasks."]
+    mock_semantic_cache.store.assert_awaited_once()
+    assert mock_semantic_cache.store.await_args.args[1] is lookup
+    assert mock_semantic_cache.store.await_args.kwargs["response"] == (
+        "You have 2 tasks."
+    )
+
+
+@pytest.mark.asyncio
+async def test_follow_up_bypasses_cache(
+    chat_service, mock_pipeline, mock_semantic_cache, mock_user
+):
+    """Messages with session history always run the agent."""
+    history = HistoryWindow(messages=[HaystackChatMessage.from_user("hi")])
+    mock_pipeline.run_async.return_value["agent"]["messages"].insert(
+        0, history.messages[0]
+    )
+
+    await chat_service._run_agent(
+        db=AsyncMock(),
+        user_message="what are my tasks",
+        user=mock_user,
+        session_id=str(uuid.uuid4()),
+        history=history,
+    )
+
+    mock_semantic_cache.lookup.assert_not_awaited()
+    mock_pipeline.run_async.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_answers_from_tool_calls_are_not_stored(
+    chat_service, mock_pipeline, mock_semantic_cache, mock_user
+):
+    """Answers citing tool results would go stale, so they aren't cached."""
+    mock_semantic_cache.lookup.return_value = SemanticLookup(query_embedding=[0.1])
+    mock_pipeline.run_async.return_value["agent"]["messages"][1:1] = [
+        HaystackChatMessage.from_assistant(
+            tool_calls=[ToolCall(tool_name="get_user_tasks", arguments={})]
+        ),
+        HaystackChatMessage.from_tool(
+            "[]", ToolCall(tool_name="get_user_tasks", arguments={})
+        ),
+    ]
+
+    replies = await chat_service._run_agent(
+        db=AsyncMock(),
+        user_message="what are my tasks",
+        user=mock_user,
+        session_id=str(uuid.uuid4()),
+    )
+
+    assert replies[-1].text == "You have 2 tasks."
+    mock_semantic_cache.store.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_lookup_commits_the_hit_count(mocker):
+    settings = MagicMock(spec=Settings)
+    settings.SEMANTIC_CACHE_SIMILARITY_THRESHOLD = 0.9
+    settings.SEMANTIC_CACHE_EF_SEARCH = 40
+    embedding_service = MagicMock()
+    embedding_service.embed_query = AsyncMock(return_value=[0.1])
+    mocker.patch(
+        "app.features.chat.semantic_cache.get_embedding_service",
+        return_value=embedding_service,
+    )
+    entry = SemanticCacheEntry(id=uuid.uuid4(), response="Hook tips.")
+    nearest = MagicMock()
+    nearest.first.return_value = (entry, 0.05)
+    db = AsyncMock()
+    db.execute.side_effect = [MagicMock(), nearest, MagicMock()]
+
+    lookup = await SemanticCache(settings).lookup(
+        db, user_id=uuid.uuid4(), prompt_key="k", query="tips for a hook"
+    )
+
+    assert lookup.hit
+    assert "hit_count" in str(db.execute.await_args_list[2].args[0])
+    db.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_lookup_scans_the_index_iteratively(mocker):
+    """Other users' entries can't exhaust the HNSW candidates before a match."""
+    settings = MagicMock(spec=Settings)
+    settings.SEMANTIC_CACHE_EF_SEARCH = 100
+    embedding_service = MagicMock()
+    embedding_service.embed_query = AsyncMock(return_value=[0.1])
+    mocker.patch(
+        "app.features.chat.semantic_cache.get_embedding_service",
+        return_value=embedding_service,
+    )
+    nearest = MagicMock()
+    nearest.first.return_value = None
+    db = AsyncMock()
+    db.execute.side_effect = [MagicMock(), nearest]
+
+    lookup = await SemanticCache(settings).lookup(
+        db, user_id=uuid.uuid4(), prompt_key="k", query="tips for a hook"
+    )
+
+    assert not lookup.hit
+    config = (
+        db.execute.await_args_list[0]
+        .args[0]
+        .compile(compile_kwargs={"literal_binds": True})
+    )
+    assert "set_config('hnsw.ef_search', '100', true)" in str(config)
+    assert "set_config('hnsw.iterative_scan', 'relaxed_order', true)" in str(config)
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock
+
+from app.shared.clients.single_flight import SingleFlight
+
+
+def make_single_flight(redis=None) -> SingleFlight:
+    return SingleFlight(
+        redis,
+        lock_ttl_seconds=1.0,
+        result_ttl_seconds=10,
+        poll_interval_seconds=0.01,
+    )
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_execution():
+    """Callers with the same key await the first caller's result."""
+    single_flight = make_single_flight()
+    calls = 0
+
+    async def generate():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "Hello!"
+
+    results = await asyncio.gather(
+        *[single_flight.do("greeting:u1", generate) for _ in range(5)]
+    )
+
+    assert results == ["Hello!"] * 5
+    assert calls == 1
+    assert single_flight.stats()["joined_local"] == 4
+
+
+@pytest.mark.asyncio
+async def test_leader_failure_reaches_all_waiters():
+    """An exception in the shared call is raised to every waiter."""
+    single_flight = make_single_flight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(
+        *[single_flight.do("k", fail) for _ in range(3)], return_exceptions=True
+    )
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    # A later call runs again instead of replaying the failure
+    assert await single_flight.do("k", AsyncMock(return_value=1)) == 1
+
+
+@pytest.mark.asyncio
+async def test_result_published_by_another_process_is_reused():
+    """A call in flight in another process is awaited instead of run again."""
+    redis = AsyncMock()
+    redis.set.return_value = None  # The lock is held by the other process
+    published = json.dumps({"reply": "Hi", "session_id": "s"})
+    redis.get.side_effect = lambda key: {
+        "singleflight:lock:chat:interact:k": "other",
+        "singleflight:result:chat:interact:k:other": published,
+    }.get(key)
+    single_flight = make_single_flight(redis)
+    fn = AsyncMock()
+
+    result = await single_flight.do("chat:interact:k", fn)
+
+    assert result == {"reply": "Hi", "session_id": "s"}
+    fn.assert_not_awaited()
+    assert single_flight.stats()["joined_remote"] == 1
+
+
+@pytest.mark.asyncio
+async def test_finished_call_is_not_replayed():
+    """A call made after the previous one finished runs again."""
+    redis = AsyncMock()
+    redis.set.return_value = True
+    single_flight = make_single_flight(redis)
+
+    first = await single_flight.do("k", AsyncMock(return_value="yes"))
+    second = await single_flight.do("k", AsyncMock(return_value="again"))
+
+    assert (first, second) == ("yes", "again")
+    redis.get.assert_not_awaited()
+    assert single_flight.stats()["led"] == 2
+
+
+@pytest.mark.asyncio
+async def test_leader_publishes_result_and_releases_lock():
+    """The process holding the lock publishes its result for other processes."""
+    redis = AsyncMock()
+    redis.set.return_value = True
+    single_flight = make_single_flight(redis)
+
+    result = await single_flight.do("k", AsyncMock(return_value="Hello!"))
+
+    assert result == "Hello!"
+    lock_call, result_call = redis.set.await_args_list
+    token = lock_call.args[1]
+    assert result_call.args == (f"singleflight:result:k:{token}", json.dumps("Hello!"))
+    assert result_call.kwargs == {"ex": 10}
+    redis.eval.assert_awaited_once()
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import uuid
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.config import Settings
+from app.db.models import UserVideo, Video
+from app.features.chat.tools.user import (
+    get_user_tasks_tool_func,
+    register_tool_cache_invalidation,
+)
+from app.shared.tools import cache as tool_cache
+from app.shared.tools.cache import ToolResultCache
+
+
+@pytest.fixture
+def mock_user():
+    return SimpleNamespace(id=uuid.uuid4(), role="user")
+
+
+@pytest.fixture
+def mock_cache():
+    cache = MagicMock(spec=ToolResultCache)
+    cache.enabled = True
+    cache.make_key.side_effect = ToolResultCache.make_key
+    with patch.object(tool_cache, "get_tool_result_cache", return_value=cache):
+        yield cache
+
+
+@pytest.mark.asyncio
+async def test_hit_skips_the_tool(mock_cache, mock_user):
+    user_service = MagicMock()
+    mock_cache.get.return_value = (True, {"tasks": ["Intro video"]}, [0, 0])
+
+    result = await get_user_tasks_tool_func(
+        state={"user": mock_user, "user_service": user_service}
+    )
+
+    assert result == {"tasks": ["Intro video"]}
+    user_service.get_user_tasks.assert_not_called()
+    key, tags = mock_cache.get.call_args.args
+    assert key.startswith(f"toolcache:v1:get_user_tasks_tool_func:{mock_user.id}:")
+    assert tags == sorted([f"user_videos:{mock_user.id}", "videos"])
+
+
+@pytest.mark.asyncio
+async def test_miss_stores_result_with_generations_read_before_the_call(
+    mock_cache, mock_user
+):
+    user_service = MagicMock()
+
+    async def get_user_tasks(user_id):
+        return ["Intro video"]
+
+    user_service.get_user_tasks.side_effect = get_user_tasks
+    mock_cache.get.return_value = (False, None, [3, 7])
+
+    result = await get_user_tasks_tool_func(
+        state={"user": mock_user, "user_service": user_service}
+    )
+
+    assert result == {"tasks": ["Intro video"]}
+    key, stored, generations, ttl = mock_cache.set.call_args.args
+    assert stored == result
+    assert generations == [3, 7]
+    assert ttl == 300
+
+
+@pytest.mark.asyncio
+async def test_errors_are_not_cached(mock_cache, mock_user):
+    mock_cache.get.return_value = (False, None, [0, 0])
+
+    result = await get_user_tasks_tool_func(state={"user": mock_user})
+
+    assert "error" in result
+    mock_cache.set.assert_not_called()
+
+
+def test_entry_with_stale_generations_misses():
+    """An entry computed before one of its tags was invalidated is not served."""
+    redis = MagicMock()
+    redis.pipeline.return_value.execute.return_value = [
+        json.dumps({"generations": [1, 4], "result": {"tasks": []}}),
+        ["1", "5"],
+    ]
+    cache = ToolResultCache(MagicMock(spec=Settings), redis)
+
+    hit, result, generations = cache.get("key", ["a", "b"])
+
+    assert not hit
+    assert generations == [1, 5]
+
+
+def test_orm_changes_collect_invalidation_tags():
+    """UserVideo changes and video title changes are mapped to tags on flush."""
+    register_tool_cache_invalidation()
+    user_id = uuid.uuid4()
+    renamed = Video(title="Old")
+    session = SimpleNamespace(
+        info={},
+        new=[UserVideo(user_id=user_id, video_id=uuid.uuid4()), Video(title="New")],
+        dirty=[renamed],
+        deleted=[],
+    )
+    # Simulate a loaded row whose title was changed
+    set_committed_value(renamed, "title", "Old")
+    renamed.title = "Renamed"
+
+    tool_cache._collect_tags(session, None)
+
+    assert session.info[tool_cache._SESSION_TAGS_KEY] == {
+        f"user_videos:{user_id}",
+        "videos",
+    }
+
+
+@pytest.mark.asyncio
+async def test_commit_on_an_event_loop_invalidates_through_the_async_client():
+    """The after_commit hook never makes a blocking Redis call on the loop."""
+    redis = MagicMock()
+    async_redis = MagicMock()
+    async_redis.pipeline.return_value.execute = AsyncMock()
+    cache = ToolResultCache(MagicMock(spec=Settings), redis, async_redis)
+    session = SimpleNamespace(info={tool_cache._SESSION_TAGS_KEY: {"videos", "a"}})
+
+    with patch.object(tool_cache, "get_tool_result_cache", return_value=cache):
+        tool_cache._invalidate_committed(session)
+        await asyncio.gather(*tool_cache._pending_invalidations)
+
+    redis.pipeline.assert_not_called()
+    pipe = async_redis.pipeline.return_value
+    assert [c.args for c in pipe.incr.call_args_list] == [
+        ("toolcache:gen:a",),
+        ("toolcache:gen:videos",),
+    ]
+    pipe.execute.assert_awaited_once()
+    assert tool_cache._SESSION_TAGS_KEY not in session.info
+
+
+def test_commit_outside_an_event_loop_invalidates_through_the_sync_client():
+    redis = MagicMock()
+    cache = ToolResultCache(MagicMock(spec=Settings), redis, MagicMock())
+    session = SimpleNamespace(info={tool_cache._SESSION_TAGS_KEY: {"videos"}})
+
+    with patch.object(tool_cache, "get_tool_result_cache", return_value=cache):
+        tool_cache._invalidate_committed(session)
+
+    redis.pipeline.return_value.incr.assert_called_once_with("toolcache:gen:videos")
+    redis.pipeline.return_value.execute.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_ainvalidate_without_an_async_client_uses_the_sync_client():
+    redis = MagicMock()
+    cache = ToolResultCache(MagicMock(spec=Settings), redis)
+
+    await cache.ainvalidate(["videos"])
+
+    redis.pipeline.return_value.incr.assert_called_once_with("toolcache:gen:videos")
+    redis.pipeline.return_value.execute.assert_called_once()
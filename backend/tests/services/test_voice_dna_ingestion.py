@@ -0,0 +1,245 @@
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import tiktoken
+from saq import Worker
+from saq.types import Context
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.config import Settings
+from app.db.models.voice_dna import CreatorTranscript
+from app.features.voice_dna import tasks
+from app.features.voice_dna.pipelines import (
+    TiktokenTokenizer,
+    chunk_sentences,
+    chunk_transcript,
+    get_tokenizer,
+    iter_caption_text,
+    iter_sentences,
+)
+from app.features.voice_dna.service import (
+    FileTranscriptSource,
+    FixtureTranscriptSource,
+    TranscriptSource,
+    VoiceDnaService,
+)
+from app.shared.clients import BATCH
+from app.shared.clients.llm_limiter import current_llm_priority
+
+
+class WordTokenizer:
+    """One token per whitespace-separated word."""
+
+    def encode(self, text):
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+@pytest.fixture(scope="module")
+def byte_tokenizer():
+    """
+    A byte-level BPE merging only a space into the byte after it, like the real
+    encodings do, so every multi-byte character spans tokens.
+    """
+    ranks = {bytes([i]): i for i in range(256)}
+    ranks.update({b" " + bytes([i]): 256 + i for i in range(256)})
+    encoding = tiktoken.Encoding(
+        name="bytes",
+        pat_str=r"""'s|'t|'re|'ve|'m|'ll|'d| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+""",
+        mergeable_ranks=ranks,
+        special_tokens={},
+    )
+    return TiktokenTokenizer(encoding)
+
+
+@pytest.fixture(scope="module")
+def cl100k():
+    try:
+        return get_tokenizer("cl100k_base")
+    except Exception:
+        pytest.skip(
+            "cl100k_base is neither cached in TIKTOKEN_CACHE_DIR nor downloadable"
+        )
+
+
+@pytest.fixture
+def settings():
+    settings = MagicMock(spec=Settings)
+    settings.VOICE_DNA_CHUNK_MAX_TOKENS = 8
+    settings.VOICE_DNA_CHUNK_OVERLAP_TOKENS = 3
+    settings.VOICE_DNA_INSERT_BATCH_SIZE = 2
+    settings.EMBEDDING_BATCH_MAX_TEXTS = 256
+    return settings
+
+
+def test_sentences_span_pieces_and_long_runs_are_cut():
+    pieces = ["First one. Sec", "ond  one!\nThird", " one"]
+    assert list(iter_sentences(pieces)) == ["First one.", "Second one!", "Third one"]
+
+    run_on = ["word " * 10]
+    sentences = list(iter_sentences(run_on, max_chars=12))
+    assert all(len(s) <= 12 for s in sentences)
+    assert " ".join(sentences) == " ".join(["word"] * 10)
+
+
+def test_caption_markup_and_rolling_repeats_are_dropped():
+    lines = [
+        "WEBVTT",
+        "",
+        "NOTE generated",
+        "by a tool",
+        "",
+        "1",
+        "00:00:01.000 --> 00:00:02.000",
+        "<c>Hello</c> there",
+        "",
+        "00:00:02.000 --> 00:00:03.000",
+        "Hello there",
+        "friends",
+    ]
+    assert list(iter_caption_text(lines)) == ["Hello there\n", "friends\n"]
+
+
+def test_chunks_stay_within_budget_and_overlap():
+    sentences = ["a b c.", "d e f.", "g h.", "i j k.", "l."]
+    chunks = list(
+        chunk_sentences(sentences, WordTokenizer(), max_tokens=8, overlap_tokens=3)
+    )
+
+    assert [c.content for c in chunks] == [
+        "a b c. d e f. g h.",
+        "g h. i j k. l.",
+    ]
+    assert [c.index for c in chunks] == [0, 1]
+    assert all(c.token_count <= 8 for c in chunks)
+
+
+def test_overlong_sentence_is_split_at_token_boundaries():
+    words = [f"w{i}" for i in range(10)]
+    chunks = list(chunk_transcript([" ".join(words)], WordTokenizer(), max_tokens=4))
+    assert [c.content.split() for c in chunks] == [words[0:4], words[4:8], words[8:]]
+
+
+@pytest.mark.parametrize("max_tokens", range(4, 13))
+def test_multibyte_characters_are_never_cut(byte_tokenizer, max_tokens):
+    text = (
+        "caf\u00e9 \U0001f600\U0001f389 \u65e5\u672c\u8a9e\u306e\u6587\u7ae0 na\u00efve "
+        * 3
+    )
+
+    chunks = list(chunk_transcript([text], byte_tokenizer, max_tokens=max_tokens))
+
+    assert all("\ufffd" not in c.content for c in chunks)
+    assert all(c.token_count <= max_tokens for c in chunks)
+    assert "".join(c.content for c in chunks).replace(" ", "") == text.replace(" ", "")
+
+
+def test_cl100k_chunks_respect_the_budget(cl100k):
+    text = "\u6211\u4eec\u4eca\u5929\u804a\u804a\u89c6\u9891\u526a\u8f91\U0001f3ac" * 40
+    text += " Then we wrap up. Thanks for watching! \U0001f44b\U0001f3fd"
+
+    chunks = list(chunk_transcript([text], cl100k, max_tokens=32, overlap_tokens=8))
+
+    assert len(chunks) > 1
+    assert all("\ufffd" not in c.content for c in chunks)
+    assert all(c.token_count <= 32 for c in chunks)
+
+
+def test_file_source_reads_captions_and_rejects_escaping_refs(tmp_path):
+    (tmp_path / "show").mkdir()
+    (tmp_path / "show" / "ep1.srt").write_text(
+        "1\n00:00:01,000 --> 00:00:02,000\nHi all.\n"
+    )
+    (tmp_path / "show" / "cover.jpg").write_bytes(b"")
+    source = FileTranscriptSource(str(tmp_path))
+
+    assert list(source.iter_refs("show")) == ["show/ep1.srt"]
+    assert "".join(source.read("show/ep1.srt")) == "Hi all.\n"
+    with pytest.raises(ValueError):
+        source.path("../etc/passwd")
+
+
+def test_transcript_source_must_list_and_read():
+    class ListOnlySource(TranscriptSource):
+        def iter_refs(self, prefix=""):
+            return iter(())
+
+    with pytest.raises(TypeError):
+        ListOnlySource()
+
+
+@pytest.mark.asyncio
+async def test_ingestion_inserts_chunks_in_batches(settings):
+    settings.VOICE_DNA_CHUNK_OVERLAP_TOKENS = 0
+    source = FixtureTranscriptSource({"ep1.txt": "One two three. " * 10})
+    service = VoiceDnaService(settings, source, tokenizer=WordTokenizer())
+    transcript = CreatorTranscript(
+        id=uuid.uuid4(), user_id=uuid.uuid4(), source_ref="ep1.txt", status="pending"
+    )
+    db = AsyncMock()
+    db.add = MagicMock()
+    lookup = MagicMock()
+    lookup.scalars.return_value.first.return_value = transcript
+    db.execute.return_value = lookup
+
+    result = await service.ingest_transcript(db, transcript.user_id, "ep1.txt")
+
+    # Lookup, DELETE of the old chunks, then one INSERT per batch of 2 chunks
+    inserts = [call.args[1] for call in db.execute.await_args_list[2:]]
+    assert [len(rows) for rows in inserts] == [2, 2, 1]
+    assert [row["chunk_index"] for rows in inserts for row in rows] == list(range(5))
+    assert result.status == "chunked"
+    assert (result.chunk_count, result.token_count) == (5, 30)
+    assert result.content_hash is not None
+    db.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_unchanged_transcript_is_skipped(settings):
+    source = FixtureTranscriptSource({"ep1.txt": "Same as before."})
+    service = VoiceDnaService(settings, source, tokenizer=WordTokenizer())
+    transcript = CreatorTranscript(
+        user_id=uuid.uuid4(),
+        source_ref="ep1.txt",
+        status="embedded",
+        content_hash=source.content_hash("ep1.txt"),
+    )
+    db = AsyncMock()
+    lookup = MagicMock()
+    lookup.scalars.return_value.first.return_value = transcript
+    db.execute.return_value = lookup
+
+    await service.ingest_transcript(db, transcript.user_id, "ep1.txt")
+
+    db.execute.assert_awaited_once()
+    db.commit.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_embedding_task_runs_at_batch_priority(settings, mocker):
+    priorities = []
+
+    async def embed_transcript_chunks(self, db, transcript_id):
+        priorities.append(current_llm_priority())
+        return 3
+
+    settings.VOICE_DNA_TRANSCRIPT_DIR = "/data/transcripts"
+    mocker.patch.object(tasks, "get_settings", return_value=settings)
+    mocker.patch.object(
+        VoiceDnaService, "embed_transcript_chunks", embed_transcript_chunks
+    )
+    # Sessions connect lazily, and the method doing the queries is replaced
+    engine = create_async_engine("postgresql+asyncpg://u:p@localhost:5432/db")
+    ctx = Context(
+        worker=MagicMock(spec=Worker), db_session_factory=async_sessionmaker(engine)
+    )
+
+    result = await tasks.embed_transcript_chunks_task(
+        ctx, transcript_id=str(uuid.uuid4())
+    )
+
+    assert result["embedded_count"] == 3
+    assert priorities == [BATCH]